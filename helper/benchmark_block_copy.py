@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+Compare writing an image file with dd and its default block size
+of 512 bytes against BlockCopy.copy
+
+usage: benchmark_block_copy.py [image_mbytes] [target]
+
+A partly sparse image of the given size in MB (default: 1024) is
+generated and written to the given target (default: a file in the
+temporary directory). The target can be a block device, e.g a
+partition of a loop mapped disk image, which is overwritten
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from kiwi.utils.block_copy import BlockCopy
+
+
+def create_image(filename, image_mbytes):
+    data = os.urandom(1 << 20)
+    with open(filename, 'wb') as image:
+        for mbyte in range(image_mbytes):
+            # every fourth MB is left as a hole
+            if mbyte % 4:
+                image.seek(mbyte << 20)
+                image.write(data)
+        image.truncate(image_mbytes << 20)
+
+
+def write_dd(image, target):
+    subprocess.run(
+        ['dd', 'if=' + image, 'of=' + target, 'conv=fsync'],
+        stderr=subprocess.DEVNULL, check=True
+    )
+    return 'dd'
+
+
+def write_block_copy(image, target, sparse=False, direct=False):
+    return BlockCopy.copy(image, target, sparse, direct).method
+
+
+def main():
+    image_mbytes = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    work_dir = tempfile.mkdtemp(prefix='kiwi_block_copy_benchmark.')
+    target = sys.argv[2] if len(sys.argv) > 2 else os.sep.join(
+        [work_dir, 'target']
+    )
+    try:
+        image = os.sep.join([work_dir, 'image'])
+        create_image(image, image_mbytes)
+        print('{0} MB image written to {1}'.format(image_mbytes, target))
+        print('{0:20} {1:>16} {2:>10}'.format('writer', 'method', 'wall s'))
+        for name, writer in [
+            ('dd', write_dd),
+            ('BlockCopy', write_block_copy),
+            ('BlockCopy sparse', lambda image, target: write_block_copy(
+                image, target, sparse=True
+            )),
+            ('BlockCopy direct', lambda image, target: write_block_copy(
+                image, target, direct=True
+            ))
+        ]:
+            if os.path.isfile(target):
+                os.unlink(target)
+            wall_start = time.perf_counter()
+            method = writer(image, target)
+            wall_seconds = time.perf_counter() - wall_start
+            print('{0:20} {1:>16} {2:>10.2f}'.format(
+                name, method, wall_seconds
+            ))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
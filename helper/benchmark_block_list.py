@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""
+Compare the block list calculation used for checksum files
+
+usage: benchmark_block_list.py [count]
+
+The former implementation factorized the file size by calling the
+coreutils factor tool, the current one uses an in-process trial
+division via kiwi.utils.block_geometry. Both are run on the same
+set of random file sizes and must produce identical results.
+"""
+import subprocess
+import random
+import sys
+import time
+
+from kiwi.utils.block_geometry import BlockGeometry
+
+
+def factor_block_list(file_size):
+    factor_call = subprocess.check_output(['factor', format(file_size)])
+    blocksize = 1
+    for factor in factor_call.decode().split(':')[1].split():
+        if blocksize * int(factor) > BlockGeometry.max_blocksize:
+            break
+        blocksize *= int(factor)
+    return (blocksize, int(file_size / blocksize))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    random.seed(count)
+    file_sizes = [random.randrange(1, 1 << 40) for _ in range(count)]
+
+    start = time.perf_counter()
+    factor_results = [factor_block_list(size) for size in file_sizes]
+    factor_time = time.perf_counter() - start
+
+    BlockGeometry.get_block_list.cache_clear()
+    start = time.perf_counter()
+    geometry_results = [
+        tuple(BlockGeometry.get_block_list(size)) for size in file_sizes
+    ]
+    geometry_time = time.perf_counter() - start
+
+    if factor_results != geometry_results:
+        sys.exit('Results differ between implementations')
+
+    print('file sizes       : {0}'.format(count))
+    print('factor subprocess: {0:.3f}s ({1:.1f}us/call)'.format(
+        factor_time, factor_time / count * 1e6
+    ))
+    print('in-process       : {0:.3f}s ({1:.1f}us/call)'.format(
+        geometry_time, geometry_time / count * 1e6
+    ))
+    print('speedup          : {0:.0f}x'.format(factor_time / geometry_time))
+
+
+if __name__ == '__main__':
+    main()
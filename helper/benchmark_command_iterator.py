@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+"""
+Compare the CommandIterator from kiwi.command_process with the
+previous reader which consumed the command output byte by byte
+
+usage: benchmark_command_iterator.py [lines] [line_length]
+
+A child process writes the given number of lines (default: 2000)
+of the given length (default: 80) to stdout and every tenth line
+also to stderr, similar to a package manager installing packages.
+For each reader the CPU time spent in kiwi, the wall clock time
+and the output throughput is reported.
+"""
+import logging
+import select
+import time
+import sys
+
+from kiwi.logger import log
+from kiwi.command import Command
+from kiwi.command_process import CommandIterator
+
+
+def legacy_iterator(command):
+    """
+    The previous CommandIterator implementation, one select
+    call with a 1e-4 seconds timeout per byte and channel
+    """
+    def available(channel):
+        readable, writable, exceptional = select.select(
+            [channel], [], [channel], 1e-4
+        )
+        return readable and not exceptional
+
+    output_line = b''
+    output_eof = errors_eof = False
+    while command.process.poll() is None or not (output_eof and errors_eof):
+        if available(command.output):
+            byte_read = command.output.read(1)
+            if not byte_read:
+                output_eof = True
+            elif byte_read == b'\n':
+                yield output_line.decode()
+                output_line = b''
+            else:
+                output_line += byte_read
+        if available(command.error):
+            if not command.error.read(1):
+                errors_eof = True
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    line_length = int(sys.argv[2]) if len(sys.argv) > 2 else 80
+    log.setLogLevel(logging.INFO)
+    child = [
+        sys.executable, '-c',
+        'import sys\n'
+        'for n in range({0}):\n'
+        '    sys.stdout.write("x" * {1} + "\\n")\n'
+        '    if not n % 10:\n'
+        '        sys.stderr.write("warning\\n")\n'.format(
+            lines, line_length - 1
+        )
+    ]
+    print('{0} lines, {1:.1f} MB output'.format(
+        lines, lines * line_length / 1048576
+    ))
+    print('{0:20} {1:>10} {2:>10} {3:>10}'.format(
+        'reader', 'cpu s', 'wall s', 'MB/s'
+    ))
+    for name, reader in [
+        ('byte by byte', legacy_iterator),
+        ('CommandIterator', CommandIterator)
+    ]:
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        line_count = sum(1 for line in reader(Command.call(child)))
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = time.process_time() - cpu_start
+        assert line_count == lines
+        print('{0:20} {1:>10.2f} {2:>10.2f} {3:>10.2f}'.format(
+            name, cpu_seconds, wall_seconds,
+            lines * line_length / 1048576 / wall_seconds
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""
+Compare the compression backends used by kiwi.utils.compress
+
+usage: benchmark_compress.py [root_tree] [threads]
+
+A tar archive of the given root tree (default: /usr/share) is
+created and compressed with each backend available on the host.
+For each backend the compression ratio and the throughput in
+MB/s of uncompressed data is reported. The thread count applies
+to all multithreaded backends, 0 means one thread per CPU.
+"""
+import subprocess
+import tempfile
+import shutil
+import time
+import sys
+import os
+
+
+def get_backends(threads):
+    return [
+        ('gzip -9', ['gzip', '-9', '-c']),
+        ('pigz -9', ['pigz', '-9', '-c'] + (
+            ['--processes', threads] if threads != '0' else []
+        )),
+        ('xz single thread', ['xz', '-c', '--threads=1']),
+        ('xz multithreaded', ['xz', '-c', '--threads=' + threads]),
+        ('zstd -19 --long', ['zstd', '-c', '-q', '-19', '--long', '-T' + threads]),
+        ('zstd -3', ['zstd', '-c', '-q', '-3', '-T' + threads])
+    ]
+
+
+def main():
+    root_tree = sys.argv[1] if len(sys.argv) > 1 else '/usr/share'
+    threads = sys.argv[2] if len(sys.argv) > 2 else '0'
+    with tempfile.TemporaryDirectory() as work_dir:
+        archive = os.path.join(work_dir, 'root.tar')
+        subprocess.call(
+            ['tar', '-C', root_tree, '-cf', archive, '.'],
+            stderr=subprocess.DEVNULL
+        )
+        archive_size = os.path.getsize(archive)
+        print('root tree: {0} ({1:.1f} MB tar)'.format(
+            root_tree, archive_size / 1048576
+        ))
+        print('{0:20} {1:>8} {2:>10} {3:>10}'.format(
+            'backend', 'ratio', 'MB/s', 'seconds'
+        ))
+        for name, command in get_backends(threads):
+            if not shutil.which(command[0]):
+                print('{0:20} not installed'.format(name))
+                continue
+            target = os.path.join(work_dir, 'root.tar.compressed')
+            with open(archive, 'rb') as source, open(target, 'wb') as result:
+                start = time.perf_counter()
+                subprocess.check_call(command, stdin=source, stdout=result)
+                seconds = time.perf_counter() - start
+            print('{0:20} {1:>8.2f} {2:>10.1f} {3:>10.2f}'.format(
+                name, archive_size / os.path.getsize(target),
+                archive_size / 1048576 / seconds, seconds
+            ))
+            os.unlink(target)
+
+
+if __name__ == '__main__':
+    main()
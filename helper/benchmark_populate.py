@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+"""
+Compare creating an ext4 filesystem image on a loop device and
+syncing the root tree into the mounted filesystem with rsync
+against FileSystemExt4.populate_on_file which creates the
+filesystem populated with the root tree in one pass
+
+usage: benchmark_populate.py [root_mbytes] [file_kbytes]
+
+A root tree of the given size in MB (default: 2048) made of files
+of the given size in kB (default: 64) is generated below a temporary
+directory. The loop device method requires root privileges, the
+losetup, mount and rsync tools and is skipped otherwise. The
+populate method requires mkfs.ext4 with support for the -d option
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from kiwi.filesystem.ext4 import FileSystemExt4
+from kiwi.storage.loop_device import LoopDevice
+from kiwi.path import Path
+
+
+def create_root_tree(root_dir, root_mbytes, file_kbytes):
+    data = os.urandom(file_kbytes * 1024)
+    files = root_mbytes * 1024 // file_kbytes
+    for count in range(files):
+        directory = os.sep.join(
+            [root_dir, 'usr', 'lib', format(count // 256)]
+        )
+        if count % 256 == 0:
+            os.makedirs(directory)
+        with open(os.sep.join([directory, format(count)]), 'wb') as target:
+            target.write(data)
+    return files
+
+
+def image_size(root_mbytes):
+    return int(root_mbytes * 1.3) + 64
+
+
+def loop_and_sync(root_dir, filename, root_mbytes):
+    loop_provider = LoopDevice(filename, image_size(root_mbytes))
+    loop_provider.create()
+    filesystem = FileSystemExt4(loop_provider, root_dir + os.sep)
+    filesystem.create_on_device()
+    filesystem.sync_data()
+    del filesystem
+    del loop_provider
+    return True
+
+
+def populate(root_dir, filename, root_mbytes):
+    return FileSystemExt4(None, root_dir + os.sep).populate_on_file(
+        filename, image_size(root_mbytes)
+    )
+
+
+def main():
+    root_mbytes = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    file_kbytes = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    target_dir = tempfile.mkdtemp(prefix='kiwi_populate_benchmark.')
+    try:
+        root_dir = os.sep.join([target_dir, 'root'])
+        files = create_root_tree(root_dir, root_mbytes, file_kbytes)
+        print('{0} MB root tree in {1} files'.format(root_mbytes, files))
+        print('{0:20} {1:>10}'.format('method', 'wall s'))
+        methods = [('populate_on_file', populate)]
+        if os.geteuid() == 0 and Path.which('rsync'):
+            methods.insert(0, ('loop + rsync', loop_and_sync))
+        else:
+            print('{0:20} {1:>10}'.format('loop + rsync', 'skipped'))
+        for name, method in methods:
+            filename = os.sep.join([target_dir, 'image.ext4'])
+            wall_start = time.perf_counter()
+            created = method(root_dir, filename, root_mbytes)
+            wall_seconds = time.perf_counter() - wall_start
+            print('{0:20} {1:>10}'.format(
+                name, format(wall_seconds, '.2f') if created else 'failed'
+            ))
+            os.unlink(filename)
+    finally:
+        shutil.rmtree(target_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+"""
+Compare loading repositories into the Sat solver pool one by one,
+with a whatprovides index rebuild after each repository, against
+Sat.add_repositories which builds the index once
+
+usage: benchmark_sat_repositories.py [packages] [repositories]
+
+Generated rpm-md primary metadata for the given number of packages
+(default: 100000) is split into the given number of repositories
+(default: 10) and converted into solvables with rpmmd2solv. Every
+package provides a library and a file and requires a library and
+a file of other packages. The python solv module and the rpmmd2solv
+tool from libsolv-tools are required.
+"""
+import gzip
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from kiwi.solver.sat import Sat
+
+PACKAGE_TEMPLATE = '''<package type="rpm">
+  <name>pkg{0}</name>
+  <arch>x86_64</arch>
+  <version epoch="0" ver="1.{0}" rel="1"/>
+  <checksum type="sha256" pkgid="YES">{1:064x}</checksum>
+  <location href="x86_64/pkg{0}-1.{0}-1.x86_64.rpm"/>
+  <format>
+    <rpm:provides>
+      <rpm:entry name="libpkg{0}.so.1()(64bit)"/>
+    </rpm:provides>
+    <rpm:requires>
+      <rpm:entry name="libpkg{2}.so.1()(64bit)"/>
+      <rpm:entry name="/usr/bin/pkg{3}"/>
+    </rpm:requires>
+    <file>/usr/bin/pkg{0}</file>
+  </format>
+</package>
+'''
+
+
+class BenchmarkUri:
+    def __init__(self, uri):
+        self.uri = uri
+
+
+class BenchmarkRepository:
+    """
+    SolverRepository replacement returning a pregenerated solvable
+    """
+    def __init__(self, uri, solvable):
+        self.uri = BenchmarkUri(uri)
+        self.solvable = solvable
+
+    def create_repository_solvable(self):
+        return self.solvable
+
+
+def create_solvables(packages, repositories, target_dir):
+    solvables = []
+    per_repository = packages // repositories
+    for repository in range(repositories):
+        primary = os.sep.join([target_dir, 'primary{0}.xml.gz'.format(
+            repository
+        )])
+        first = repository * per_repository
+        with gzip.open(primary, 'wt') as primary_xml:
+            primary_xml.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<metadata xmlns="http://linux.duke.edu/metadata/common" '
+                'xmlns:rpm="http://linux.duke.edu/metadata/rpm" '
+                'packages="{0}">\n'.format(per_repository)
+            )
+            for package in range(first, first + per_repository):
+                primary_xml.write(PACKAGE_TEMPLATE.format(
+                    package, package,
+                    (package * 7 + 1) % packages,
+                    (package * 13 + 5) % packages
+                ))
+            primary_xml.write('</metadata>\n')
+        solvable = primary.replace('.xml.gz', '.solv')
+        with gzip.open(primary) as primary_xml:
+            with open(solvable, 'wb') as solvable_file:
+                subprocess.run(
+                    ['rpmmd2solv'], input=primary_xml.read(),
+                    stdout=solvable_file, check=True
+                )
+        solvables.append(
+            BenchmarkRepository('repo{0}'.format(repository), solvable)
+        )
+    return solvables
+
+
+def add_one_by_one(sat, solver_repositories):
+    for solver_repository in solver_repositories:
+        pool_repository = sat.pool.add_repo(solver_repository.uri.uri)
+        pool_repository.add_solv(
+            solver_repository.create_repository_solvable()
+        )
+        sat.pool.addfileprovides()
+        sat.pool.createwhatprovides()
+
+
+def add_batch(sat, solver_repositories):
+    sat.add_repositories(solver_repositories)
+
+
+def main():
+    packages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repositories = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    target_dir = tempfile.mkdtemp(prefix='kiwi_sat_benchmark.')
+    try:
+        solver_repositories = create_solvables(
+            packages, repositories, target_dir
+        )
+        print('{0} packages in {1} repositories'.format(
+            packages, repositories
+        ))
+        print('{0:20} {1:>10} {2:>10}'.format('loader', 'wall s', 'solved'))
+        for name, loader in [
+            ('one by one', add_one_by_one),
+            ('add_repositories', add_batch)
+        ]:
+            sat = Sat()
+            wall_start = time.perf_counter()
+            loader(sat, solver_repositories)
+            wall_seconds = time.perf_counter() - wall_start
+            solved = sat.solve(['pkg0'])
+            print('{0:20} {1:>10.2f} {2:>10}'.format(
+                name, wall_seconds, len(solved)
+            ))
+    finally:
+        shutil.rmtree(target_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""
+Compare build time and image size of squashfs images created
+with different FileSystemSquashFs profiles
+
+usage: benchmark_squashfs_profiles.py [root_tree] [processors]
+
+The given root tree (default: a generated 512 MB tree of text like
+and random files) is compressed with xz, gzip, lz4 and zstd at
+several levels. The number of processors (default: all available
+CPUs) is passed to every profile. The mksquashfs tool is required,
+the compressors not supported by it are reported as failed
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from kiwi.filesystem.squashfs import FileSystemSquashFs
+from kiwi.exceptions import KiwiCommandError
+from kiwi.path import Path
+
+PROFILES = [
+    ('xz', None),
+    ('gzip', 9),
+    ('lz4', None),
+    ('lz4', 12),
+    ('zstd', 3),
+    ('zstd', 15),
+    ('zstd', 19)
+]
+
+
+def create_root_tree(root_dir, root_mbytes=512, file_kbytes=64):
+    words = [
+        format(random.getrandbits(32), 'x') for count in range(4096)
+    ]
+    files = root_mbytes * 1024 // file_kbytes
+    for count in range(files):
+        directory = os.sep.join(
+            [root_dir, 'usr', 'lib', format(count // 256)]
+        )
+        if count % 256 == 0:
+            os.makedirs(directory)
+        if count % 4:
+            # text like data, e.g scripts and documentation
+            data = ' '.join(
+                random.choice(words) for word in range(file_kbytes * 128)
+            ).encode()[:file_kbytes * 1024]
+        else:
+            # already compressed data
+            data = os.urandom(file_kbytes * 1024)
+        with open(os.sep.join([directory, format(count)]), 'wb') as target:
+            target.write(data)
+
+
+def main():
+    if not Path.which('mksquashfs'):
+        print('mksquashfs not found, skipped')
+        return
+    processors = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    target_dir = tempfile.mkdtemp(prefix='kiwi_squashfs_benchmark.')
+    try:
+        if len(sys.argv) > 1:
+            root_dir = sys.argv[1]
+        else:
+            root_dir = os.sep.join([target_dir, 'root'])
+            create_root_tree(root_dir)
+        filename = os.sep.join([target_dir, 'image.squashfs'])
+        print('{0:12} {1:>10} {2:>10}'.format('profile', 'wall s', 'size MB'))
+        for compression, level in PROFILES:
+            profile = FileSystemSquashFs.get_profile(
+                compression=compression, level=level, processors=processors
+            )
+            name = compression if level is None else '{0}-{1}'.format(
+                compression, level
+            )
+            wall_start = time.perf_counter()
+            try:
+                FileSystemSquashFs(
+                    device_provider=None, root_dir=root_dir,
+                    custom_args={'profile': profile}
+                ).create_on_file(filename)
+            except KiwiCommandError:
+                print('{0:12} {1:>10}'.format(name, 'failed'))
+                continue
+            wall_seconds = time.perf_counter() - wall_start
+            print('{0:12} {1:>10.2f} {2:>10.1f}'.format(
+                name, wall_seconds, os.path.getsize(filename) / 1048576
+            ))
+            os.unlink(filename)
+    finally:
+        shutil.rmtree(target_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/python3
+"""
+Create filesystems of the size estimated by SystemSize from source
+trees of different shapes and report how much space is left free
+
+usage: validate_size_estimate.py [root_tree]
+
+The given root tree, or generated trees of small files, large
+files, links with extended attributes and a large directory, are
+written into filesystems of the size SystemSize.customize returns
+for them. Each filesystem is written in two ways:
+
+* populate: the filesystem is created populated with the tree,
+  mkfs.ext* -d or mkfs.btrfs --rootdir
+* sync: the filesystem is created empty, loop mounted and the tree
+  is copied into it with rsync like kiwi does, cp -a is used if
+  rsync is not installed. This requires root privileges
+
+A filesystem which does not hold the tree is reported as failed.
+The ext filesystems require e2fsprogs, btrfs is only validated if
+mkfs.btrfs is installed
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from kiwi.system.size import SystemSize
+
+
+def create_small_files(root_dir):
+    for directory in range(20):
+        path = '{0}/usr/share/{1}'.format(root_dir, directory)
+        os.makedirs(path)
+        for count in range(100):
+            with open('{0}/file{1}'.format(path, count), 'wb') as data:
+                data.write(b'x' * (count * 97 % 5000))
+
+
+def create_large_files(root_dir):
+    os.makedirs(root_dir + '/usr/lib')
+    for count in range(6):
+        filename = '{0}/usr/lib/lib{1}.so'.format(root_dir, count)
+        with open(filename, 'wb') as data:
+            data.write(os.urandom(4 << 20))
+
+
+def create_links_and_xattrs(root_dir):
+    os.makedirs(root_dir + '/etc')
+    for count in range(500):
+        filename = '{0}/etc/config{1}'.format(root_dir, count)
+        with open(filename, 'wb') as data:
+            data.write(b'y' * 3000)
+        try:
+            os.setxattr(filename, 'user.comment', b'z' * (count % 300))
+        except OSError:
+            pass
+        os.link(filename, filename + '.link')
+        os.symlink('../' * 30 + filename, filename + '.symlink')
+
+
+def create_large_directory(root_dir):
+    os.makedirs(root_dir + '/usr/share/locale')
+    for count in range(20000):
+        filename = '{0}/usr/share/locale/translation-{1:05}.mo'.format(
+            root_dir, count
+        )
+        with open(filename, 'wb') as data:
+            data.write(b'm' * (count % 700))
+
+
+TREES = [
+    ('small files', create_small_files),
+    ('large files', create_large_files),
+    ('links+xattrs', create_links_and_xattrs),
+    ('large directory', create_large_directory)
+]
+
+
+def create_filesystem(filesystem, root_dir, image, mbytes, populate):
+    with open(image, 'wb') as image_file:
+        image_file.truncate(mbytes * 1048576)
+    if filesystem == 'btrfs':
+        command = ['mkfs.btrfs']
+        if populate:
+            command += ['--rootdir', root_dir]
+    else:
+        command = ['mkfs.' + filesystem, '-q', '-F']
+        if populate:
+            command += ['-d', root_dir]
+    subprocess.check_call(
+        command + [image], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def populate(filesystem, root_dir, image, mbytes):
+    try:
+        create_filesystem(filesystem, root_dir, image, mbytes, True)
+    except subprocess.CalledProcessError:
+        return None
+    if filesystem == 'btrfs':
+        # free space of an unmounted btrfs is not reported
+        return -1
+    header = {}
+    for line in subprocess.check_output(
+        ['dumpe2fs', '-h', image], stderr=subprocess.DEVNULL
+    ).decode().splitlines():
+        key, separator, value = line.partition(':')
+        header[key] = value.strip()
+    return int(header['Free blocks']) * int(header['Block size'])
+
+
+def sync(filesystem, root_dir, image, mbytes):
+    create_filesystem(filesystem, root_dir, image, mbytes, False)
+    mountpoint = tempfile.mkdtemp(prefix='kiwi_size_mount.')
+    subprocess.check_call(['mount', '-o', 'loop', image, mountpoint])
+    try:
+        if shutil.which('rsync'):
+            command = [
+                'rsync', '-a', '-H', '-X', '-A', '--one-file-system',
+                root_dir + os.sep, mountpoint
+            ]
+        else:
+            command = ['cp', '-a', root_dir + '/.', mountpoint]
+        copy = subprocess.run(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        if copy.returncode != 0:
+            return None
+        os.sync()
+        # free blocks including the blocks reserved for root, kiwi
+        # syncs the root tree as root
+        filesystem_stat = os.statvfs(mountpoint)
+        return filesystem_stat.f_bfree * filesystem_stat.f_frsize
+    finally:
+        subprocess.check_call(['umount', mountpoint])
+        os.rmdir(mountpoint)
+
+
+def validate_tree(name, root_dir, filesystems, methods, image):
+    size = SystemSize(root_dir)
+    data_mbytes = size.accumulate_mbyte_file_sizes()
+    for filesystem in filesystems:
+        mbytes = size.customize(data_mbytes, filesystem)
+        for method_name, method in methods:
+            free_bytes = method(filesystem, root_dir, image, mbytes)
+            os.unlink(image)
+            if free_bytes is None:
+                result = 'failed'
+            elif free_bytes < 0:
+                result = 'fits'
+            else:
+                result = format(free_bytes / 1048576, '.1f')
+            print('{0:16} {1:6} {2:9} {3:>12} {4:>10}'.format(
+                name[-16:], filesystem, method_name, mbytes, result
+            ))
+
+
+def main():
+    filesystems = []
+    if shutil.which('mkfs.ext4') and shutil.which('dumpe2fs'):
+        filesystems += ['ext2', 'ext3', 'ext4']
+    if shutil.which('mkfs.btrfs'):
+        filesystems.append('btrfs')
+    methods = [('populate', populate)]
+    if os.geteuid() == 0:
+        methods.append(('sync', sync))
+    target_dir = tempfile.mkdtemp(prefix='kiwi_size_estimate.')
+    image = os.sep.join([target_dir, 'image'])
+    try:
+        print('{0:16} {1:6} {2:9} {3:>12} {4:>10}'.format(
+            'tree', 'fs', 'method', 'estimate MB', 'free MB'
+        ))
+        if len(sys.argv) > 1:
+            validate_tree(
+                sys.argv[1], sys.argv[1], filesystems, methods, image
+            )
+            return
+        root_dir = os.sep.join([target_dir, 'root'])
+        for name, create_tree in TREES:
+            create_tree(root_dir)
+            validate_tree(name, root_dir, filesystems, methods, image)
+            shutil.rmtree(root_dir)
+    finally:
+        shutil.rmtree(target_dir)
+
+
+if __name__ == '__main__':
+    main()
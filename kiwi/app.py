@@ -17,6 +17,7 @@
 #
 # project
 from .tasks.base import CliTask
+from .path import Path
 
 
 class App:
@@ -24,7 +25,8 @@ class App:
     **Implements creation of task instances**
 
     Each task class implements a process method which is called
-    when constructing an instance of App
+    when constructing an instance of App. Directories deleted in
+    the background by the task are removed before App returns
     """
     def __init__(self):
         app = CliTask(should_perform_task_setup=False)
@@ -32,4 +34,7 @@ class App:
         service = app.cli.get_servicename()
         task_class_name = service.title() + action.title() + 'Task'
         task_class = app.task.__dict__[task_class_name]
-        task_class().process()
+        try:
+            task_class().process()
+        finally:
+            Path.wait_for_background_wipes()
@@ -352,4 +352,4 @@ class BootImageBase:
             log.info('Cleaning up %s instance', type(self).__name__)
             for directory in self.temp_directories:
                 if directory and os.path.exists(directory):
-                    Path.wipe(directory)
+                    Path.wipe(directory, background=True)
@@ -43,6 +43,7 @@ from kiwi.system.kernel import Kernel
 from kiwi.storage.subformat import DiskFormat
 from kiwi.system.result import Result
 from kiwi.utils.block import BlockID
+from kiwi.utils.block_copy import BlockCopy
 from kiwi.path import Path
 from kiwi.runtime_config import RuntimeConfig
 from kiwi.partitioner import Partitioner
@@ -423,12 +424,12 @@ class DiskBuilder:
                 filename=squashed_root_file.name,
                 exclude=self._get_exclude_list_for_root_data_sync(device_map)
             )
-            Command.run(
-                [
-                    'dd',
-                    'if=%s' % squashed_root_file.name,
-                    'of=%s' % device_map['readonly'].get_device()
-                ]
+            # the disk image is newly created, holes in the squashfs
+            # file don't need to be written to the partition
+            BlockCopy.copy(
+                squashed_root_file.name,
+                device_map['readonly'].get_device(),
+                sparse=True
             )
         else:
             self.system.sync_data(
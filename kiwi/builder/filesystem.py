@@ -153,7 +153,16 @@ class FileSystemBuilder:
         return self.result
 
     def _operate_on_loop(self):
-        filesystem = None
+        if not self.blocksize or self.blocksize == 512:
+            filesystem = FileSystem(
+                self.requested_filesystem, DeviceProvider(),
+                self.root_dir + os.sep, self.filesystem_custom_parameters
+            )
+            if filesystem.populate_on_file(
+                self.filename, self.filesystem_setup.get_size_mbytes(),
+                self.label, Defaults.get_exclude_list_for_root_data_sync()
+            ):
+                return
         loop_provider = LoopDevice(
             self.filename,
             self.filesystem_setup.get_size_mbytes(),
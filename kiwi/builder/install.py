@@ -119,6 +119,7 @@ class InstallImageBuilder:
         self.pxe_dir = None
         self.squashed_contents = None
         self.custom_iso_args = None
+        self.disk_checksum = None
 
     def create_install_iso(self):
         """
@@ -150,8 +151,9 @@ class InstallImageBuilder:
         self.squashed_contents = mkdtemp(
             prefix='kiwi_install_squashfs.', dir=self.target_dir
         )
-        checksum = Checksum(self.diskname)
-        checksum.md5(self.squashed_contents + '/' + self.md5name)
+        self._get_disk_checksum().md5(
+            self.squashed_contents + '/' + self.md5name
+        )
 
         # the system image name is stored in a config file
         self._write_install_image_info_to_iso_image()
@@ -278,8 +280,7 @@ class InstallImageBuilder:
                 self.xml_state.xml_data.get_name(), '.md5'
             ]
         )
-        checksum = Checksum(self.diskname)
-        checksum.md5(pxe_md5_filename)
+        self._get_disk_checksum().md5(pxe_md5_filename)
 
         # the install image name is stored in a config file
         if self.initrd_system == 'kiwi':
@@ -332,6 +333,13 @@ class InstallImageBuilder:
 
         archive.create(self.pxe_dir)
 
+    def _get_disk_checksum(self):
+        # the install ISO and the pxe install archive share the
+        # checksum instance such that the disk is read only once
+        if not self.disk_checksum:
+            self.disk_checksum = Checksum(self.diskname)
+        return self.disk_checksum
+
     def _create_pxe_install_kernel_and_initrd(self):
         kernel = Kernel(self.boot_image_task.boot_root_directory)
         if kernel.get_kernel():
@@ -448,8 +456,8 @@ class InstallImageBuilder:
     def __del__(self):
         log.info('Cleaning up %s instance', type(self).__name__)
         if self.media_dir:
-            Path.wipe(self.media_dir)
+            Path.wipe(self.media_dir, background=True)
         if self.pxe_dir:
-            Path.wipe(self.pxe_dir)
+            Path.wipe(self.pxe_dir, background=True)
         if self.squashed_contents:
-            Path.wipe(self.squashed_contents)
+            Path.wipe(self.squashed_contents, background=True)
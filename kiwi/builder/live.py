@@ -17,7 +17,6 @@
 #
 import os
 from tempfile import mkdtemp
-from tempfile import NamedTemporaryFile
 import platform
 import shutil
 
@@ -220,46 +219,54 @@ class LiveImageBuilder:
         filesystem_setup = FileSystemSetup(
             self.xml_state, self.root_dir
         )
-        root_image = NamedTemporaryFile()
-        loop_provider = LoopDevice(
-            root_image.name,
-            filesystem_setup.get_size_mbytes(root_filesystem),
-            self.xml_state.build_type.get_target_blocksize()
-        )
-        loop_provider.create()
-        live_filesystem = FileSystem(
-            name=root_filesystem,
-            device_provider=loop_provider,
-            root_dir=self.root_dir + os.sep,
-            custom_args=filesystem_custom_parameters
-        )
-        live_filesystem.create_on_device()
-        log.info(
-            '--> Syncing data to {0} root image'.format(root_filesystem)
-        )
-        live_filesystem.sync_data(
-            Defaults.get_exclude_list_for_root_data_sync()
-        )
-        log.info('--> Creating squashfs container for root image')
+        # the root image and the squashfs container are created
+        # at their final location, there is no copy of them
         self.live_container_dir = mkdtemp(
             prefix='live-container.', dir=self.target_dir
         )
         Path.create(self.live_container_dir + '/LiveOS')
-        shutil.copy(
-            root_image.name, self.live_container_dir + '/LiveOS/rootfs.img'
-        )
+        root_image = self.live_container_dir + '/LiveOS/rootfs.img'
+        root_image_size = filesystem_setup.get_size_mbytes(root_filesystem)
+        blocksize = self.xml_state.build_type.get_target_blocksize()
+        populated = False
+        if not blocksize or blocksize == 512:
+            live_filesystem = FileSystem(
+                name=root_filesystem,
+                device_provider=None,
+                root_dir=self.root_dir + os.sep,
+                custom_args=filesystem_custom_parameters
+            )
+            populated = live_filesystem.populate_on_file(
+                root_image, root_image_size,
+                exclude=Defaults.get_exclude_list_for_root_data_sync()
+            )
+        if not populated:
+            loop_provider = LoopDevice(
+                root_image, root_image_size, blocksize
+            )
+            loop_provider.create()
+            live_filesystem = FileSystem(
+                name=root_filesystem,
+                device_provider=loop_provider,
+                root_dir=self.root_dir + os.sep,
+                custom_args=filesystem_custom_parameters
+            )
+            live_filesystem.create_on_device()
+            log.info(
+                '--> Syncing data to {0} root image'.format(root_filesystem)
+            )
+            live_filesystem.sync_data(
+                Defaults.get_exclude_list_for_root_data_sync()
+            )
+        log.info('--> Creating squashfs container for root image')
         live_container_image = FileSystem(
             name='squashfs',
             device_provider=None,
             root_dir=self.live_container_dir
         )
-        container_image = NamedTemporaryFile()
-        live_container_image.create_on_file(
-            container_image.name
-        )
         Path.create(self.media_dir + '/LiveOS')
-        shutil.copy(
-            container_image.name, self.media_dir + '/LiveOS/squashfs.img'
+        live_container_image.create_on_file(
+            self.media_dir + '/LiveOS/squashfs.img'
         )
 
         # create iso filesystem from media_dir
@@ -353,6 +360,6 @@ class LiveImageBuilder:
                 'Cleaning up {0} instance'.format(type(self).__name__)
             )
             if self.media_dir:
-                Path.wipe(self.media_dir)
+                Path.wipe(self.media_dir, background=True)
             if self.live_container_dir:
-                Path.wipe(self.live_container_dir)
+                Path.wipe(self.live_container_dir, background=True)
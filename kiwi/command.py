@@ -22,6 +22,7 @@ from collections import namedtuple
 
 # project
 from .utils.codec import Codec
+from .utils.command_profiler import ProfiledPopen
 
 from .exceptions import (
     KiwiCommandError,
@@ -93,7 +94,7 @@ class Command:
                 raise KiwiCommandNotFound(message)
         stderr = subprocess.STDOUT if stderr_to_stdout else subprocess.PIPE
         try:
-            process = subprocess.Popen(
+            process = ProfiledPopen(
                 command,
                 stdout=subprocess.PIPE,
                 stderr=stderr,
@@ -126,13 +127,16 @@ class Command:
         )
 
     @staticmethod
-    def call(command, custom_env=None):
+    def call(command, custom_env=None, error_file=None):
         """
         Execute a program and return an io file handle pair back.
         stdout and stderr are both on different channels. The caller
         must read from the output file handles in order to actually
         run the command. This can be done using the CommandIterator
-        from command_process
+        from command_process. Callers which only read stdout can
+        pass a file to store stderr instead, such that the command
+        does not block on a full error channel. The error file
+        handle is None in this case
 
         Example:
 
@@ -142,6 +146,7 @@ class Command:
 
         :param list command: command and arguments
         :param list custom_env: custom os.environ
+        :param file error_file: file object to write stderr to
 
         :return:
             Contains process results in command type
@@ -169,10 +174,10 @@ class Command:
                 'Command "%s" not found in the environment' % command[0]
             )
         try:
-            process = subprocess.Popen(
+            process = ProfiledPopen(
                 command,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=error_file or subprocess.PIPE,
                 env=environment
             )
         except Exception as e:
@@ -15,7 +15,11 @@
 # You should have received a copy of the GNU General Public License
 # along with kiwi.  If not, see <http://www.gnu.org/licenses/>
 #
-from collections import namedtuple
+import os
+import selectors
+from collections import (
+    namedtuple, deque
+)
 
 # project
 from .logger import log
@@ -53,21 +57,37 @@ class CommandProcess:
                 self.command.get_error_output()
             )
 
-    def poll_show_progress(self, items_to_complete, match_method):
+    def poll_show_progress(
+        self, items_to_complete, match_method, name_method=None
+    ):
         """
         Iterate over process and show progress in percent
         raise on error and log output
 
+        If a name_method is given, the item name is extracted from
+        each output line once and looked up in an index of the
+        pending items. A completed item is removed from the index.
+        Otherwise each output line is matched against all items
+        using the match_method
+
         :param list items_to_complete: all items
         :param function match_method: method matching item
+        :param function name_method: method extracting item name
         """
         self._init_progress()
+        pending_items = set(items_to_complete)
         for line in self.command:
             if line:
                 log.debug('%s: %s', self.log_topic, line)
-                self._update_progress(
-                    match_method, items_to_complete, line
-                )
+                if name_method:
+                    self._update_indexed_progress(
+                        name_method, pending_items, len(items_to_complete),
+                        line
+                    )
+                else:
+                    self._update_progress(
+                        match_method, items_to_complete, line
+                    )
         self._stop_progress()
         if self.command.get_error_code() != 0:
             raise KiwiCommandError(
@@ -139,6 +159,18 @@ class CommandProcess:
                         '[ INFO    ]: Processing'
                     )
 
+    def _update_indexed_progress(
+        self, name_method, pending_items, items_count, command_output
+    ):
+        item = name_method(command_output)
+        if item in pending_items:
+            pending_items.remove(item)
+            self.items_processed += 1
+            log.progress(
+                self.items_processed, items_count,
+                '[ INFO    ]: Processing'
+            )
+
     def __del__(self):
         if self.command and self.command.get_error_code() is None:
             log.info(
@@ -151,39 +183,32 @@ class CommandIterator:
     """
     **Implements an Iterator for Instances of Command**
 
+    The stdout and stderr channels of the command are drained
+    in large reads whenever data is available. The iterator
+    blocks until the next complete line of output is available
+    and stops when both channels are closed
+
     :param subprocess command: instance of subprocess
     """
+    # maximum number of bytes read from a channel at once
+    read_size = 65536
+
     def __init__(self, command):
         self.command = command
-        self.command_error_output = bytes(b'')
+        self.command_error_output = bytearray()
         self.command_output_line = bytes(b'')
+        self.command_output_lines = deque()
         self.output_eof_reached = False
         self.errors_eof_reached = False
+        self.selector = None
 
     def __next__(self):
-        line_read = None
-        if self.command.process.poll() is not None:
+        while not self.command_output_lines:
             if self.output_eof_reached and self.errors_eof_reached:
+                self.command.process.wait()
                 raise StopIteration()
-
-        if self.command.output_available():
-            byte_read = self.command.output.read(1)
-            if not byte_read:
-                self.output_eof_reached = True
-            elif byte_read == bytes(b'\n'):
-                line_read = Codec.decode(self.command_output_line)
-                self.command_output_line = bytes(b'')
-            else:
-                self.command_output_line += byte_read
-
-        if self.command.error_available():
-            byte_read = self.command.error.read(1)
-            if not byte_read:
-                self.errors_eof_reached = True
-            else:
-                self.command_error_output += byte_read
-
-        return line_read
+            self._read_available()
+        return self.command_output_lines.popleft()
 
     def get_error_output(self):
         """
@@ -193,7 +218,7 @@ class CommandIterator:
 
         :rtype: str
         """
-        return Codec.decode(self.command_error_output)
+        return Codec.decode(bytes(self.command_error_output))
 
     def get_error_code(self):
         """
@@ -223,3 +248,39 @@ class CommandIterator:
 
     def __iter__(self):
         return self
+
+    def _read_available(self):
+        if not self.selector:
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(
+                self.command.output, selectors.EVENT_READ, 'output'
+            )
+            self.selector.register(
+                self.command.error, selectors.EVENT_READ, 'error'
+            )
+        for key, events in self.selector.select():
+            data = os.read(key.fd, self.read_size)
+            if key.data == 'output':
+                self._add_output(data)
+            elif data:
+                self.command_error_output += data
+            else:
+                self.errors_eof_reached = True
+            if not data:
+                self.selector.unregister(key.fileobj)
+        if self.output_eof_reached and self.errors_eof_reached:
+            self.selector.close()
+
+    def _add_output(self, data):
+        if not data:
+            self.output_eof_reached = True
+            if self.command_output_line:
+                # last line of output without a line break
+                self.command_output_lines.append(
+                    Codec.decode(self.command_output_line)
+                )
+            return
+        lines = (self.command_output_line + data).split(b'\n')
+        self.command_output_line = lines.pop()
+        for line in lines:
+            self.command_output_lines.append(Codec.decode(line))
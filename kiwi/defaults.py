@@ -86,6 +86,60 @@ class Defaults:
             '--threads=0'
         ]
 
+    @staticmethod
+    def get_zstd_compression_options():
+        """
+        Provides compression options for the zstd compressor
+
+        :return:
+            Contains list of options
+
+            .. code:: python
+
+                ['--option=value']
+
+        :rtype: list
+        """
+        return [
+            '-19', '--long'
+        ]
+
+    @staticmethod
+    def get_bundle_compression_tool():
+        """
+        Provides the default tool to compress result files in
+        the image bundle
+
+        :return: name
+
+        :rtype: str
+        """
+        return 'xz'
+
+    @staticmethod
+    def get_bundle_jobs():
+        """
+        Provides the default number of result files bundled in
+        parallel, one per CPU but not more than 4. Every job runs
+        its own compressor which allocates its own memory
+
+        :return: number of jobs
+
+        :rtype: int
+        """
+        return min(os.cpu_count() or 1, 4)
+
+    @staticmethod
+    def get_gzip_tool():
+        """
+        Provides the default tool to create gzip compressed files
+
+        :return: name
+
+        :rtype: str
+        """
+        return 'pigz'
+
     @staticmethod
     def is_x86_arch(arch):
         """
@@ -176,6 +230,55 @@ class Defaults:
         """
         return '/var/tmp/kiwi/satsolver'
 
+    @staticmethod
+    def get_solvable_cache_size():
+        """
+        Provides the size limit of the SAT solvable cache. Least
+        recently used solvables are removed if the limit is exceeded
+
+        :return: size in bytes
+
+        :rtype: int
+        """
+        return 1 << 30
+
+    @staticmethod
+    def get_metadata_cache_location():
+        """
+        Provides the directory to store downloaded repository
+        metadata. The cached files are revalidated with conditional
+        requests against the repository server
+
+        :return: directory path
+
+        :rtype: str
+        """
+        return '/var/tmp/kiwi/metadata'
+
+    @staticmethod
+    def get_download_jobs():
+        """
+        Provides the default number of concurrent file transfers
+        from a repository
+
+        :return: number of jobs
+
+        :rtype: int
+        """
+        return 4
+
+    @staticmethod
+    def get_command_capabilities_cache_file():
+        """
+        Provides the file to store the output of command capability
+        probes like tool --help or tool --version
+
+        :return: file path
+
+        :rtype: str
+        """
+        return '/var/tmp/kiwi/command_capabilities.json'
+
     @staticmethod
     def get_shared_cache_location():
         """
@@ -749,6 +852,21 @@ class Defaults:
         """
         return 300
 
+    @staticmethod
+    def get_boot_files_mbytes():
+        """
+        Provides the size in mbytes reserved in the root filesystem
+        for the files written to /boot after the disk size was
+        calculated, the kernel and initrd of the boot image and the
+        bootloader installation. The root filesystem holds these
+        files if there is no extra boot partition
+
+        :return: mbsize value
+
+        :rtype: int
+        """
+        return 160
+
     @staticmethod
     def get_default_efi_boot_mbytes():
         """
@@ -1310,6 +1428,17 @@ class Defaults:
         """
         return 'xz'
 
+    @staticmethod
+    def get_squashfs_compression():
+        """
+        Provides default squashfs compression algorithm
+
+        :return: name
+
+        :rtype: str
+        """
+        return 'xz'
+
     @staticmethod
     def get_default_container_name():
         """
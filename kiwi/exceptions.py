@@ -760,6 +760,13 @@ class KiwiSizeError(KiwiError):
     """
 
 
+class KiwiChecksumError(KiwiError):
+    """
+    Exception raised if a checksum could not be calculated, e.g
+    because of an unsupported digest name.
+    """
+
+
 class KiwiCommandCapabilitiesError(KiwiError):
     """
     Exception is raised when some the CommandCapabilities methods fails,
@@ -783,3 +790,23 @@ class KiwiFileAccessError(KiwiError):
     """
     Exception raised if accessing a file or its metadata failed
     """
+
+
+class KiwiFileCopyError(KiwiError):
+    """
+    Exception raised if copying a file failed
+    """
+
+
+class KiwiDownloadChecksumError(KiwiError):
+    """
+    Exception raised if the checksum of a downloaded file does
+    not match the checksum from the repository metadata
+    """
+
+
+class KiwiSolverServiceError(KiwiError):
+    """
+    Exception raised if the communication with the solver
+    service failed
+    """
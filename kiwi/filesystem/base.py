@@ -16,14 +16,21 @@
 # along with kiwi.  If not, see <http://www.gnu.org/licenses/>
 #
 import os
+import re
 import copy
+import glob
+import shutil
+from tempfile import mkdtemp
 
 # project
 from kiwi.logger import log
+from kiwi.command import Command
+from kiwi.path import Path
 from kiwi.utils.sync import DataSync
 from kiwi.mount_manager import MountManager
 
 from kiwi.exceptions import (
+    KiwiCommandError,
     KiwiFileSystemSyncError
 )
 
@@ -116,20 +123,87 @@ class FileSystemBase:
         """
         raise NotImplementedError
 
-    def sync_data(self, exclude=None):
+    def populate_on_file(self, filename, size_mbytes, label=None, exclude=None):
         """
-        Copy root data tree into filesystem
+        Create filesystem in the given file and populate it with
+        the root data tree while the filesystem is created. This
+        writes the filesystem in one pass without a loop device,
+        a mount and a sync of the data tree
+
+        The populate command is provided by the specialized
+        filesystem class for filesystems whose creation tool can
+        populate the filesystem from a directory, e.g mke2fs -d.
+        The tools have no option to exclude data. If entries from
+        the exclude list exist, the filesystem is populated from a
+        staging tree of hardlinks to the root data tree without
+        the excluded entries. The root data tree is not changed.
 
+        Populating is skipped if the filesystem does not support
+        it, the tool is not available, there are filesystems
+        mounted below the root data tree or the tool failed. In
+        this case the filesystem must be created with
+        create_on_device and filled with sync_data
+
+        :param string filename: result file path name
+        :param int size_mbytes: size of the filesystem file
+        :param string label: label name
         :param list exclude: list of exclude dirs/files
+
+        :return: True if the filesystem got created, False otherwise
+
+        :rtype: bool
         """
-        if not self.root_dir:
-            raise KiwiFileSystemSyncError(
-                'no root directory specified'
+        self._check_root_dir()
+        populate_command = self._get_populate_command(
+            self.root_dir, filename, label
+        )
+        if not populate_command:
+            return False
+        if not Path.which(populate_command[0], access_mode=os.X_OK):
+            log.info(
+                '--> %s not found, populate mode not available',
+                populate_command[0]
             )
-        if not os.path.exists(self.root_dir):
-            raise KiwiFileSystemSyncError(
-                'given root directory %s does not exist' % self.root_dir
+            return False
+        mountpoints = self._get_mountpoints_below_root()
+        if mountpoints is None or mountpoints:
+            log.info(
+                '--> Filesystems mounted below %s, populate mode not '
+                'available', self.root_dir
+            )
+            return False
+        staging_dir = None
+        excluded_entries = self._get_excluded_entries(exclude)
+        if excluded_entries:
+            staging_dir = self._create_staging_tree(excluded_entries)
+            if not staging_dir:
+                return False
+            populate_command = self._get_populate_command(
+                staging_dir, filename, label
+            )
+        try:
+            with open(filename, 'wb') as filesystem:
+                filesystem.truncate(size_mbytes * 1048576)
+            Command.run(populate_command)
+        except KiwiCommandError as issue:
+            log.warning(
+                '--> Populating filesystem failed, falling back to '
+                'sync: %s', issue
             )
+            return False
+        finally:
+            if staging_dir:
+                Path.wipe(staging_dir)
+        log.info('--> Populated filesystem in %s', filename)
+        return True
+
+    def sync_data(self, exclude=None):
+        """
+        Copy root data tree into filesystem
+
+        :param list exclude: list of exclude dirs/files
+        """
+        self._check_root_dir()
         self.filesystem_mount = MountManager(
             device=self.device_provider.get_device()
         )
@@ -145,6 +219,156 @@ class FileSystemBase:
         )
         self.filesystem_mount.umount()
 
+    def _get_populate_command(self, source_dir, filename, label=None):
+        """
+        Provides the command to create the filesystem in the given
+        file populated with the data of the source directory
+
+        Implement in specialized filesystem class for filesystems
+        which supports this. The base implementation returns None
+        to indicate populate mode is not available
+
+        :param string source_dir: root data directory path name
+        :param string filename: result file path name
+        :param string label: label name
+
+        :return: command and arguments
+
+        :rtype: list
+        """
+        return None
+
+    def _get_create_options(self, label=None):
+        create_options = list(self.custom_args['create_options'])
+        if label:
+            create_options += ['-L', label]
+        return create_options
+
+    def _check_root_dir(self):
+        if not self.root_dir:
+            raise KiwiFileSystemSyncError(
+                'no root directory specified'
+            )
+        if not os.path.exists(self.root_dir):
+            raise KiwiFileSystemSyncError(
+                'given root directory %s does not exist' % self.root_dir
+            )
+
+    def _get_mountpoints_below_root(self):
+        """
+        Provides the mountpoints below the root directory, populate
+        tools don't stop at filesystem boundaries like rsync does
+        with the --one-file-system option
+
+        :return: list of mountpoints or None if the mount table
+            can't be read
+
+        :rtype: list
+        """
+        root_dir = os.path.realpath(self.root_dir) + os.sep
+        mountpoints = []
+        try:
+            with open('/proc/self/mountinfo') as mountinfo:
+                for mount in mountinfo:
+                    # octal escapes are used for whitespace characters
+                    mountpoint = re.sub(
+                        r'\\([0-7]{3})',
+                        lambda match: chr(int(match.group(1), 8)),
+                        mount.split()[4]
+                    )
+                    if mountpoint.startswith(root_dir):
+                        mountpoints.append(mountpoint)
+        except OSError as issue:
+            log.debug('Failed to read mount table: {0}'.format(issue))
+            return None
+        return mountpoints
+
+    def _get_excluded_entries(self, exclude):
+        """
+        Provides the root directory entries matching the exclude list
+
+        :param list exclude: list of exclude dirs/files
+
+        :return: set of path names
+
+        :rtype: set
+        """
+        root_dir = os.path.normpath(self.root_dir)
+        excluded_entries = set()
+        for item in exclude or []:
+            excluded_entries.update(
+                glob.iglob(os.sep.join([root_dir, item]))
+            )
+        return excluded_entries
+
+    def _create_staging_tree(self, excluded_entries):
+        """
+        Create a copy of the root directory next to it, which
+        does not contain the excluded entries. Directories are
+        created with the ownership, permissions, extended attributes
+        and times of the original directory, all other entries
+        are hardlinks to the original entries. No file data is
+        copied and the root directory is not changed
+
+        :param set excluded_entries: path names to leave out
+
+        :return: staging directory path name or None if the
+            staging tree could not be created
+
+        :rtype: str
+        """
+        def raise_walk_error(issue):
+            raise issue
+
+        root_dir = os.path.normpath(self.root_dir)
+        staging_dir = None
+        try:
+            staging_dir = mkdtemp(
+                prefix='.kiwi_populate.', dir=os.path.dirname(root_dir)
+            )
+            directories = [(root_dir, staging_dir)]
+            for source_dir, dirnames, filenames in os.walk(
+                root_dir, onerror=raise_walk_error
+            ):
+                target_dir = os.path.normpath(
+                    os.sep.join(
+                        [staging_dir, os.path.relpath(source_dir, root_dir)]
+                    )
+                )
+                for name in list(dirnames):
+                    source = os.sep.join([source_dir, name])
+                    target = os.sep.join([target_dir, name])
+                    if source in excluded_entries or os.path.islink(source):
+                        # symlinks to directories are linked like files
+                        dirnames.remove(name)
+                        if source not in excluded_entries:
+                            os.link(source, target, follow_symlinks=False)
+                    else:
+                        os.mkdir(target)
+                        directories.append((source, target))
+                for name in filenames:
+                    source = os.sep.join([source_dir, name])
+                    if source not in excluded_entries:
+                        os.link(
+                            source, os.sep.join([target_dir, name]),
+                            follow_symlinks=False
+                        )
+            # directory times change while entries are added, the
+            # attributes are copied once the directory is complete
+            for source, target in reversed(directories):
+                source_stat = os.lstat(source)
+                os.chown(target, source_stat.st_uid, source_stat.st_gid)
+                shutil.copystat(source, target)
+        except OSError as issue:
+            log.info(
+                '--> Failed to stage data without excluded entries, '
+                'populate mode not available: %s', issue
+            )
+            if staging_dir:
+                Path.wipe(staging_dir)
+            return None
+        return staging_dir
+
     def __del__(self):
         if self.filesystem_mount:
             log.info('Cleaning up %s instance', type(self).__name__)
@@ -37,3 +37,20 @@ class FileSystemBtrfs(FileSystemBase):
         Command.run(
             ['mkfs.btrfs'] + self.custom_args['create_options'] + [device]
         )
+
+    def _get_populate_command(self, source_dir, filename, label=None):
+        """
+        Provides mkfs.btrfs command to create the filesystem in the
+        given file populated with the source directory data
+
+        :param string source_dir: root data directory path name
+        :param string filename: result file path name
+        :param string label: label name
+
+        :return: command and arguments
+
+        :rtype: list
+        """
+        return ['mkfs.btrfs'] + self._get_create_options(label) + [
+            '--rootdir', source_dir, filename
+        ]
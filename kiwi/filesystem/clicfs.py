@@ -59,19 +59,27 @@ class FileSystemClicFs(FileSystemBase):
         """
         self.container_dir = mkdtemp(prefix='kiwi_clicfs.')
         clicfs_container_filesystem = self.container_dir + '/fsdata.ext4'
-        loop_provider = LoopDevice(
-            clicfs_container_filesystem,
-            self._get_container_filesystem_size_mbytes()
-        )
-        loop_provider.create()
-        filesystem = FileSystemExt4(
-            loop_provider, self.root_dir
-        )
-        filesystem.create_on_device()
-        filesystem.sync_data()
-        Command.run(
-            ['resize2fs', '-f', loop_provider.get_device(), '-M']
-        )
+        container_size_mbytes = self._get_container_filesystem_size_mbytes()
+        filesystem = FileSystemExt4(None, self.root_dir)
+        if filesystem.populate_on_file(
+            clicfs_container_filesystem, container_size_mbytes
+        ):
+            Command.run(
+                ['resize2fs', '-f', clicfs_container_filesystem, '-M']
+            )
+        else:
+            loop_provider = LoopDevice(
+                clicfs_container_filesystem, container_size_mbytes
+            )
+            loop_provider.create()
+            filesystem = FileSystemExt4(
+                loop_provider, self.root_dir
+            )
+            filesystem.create_on_device()
+            filesystem.sync_data()
+            Command.run(
+                ['resize2fs', '-f', loop_provider.get_device(), '-M']
+            )
 
         # force cleanup and umount of container filesystem
         # before mkclicfs is called
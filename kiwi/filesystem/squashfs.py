@@ -14,42 +14,96 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with kiwi.  If not, see <http://www.gnu.org/licenses/>
+import os
+import stat
 import platform
+from collections import namedtuple
+from tempfile import NamedTemporaryFile
 
 # project
 from kiwi.filesystem.base import FileSystemBase
 from kiwi.command import Command
+from kiwi.runtime_config import RuntimeConfig
+from kiwi.logger import log
+
+squashfs_profile_type = namedtuple(
+    'squashfs_profile_type', [
+        'compression', 'level', 'processors', 'memory', 'access_list'
+    ]
+)
 
 
 class FileSystemSquashFs(FileSystemBase):
     """
     **Implements creation of squashfs filesystem**
+
+    The compressor, the processor and memory budget and the file
+    order of the image are taken from a squashfs profile. The
+    profile can be passed as 'profile' custom argument and is
+    read from the runtime configuration otherwise
     """
+    # data block size of the image
+    block_size = '1M'
+
+    # supported compression levels per compressor, xz has no level.
+    # lz4 levels from 3 on select the high compression mode
+    compression_levels = {
+        'gzip': (1, 9),
+        'zstd': (1, 22),
+        'lz4': (1, 12)
+    }
+
+    # mksquashfs may use at most this fraction of the host memory
+    max_memory_fraction = 0.5
+
+    # sort file priorities of the access list entries count down
+    # from here, files not in the access list have priority 0
+    max_sort_priority = 32767
+
     def create_on_file(self, filename, label=None, exclude=None):
         """
         Create squashfs filesystem from data tree
 
         There is no label which could be set for squashfs
-        thus this parameter is not used
+        thus this parameter is not used. Options for the
+        compressor, the processors, the memory and the sort
+        file are only added from the profile if not already
+        set in the create options
 
         :param string filename: result file path name
         :param string label: unused
         :param list exclude: list of exclude dirs/files
         """
         exclude_options = []
+        create_options = self.custom_args['create_options']
+        profile = self.custom_args.get('profile') or \
+            FileSystemSquashFs.get_profile()
 
-        if '-comp' not in self.custom_args['create_options']:
-            self.custom_args['create_options'].append('-comp')
-            self.custom_args['create_options'].append('xz')
+        if '-comp' not in create_options:
+            create_options += self._get_compression_options(profile)
 
-        if '-Xbcj' not in self.custom_args['create_options']:
+        if '-Xbcj' not in create_options and \
+                create_options[create_options.index('-comp') + 1] == 'xz':
             host_architecture = platform.machine()
             if '86' in host_architecture:
-                self.custom_args['create_options'].append('-Xbcj')
-                self.custom_args['create_options'].append('x86')
+                create_options += ['-Xbcj', 'x86']
             if 'ppc' in host_architecture:
-                self.custom_args['create_options'].append('-Xbcj')
-                self.custom_args['create_options'].append('powerpc')
+                create_options += ['-Xbcj', 'powerpc']
+
+        if '-processors' not in create_options:
+            create_options += ['-processors', format(profile.processors)]
+
+        if '-mem' not in create_options and profile.memory:
+            create_options += [
+                '-mem', '{0}M'.format(profile.memory // 1048576)
+            ]
+
+        if '-sort' not in create_options and profile.access_list:
+            self.sort_file = NamedTemporaryFile()
+            if FileSystemSquashFs.create_sort_file(
+                self.root_dir, profile.access_list, self.sort_file.name
+            ):
+                create_options += ['-sort', self.sort_file.name]
 
         if exclude:
             exclude_options.append('-e')
@@ -58,6 +112,162 @@ class FileSystemSquashFs(FileSystemBase):
 
         Command.run(
             [
-                'mksquashfs', self.root_dir, filename, '-noappend', '-b', '1M'
-            ] + self.custom_args['create_options'] + exclude_options
+                'mksquashfs', self.root_dir, filename, '-noappend',
+                '-b', self.block_size
+            ] + create_options + exclude_options
         )
+
+    @staticmethod
+    def get_profile(
+        compression=None, level=None, processors=None, memory=None,
+        access_list=None
+    ):
+        """
+        Provides a squashfs profile fitting to the host
+
+        Unset values are read from the squashfs section of the
+        runtime configuration. The number of processors is limited
+        to the CPUs available to the process, 0 or no value uses
+        all of them. The memory is limited to max_memory_fraction
+        of the host memory, no value leaves the choice to mksquashfs.
+        An unsupported compression level is skipped
+
+        .. code:: python
+
+            profile = FileSystemSquashFs.get_profile(
+                compression='zstd', level=19
+            )
+            FileSystemSquashFs(
+                device_provider=None, root_dir='root_dir',
+                custom_args={'profile': profile}
+            ).create_on_file('root.squashfs')
+
+        :param str compression: xz|zstd|lz4|gzip
+        :param int level: compression level
+        :param int processors: number of processors
+        :param int memory: memory in bytes
+        :param str access_list: path to a recorded file access list
+
+        :return:
+            squashfs profile
+
+            .. code:: python
+
+                squashfs_profile_type(
+                    compression='zstd', level=19, processors=8,
+                    memory=None, access_list=None
+                )
+
+        :rtype: namedtuple
+        """
+        runtime_config = RuntimeConfig()
+        if not compression:
+            compression = runtime_config.get_squashfs_compression()
+            if level is None:
+                level = runtime_config.get_squashfs_compression_level()
+        if processors is None:
+            processors = runtime_config.get_squashfs_processors()
+        if memory is None:
+            memory = runtime_config.get_squashfs_memory()
+        if access_list is None:
+            access_list = runtime_config.get_squashfs_access_list()
+
+        if level is not None:
+            level_range = FileSystemSquashFs.compression_levels.get(
+                compression
+            )
+            if not level_range or \
+                    not level_range[0] <= level <= level_range[1]:
+                log.warning(
+                    'Skipping unsupported {0} compression level: {1}'.format(
+                        compression, level
+                    )
+                )
+                level = None
+
+        host_processors = len(os.sched_getaffinity(0))
+        if not processors or processors > host_processors:
+            processors = host_processors
+
+        if memory:
+            host_memory = os.sysconf('SC_PAGE_SIZE') * \
+                os.sysconf('SC_PHYS_PAGES')
+            host_memory = int(
+                host_memory * FileSystemSquashFs.max_memory_fraction
+            )
+            if memory > host_memory:
+                log.warning(
+                    'Limiting squashfs memory to {0} bytes'.format(
+                        host_memory
+                    )
+                )
+                memory = host_memory
+
+        return squashfs_profile_type(
+            compression=compression,
+            level=level,
+            processors=processors,
+            memory=memory,
+            access_list=access_list
+        )
+
+    @staticmethod
+    def create_sort_file(root_dir, access_list, filename):
+        """
+        Create a mksquashfs sort file from a recorded access list
+
+        The access list contains one absolute path per line in the
+        order the files were first accessed, e.g on the first boot
+        of the image. Empty lines and lines starting with '#' are
+        skipped. Regular files which exist below root_dir are
+        written with descending priorities such that mksquashfs
+        places them at the start of the image in access order.
+        Paths with whitespace can't be expressed in a sort file
+        and are skipped
+
+        :param str root_dir: root directory of the image
+        :param str access_list: path to the access list
+        :param str filename: sort file path name
+
+        :return: number of sort file entries
+
+        :rtype: int
+        """
+        sorted_files = set()
+        priority = FileSystemSquashFs.max_sort_priority
+        with open(access_list) as access, open(filename, 'w') as sortfile:
+            for line in access:
+                path = line.strip()
+                if not path or path.startswith('#'):
+                    continue
+                path = path.lstrip(os.sep)
+                if path in sorted_files:
+                    continue
+                if len(path.split()) > 1:
+                    log.debug(
+                        'Skipping access list entry with whitespace: '
+                        '{0}'.format(path)
+                    )
+                    continue
+                try:
+                    file_stat = os.lstat(os.sep.join([root_dir, path]))
+                except OSError:
+                    continue
+                if not stat.S_ISREG(file_stat.st_mode):
+                    continue
+                sorted_files.add(path)
+                sortfile.write('{0} {1}\n'.format(path, priority))
+                priority = max(1, priority - 1)
+        return len(sorted_files)
+
+    @staticmethod
+    def _get_compression_options(profile):
+        options = ['-comp', profile.compression]
+        if profile.level is None:
+            return options
+        if profile.compression == 'lz4':
+            if profile.level >= 3:
+                options.append('-Xhc')
+        else:
+            options += ['-Xcompression-level', format(profile.level)]
+        return options
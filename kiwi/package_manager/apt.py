@@ -312,7 +312,42 @@ class PackageManagerApt(PackageManagerBase):
             '.*Removing ' + re.escape(package_name) + '.*', apt_get_output
         )
 
+    def get_installed_package_name(self, apt_get_output):
+        """
+        Extract the name of the package which gets installed
+        from the apt-get status line
+
+        :param str apt_get_output: apt-get status line
+
+        :returns: package name or None if the line is no install status
+
+        :rtype: str
+        """
+        return self._get_package_name(
+            re.match('.*Unpacking (\\S+)', apt_get_output)
+        )
+
+    def get_deleted_package_name(self, apt_get_output):
+        """
+        Extract the name of the package which gets deleted
+        from the apt-get status line
+
+        :param str apt_get_output: apt-get status line
+
+        :returns: package name or None if the line is no delete status
+
+        :rtype: str
+        """
+        return self._get_package_name(
+            re.match('.*Removing (\\S+)', apt_get_output)
+        )
+
     def _package_requests(self):
         items = self.package_requests[:]
         self.cleanup_requests()
         return items
+
+    def _get_package_name(self, match):
+        # status lines show name[:arch] (version)
+        if match:
+            return match.group(1).split(':')[0]
@@ -172,6 +172,28 @@ class PackageManagerBase:
         """
         raise NotImplementedError
 
+    def get_installed_package_name(self, log_line):
+        """
+        Extract the name of the package which gets installed
+        from a package manager status line
+
+        Implementation in specialized package manager class
+
+        :param str log_line: unused
+        """
+        raise NotImplementedError
+
+    def get_deleted_package_name(self, log_line):
+        """
+        Extract the name of the package which gets deleted
+        from a package manager status line
+
+        Implementation in specialized package manager class
+
+        :param str log_line: unused
+        """
+        raise NotImplementedError
+
     def database_consistent(self):
         """
         OBSOLETE: Will be removed 2019-06-05
@@ -257,6 +257,36 @@ class PackageManagerDnf(PackageManagerBase):
             '.*Removing: ' + re.escape(package_name) + '.*', dnf_output
         )
 
+    def get_installed_package_name(self, dnf_output):
+        """
+        Extract the name of the package which gets installed
+        from the dnf status line
+
+        :param str dnf_output: dnf status line
+
+        :returns: package name or None if the line is no install status
+
+        :rtype: str
+        """
+        return self._get_package_name(
+            re.match('.*Installing  : (\\S+)', dnf_output)
+        )
+
+    def get_deleted_package_name(self, dnf_output):
+        """
+        Extract the name of the package which gets deleted
+        from the dnf status line
+
+        :param str dnf_output: dnf status line
+
+        :returns: package name or None if the line is no delete status
+
+        :rtype: str
+        """
+        return self._get_package_name(
+            re.match('.*Removing: (\\S+)', dnf_output)
+        )
+
     def post_process_install_requests_bootstrap(self):
         """
         Move the rpm database to the place as it is expected by the
@@ -265,3 +295,8 @@ class PackageManagerDnf(PackageManagerBase):
         rpmdb = RpmDataBase(self.root_dir)
         if rpmdb.has_rpm():
             rpmdb.set_database_to_image_path()
+
+    def _get_package_name(self, match):
+        # status lines show name-[epoch:]version-release.arch
+        if match:
+            return match.group(1).rsplit('.', 1)[0].rsplit('-', 2)[0]
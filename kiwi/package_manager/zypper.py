@@ -246,6 +246,36 @@ class PackageManagerZypper(PackageManagerBase):
             '.*Removing: ' + re.escape(package_name) + '.*', zypper_output
         )
 
+    def get_installed_package_name(self, zypper_output):
+        """
+        Extract the name of the package which gets installed
+        from the zypper status line
+
+        :param str zypper_output: zypper status line
+
+        :returns: package name or None if the line is no install status
+
+        :rtype: str
+        """
+        return self._get_package_name(
+            re.match('.*Installing: (\\S+)', zypper_output)
+        )
+
+    def get_deleted_package_name(self, zypper_output):
+        """
+        Extract the name of the package which gets deleted
+        from the zypper status line
+
+        :param str zypper_output: zypper status line
+
+        :returns: package name or None if the line is no delete status
+
+        :rtype: str
+        """
+        return self._get_package_name(
+            re.match('.*Removing: (\\S+)', zypper_output)
+        )
+
     def post_process_install_requests_bootstrap(self):
         """
         Move the rpm database to the place as it is expected by the
@@ -299,3 +329,8 @@ class PackageManagerZypper(PackageManagerBase):
         items += self.package_requests
         self.cleanup_requests()
         return items
+
+    def _get_package_name(self, match):
+        # status lines show name-[epoch:]version-release.arch
+        if match:
+            return match.group(1).rsplit('.', 1)[0].rsplit('-', 2)[0]
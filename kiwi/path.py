@@ -15,11 +15,15 @@
 # You should have received a copy of the GNU General Public License
 # along with kiwi.  If not, see <http://www.gnu.org/licenses/>
 #
+from concurrent.futures import ThreadPoolExecutor
+import errno
 import os
+import stat
+import threading
 import collections
+import uuid
 
 # project
-from .command import Command
 from .logger import log
 from .exceptions import KiwiFileAccessError
 
@@ -28,6 +32,15 @@ class Path:
     """
     **Directory path helpers**
     """
+    # locations found by which, per file name, lookup paths and mode
+    which_cache = {}
+
+    # wipe jobs of directories moved out of the way, and the
+    # worker pool running them, see Path.wipe(background=True)
+    background_wipes = []
+    background_workers = None
+    background_lock = threading.Lock()
+
     @staticmethod
     def sort_by_hierarchy(path_list):
         """
@@ -101,21 +114,62 @@ class Path:
         Create path and all sub directories to target
 
         :param string path: path name
+
+        :raises KiwiFileAccessError: if the path could not be created
         """
-        Command.run(
-            ['mkdir', '-p', path]
-        )
+        try:
+            os.makedirs(path, exist_ok=True)
+        except OSError as issue:
+            raise KiwiFileAccessError(
+                'Failed to create {0}: {1}'.format(path, issue)
+            )
 
     @staticmethod
-    def wipe(path):
+    def wipe(path, background=False):
         """
         Delete path and all contents
 
+        Directories are removed by a parallel scandir walk. With
+        background set, a directory is renamed next to its current
+        location and removed by a background worker, which allows
+        the caller to continue while a large tree is deleted. All
+        background wipes are completed before the process exits
+
         :param string path: path name
+        :param bool background: delete directories in the background
+
+        :raises KiwiFileAccessError: if the path could not be deleted
         """
-        Command.run(
-            ['rm', '-r', '-f', path]
-        )
+        try:
+            path_mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            return
+        except OSError as issue:
+            raise KiwiFileAccessError(
+                'Failed to wipe {0}: {1}'.format(path, issue)
+            )
+        if not stat.S_ISDIR(path_mode):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as issue:
+                raise KiwiFileAccessError(
+                    'Failed to wipe {0}: {1}'.format(path, issue)
+                )
+        elif not background or not Path._wipe_in_background(path):
+            Path._wipe_tree(path)
+
+    @staticmethod
+    def wait_for_background_wipes():
+        """
+        Wait for all directories scheduled by
+        Path.wipe(background=True) to be deleted
+        """
+        with Path.background_lock:
+            background_wipes = list(Path.background_wipes)
+        for job in background_wipes:
+            job.exception()
 
     @staticmethod
     def remove(path):
@@ -123,10 +177,15 @@ class Path:
         Delete empty path, causes an error if target is not empty
 
         :param string path: path name
+
+        :raises KiwiFileAccessError: if the path could not be removed
         """
-        Command.run(
-            ['rmdir', path]
-        )
+        try:
+            os.rmdir(path)
+        except OSError as issue:
+            raise KiwiFileAccessError(
+                'Failed to remove {0}: {1}'.format(path, issue)
+            )
 
     @staticmethod
     def remove_hierarchy(path):
@@ -135,10 +194,10 @@ class Path:
         ignore non empty or protected paths and leave them untouched
 
         :param string path: path name
+
+        :raises KiwiFileAccessError: if an empty path could not be removed
         """
-        Command.run(
-            ['rmdir', '--ignore-fail-on-non-empty', path]
-        )
+        Path._remove_if_empty(path)
         path_elements = path.split(os.sep)
         protected_elements = [
             'boot', 'dev', 'proc', 'run', 'sys', 'tmp', 'home', 'mnt'
@@ -153,9 +212,7 @@ class Path:
                         )
                     )
                     return
-                Command.run(
-                    ['rmdir', '--ignore-fail-on-non-empty', sub_path]
-                )
+                Path._remove_if_empty(sub_path)
 
     @staticmethod
     def which(
@@ -165,6 +222,10 @@ class Path:
         """
         Lookup file name in PATH
 
+        Found locations are remembered for the lifetime of the process
+        per file name, lookup paths and access mode. A remembered
+        location is only used if it still matches
+
         :param string filename: file base name
         :param list alternative_lookup_paths: list of additional lookup paths
         :param list custom_env: a custom os.environ
@@ -187,6 +248,12 @@ class Path:
             lookup_paths = system_path.split(os.pathsep)
         if alternative_lookup_paths:
             lookup_paths += alternative_lookup_paths
+        cache_key = (filename, tuple(lookup_paths), access_mode)
+        location = Path.which_cache.get(cache_key)
+        if location and os.path.exists(location) and (
+            not access_mode or os.access(location, access_mode)
+        ):
+            return location
         multipart_message[0] += 'in paths "%s"' % ':'.join(lookup_paths)
         for path in lookup_paths:
             location = os.path.join(path, filename)
@@ -196,8 +263,141 @@ class Path:
                 mode_match = os.access(location, access_mode)
                 multipart_message[2] = 'mode match: "%s"' % mode_match
                 if mode_match:
+                    Path.which_cache[cache_key] = location
                     return location
             elif file_exists:
+                Path.which_cache[cache_key] = location
                 return location
 
         log.debug(' '.join(multipart_message))
+
+    @staticmethod
+    def _remove_if_empty(path):
+        try:
+            os.rmdir(path)
+        except OSError as issue:
+            if issue.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                raise KiwiFileAccessError(
+                    'Failed to remove {0}: {1}'.format(path, issue)
+                )
+
+    @staticmethod
+    def _wipe_tree(path):
+        tree = _TreeWipe()
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as workers:
+            tree.walk(path, workers)
+        tree.remove_directories()
+        if tree.errors:
+            raise KiwiFileAccessError(
+                'Failed to wipe {0}: {1} error(s), first: {2}'.format(
+                    path, len(tree.errors), tree.errors[0]
+                )
+            )
+
+    @staticmethod
+    def _wipe_in_background(path):
+        trash_path = '{0}.kiwi_trash.{1}'.format(
+            os.path.normpath(path), uuid.uuid4().hex
+        )
+        try:
+            os.rename(path, trash_path)
+        except OSError as issue:
+            # e.g a mount point, wipe in place instead
+            log.debug(
+                'Background wipe of {0} not possible: {1}'.format(
+                    path, issue
+                )
+            )
+            return False
+        with Path.background_lock:
+            if not Path.background_workers:
+                Path.background_workers = ThreadPoolExecutor(max_workers=1)
+            try:
+                job = Path.background_workers.submit(
+                    Path._wipe_tree, trash_path
+                )
+            except RuntimeError:
+                # no new jobs are accepted at interpreter shutdown
+                job = None
+            else:
+                Path.background_wipes.append(job)
+        if not job:
+            Path._wipe_tree(trash_path)
+        else:
+            job.add_done_callback(Path._background_wipe_done)
+        return True
+
+    @staticmethod
+    def _background_wipe_done(job):
+        with Path.background_lock:
+            Path.background_wipes.remove(job)
+        if job.exception():
+            log.warning(
+                'Background wipe failed: {0}'.format(job.exception())
+            )
+
+
+class _TreeWipe:
+    """
+    Parallel removal of a directory tree
+
+    Every directory is scanned as a job of the given worker pool,
+    the job unlinks all non directory entries and schedules a scan
+    job for each sub directory. When all scans are done the then
+    empty directories are removed, deepest first
+    """
+    def __init__(self):
+        self.directories = []
+        self.errors = []
+        self.pending = 0
+        self.condition = threading.Condition()
+
+    def walk(self, path, workers):
+        with self.condition:
+            self.pending = 1
+            workers.submit(self.scan, path, 0, workers)
+            while self.pending:
+                self.condition.wait()
+
+    def scan(self, directory, depth, workers):
+        sub_directories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            sub_directories.append(entry.path)
+                        else:
+                            os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
+                    except OSError as issue:
+                        self.add_error(issue)
+        except FileNotFoundError:
+            pass
+        except OSError as issue:
+            self.add_error(issue)
+        finally:
+            with self.condition:
+                self.directories.append((depth, directory))
+                for sub_directory in sub_directories:
+                    self.pending += 1
+                    workers.submit(
+                        self.scan, sub_directory, depth + 1, workers
+                    )
+                self.pending -= 1
+                if not self.pending:
+                    self.condition.notify_all()
+
+    def remove_directories(self):
+        for depth, directory in sorted(self.directories, reverse=True):
+            try:
+                os.rmdir(directory)
+            except FileNotFoundError:
+                pass
+            except OSError as issue:
+                self.add_error(issue)
+
+    def add_error(self, issue):
+        with self.condition:
+            self.errors.append(issue)
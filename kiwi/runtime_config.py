@@ -23,7 +23,8 @@ from .logger import log
 from .defaults import Defaults
 from .utils.size import StringToSize
 from .exceptions import (
-    KiwiRuntimeConfigFormatError
+    KiwiRuntimeConfigFormatError,
+    KiwiSizeError
 )
 
 
@@ -120,6 +121,63 @@ class RuntimeConfig:
             bundle_compress = default
         return bool(bundle_compress)
 
+    def get_bundle_compression_tool(self):
+        """
+        Return tool name which should be used to compress result
+        files in the image bundle
+
+        bundle:
+          - compression_tool: xz|zstd
+
+        if no or invalid configuration exists the default tool
+        from the Defaults class is returned
+
+        :return: A name
+
+        :rtype: str
+        """
+        compression_tool = self._get_attribute(
+            element='bundle', attribute='compression_tool'
+        )
+        if not compression_tool:
+            return Defaults.get_bundle_compression_tool()
+        elif compression_tool in ('xz', 'zstd'):
+            return compression_tool
+        else:
+            log.warning(
+                'Skipping invalid bundle compression tool: {0}'.format(
+                    compression_tool
+                )
+            )
+            return Defaults.get_bundle_compression_tool()
+
+    def get_bundle_jobs(self):
+        """
+        Return number of result files bundled in parallel in:
+
+        bundle:
+          - jobs: 4
+
+        if no or invalid configuration exists the default from the
+        Defaults class is returned
+
+        :return: number of jobs
+
+        :rtype: int
+        """
+        bundle_jobs = self._get_attribute(
+            element='bundle', attribute='jobs'
+        )
+        if not bundle_jobs:
+            return Defaults.get_bundle_jobs()
+        elif format(bundle_jobs).isdigit() and int(bundle_jobs) > 0:
+            return int(bundle_jobs)
+        else:
+            log.warning(
+                'Skipping invalid bundle jobs: {0}'.format(bundle_jobs)
+            )
+            return Defaults.get_bundle_jobs()
+
     def get_xz_options(self):
         """
         Return list of XZ compression options in:
@@ -141,6 +199,65 @@ class RuntimeConfig:
         xz_options = self._get_attribute(element='xz', attribute='options')
         return xz_options.split() if xz_options else None
 
+    def get_compress_threads(self):
+        """
+        Return number of threads the compression tools should use in:
+
+        compress:
+          - threads: 8
+
+        A value of 0 lets the tools use one thread per available CPU.
+        If no or invalid configuration exists None is returned and
+        the tools run with their thread setting from the compression
+        options
+
+        :return: number of threads or None
+
+        :rtype: int
+        """
+        compress_threads = self._get_attribute(
+            element='compress', attribute='threads'
+        )
+        if compress_threads is None:
+            return None
+        elif format(compress_threads).isdigit():
+            return int(compress_threads)
+        else:
+            log.warning(
+                'Skipping invalid compress threads: {0}'.format(
+                    compress_threads
+                )
+            )
+            return None
+
+    def get_gzip_tool(self):
+        """
+        Return tool name which should be used to create gzip
+        compressed files
+
+        compress:
+          - gzip_tool: pigz|gzip
+
+        if no or invalid configuration exists the default tool
+        from the Defaults class is returned
+
+        :return: A name
+
+        :rtype: str
+        """
+        gzip_tool = self._get_attribute(
+            element='compress', attribute='gzip_tool'
+        )
+        if not gzip_tool:
+            return Defaults.get_gzip_tool()
+        elif gzip_tool in ('pigz', 'gzip'):
+            return gzip_tool
+        else:
+            log.warning(
+                'Skipping invalid gzip tool: {0}'.format(gzip_tool)
+            )
+            return Defaults.get_gzip_tool()
+
     def get_container_compression(self):
         """
         Return compression algorithm to use for compression of container images
@@ -172,6 +289,137 @@ class RuntimeConfig:
             )
             return Defaults.get_container_compression()
 
+    def get_squashfs_compression(self):
+        """
+        Return compression algorithm to use for squashfs images
+
+        squashfs:
+          - compression: xz|zstd|lz4|gzip
+
+        if no or invalid configuration data is provided, the default
+        compression algorithm from the Defaults class is returned
+
+        :return: A name
+
+        :rtype: str
+        """
+        squashfs_compression = self._get_attribute(
+            element='squashfs', attribute='compression'
+        )
+        if not squashfs_compression:
+            return Defaults.get_squashfs_compression()
+        elif squashfs_compression in ('xz', 'zstd', 'lz4', 'gzip'):
+            return squashfs_compression
+        else:
+            log.warning(
+                'Skipping invalid squashfs compression: {0}'.format(
+                    squashfs_compression
+                )
+            )
+            return Defaults.get_squashfs_compression()
+
+    def get_squashfs_compression_level(self):
+        """
+        Return compression level of the squashfs compressor in:
+
+        squashfs:
+          - compression_level: 19
+
+        if no or invalid configuration exists None is returned and
+        the compressor runs with its default level
+
+        :return: level or None
+
+        :rtype: int
+        """
+        compression_level = self._get_attribute(
+            element='squashfs', attribute='compression_level'
+        )
+        if compression_level is None:
+            return None
+        elif format(compression_level).isdigit():
+            return int(compression_level)
+        else:
+            log.warning(
+                'Skipping invalid squashfs compression level: {0}'.format(
+                    compression_level
+                )
+            )
+            return None
+
+    def get_squashfs_processors(self):
+        """
+        Return number of processors mksquashfs should use in:
+
+        squashfs:
+          - processors: 4
+
+        A value of 0 uses one processor per available CPU.
+        If no or invalid configuration exists None is returned
+
+        :return: number of processors or None
+
+        :rtype: int
+        """
+        processors = self._get_attribute(
+            element='squashfs', attribute='processors'
+        )
+        if processors is None:
+            return None
+        elif format(processors).isdigit():
+            return int(processors)
+        else:
+            log.warning(
+                'Skipping invalid squashfs processors: {0}'.format(processors)
+            )
+            return None
+
+    def get_squashfs_memory(self):
+        """
+        Return the amount of memory mksquashfs should use for its
+        caches and queues. The value is returned in bytes and can
+        be specified in bytes or with m=MB or g=GB
+
+        squashfs:
+          - memory: 2g
+
+        if no or invalid configuration exists None is returned
+
+        :return: byte value or None
+
+        :rtype: int
+        """
+        memory = self._get_attribute(
+            element='squashfs', attribute='memory'
+        )
+        if not memory:
+            return None
+        try:
+            return int(StringToSize.to_bytes(format(memory)))
+        except KiwiSizeError:
+            log.warning(
+                'Skipping invalid squashfs memory: {0}'.format(memory)
+            )
+            return None
+
+    def get_squashfs_access_list(self):
+        """
+        Return path to a recorded file access list which is used
+        to place the files of squashfs images in access order
+
+        squashfs:
+          - access_list: /var/lib/kiwi/boot-access.list
+
+        if no configuration exists None is returned
+
+        :return: file path or None
+
+        :rtype: str
+        """
+        return self._get_attribute(
+            element='squashfs', attribute='access_list'
+        )
+
     def get_iso_tool_category(self):
         """
         Return tool category which should be used to build iso images
@@ -15,21 +15,35 @@
 # You should have received a copy of the GNU General Public License
 # along with kiwi.  If not, see <http://www.gnu.org/licenses/>
 #
-from base64 import b64encode
-from urllib.request import urlopen
-from urllib.request import Request
+from concurrent.futures import ThreadPoolExecutor
 from tempfile import NamedTemporaryFile
+from tempfile import TemporaryFile
 from tempfile import mkdtemp
 from lxml import etree
+import subprocess
+import hashlib
+import shutil
 import random
 import glob
 import os
 
 # project
-from kiwi.exceptions import KiwiUriOpenError
+from kiwi.exceptions import (
+    KiwiCommandError,
+    KiwiCommandNotFound
+)
+from kiwi.logger import log
 from kiwi.path import Path
-from kiwi.command import Command
 from kiwi.defaults import Defaults
+from kiwi.utils.codec import Codec
+from kiwi.utils.checksum import Checksum
+from kiwi.utils.compress import Compress
+from kiwi.utils.command_profiler import ProfiledPopen
+from kiwi.utils.download_manager import (
+    DownloadManager,
+    download_request_type
+)
+from kiwi.solver.solvable_cache import SolvableCache
 
 
 class SolverRepositoryBase:
@@ -38,6 +52,9 @@ class SolverRepositoryBase:
 
     * :param object uri: Instance of :class:`Uri`
     """
+    # download manager shared by all repositories
+    download_manager = None
+
     def __init__(self, uri, user=None, secret=None):
         self.uri = uri
         self.user = user
@@ -50,7 +67,9 @@ class SolverRepositoryBase:
         """
         Create SAT solvable for this repository from previously
         created intermediate solvables by merge and store the
-        result solvable in the specified target_dir
+        result solvable in the solvable cache at the specified
+        target_dir. A cached solvable for the same repository
+        fingerprint is used as it is
 
         :param str target_dir: path name
 
@@ -58,16 +77,41 @@ class SolverRepositoryBase:
 
         :rtype: str
         """
-        Path.create(target_dir)
-        solvable = os.sep.join(
-            [target_dir, self.uri.alias()]
-        )
-        if not self.is_uptodate(target_dir):
-            self._setup_repository_metadata()
-            solvable = self._merge_solvables(target_dir)
+        solvable_cache = SolvableCache(target_dir)
+        fingerprint = self.fingerprint()
+        if fingerprint:
+            key = self._get_solvable_key(solvable_cache, fingerprint)
+            solvable = solvable_cache.lookup(key)
+            if solvable:
+                return solvable
+        else:
+            key = self._get_solvable_key(
+                solvable_cache, 'uri:{0}'.format(self.uri.uri)
+            )
+        self._setup_repository_metadata()
+        try:
+            return solvable_cache.store(
+                key, self._merge_solvables,
+                ''.join([self.uri.uri, os.linesep])
+            )
+        finally:
             self._cleanup()
 
-        return solvable
+    def fingerprint(self):
+        """
+        Return repository fingerprint
+
+        The fingerprint identifies the repository metadata content
+        independent of the repository location and is used as key
+        for the solvable cache. The retrieval depends on the type
+        of the repository and is therefore supposed to be implemented
+        in the specialized Solver Repository classes. If no such
+        implementation exists the method returns None to indicate
+        the solvable can't be cached and must be created every time
+
+        :rtype: str
+        """
+        return None
 
     def timestamp(self):
         """
@@ -85,24 +129,26 @@ class SolverRepositoryBase:
 
     def is_uptodate(self, target_dir=Defaults.get_solvable_location()):
         """
-        Check if repository metadata is up to date
+        Check if the solvable cache at target_dir provides a
+        solvable for the current repository metadata
+
+        :param str target_dir: path name
 
         :return: True or False
 
         :rtype: bool
         """
-        solvable_time_file = ''.join(
-            [target_dir, os.sep, self.uri.alias(), '.timestamp']
-        )
-        if os.path.exists(solvable_time_file):
-            with open(solvable_time_file) as solvable_time:
-                saved_time = solvable_time.read()
-            if saved_time == self.timestamp() and not saved_time == 'static':
-                return True
-
+        fingerprint = self.fingerprint()
+        if fingerprint:
+            solvable_cache = SolvableCache(target_dir)
+            return bool(
+                solvable_cache.lookup(
+                    self._get_solvable_key(solvable_cache, fingerprint)
+                )
+            )
         return False
 
-    def download_from_repository(self, repo_source, target):
+    def download_from_repository(self, repo_source, target, checksum=None):
         """
         Download given source file from the repository and store
         it as target file
@@ -113,27 +159,48 @@ class SolverRepositoryBase:
 
         :param str repo_source: source file in the repo
         :param str target: file path
+        :param tuple checksum: (digest name, hex digest) to verify or None
 
         :raises KiwiUriOpenError: if the download fails
+        :raises KiwiDownloadChecksumError: if the checksum does not match
         """
-        try:
-            request = Request(
-                os.sep.join([self._get_mime_typed_uri(), repo_source])
-            )
-            if self.user and self.secret:
-                credentials = b64encode(
-                    format(':'.join([self.user, self.secret])).encode()
-                )
-                request.add_header(
-                    'Authorization', b'Basic ' + credentials
-                )
-            location = urlopen(request)
-        except Exception as e:
-            raise KiwiUriOpenError(
-                '{0}: {1}'.format(type(e).__name__, format(e))
+        self.download_files_from_repository([(repo_source, target, checksum)])
+
+    def download_files_from_repository(self, downloads):
+        """
+        Download a list of source files from the repository
+
+        The files are transferred concurrently through the download
+        manager shared by all repositories, see download_from_repository
+        for the meaning of the download arguments
+
+        :param list downloads: list of (repo_source, target, checksum)
+
+        :raises KiwiUriOpenError: if a download fails
+        :raises KiwiDownloadChecksumError: if a checksum does not match
+        """
+        mime_typed_uri = self._get_mime_typed_uri()
+        SolverRepositoryBase._get_download_manager().download_all(
+            [
+                download_request_type(
+                    url=os.sep.join([mime_typed_uri, repo_source]),
+                    target=target, checksum=checksum
+                ) for repo_source, target, checksum in downloads
+            ], auth=(self.user, self.secret)
+            if self.user and self.secret else None
+        )
+
+    @staticmethod
+    def _get_download_manager():
+        """
+        Provides the download manager shared by all repositories,
+        connections to the same host are reused across repositories
+        """
+        if not SolverRepositoryBase.download_manager:
+            SolverRepositoryBase.download_manager = DownloadManager(
+                cache_dir=Defaults.get_metadata_cache_location()
             )
-        with open(target, 'wb') as target_file:
-            target_file.write(location.read())
+        return SolverRepositoryBase.download_manager
 
     def _get_repomd_xml(self, lookup_path='repodata'):
         """
@@ -151,6 +218,27 @@ class SolverRepositoryBase:
         self.download_from_repository(xml_setup_file, xml_download.name)
         return etree.parse(xml_download.name)
 
+    def _get_repomd_fingerprint(self, lookup_path='repodata'):
+        """
+        Provides the sha256 checksum of the repomd.xml file from
+        lookup_path. The repomd.xml file references all metadata
+        files by their checksum, its checksum therefore identifies
+        the complete repository metadata
+
+        :param str lookup_path: relative path used to find repomd.xml file
+
+        :return: hexdigest
+
+        :rtype: str
+        """
+        xml_download = NamedTemporaryFile()
+        xml_setup_file = os.sep.join([lookup_path, 'repomd.xml'])
+        self.download_from_repository(xml_setup_file, xml_download.name)
+        return Checksum(xml_download.name).sha256()
+
+    def _get_solvable_key(self, solvable_cache, fingerprint):
+        return solvable_cache.get_key(type(self).__name__, fingerprint)
+
     def _get_repomd_xpath(self, xml_data, expression):
         """
         Call the provided xpath expression on the root element
@@ -176,6 +264,38 @@ class SolverRepositoryBase:
             expression, namespaces=namespace_map
         )
 
+    def _get_repomd_files(self, xml_data, metadata_type):
+        """
+        Provides the location and checksum of the files of the given
+        metadata type from a parsed repomd.xml file
+
+        :param object xml_data: An XML etree object of a repomd.xml file
+        :param str metadata_type: type attribute of the repo:data element
+
+        :return: list of (location, checksum) tuples, the checksum is
+            a (digest name, hex digest) tuple or None if the checksum
+            type is not supported
+
+        :rtype: list
+        """
+        repo = '{http://linux.duke.edu/metadata/repo}'
+        metadata_files = []
+        for data in self._get_repomd_xpath(
+            xml_data, 'repo:data[@type="{0}"]'.format(metadata_type)
+        ):
+            checksum = None
+            checksum_data = data.find(repo + 'checksum')
+            if checksum_data is not None:
+                # createrepo uses sha as name for sha1
+                digest_name = {'sha': 'sha1'}.get(
+                    checksum_data.get('type'), checksum_data.get('type')
+                )
+                if digest_name in hashlib.algorithms_available:
+                    checksum = (digest_name, checksum_data.text.strip())
+            for location in data.findall(repo + 'location'):
+                metadata_files.append((location.get('href'), checksum))
+        return metadata_files
+
     def _setup_repository_metadata(self):
         """
         Download all relevant repository metadata and create
@@ -205,6 +325,9 @@ class SolverRepositoryBase:
         * rpms2solv
           solvable from rpm header files
 
+        The metadata files are converted concurrently. Compressed
+        files are decompressed in-process and streamed into the tool
+
         :param str metadata_dir: path name
         :param str tool: one of the above tools
         """
@@ -213,42 +336,114 @@ class SolverRepositoryBase:
 
         if tool == 'rpms2solv':
             # solvable is created from a bunch of rpm files
-            bash_command = [
-                tool, os.sep.join([metadata_dir, '*.rpm']),
-                '>', self._get_random_solvable_name()
-            ]
-            Command.run(['bash', '-c', ' '.join(bash_command)])
+            self._run_solv_tool(
+                [tool] + sorted(
+                    glob.iglob(os.sep.join([metadata_dir, '*.rpm']))
+                ), self._get_random_solvable_name()
+            )
         else:
             # each file in the metadata_dir is considered a valid
             # solvable for the selected solv tool
-            for source in glob.iglob('/'.join([metadata_dir, '*'])):
-                bash_command = [
-                    'gzip', '-cd', '--force', source, '|', tool,
-                    '>', self._get_random_solvable_name()
+            with ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1
+            ) as workers:
+                solvable_jobs = [
+                    workers.submit(
+                        self._run_solv_tool, [tool],
+                        self._get_random_solvable_name(), source
+                    ) for source in glob.iglob('/'.join([metadata_dir, '*']))
                 ]
-                Command.run(['bash', '-c', ' '.join(bash_command)])
+            for solvable_job in solvable_jobs:
+                solvable_job.result()
 
-    def _merge_solvables(self, target_dir):
+    def _merge_solvables(self, solvable):
         """
-        Merge all intermediate SAT solvables into one and store
-        the result in the given target_dir. In addition an
-        info file containing the repo url and a timestamp file
-        is created
+        Merge all intermediate SAT solvables into the given
+        solvable file. A single intermediate solvable is moved
+        as it is
 
-        :param str target_dir: path name
+        :param str solvable: path name
         """
-        if self.repository_solvable_dir:
-            solvable = os.sep.join([target_dir, self.uri.alias()])
-            bash_command = [
-                'mergesolv', '/'.join([self.repository_solvable_dir, '*']),
-                '>', solvable
-            ]
-            Command.run(['bash', '-c', ' '.join(bash_command)])
-            with open('.'.join([solvable, 'info']), 'w') as solvable_info:
-                solvable_info.write(''.join([self.uri.uri, os.linesep]))
-            with open('.'.join([solvable, 'timestamp']), 'w') as solvable_time:
-                solvable_time.write(self.timestamp())
-            return solvable
+        solvables = sorted(
+            glob.iglob('/'.join([self.repository_solvable_dir, '*']))
+        )
+        if len(solvables) == 1:
+            shutil.move(solvables[0], solvable)
+        else:
+            self._run_solv_tool(['mergesolv'] + solvables, solvable)
+
+    def _run_solv_tool(self, command, solvable, source=None):
+        """
+        Run a solv tool and store its output in the given solvable
+        file. The uncompressed data of the source file is streamed
+        into the tool if a source is given
+
+        :param list command: solv tool command and arguments
+        :param str solvable: path name of the solvable to write
+        :param str source: path name of a metadata file
+
+        :raises KiwiCommandNotFound: if the tool was not found
+        :raises KiwiCommandError: if the tool failed
+        """
+        log.debug(
+            'EXEC: [{0}]{1} > {2}'.format(
+                ' '.join(command), ' < ' + source if source else '',
+                solvable
+            )
+        )
+        if not Path.which(command[0], access_mode=os.X_OK):
+            raise KiwiCommandNotFound(
+                'Command "{0}" not found in the environment'.format(
+                    command[0]
+                )
+            )
+        with open(solvable, 'wb') as solvable_file:
+            with TemporaryFile() as error:
+                process = ProfiledPopen(
+                    command,
+                    stdin=subprocess.PIPE if source else subprocess.DEVNULL,
+                    stdout=solvable_file,
+                    stderr=error
+                )
+                if source:
+                    try:
+                        with self._open_metadata(source) as metadata:
+                            shutil.copyfileobj(
+                                metadata, process.stdin,
+                                Compress.stream_chunk_size
+                            )
+                    except BrokenPipeError:
+                        # the tool has exited early, the reason
+                        # is reported by its exit code
+                        pass
+                    finally:
+                        try:
+                            process.stdin.close()
+                        except BrokenPipeError:
+                            pass
+                        process.wait()
+                if process.wait() != 0:
+                    error.seek(0)
+                    raise KiwiCommandError(
+                        '{0}: stderr: {1}'.format(
+                            command[0], Codec.decode(error.read())
+                        )
+                    )
+
+    def _open_metadata(self, source):
+        """
+        Open a metadata file for reading its uncompressed data
+
+        :param str source: path name of a metadata file
+
+        :return: binary file object
+
+        :rtype: object
+        """
+        metadata = Compress(source)
+        if metadata.get_format():
+            return metadata.open_uncompressed()
+        return open(source, 'rb')
 
     def _cleanup(self):
         """
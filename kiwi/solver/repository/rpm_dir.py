@@ -17,6 +17,7 @@
 #
 import os
 import glob
+import hashlib
 
 # project
 from kiwi.solver.repository.base import SolverRepositoryBase
@@ -27,6 +28,37 @@ class SolverRepositoryRpmDir(SolverRepositoryBase):
     """
     **Class for SAT solvable creation for rpm_dir type repositories.**
     """
+    def fingerprint(self):
+        """
+        Get fingerprint from the name, size and modification time
+        of the rpm packages in the repository directory
+
+        :return:
+            hexdigest or None for remote repositories and directories
+            which can't be read
+
+        :rtype: str
+        """
+        if self.uri.is_remote():
+            return None
+        packages = []
+        try:
+            with os.scandir(self.uri.translate()) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.rpm') and entry.is_file():
+                        package_stat = entry.stat()
+                        packages.append(
+                            '{0}:{1}:{2}'.format(
+                                entry.name, package_stat.st_size,
+                                package_stat.st_mtime_ns
+                            )
+                        )
+        except OSError:
+            return None
+        return hashlib.sha256(
+            os.linesep.join(sorted(packages)).encode()
+        ).hexdigest()
+
     def _setup_repository_metadata(self):
         """
         Download rpms from the repository and create a SAT
@@ -38,11 +70,13 @@ class SolverRepositoryRpmDir(SolverRepositoryBase):
             )
 
         package_dir = self._create_temporary_metadata_dir()
+        downloads = []
         for package in glob.iglob('/'.join([self.uri.translate(), '*.rpm'])):
             package_name = os.path.basename(package)
-            self.download_from_repository(
-                package_name, os.sep.join([package_dir, package_name])
+            downloads.append(
+                (package_name, os.sep.join([package_dir, package_name]), None)
             )
+        self.download_files_from_repository(downloads)
         self._create_solvables(
             package_dir, 'rpms2solv'
         )
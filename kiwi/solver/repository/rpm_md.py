@@ -38,11 +38,15 @@ class SolverRepositoryRpmMd(SolverRepositoryBase):
         rpm_md_data = self._find_repomd_files(
             ['primary', 'patterns'], 'rpmmd2solv'
         )
-        for rpm_md_file in rpm_md_data.metadata_files:
-            self.download_from_repository(
-                rpm_md_file,
-                os.sep.join([rpm_md_dir, os.path.basename(rpm_md_file)])
-            )
+        self.download_files_from_repository(
+            [
+                (
+                    rpm_md_file,
+                    os.sep.join([rpm_md_dir, os.path.basename(rpm_md_file)]),
+                    checksum
+                ) for rpm_md_file, checksum in rpm_md_data.metadata_files
+            ]
+        )
         self._create_solvables(
             rpm_md_dir, rpm_md_data.solv_tool
         )
@@ -56,15 +60,31 @@ class SolverRepositoryRpmMd(SolverRepositoryBase):
         rpm_comps_data = self._find_repomd_files(
             ['group_gz'], 'comps2solv'
         )
-        for rpm_comps_file in rpm_comps_data.metadata_files:
-            self.download_from_repository(
-                rpm_comps_file,
-                os.sep.join([rpm_comps_dir, os.path.basename(rpm_comps_file)])
-            )
+        self.download_files_from_repository(
+            [
+                (
+                    rpm_comps_file,
+                    os.sep.join(
+                        [rpm_comps_dir, os.path.basename(rpm_comps_file)]
+                    ),
+                    checksum
+                ) for rpm_comps_file, checksum in rpm_comps_data.metadata_files
+            ]
+        )
         self._create_solvables(
             rpm_comps_dir, rpm_comps_data.solv_tool
         )
 
+    def fingerprint(self):
+        """
+        Get fingerprint from the checksum of the repomd.xml file
+
+        :return: hexdigest
+
+        :rtype: str
+        """
+        return self._get_repomd_fingerprint()
+
     def timestamp(self):
         """
         Get timestamp from the first primary metadata
@@ -89,7 +109,8 @@ class SolverRepositoryRpmMd(SolverRepositoryBase):
         :param str tool:
             Tool to create a solvable from this data
 
-        :return: str:solv_tool, list:metadata_files
+        :return:
+            str:solv_tool, list:metadata_files of (location, checksum)
 
         :rtype: tuple
         """
@@ -97,13 +118,11 @@ class SolverRepositoryRpmMd(SolverRepositoryBase):
             'result_type', ['solv_tool', 'metadata_files']
         )
         metadata_files = []
+        repomd_xml = self._get_repomd_xml()
         for metadata_type in type_list:
-            metadata_locations = self._get_repomd_xpath(
-                self._get_repomd_xml(),
-                'repo:data[@type="{0}"]/repo:location'.format(metadata_type)
+            metadata_files += self._get_repomd_files(
+                repomd_xml, metadata_type
             )
-            for location in metadata_locations:
-                metadata_files.append(location.get('href'))
 
         return result_type(
             solv_tool=tool, metadata_files=metadata_files
@@ -20,6 +20,7 @@ from collections import namedtuple
 
 # project
 from kiwi.solver.repository.base import SolverRepositoryBase
+from kiwi.exceptions import KiwiUriOpenError
 
 
 class SolverRepositorySUSE(SolverRepositoryBase):
@@ -33,15 +34,34 @@ class SolverRepositorySUSE(SolverRepositoryBase):
         """
         metadata_dir = self._create_temporary_metadata_dir()
         repo_data = self._find_primary_repository_files()
-        for primary_file in repo_data.primary_files:
-            self.download_from_repository(
-                primary_file,
-                os.sep.join([metadata_dir, os.path.basename(primary_file)])
-            )
+        self.download_files_from_repository(
+            [
+                (
+                    primary_file,
+                    os.sep.join([metadata_dir, os.path.basename(primary_file)]),
+                    checksum
+                ) for primary_file, checksum in repo_data.primary_files
+            ]
+        )
         self._create_solvables(
             metadata_dir, repo_data.solv_tool
         )
 
+    def fingerprint(self):
+        """
+        Get fingerprint from the checksum of the suse/repodata
+        repomd.xml file. Media providing only the suse metadata
+        have no fingerprint
+
+        :return: hexdigest or None
+
+        :rtype: str
+        """
+        try:
+            return self._get_repomd_fingerprint('suse/repodata')
+        except KiwiUriOpenError:
+            return None
+
     def _find_primary_repository_files(self):
         """
         Lookup repodata/repomd.xml or alternative the packages.gz
@@ -52,7 +72,7 @@ class SolverRepositorySUSE(SolverRepositoryBase):
         create the solv data from the information
 
 
-        :return: str:solv_tool, list:primary_files
+        :return: str:solv_tool, list:primary_files of (location, checksum)
 
         :rtype: tuple
         """
@@ -61,13 +81,11 @@ class SolverRepositorySUSE(SolverRepositoryBase):
         )
         try:
             primary_files = []
-            primary_locations = self._get_repomd_xpath(
-                self._get_repomd_xml('suse/repodata'),
-                'repo:data[@type="primary"]/repo:location'
-            )
-            for location in primary_locations:
+            for location, checksum in self._get_repomd_files(
+                self._get_repomd_xml('suse/repodata'), 'primary'
+            ):
                 primary_files.append(
-                    os.sep.join(['suse', location.get('href')])
+                    (os.sep.join(['suse', location]), checksum)
                 )
             return result_type(
                 solv_tool='rpmmd2solv',
@@ -76,5 +94,5 @@ class SolverRepositorySUSE(SolverRepositoryBase):
         except Exception:
             return result_type(
                 solv_tool='susetags2solv',
-                primary_files=['suse/setup/descr/packages.gz']
+                primary_files=[('suse/setup/descr/packages.gz', None)]
             )
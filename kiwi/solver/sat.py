@@ -17,6 +17,7 @@
 #
 import importlib
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from xml.etree import ElementTree
 from xml.dom import minidom
 
@@ -29,6 +30,12 @@ from kiwi.exceptions import (
     KiwiSatSolverJobProblems
 )
 
+solved_package_type = namedtuple(
+    'solved_package_type', [
+        'uri', 'installsize_bytes', 'arch', 'version', 'checksum'
+    ]
+)
+
 
 class Sat:
     """
@@ -63,9 +70,36 @@ class Sat:
 
         :param object solver_repository: Instance of :class:`SolverRepository`
         """
-        solvable = solver_repository.create_repository_solvable()
-        pool_repository = self.pool.add_repo(solver_repository.uri.uri)
-        pool_repository.add_solv(solvable)
+        self.add_repositories([solver_repository])
+
+    def add_repositories(self, solver_repositories):
+        """
+        Add the solvables of a list of repositories to the pool
+
+        The repository solvables are created concurrently and added
+        to the pool in the order of the given list. The pool provides
+        index is created once after all repositories were added,
+        which is preferred over a sequence of add_repository calls
+        for more than one repository
+
+        :param list solver_repositories:
+            list of :class:`SolverRepository` instances
+        """
+        if not solver_repositories:
+            return
+        with ThreadPoolExecutor(
+            max_workers=len(solver_repositories)
+        ) as workers:
+            solvable_jobs = [
+                workers.submit(
+                    solver_repository.create_repository_solvable
+                ) for solver_repository in solver_repositories
+            ]
+        for solver_repository, solvable_job in zip(
+            solver_repositories, solvable_jobs
+        ):
+            pool_repository = self.pool.add_repo(solver_repository.uri.uri)
+            pool_repository.add_solv(solvable_job.result())
         self.pool.addfileprovides()
         self.pool.createwhatprovides()
 
@@ -160,15 +194,10 @@ class Sat:
 
         :rtype: dict
         """
-        result_type = namedtuple(
-            'result_type', [
-                'uri', 'installsize_bytes', 'arch', 'version', 'checksum'
-            ]
-        )
         result = {}
         for solvable in solver_transaction.newpackages():
             name = solvable.lookup_str(self.solv.SOLVABLE_NAME)
-            result[name] = result_type(
+            result[name] = solved_package_type(
                 uri=solvable.repo.name,
                 installsize_bytes=solvable.lookup_num(
                     self.solv.SOLVABLE_INSTALLSIZE
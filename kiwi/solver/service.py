@@ -0,0 +1,363 @@
+# Copyright (c) 2019 SUSE Linux GmbH.  All rights reserved.
+#
+# This file is part of kiwi.
+#
+# kiwi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# kiwi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with kiwi.  If not, see <http://www.gnu.org/licenses/>
+#
+import os
+import json
+import socket
+import socketserver
+from collections import (
+    namedtuple, OrderedDict
+)
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# project
+import kiwi.exceptions
+from kiwi.logger import log
+from kiwi.solver.sat import (
+    Sat, solved_package_type
+)
+from kiwi.solver.repository import SolverRepository
+from kiwi.system.uri import Uri
+
+from kiwi.exceptions import (
+    KiwiError,
+    KiwiSolverServiceError
+)
+
+solver_repository_type = namedtuple(
+    'solver_repository_type', ['source', 'type', 'user', 'secret']
+)
+
+solver_job_type = namedtuple(
+    'solver_job_type', ['job_names', 'skip_missing', 'ignore_recommended']
+)
+
+
+class SolverService:
+    """
+    **Long running package solver service**
+
+    The service listens on a Unix socket and keeps the solver pools
+    for the recently used repository sets loaded. Solver results
+    are memoized per pool by the job list and the solver flags.
+    A pool is identified by the fingerprints of its repositories,
+    a change of the repository metadata therefore leads to a new
+    pool. Repository sets with a repository without a fingerprint
+    are loaded for every request. Repository sources are resolved
+    by the client, see resolve_repository, such that relative paths
+    and obs locations do not depend on the working directory and
+    the runtime configuration of the service.
+
+    Requests and responses are JSON documents, one per line:
+
+    .. code:: python
+
+        {
+            'repositories': [solver_repository_type._asdict(), ...],
+            'jobs': [solver_job_type._asdict(), ...]
+        }
+
+        {
+            'results': [{'package': solved_package_type, ...}, ...]
+        }
+
+        {
+            'error': {'type': 'KiwiErrorName', 'message': 'text'}
+        }
+
+    Requests are processed one after the other, the socket is
+    only accessible by the owner of the service process
+
+    :param str socket_path: Unix socket path
+    """
+    # number of pools kept loaded
+    max_pools = 4
+
+    # number of memoized solver results per pool
+    max_results = 256
+
+    # URI schemes of repository sources given as local path
+    local_schemes = ('dir', 'file', 'iso')
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.pools = OrderedDict()
+        self.server = None
+
+    @staticmethod
+    def resolve_repository(repository):
+        """
+        Translate the source of a repository into an absolute location
+
+        Local paths are made absolute, other sources are translated
+        into the location they are read from, e.g the download URL
+        of an obs project. ISO sources keep their scheme because the
+        image is loop mounted by the solver repository. Resolving an
+        already resolved repository returns it unchanged
+
+        :param namedtuple repository: instance of solver_repository_type
+
+        :return: instance of solver_repository_type
+
+        :rtype: namedtuple
+        """
+        source_uri = urlparse(repository.source)
+        if not source_uri.scheme or source_uri.scheme in \
+                SolverService.local_schemes:
+            # relative paths, e.g dir://./repo, are relative to
+            # the working directory of the caller
+            source = '{0}://{1}'.format(
+                source_uri.scheme or 'dir', os.path.abspath(
+                    ''.join([source_uri.netloc, source_uri.path])
+                )
+            )
+        else:
+            uri = Uri(repository.source, repository.type)
+            source = uri.translate()
+            if not uri.is_remote():
+                source = 'dir://' + os.path.abspath(source)
+        return repository._replace(source=source)
+
+    def serve_forever(self):
+        """
+        Process requests until shutdown is called
+
+        :raises KiwiSolverServiceError: if the service is already running
+        """
+        self._remove_stale_socket()
+        umask = os.umask(0o077)
+        try:
+            self.server = socketserver.UnixStreamServer(
+                self.socket_path, SolverServiceRequestHandler
+            )
+        finally:
+            os.umask(umask)
+        self.server.service = self
+        log.info('Solver service listening on {0}'.format(self.socket_path))
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            os.unlink(self.socket_path)
+
+    def shutdown(self):
+        """
+        Stop a running serve_forever loop from another thread
+        """
+        self.server.shutdown()
+
+    def handle(self, request):
+        """
+        Solve the jobs of a request
+
+        :param dict request: request document
+
+        :return: response document
+
+        :rtype: dict
+        """
+        try:
+            solver, results = self._get_pool(
+                [
+                    SolverService.resolve_repository(
+                        solver_repository_type(**repository)
+                    ) for repository in request['repositories']
+                ]
+            )
+            solved = []
+            for job in request['jobs']:
+                job = solver_job_type(**job)
+                result_key = (
+                    tuple(job.job_names), job.skip_missing,
+                    job.ignore_recommended
+                )
+                if result_key in results:
+                    results.move_to_end(result_key)
+                else:
+                    results[result_key] = solver.solve(
+                        job.job_names, job.skip_missing,
+                        job.ignore_recommended
+                    )
+                    if len(results) > self.max_results:
+                        results.popitem(last=False)
+                solved.append(results[result_key])
+            return {'results': solved}
+        except Exception as issue:
+            return {
+                'error': {
+                    'type': type(issue).__name__, 'message': format(issue)
+                }
+            }
+
+    def _get_pool(self, repositories):
+        """
+        Provides the solver and the memoized results for the given
+        repository set, a new pool is loaded if the repository set
+        or the metadata of one of its repositories changed
+
+        :param list repositories: list of resolved solver_repository_type
+
+        :return: instance of Sat, OrderedDict of solver results
+
+        :rtype: tuple
+        """
+        solver_repositories = [
+            SolverRepository(
+                Uri(repository.source, repository.type),
+                repository.user, repository.secret
+            ) for repository in repositories
+        ]
+        with ThreadPoolExecutor(
+            max_workers=len(solver_repositories) or 1
+        ) as workers:
+            fingerprints = list(
+                workers.map(
+                    lambda solver_repository: solver_repository.fingerprint(),
+                    solver_repositories
+                )
+            )
+        pool_key = None
+        if None not in fingerprints:
+            pool_key = tuple(
+                (repository.source, repository.type, repository.user)
+                for repository in repositories
+            ) + tuple(fingerprints)
+        if pool_key in self.pools:
+            self.pools.move_to_end(pool_key)
+            return self.pools[pool_key]
+        solver = Sat()
+        solver.add_repositories(solver_repositories)
+        pool = (solver, OrderedDict())
+        if pool_key:
+            self.pools[pool_key] = pool
+            if len(self.pools) > self.max_pools:
+                self.pools.popitem(last=False)
+        return pool
+
+    def _remove_stale_socket(self):
+        """
+        Remove the socket of a service which was not shut down
+        cleanly
+
+        :raises KiwiSolverServiceError: if the service is already running
+        """
+        if not os.path.exists(self.socket_path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            try:
+                connection.connect(self.socket_path)
+            except ConnectionRefusedError:
+                os.unlink(self.socket_path)
+                return
+        raise KiwiSolverServiceError(
+            'Solver service already running on {0}'.format(self.socket_path)
+        )
+
+
+class SolverServiceRequestHandler(socketserver.StreamRequestHandler):
+    """
+    **Reads requests from a solver service connection and
+    writes the responses**
+    """
+    def handle(self):
+        for request in self.rfile:
+            try:
+                response = self.server.service.handle(
+                    json.loads(request.decode())
+                )
+            except ValueError as issue:
+                response = {
+                    'error': {
+                        'type': type(issue).__name__, 'message': format(issue)
+                    }
+                }
+            self.wfile.write(
+                json.dumps(response, default=format).encode() + b'\n'
+            )
+
+
+class SolverServiceClient:
+    """
+    **Client for the package solver service**
+
+    :param str socket_path: Unix socket path of the service
+    """
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+
+    def solve(self, repositories, jobs):
+        """
+        Solve the given jobs against the given repository set
+
+        The repository sources are resolved before they are sent to
+        the service. Errors reported by the solver are raised with
+        the same exception type as a local solver operation would raise
+
+        :param list repositories: list of solver_repository_type
+        :param list jobs: list of solver_job_type
+
+        :raises KiwiSolverServiceError: if the service is not reachable
+        :return:
+            list of solver results, one for each job as returned
+            by :meth:`Sat.solve`
+
+        :rtype: list
+        """
+        request = {
+            'repositories': [
+                SolverService.resolve_repository(repository)._asdict()
+                for repository in repositories
+            ],
+            'jobs': [job._asdict() for job in jobs]
+        }
+        try:
+            with socket.socket(
+                socket.AF_UNIX, socket.SOCK_STREAM
+            ) as connection:
+                connection.connect(self.socket_path)
+                connection.sendall(json.dumps(request).encode() + b'\n')
+                with connection.makefile('rb') as responses:
+                    response = json.loads(responses.readline().decode())
+        except (OSError, ValueError) as issue:
+            raise KiwiSolverServiceError(
+                'Solver service on {0} failed: {1}: {2}'.format(
+                    self.socket_path, type(issue).__name__, issue
+                )
+            )
+        if 'error' in response:
+            raise self._get_exception(
+                response['error']['type'], response['error']['message']
+            )
+        return [
+            dict(
+                (name, solved_package_type(*package))
+                for name, package in result.items()
+            ) for result in response['results']
+        ]
+
+    def _get_exception(self, error_type, message):
+        """
+        Provides the kiwi exception of the given name or a
+        KiwiSolverServiceError for any other error type
+        """
+        exception = getattr(kiwi.exceptions, error_type, None)
+        if isinstance(exception, type) and issubclass(exception, KiwiError):
+            return exception(message)
+        return KiwiSolverServiceError(
+            'Solver service error: {0}: {1}'.format(error_type, message)
+        )
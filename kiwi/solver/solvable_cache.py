@@ -0,0 +1,179 @@
+# Copyright (c) 2019 SUSE Linux GmbH.  All rights reserved.
+#
+# This file is part of kiwi.
+#
+# kiwi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# kiwi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with kiwi.  If not, see <http://www.gnu.org/licenses/>
+#
+import os
+import time
+import hashlib
+
+# project
+from kiwi.logger import log
+from kiwi.defaults import Defaults
+from kiwi.utils.atomic_file import AtomicFile
+
+
+class SolvableCache:
+    """
+    **Content addressed cache of repository SAT solvables**
+
+    Solvables are stored under a key calculated from the repository
+    type and a fingerprint of the repository metadata, e.g the
+    checksum of the repomd.xml file. Identical repositories reached
+    through different URIs or aliases therefore share one entry.
+
+    Entries are written to a temporary file in the cache directory
+    and atomically renamed, which makes the cache safe to be used
+    by concurrent builds on the same host. If the size of all
+    entries exceeds max_size, the least recently used entries are
+    removed
+
+    :param str cache_dir: cache directory path
+    :param int max_size: size limit in bytes
+    """
+    # bump if the way solvables are created changes
+    cache_version = '1'
+
+    # entries used within this time are never evicted because
+    # they might be about to be loaded by a running build
+    protected_seconds = 3600
+
+    # temporary files older than this are leftovers of aborted builds
+    stale_seconds = 3600
+
+    def __init__(
+        self, cache_dir=Defaults.get_solvable_location(),
+        max_size=Defaults.get_solvable_cache_size()
+    ):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def get_key(self, repository_type, fingerprint):
+        """
+        Calculate the cache key for a repository
+
+        :param str repository_type: type of the solver repository
+        :param str fingerprint: fingerprint of the repository metadata
+
+        :return: hexdigest
+
+        :rtype: str
+        """
+        return hashlib.sha256(
+            '{0}:{1}:{2}'.format(
+                self.cache_version, repository_type, fingerprint
+            ).encode()
+        ).hexdigest()
+
+    def get_solvable(self, key):
+        """
+        Provides the solvable file path of a cache entry
+
+        :param str key: cache key
+
+        :return: file path
+
+        :rtype: str
+        """
+        return os.sep.join([self.cache_dir, key])
+
+    def lookup(self, key):
+        """
+        Lookup a cache entry and mark it as recently used
+
+        :param str key: cache key
+
+        :return: solvable file path or None
+
+        :rtype: str
+        """
+        solvable = self.get_solvable(key)
+        try:
+            os.utime(solvable)
+        except OSError:
+            return None
+        return solvable
+
+    def store(self, key, create, info=None):
+        """
+        Atomically add an entry to the cache and evict least
+        recently used entries exceeding the size limit
+
+        :param str key: cache key
+        :param callable create:
+            called with a temporary file path in the cache directory
+            to write the solvable to
+        :param str info: text stored along with the solvable
+
+        :return: solvable file path
+
+        :rtype: str
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        solvable = self.get_solvable(key)
+        if info is not None:
+            AtomicFile.write(solvable + '.info', info)
+        AtomicFile.replace(solvable, create)
+        self.evict(keep=key)
+        return solvable
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the size of all
+        entries fits into max_size. Entries used within the last
+        protected_seconds are kept as well as the entry for the
+        given key. Stale temporary files are removed too
+
+        :param str key: cache key to keep
+        """
+        now = time.time()
+        entries = []
+        total_size = 0
+        with os.scandir(self.cache_dir) as cache_entries:
+            for entry in cache_entries:
+                try:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith('.tmp'):
+                    if now - entry_stat.st_mtime > self.stale_seconds:
+                        self._unlink(entry.path)
+                elif self._is_key(entry.name):
+                    entries.append(
+                        (entry_stat.st_mtime, entry.name, entry_stat.st_size)
+                    )
+                    total_size += entry_stat.st_size
+        for mtime, name, size in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if name == keep or now - mtime < self.protected_seconds:
+                continue
+            solvable = self.get_solvable(name)
+            log.debug('Evicting solvable {0}'.format(solvable))
+            total_size -= size
+            self._unlink(solvable)
+            self._unlink(solvable + '.info')
+
+    def _unlink(self, filename):
+        try:
+            os.unlink(filename)
+        except FileNotFoundError:
+            # removed by a concurrent build in the meantime
+            pass
+
+    def _is_key(self, name):
+        return len(name) == 64 and all(
+            character in '0123456789abcdef' for character in name
+        )
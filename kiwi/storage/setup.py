@@ -60,7 +60,7 @@ class DiskSetup:
         self.root_dir = root_dir
         self.xml_state = xml_state
 
-    def get_disksize_mbytes(self):
+    def get_disksize_mbytes(self):  # noqa: C901
         """
         Precalculate disk size requirements in mbytes
 
@@ -78,6 +78,15 @@ class DiskSetup:
             '--> system data with filesystem overhead needs %s MB',
             root_filesystem_mbytes
         )
+        if not self.need_boot_partition():
+            # kernel, initrd and bootloader are written to the root
+            # filesystem after its size was calculated
+            boot_files_mbytes = Defaults.get_boot_files_mbytes()
+            calculated_disk_mbytes += boot_files_mbytes
+            log.info(
+                '--> boot files in root filesystem adding %s MB',
+                boot_files_mbytes
+            )
         if self.volume_manager and self.volume_manager == 'lvm':
             lvm_overhead_mbytes = Defaults.get_lvm_overhead_mbytes()
             log.info(
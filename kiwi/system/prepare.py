@@ -223,7 +223,8 @@ class SystemPrepare:
                 items_to_complete=all_install_items,
                 match_method=process.create_match_method(
                     manager.match_package_installed
-                )
+                ),
+                name_method=manager.get_installed_package_name
             )
         except Exception as issue:
             if manager.has_failed(process.returncode()):
@@ -290,7 +291,8 @@ class SystemPrepare:
                     items_to_complete=all_install_items,
                     match_method=process.create_match_method(
                         manager.match_package_installed
-                    )
+                    ),
+                    name_method=manager.get_installed_package_name
                 )
             except Exception as issue:
                 if manager.has_failed(process.returncode()):
@@ -374,7 +376,8 @@ class SystemPrepare:
                     items_to_complete=all_install_items,
                     match_method=process.create_match_method(
                         manager.match_package_installed
-                    )
+                    ),
+                    name_method=manager.get_installed_package_name
                 )
             except Exception as issue:
                 raise KiwiSystemInstallPackagesFailed(
@@ -415,7 +418,8 @@ class SystemPrepare:
                     items_to_complete=all_delete_items,
                     match_method=process.create_match_method(
                         manager.match_package_deleted
-                    )
+                    ),
+                    name_method=manager.get_deleted_package_name
                 )
             except Exception as issue:
                 raise KiwiSystemDeletePackagesFailed(
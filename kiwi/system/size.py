@@ -15,75 +15,129 @@
 # You should have received a copy of the GNU General Public License
 # along with kiwi.  If not, see <http://www.gnu.org/licenses/>
 #
+import os
+import stat
+import errno
+import math
+from fnmatch import fnmatch
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
 # project
-from kiwi.command import Command
 from kiwi.defaults import Defaults
 
+tree_size_type = namedtuple(
+    'tree_size_type', [
+        'apparent_bytes', 'deduplicated_bytes', 'files', 'inodes'
+    ]
+)
+
+filesystem_usage_type = namedtuple(
+    'filesystem_usage_type', [
+        'file_blocks', 'directory_blocks', 'long_symlinks',
+        'xattr_blocks', 'xattr_bytes', 'inline_files', 'inline_bytes',
+        'name_bytes', 'inodes'
+    ]
+)
+
 
 class SystemSize:
     """
     **Provide source tree size information**
 
+    The source tree is walked once per exclude list and the result
+    is cached in the instance. Create a new instance to get the size
+    of a source tree which was modified afterwards
+
     :param str source_dir: source directory path name
     """
+    # filesystem block size the estimates are based on
+    block_size = 4096
+
+    # symlink targets shorter than this are stored in the ext inode
+    ext_fast_symlink_bytes = 60
+
+    # space for extended attributes in a 256 byte ext inode
+    ext_inode_xattr_bytes = 92
+
+    # files up to this size are stored inline in the btrfs metadata
+    btrfs_max_inline_bytes = 2048
+
     def __init__(self, source_dir):
         self.source_dir = source_dir
+        self.tree_size_cache = {}
 
-    def customize(self, size, requested_filesystem):
+    def customize(self, size, requested_filesystem, exclude=None):
         """
-        Increase the sum of all file sizes by an empiric factor
+        Increase the sum of all file sizes by the filesystem overhead
 
         Each filesystem has some overhead it needs to manage itself.
         Thus the plain data size is always smaller as the size of
-        the container which embeds it. This method increases the
-        given size by a filesystem specific empiric factor to
-        ensure the given data size can be stored in a filesystem
-        of the customized size
+        the container which embeds it. This method estimates the
+        size of a filesystem of the requested type holding the
+        source tree and increases the given size by the difference
+        to the data size of the source tree. The estimate models
+        the block rounding of each file, directory blocks, inode
+        tables, extended attributes and the journal. The xfs
+        estimate has not been validated against mkfs.xfs yet, thus
+        xfs keeps the empiric factor used before
 
         :param int size: mbsize to update
         :param str requested_filesystem: filesystem name
+        :param list exclude: list of paths excluded from the data size
 
         :return: mbytes
 
         :rtype: int
         """
-        if requested_filesystem:
-            if requested_filesystem.startswith('ext'):
-                size *= 1.5
-                file_count = self.accumulate_files()
-                inode_mbytes = \
-                    file_count * Defaults.get_default_inode_size() / 1048576
-                size += 2 * inode_mbytes
-            elif requested_filesystem == 'btrfs':
-                size *= 1.5
-            elif requested_filesystem == 'xfs':
-                size *= 1.5
+        if requested_filesystem == 'xfs':
+            size *= 1.5
+        elif requested_filesystem in ('ext2', 'ext3', 'ext4', 'btrfs'):
+            filesystem_bytes = self.get_filesystem_bytes(
+                requested_filesystem, exclude
+            )
+            overhead_bytes = filesystem_bytes - self.get_tree_size(
+                exclude
+            ).deduplicated_bytes
+            size += math.ceil(max(overhead_bytes, 0) / 1048576)
 
         return int(size)
 
+    def get_filesystem_bytes(self, filesystem, exclude=None):
+        """
+        Estimate the size of a filesystem holding the source tree
+
+        :param str filesystem: one of ext2, ext3, ext4, btrfs or xfs
+        :param list exclude: list of path patterns to exclude
+
+        :return: bytes
+
+        :rtype: int
+        """
+        usage = self.get_filesystem_usage(exclude)
+        if filesystem == 'btrfs':
+            filesystem_bytes = SystemSize._get_btrfs_bytes(usage)
+        elif filesystem == 'xfs':
+            filesystem_bytes = SystemSize._get_xfs_bytes(usage)
+        else:
+            filesystem_bytes = SystemSize._get_ext_bytes(usage, filesystem)
+        # headroom for allocation differences between populating
+        # the filesystem at creation time and syncing into it
+        return int(math.ceil(filesystem_bytes * 1.03))
+
     def accumulate_mbyte_file_sizes(self, exclude=None):
         """
         Calculate data size of all data in the source tree
 
+        Like du, files with multiple hardlinks are counted once
+
         :param list exclude: list of paths to exclude
 
         :return: mbytes
 
         :rtype: int
         """
-        exclude_options = []
-        if exclude:
-            for item in exclude:
-                exclude_options.append('--exclude')
-                exclude_options.append(item)
-        du_call = Command.run(
-            [
-                'du', '-s', '--apparent-size', '--block-size', '1'
-            ] + exclude_options + [
-                self.source_dir
-            ]
-        )
-        return int(du_call.output.split('\t')[0]) / 1048576
+        return self.get_tree_size(exclude).deduplicated_bytes / 1048576
 
     def accumulate_files(self):
         """
@@ -93,12 +147,348 @@ class SystemSize:
 
         :rtype: int
         """
-        bash_comand = [
-            'find', self.source_dir, '|', 'wc', '-l'
-        ]
-        wc_call = Command.run(
-            [
-                'bash', '-c', ' '.join(bash_comand)
-            ]
+        return self.get_tree_size().files
+
+    def get_tree_size(self, exclude=None):
+        """
+        Walk the source tree and sum up the size information of
+        all entries including directories and the source directory
+        itself. Symlinks are not followed. The top level directories
+        are walked in parallel
+
+        An entry is excluded together with everything below it if
+        its path or its name matches one of the given shell patterns
+
+        :param list exclude: list of path patterns to exclude
+
+        :return:
+            Contains the sum of all apparent sizes, the sum of all
+            apparent sizes counting hardlinked files once, the number
+            of entries and the number of distinct inodes
+
+            .. code:: python
+
+                tree_size_type(
+                    apparent_bytes=int,
+                    deduplicated_bytes=int,
+                    files=int,
+                    inodes=int
+                )
+
+        :rtype: namedtuple
+        """
+        return self._get_tree_count(exclude)[0]
+
+    def get_filesystem_usage(self, exclude=None):
+        """
+        Provide the source tree information filesystem size estimates
+        are based on. It is collected by the same walk as the tree
+        size. Block counts are based on SystemSize.block_size,
+        files with multiple hardlinks are counted once
+
+        :param list exclude: list of path patterns to exclude
+
+        :return:
+            Contains the data blocks of all files, the blocks of all
+            directories, the number of symlinks with a target too
+            long to be stored in an ext inode, the number of entries
+            whose extended attributes don't fit into an ext inode,
+            the extended attribute bytes, the number and size of
+            files small enough to be stored inline in btrfs metadata,
+            the bytes of all entry names and the number of distinct
+            inodes
+
+            .. code:: python
+
+                filesystem_usage_type(
+                    file_blocks=int,
+                    directory_blocks=int,
+                    long_symlinks=int,
+                    xattr_blocks=int,
+                    xattr_bytes=int,
+                    inline_files=int,
+                    inline_bytes=int,
+                    name_bytes=int,
+                    inodes=int
+                )
+
+        :rtype: namedtuple
+        """
+        return self._get_tree_count(exclude)[1]
+
+    def clear_cache(self):
+        """
+        Drop the cached tree size results, required if the source
+        tree was modified after its size was calculated
+        """
+        self.tree_size_cache.clear()
+
+    def _get_tree_count(self, exclude):
+        exclude = tuple(exclude or [])
+        if exclude not in self.tree_size_cache:
+            self.tree_size_cache[exclude] = self._walk(exclude)
+        return self.tree_size_cache[exclude]
+
+    @staticmethod
+    def _get_ext_bytes(usage, filesystem):
+        block_size = SystemSize.block_size
+        data_bytes = block_size * sum([
+            usage.file_blocks, usage.directory_blocks,
+            usage.long_symlinks, usage.xattr_blocks
+        ])
+        if filesystem != 'ext4':
+            # ext2 and ext3 map the data with indirect blocks, for
+            # the 1k blocks of small filesystems one per 256 blocks
+            data_bytes += block_size * -(-usage.file_blocks // 256)
+        inode_size = Defaults.get_default_inode_size()
+        journal = SystemSize._get_ext_journal_bytes \
+            if filesystem != 'ext2' else lambda size: 0
+        # mke2fs uses a smaller inode ratio below 512 MB, the inode
+        # tables take their share of the filesystem size. Bitmaps,
+        # group descriptors and the blocks reserved for resizing
+        # take less than 1 percent
+        for inode_ratio, min_bytes in [(16384, 512 << 20), (4096, 0)]:
+            filesystem_bytes = max(
+                SystemSize._solve_size(
+                    data_bytes, inode_size / inode_ratio + 0.01, journal
+                ),
+                (usage.inodes + 16) * inode_ratio
+            )
+            if filesystem_bytes >= min_bytes:
+                break
+        return filesystem_bytes
+
+    @staticmethod
+    def _get_ext_journal_bytes(filesystem_bytes):
+        # journal size as chosen by mke2fs for the number of blocks
+        blocks = filesystem_bytes // SystemSize.block_size
+        if blocks < 2048:
+            return 0
+        journal_blocks = 262144
+        for max_blocks, max_journal_blocks in [
+            (32768, 1024), (262144, 4096), (524288, 8192),
+            (4194304, 16384), (8388608, 32768), (16777216, 65536),
+            (33554432, 131072)
+        ]:
+            if blocks < max_blocks:
+                journal_blocks = max_journal_blocks
+                break
+        return journal_blocks * SystemSize.block_size
+
+    @staticmethod
+    def _get_xfs_bytes(usage):
+        data_bytes = SystemSize.block_size * (
+            usage.file_blocks + usage.directory_blocks + usage.xattr_blocks
+        )
+        # 512 byte inodes are allocated in chunks of 64 inodes
+        inode_bytes = (usage.inodes + 4 * 64) * 512
+        # allocation group headers, free space trees and the per
+        # allocation group reservations take about 3 percent, the
+        # log is at least 64 MB. mkfs.xfs refuses to create
+        # filesystems smaller than 300 MB
+        return max(
+            SystemSize._solve_size(
+                data_bytes + inode_bytes, 0.03,
+                lambda size: min(max(64 << 20, size // 2048), 2 << 30)
+            ),
+            300 << 20
+        )
+
+    @staticmethod
+    def _get_btrfs_bytes(usage):
+        data_bytes = SystemSize.block_size * (
+            usage.file_blocks - usage.inline_files
         )
-        return int(wc_call.output.rstrip('\n'))
+        # per inode an inode item, an inode ref, a dir item, a dir
+        # index and a file extent item plus their item headers, the
+        # name is stored in three of them. Data is checksummed with
+        # 4 bytes per block
+        metadata_bytes = usage.inodes * 440 + usage.name_bytes * 3 + (
+            usage.file_blocks * 4
+        ) + usage.inline_bytes + usage.inline_files * 21 + (
+            usage.xattr_bytes * 2
+        )
+        # metadata is stored twice and leaves are filled to about
+        # 75 percent. Chunk allocation leaves up to 10 percent of
+        # the filesystem unused, the system chunk and the global
+        # reserve need 64 MB
+        return max(
+            (data_bytes + metadata_bytes * 2 / 0.75) * 1.1 + (64 << 20),
+            256 << 20
+        )
+
+    @staticmethod
+    def _solve_size(fixed_bytes, overhead_fraction, get_log_bytes):
+        """
+        Calculate the smallest filesystem size which holds the
+        fixed bytes, the log and the overhead which is a fraction
+        of the filesystem size. The log size depends on the
+        filesystem size and grows in steps
+        """
+        filesystem_bytes = fixed_bytes
+        while True:
+            required_bytes = (
+                fixed_bytes + get_log_bytes(filesystem_bytes)
+            ) / (1 - overhead_fraction)
+            if required_bytes <= filesystem_bytes:
+                return filesystem_bytes
+            filesystem_bytes = required_bytes
+
+    def _walk(self, exclude):
+        root_stat = os.lstat(self.source_dir)
+        total = _TreeCount()
+        total.add(root_stat, self.source_dir)
+        top_level_dirs = []
+        with os.scandir(self.source_dir) as entries:
+            for entry in entries:
+                if _is_excluded(entry, exclude):
+                    continue
+                entry_stat = entry.stat(follow_symlinks=False)
+                total.add(entry_stat, entry.path, entry.name)
+                if stat.S_ISDIR(entry_stat.st_mode):
+                    top_level_dirs.append(entry.path)
+        total.add_directory(total.name_bytes, total.files - 1)
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as workers:
+            for count in workers.map(
+                lambda path: _TreeCount().walk(path, exclude), top_level_dirs
+            ):
+                total.merge(count)
+        hardlink_bytes = sum(total.hardlinks.values())
+        inodes = total.files + len(total.hardlinks) - total.hardlink_entries
+        for size in total.hardlinks.values():
+            total.add_file_data(size)
+        return (
+            tree_size_type(
+                apparent_bytes=total.apparent_bytes,
+                deduplicated_bytes=total.apparent_bytes + hardlink_bytes - (
+                    total.hardlink_bytes
+                ),
+                files=total.files,
+                inodes=inodes
+            ),
+            filesystem_usage_type(
+                file_blocks=total.file_blocks,
+                directory_blocks=total.directory_blocks,
+                long_symlinks=total.long_symlinks,
+                xattr_blocks=total.xattr_blocks,
+                xattr_bytes=total.xattr_bytes,
+                inline_files=total.inline_files,
+                inline_bytes=total.inline_bytes,
+                name_bytes=total.name_bytes,
+                inodes=inodes
+            )
+        )
+
+
+class _TreeCount:
+    """
+    Size information of a part of the source tree
+    """
+    def __init__(self):
+        self.apparent_bytes = 0
+        self.files = 0
+        self.hardlink_bytes = 0
+        self.hardlink_entries = 0
+        self.hardlinks = {}
+        self.file_blocks = 0
+        self.directory_blocks = 0
+        self.long_symlinks = 0
+        self.xattr_blocks = 0
+        self.xattr_bytes = 0
+        self.inline_files = 0
+        self.inline_bytes = 0
+        self.name_bytes = 0
+        self.xattr_supported = True
+
+    def add(self, entry_stat, path, name=''):
+        self.apparent_bytes += entry_stat.st_size
+        self.files += 1
+        self.name_bytes += len(name)
+        if entry_stat.st_nlink > 1 and not stat.S_ISDIR(entry_stat.st_mode):
+            self.hardlink_bytes += entry_stat.st_size
+            self.hardlink_entries += 1
+            self.hardlinks[
+                (entry_stat.st_dev, entry_stat.st_ino)
+            ] = entry_stat.st_size
+        elif stat.S_ISREG(entry_stat.st_mode):
+            self.add_file_data(entry_stat.st_size)
+        elif stat.S_ISLNK(entry_stat.st_mode) and \
+                entry_stat.st_size >= SystemSize.ext_fast_symlink_bytes:
+            self.long_symlinks += 1
+        if self.xattr_supported:
+            self.add_xattrs(path)
+
+    def add_file_data(self, size):
+        self.file_blocks += -(-size // SystemSize.block_size)
+        if 0 < size <= SystemSize.btrfs_max_inline_bytes:
+            self.inline_files += 1
+            self.inline_bytes += size
+
+    def add_directory(self, name_bytes, entries):
+        # ext directory entries have an 8 byte header and are 4 byte
+        # aligned, the . and .. entries take 24 bytes
+        entry_bytes = 24 + name_bytes + entries * 11
+        self.directory_blocks += -(-entry_bytes // SystemSize.block_size)
+
+    def add_xattrs(self, path):
+        try:
+            names = os.listxattr(path, follow_symlinks=False)
+            inode_xattr_bytes = 0
+            for name in names:
+                value_bytes = len(
+                    os.getxattr(path, name, follow_symlinks=False)
+                )
+                self.xattr_bytes += len(name) + value_bytes
+                # ext stores a 16 byte header and the 4 byte aligned
+                # name and value per extended attribute
+                inode_xattr_bytes += 16 + -(-len(name) // 4) * 4 + (
+                    -(-value_bytes // 4) * 4
+                )
+            if inode_xattr_bytes > SystemSize.ext_inode_xattr_bytes:
+                self.xattr_blocks += 1
+        except OSError as issue:
+            if issue.errno in (errno.ENOTSUP, errno.ENOSYS):
+                self.xattr_supported = False
+
+    def merge(self, count):
+        self.apparent_bytes += count.apparent_bytes
+        self.files += count.files
+        self.hardlink_bytes += count.hardlink_bytes
+        self.hardlink_entries += count.hardlink_entries
+        self.hardlinks.update(count.hardlinks)
+        self.file_blocks += count.file_blocks
+        self.directory_blocks += count.directory_blocks
+        self.long_symlinks += count.long_symlinks
+        self.xattr_blocks += count.xattr_blocks
+        self.xattr_bytes += count.xattr_bytes
+        self.inline_files += count.inline_files
+        self.inline_bytes += count.inline_bytes
+        self.name_bytes += count.name_bytes
+
+    def walk(self, path, exclude):
+        directories = [path]
+        while directories:
+            name_bytes = self.name_bytes
+            entry_count = 0
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if _is_excluded(entry, exclude):
+                        continue
+                    try:
+                        entry_stat = entry.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        # entry was deleted while walking the tree
+                        continue
+                    self.add(entry_stat, entry.path, entry.name)
+                    entry_count += 1
+                    if stat.S_ISDIR(entry_stat.st_mode):
+                        directories.append(entry.path)
+            self.add_directory(self.name_bytes - name_bytes, entry_count)
+        return self
+
+
+def _is_excluded(entry, exclude):
+    for pattern in exclude:
+        if fnmatch(entry.path, pattern) or fnmatch(entry.name, pattern):
+            return True
+    return False
@@ -21,6 +21,8 @@ usage: kiwi image info -h | --help
            [--resolve-package-list]
            [--ignore-repos]
            [--add-repo=<source,type,alias,priority>...]
+           [--resolver-socket=<socket>]
+       kiwi image info --serve-resolver=<socket>
        kiwi image info help
 
 commands:
@@ -39,15 +41,33 @@ options:
         solve package dependencies and return a list of all
         packages including their attributes e.g size,
         shasum, etc...
+    --resolver-socket=<socket>
+        solve package dependencies using the resolver service
+        listening on the given Unix socket. If the service is
+        not reachable the dependencies are solved locally
+    --serve-resolver=<socket>
+        run a resolver service on the given Unix socket. The
+        service keeps the repository metadata loaded and
+        remembers solver results for subsequent calls using
+        the --resolver-socket option
 """
 # project
 from kiwi.tasks.base import CliTask
 from kiwi.help import Help
+from kiwi.logger import log
 from kiwi.utils.output import DataOutput
 from kiwi.solver.sat import Sat
 from kiwi.solver.repository import SolverRepository
+from kiwi.solver.service import (
+    SolverService,
+    SolverServiceClient,
+    solver_repository_type,
+    solver_job_type
+)
 from kiwi.system.uri import Uri
 
+from kiwi.exceptions import KiwiSolverServiceError
+
 
 class ImageInfoTask(CliTask):
     """
@@ -66,6 +86,11 @@ class ImageInfoTask(CliTask):
         if self.command_args.get('help') is True:
             return self.manual.show('kiwi::image::info')
 
+        if self.command_args['--serve-resolver']:
+            return SolverService(
+                self.command_args['--serve-resolver']
+            ).serve_forever()
+
         self.load_xml_description(
             self.command_args['--description']
         )
@@ -88,7 +113,6 @@ class ImageInfoTask(CliTask):
         }
 
         if self.command_args['--resolve-package-list']:
-            solver = self._setup_solver()
             boostrap_package_list = self.xml_state.get_bootstrap_packages()
             package_list = boostrap_package_list + \
                 self.xml_state.get_system_packages()
@@ -96,13 +120,17 @@ class ImageInfoTask(CliTask):
                 self.xml_state.get_bootstrap_collection_type()
             system_collection_type = \
                 self.xml_state.get_system_collection_type()
-            bootstrap_packages = solver.solve(
-                boostrap_package_list, False,
-                True if bootstrap_collection_type == 'onlyRequired' else False
-            )
-            solved_packages = solver.solve(
-                self.xml_state.get_system_packages(), False,
-                True if system_collection_type == 'onlyRequired' else False
+            bootstrap_packages, solved_packages = self._solve(
+                [
+                    solver_job_type(
+                        boostrap_package_list, False,
+                        bootstrap_collection_type == 'onlyRequired'
+                    ),
+                    solver_job_type(
+                        self.xml_state.get_system_packages(), False,
+                        system_collection_type == 'onlyRequired'
+                    )
+                ]
             )
             solved_packages.update(bootstrap_packages)
             package_info = {}
@@ -125,16 +153,41 @@ class ImageInfoTask(CliTask):
         else:
             DataOutput(result).display()
 
-    def _setup_solver(self):
-        solver = Sat()
+    def _solve(self, jobs):
+        repositories = []
         for xml_repo in self.xml_state.get_repository_sections_used_for_build():
-            repo_source = xml_repo.get_source().get_path()
-            repo_user = xml_repo.get_username()
-            repo_secret = xml_repo.get_password()
-            repo_type = xml_repo.get_type()
-            solver.add_repository(
-                SolverRepository(
-                    Uri(repo_source, repo_type), repo_user, repo_secret
+            repositories.append(
+                solver_repository_type(
+                    source=xml_repo.get_source().get_path(),
+                    type=xml_repo.get_type(),
+                    user=xml_repo.get_username(),
+                    secret=xml_repo.get_password()
                 )
             )
+        if self.command_args['--resolver-socket']:
+            try:
+                return SolverServiceClient(
+                    self.command_args['--resolver-socket']
+                ).solve(repositories, jobs)
+            except KiwiSolverServiceError as issue:
+                log.warning(
+                    '{0}, solving package dependencies locally'.format(issue)
+                )
+        solver = self._setup_solver(repositories)
+        return [
+            solver.solve(
+                job.job_names, job.skip_missing, job.ignore_recommended
+            ) for job in jobs
+        ]
+
+    def _setup_solver(self, repositories):
+        solver = Sat()
+        solver.add_repositories(
+            [
+                SolverRepository(
+                    Uri(repository.source, repository.type),
+                    repository.user, repository.secret
+                ) for repository in repositories
+            ]
+        )
         return solver
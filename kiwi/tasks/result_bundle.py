@@ -26,8 +26,12 @@ commands:
         create result bundle from the image build results in the
         specified target directory. Each result image will contain
         the specified bundle identifier as part of its filename.
-        Uncompressed image files will also become xz compressed
+        Uncompressed image files will also become xz compressed,
+        or zstd compressed if configured in the runtime config,
         and a sha sum will be created from every result image.
+        Result files which did not change since the last bundle
+        run into the same bundle directory reuse the existing
+        bundle files.
 
 options:
     --bundle-dir=<directory>
@@ -47,6 +51,7 @@ options:
         are placed to the same download location
 """
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import os
 
 # project
@@ -57,6 +62,9 @@ from kiwi.logger import log
 from kiwi.path import Path
 from kiwi.utils.compress import Compress
 from kiwi.utils.checksum import Checksum
+from kiwi.utils.file_copy import FileCopy
+from kiwi.utils.bundle_cache import BundleCache
+from kiwi.utils.atomic_file import AtomicFile
 from kiwi.command import Command
 
 from kiwi.exceptions import (
@@ -73,13 +81,25 @@ class ResultBundleTask(CliTask):
     * :attr:`manual`
         Instance of Help
     """
+    # file name suffix of the compressed bundle file per tool
+    compression_suffix = {
+        'xz': '.xz',
+        'zstd': '.zst'
+    }
+
     def process(self):
         """
         Create result bundle from the image build results in the
         specified target directory. Each result image will contain
         the specified bundle identifier as part of its filename.
-        Uncompressed image files will also become xz compressed
-        and a sha sum will be created from every result image
+        Uncompressed image files will also become compressed by
+        the bundle compression tool from the runtime config and a
+        sha sum will be created from every result image.
+        The result files are bundled concurrently, the number of
+        parallel jobs is set by the bundle jobs runtime config.
+        Result files which did not change since the last bundle
+        run into the same bundle directory reuse the existing
+        bundle files
         """
         self.manual = Help()
         if self._help():
@@ -106,66 +126,266 @@ class ResultBundleTask(CliTask):
         # hard link bundle files, compress and build checksum
         if not os.path.exists(bundle_directory):
             Path.create(bundle_directory)
-        for result_file in list(ordered_results.values()):
-            if result_file.use_for_bundle:
-                bundle_file_basename = os.path.basename(result_file.filename)
-                # The bundle id is only taken into account for image results
-                # which contains the image version appended in its file name
-                part_name = list(bundle_file_basename.partition(image_name))
-                bundle_file_basename = ''.join([
-                    part_name[0], part_name[1],
-                    part_name[2].replace(
-                        image_version,
-                        image_version + '-' + self.command_args['--id']
+        bundle_cache = BundleCache(bundle_directory)
+        bundle_jobs = []
+        max_workers = self.runtime_config.get_bundle_jobs()
+        compression_tool = self.runtime_config.get_bundle_compression_tool()
+        if compression_tool == 'zstd' and not Path.which(
+            'zstd', access_mode=os.X_OK
+        ):
+            log.warning('zstd not found, falling back to xz compression')
+            compression_tool = 'xz'
+        # the compression threads are split across the compression
+        # processes running in parallel, each of them still gets
+        # one thread
+        compress_jobs = min(max_workers, len([
+            result_file for result_file in ordered_results.values()
+            if result_file.use_for_bundle and result_file.compress
+        ])) or 1
+        compress_threads = self.runtime_config.get_compress_threads() \
+            or os.cpu_count() or 1
+        job_threads = max(1, compress_threads // compress_jobs)
+        with ThreadPoolExecutor(max_workers=max_workers) as workers:
+            for result_file in list(ordered_results.values()):
+                if result_file.use_for_bundle:
+                    messages = []
+                    bundle_jobs.append(
+                        (
+                            result_file, messages, workers.submit(
+                                self._bundle_result_file, result_file,
+                                bundle_directory, image_name,
+                                image_version, messages, bundle_cache,
+                                job_threads, compression_tool
+                            )
+                        )
+                    )
+            # log messages and errors per result file in the order
+            # of the results, independent of the job completion order
+            bundle_errors = []
+            for result_file, messages, job in bundle_jobs:
+                try:
+                    job.result()
+                except Exception as issue:
+                    bundle_errors.append(
+                        '{0}: {1}: {2}'.format(
+                            result_file.filename, type(issue).__name__, issue
+                        )
+                    )
+                finally:
+                    for level, message in messages:
+                        getattr(log, level)(*message)
+        bundle_cache.write()
+        if bundle_errors:
+            raise KiwiBundleError(
+                'Failed to bundle {0} result file(s):\n{1}'.format(
+                    len(bundle_errors), '\n'.join(bundle_errors)
+                )
+            )
+
+    def _bundle_result_file(
+        self, result_file, bundle_directory, image_name, image_version,
+        messages, bundle_cache, threads=None, compression_tool='xz'
+    ):
+        """
+        Stage or compress, checksum and zsync a result file into
+        the bundle, or reuse the bundle files of an unchanged
+        result file from the bundle cache
+
+        The method runs in a worker thread, log messages are stored
+        in the given messages list instead of being logged directly
+
+        :param namedtuple result_file: result file information
+        :param str bundle_directory: bundle target directory
+        :param str image_name: image name
+        :param str image_version: image version
+        :param list messages: list to store (log level, arguments) tuples
+        :param object bundle_cache: instance of BundleCache
+        :param int threads: number of compression threads
+        :param str compression_tool: xz|zstd
+        """
+        bundle_file_basename = os.path.basename(result_file.filename)
+        # The bundle id is only taken into account for image results
+        # which contains the image version appended in its file name
+        part_name = list(bundle_file_basename.partition(image_name))
+        bundle_file_basename = ''.join([
+            part_name[0], part_name[1],
+            part_name[2].replace(
+                image_version,
+                image_version + '-' + self.command_args['--id']
+            )
+        ])
+        messages.append(('info', ('Creating %s', bundle_file_basename)))
+        bundle_file = ''.join(
+            [bundle_directory, '/', bundle_file_basename]
+        )
+        bundle_settings = {
+            'compress': result_file.compress,
+            'shasum': result_file.shasum,
+            'compression_tool': compression_tool
+            if result_file.compress else None,
+            'xz_options': self.runtime_config.get_xz_options()
+            if result_file.compress and compression_tool == 'xz' else None
+        }
+        cached = bundle_cache.lookup(result_file.filename, bundle_settings)
+        sha256_checksum = None
+        zsync_file = None
+        if cached:
+            messages.append(
+                ('info', ('--> Reusing unchanged bundle file',))
+            )
+            if result_file.compress:
+                bundle_file += self.compression_suffix[compression_tool]
+            cached_bundle_file = os.sep.join(
+                [bundle_directory, cached['bundle_file']]
+            )
+            if cached_bundle_file != bundle_file:
+                FileCopy.stage(
+                    cached_bundle_file, bundle_file, allow_hardlink=True
+                )
+            sha256_checksum = cached['sha256']
+        elif result_file.compress:
+            # read the result file once, the compressed data is written
+            # to the bundle and fed into the checksum at the same time
+            compression_name = compression_tool.upper()
+            messages.append(
+                ('info', ('--> %s compressing', compression_name))
+            )
+            compress = Compress(result_file.filename)
+            digest_names = ['sha256'] if result_file.shasum else None
+            if compression_tool == 'zstd':
+                compressed = compress.zstd_stream(
+                    bundle_file + '.zst', None, digest_names, threads
+                )
+            else:
+                compressed = compress.xz_stream(
+                    bundle_file + '.xz', self.runtime_config.get_xz_options(),
+                    digest_names, threads
+                )
+            bundle_file = compress.compressed_filename
+            sha256_checksum = compressed.hexdigests.get('sha256')
+            messages.append(
+                (
+                    'debug', (
+                        '--> %s compressed %d to %d bytes, throughput: '
+                        'compress %s, write %s, checksum %s',
+                        compression_name, compressed.input_bytes, compressed.output_bytes,
+                        self._get_throughput(
+                            compressed.input_bytes,
+                            compressed.stage_seconds['compress']
+                        ),
+                        self._get_throughput(
+                            compressed.output_bytes,
+                            compressed.stage_seconds['write']
+                        ),
+                        self._get_throughput(
+                            compressed.output_bytes,
+                            compressed.stage_seconds['checksum']
+                        )
+                    )
+                )
+            )
+        else:
+            # files which are not compressed are never modified in
+            # the bundle and can therefore be hardlinked
+            staged = FileCopy.stage(
+                result_file.filename, bundle_file, allow_hardlink=True
+            )
+            if staged.method == 'copy':
+                messages.append(
+                    (
+                        'info', (
+                            '--> Plain copy of %d bytes took %.2fs',
+                            staged.size, staged.seconds
+                        )
                     )
-                ])
-                log.info('Creating %s', bundle_file_basename)
-                bundle_file = ''.join(
-                    [bundle_directory, '/', bundle_file_basename]
                 )
+            else:
+                messages.append(
+                    ('debug', ('--> Staged via %s', staged.method))
+                )
+
+        if self.command_args['--zsync-source'] and result_file.shasum:
+            # Files with a checksum are considered to be image files
+            # and are therefore eligible to be provided via the
+            # requested Partial/differential file download based on
+            # zsync
+            zsync_url = os.sep.join(
+                [
+                    self.command_args['--zsync-source'],
+                    os.path.basename(bundle_file)
+                ]
+            )
+            zsyncmake = Path.which('zsyncmake', access_mode=os.X_OK)
+            if cached and cached['zsync_file']:
+                zsync_file = bundle_file + '.zsync'
+                self._relocate_zsync_file(
+                    os.sep.join([bundle_directory, cached['zsync_file']]),
+                    zsync_file, os.path.basename(bundle_file), zsync_url
+                )
+            elif zsyncmake:
+                messages.append(
+                    ('info', ('--> Creating zsync control file',))
+                )
+                zsync_file = bundle_file + '.zsync'
                 Command.run(
                     [
-                        'cp', result_file.filename, bundle_file
+                        zsyncmake, '-e', '-u', zsync_url,
+                        '-o', zsync_file, bundle_file
                     ]
                 )
-                if result_file.compress:
-                    log.info('--> XZ compressing')
-                    compress = Compress(bundle_file)
-                    compress.xz(self.runtime_config.get_xz_options())
-                    bundle_file = compress.compressed_filename
-
-                if self.command_args['--zsync-source'] and result_file.shasum:
-                    # Files with a checksum are considered to be image files
-                    # and are therefore eligible to be provided via the
-                    # requested Partial/differential file download based on
-                    # zsync
-                    zsyncmake = Path.which('zsyncmake', access_mode=os.X_OK)
-                    if zsyncmake:
-                        log.info('--> Creating zsync control file')
-                        Command.run(
-                            [
-                                zsyncmake, '-e', '-u', os.sep.join(
-                                    [
-                                        self.command_args['--zsync-source'],
-                                        os.path.basename(bundle_file)
-                                    ]
-                                ), '-o', bundle_file + '.zsync', bundle_file
-                            ]
-                        )
-                    else:
-                        log.warning(
-                            '--> zsyncmake missing, zsync setup skipped'
-                        )
+            else:
+                messages.append(
+                    (
+                        'warning',
+                        ('--> zsyncmake missing, zsync setup skipped',)
+                    )
+                )
 
-                if result_file.shasum:
-                    log.info('--> Creating SHA 256 sum')
-                    checksum = Checksum(bundle_file)
-                    with open(bundle_file + '.sha256', 'w') as shasum:
-                        shasum.write(
-                            '{0}  {1}'.format(
-                                checksum.sha256(), bundle_file_basename
-                            )
-                        )
+        if result_file.shasum:
+            messages.append(('info', ('--> Creating SHA 256 sum',)))
+            if not sha256_checksum:
+                sha256_checksum = Checksum(bundle_file).sha256()
+            with open(bundle_file + '.sha256', 'w') as shasum:
+                shasum.write(
+                    '{0}  {1}'.format(
+                        sha256_checksum, bundle_file_basename
+                    )
+                )
+
+        bundle_cache.update(
+            result_file.filename, bundle_settings, bundle_file,
+            sha256_checksum, zsync_file
+        )
+
+    def _relocate_zsync_file(self, source, target, filename, url):
+        """
+        Write a copy of a zsync control file for a renamed bundle
+        file. Only the Filename and URL header lines depend on the
+        bundle file name, the block checksums following the header
+        are kept as they are
+
+        :param str source: zsync control file path
+        :param str target: new zsync control file path
+        :param str filename: new bundle file name
+        :param str url: new bundle file download URL
+        """
+        with open(source, 'rb') as zsync:
+            header, separator, checksums = zsync.read().partition(b'\n\n')
+        header_lines = []
+        for line in header.split(b'\n'):
+            if line.startswith(b'Filename: '):
+                line = b'Filename: ' + filename.encode()
+            elif line.startswith(b'URL: '):
+                line = b'URL: ' + url.encode()
+            header_lines.append(line)
+        AtomicFile.write(
+            target, b'\n'.join(header_lines) + separator + checksums
+        )
+
+    def _get_throughput(self, size, seconds):
+        return '{0:.1f} MB/s'.format(
+            size / 1048576 / seconds
+        ) if seconds else 'n/a'
 
     def _help(self):
         if self.command_args['help']:
@@ -101,6 +101,7 @@ from kiwi.privileges import Privileges
 from kiwi.path import Path
 from kiwi.logger import log
 from kiwi.utils.rpm import Rpm
+from kiwi.utils.command_profiler import CommandProfiler
 
 
 class SystemBuildTask(CliTask):
@@ -115,7 +116,10 @@ class SystemBuildTask(CliTask):
     def process(self):                                      # noqa: C901
         """
         Build a system image from the specified description. The
-        build command combines the prepare and create commands
+        build command combines the prepare and create commands.
+        At the end of the build the commands which took the most
+        time are logged and a timeline of all commands is written
+        to kiwi.command_trace.json in the target directory
         """
         self.manual = Help()
         if self._help():
@@ -188,94 +192,102 @@ class SystemBuildTask(CliTask):
         self.run_checks(self.checks_after_command_args)
 
         log.info('Preparing new root system')
-        system = SystemPrepare(
-            self.xml_state,
-            image_root,
-            self.command_args['--allow-existing-root']
-        )
-        manager = system.setup_repositories(
-            self.command_args['--clear-cache'],
-            self.command_args['--signing-key']
-        )
-        system.install_bootstrap(
-            manager, self.command_args['--add-bootstrap-package']
-        )
-        system.install_system(
-            manager
-        )
-        if self.command_args['--add-package']:
-            system.install_packages(
-                manager, self.command_args['--add-package']
+        with CommandProfiler() as profiler:
+            profiler.set_phase('prepare')
+            system = SystemPrepare(
+                self.xml_state,
+                image_root,
+                self.command_args['--allow-existing-root']
             )
-        if self.command_args['--delete-package']:
-            system.delete_packages(
-                manager, self.command_args['--delete-package']
+            manager = system.setup_repositories(
+                self.command_args['--clear-cache'],
+                self.command_args['--signing-key']
             )
+            system.install_bootstrap(
+                manager, self.command_args['--add-bootstrap-package']
+            )
+            system.install_system(
+                manager
+            )
+            if self.command_args['--add-package']:
+                system.install_packages(
+                    manager, self.command_args['--add-package']
+                )
+            if self.command_args['--delete-package']:
+                system.delete_packages(
+                    manager, self.command_args['--delete-package']
+                )
 
-        profile = Profile(self.xml_state)
+            profiler.set_phase('setup')
+            profile = Profile(self.xml_state)
 
-        defaults = Defaults()
-        defaults.to_profile(profile)
+            defaults = Defaults()
+            defaults.to_profile(profile)
 
-        setup = SystemSetup(
-            self.xml_state, image_root
-        )
-        setup.import_shell_environment(profile)
-
-        setup.import_description()
-        setup.import_overlay_files()
-        setup.import_image_identifier()
-        setup.setup_groups()
-        setup.setup_users()
-        setup.setup_keyboard_map()
-        setup.setup_locale()
-        setup.setup_plymouth_splash()
-        setup.setup_timezone()
-        setup.setup_permissions()
-
-        # make sure manager instance is cleaned up now
-        del manager
-
-        # setup permanent image repositories after cleanup
-        setup.import_repositories_marked_as_imageinclude()
-        setup.call_config_script()
-
-        # handle uninstall package requests, gracefully uninstall
-        # with dependency cleanup
-        system.pinch_system(force=False)
-
-        # handle delete package requests, forced uninstall without
-        # any dependency resolution
-        system.pinch_system(force=True)
-
-        # delete any custom rpm macros created
-        Rpm(
-            image_root, Defaults.get_custom_rpm_image_macro_name()
-        ).wipe_config()
-
-        # make sure system instance is cleaned up now
-        del system
-
-        setup.call_image_script()
-
-        # make sure setup instance is cleaned up now
-        del setup
-
-        log.info('Creating system image')
-        image_builder = ImageBuilder(
-            self.xml_state,
-            abs_target_dir_path,
-            image_root,
-            custom_args={
-                'signing_keys': self.command_args['--signing-key'],
-                'xz_options': self.runtime_config.get_xz_options()
-            }
-        )
-        result = image_builder.create()
-        result.print_results()
-        result.dump(
-            os.sep.join([abs_target_dir_path, 'kiwi.result'])
-        )
+            setup = SystemSetup(
+                self.xml_state, image_root
+            )
+            setup.import_shell_environment(profile)
+
+            setup.import_description()
+            setup.import_overlay_files()
+            setup.import_image_identifier()
+            setup.setup_groups()
+            setup.setup_users()
+            setup.setup_keyboard_map()
+            setup.setup_locale()
+            setup.setup_plymouth_splash()
+            setup.setup_timezone()
+            setup.setup_permissions()
+
+            # make sure manager instance is cleaned up now
+            del manager
+
+            # setup permanent image repositories after cleanup
+            setup.import_repositories_marked_as_imageinclude()
+            setup.call_config_script()
+
+            # handle uninstall package requests, gracefully uninstall
+            # with dependency cleanup
+            system.pinch_system(force=False)
+
+            # handle delete package requests, forced uninstall without
+            # any dependency resolution
+            system.pinch_system(force=True)
+
+            # delete any custom rpm macros created
+            Rpm(
+                image_root, Defaults.get_custom_rpm_image_macro_name()
+            ).wipe_config()
+
+            # make sure system instance is cleaned up now
+            del system
+
+            setup.call_image_script()
+
+            # make sure setup instance is cleaned up now
+            del setup
+
+            log.info('Creating system image')
+            profiler.set_phase('create')
+            image_builder = ImageBuilder(
+                self.xml_state,
+                abs_target_dir_path,
+                image_root,
+                custom_args={
+                    'signing_keys': self.command_args['--signing-key'],
+                    'xz_options': self.runtime_config.get_xz_options()
+                }
+            )
+            result = image_builder.create()
+            result.print_results()
+            result.dump(
+                os.sep.join([abs_target_dir_path, 'kiwi.result'])
+            )
+            profiler.log_summary()
+            profiler.write_trace(
+                os.sep.join([abs_target_dir_path, 'kiwi.command_trace.json'])
+            )
 
     def _help(self):
         if self.command_args['help']:
@@ -0,0 +1,89 @@
+# Copyright (c) 2019 SUSE Linux GmbH.  All rights reserved.
+#
+# This file is part of kiwi.
+#
+# kiwi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# kiwi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with kiwi.  If not, see <http://www.gnu.org/licenses/>
+#
+import os
+import tempfile
+
+
+def _get_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+class AtomicFile:
+    """
+    **Replace files atomically**
+
+    The new content is written to a uniquely named temporary file
+    in the directory of the target, which is moved into place once
+    it is complete. Readers see either the old or the new file,
+    concurrent writers of the same file don't interfere with each
+    other and the last one wins. The temporary file names carry
+    the .tmp suffix, which allows to identify files left behind
+    by a crashed writer
+    """
+    # permissions of newly written files, reduced by the umask of
+    # the process like for a file created with open()
+    file_mode = 0o666 & ~_get_umask()
+
+    @staticmethod
+    def replace(filename, write):
+        """
+        Replace filename with the file written by the given callable
+
+        Example:
+
+        .. code:: python
+
+            AtomicFile.replace(
+                'manifest.json', lambda target: shutil.copy(source, target)
+            )
+
+        If write raises, the temporary file is deleted and the
+        target file is left untouched
+
+        :param str filename: target file path
+        :param callable write:
+            called with the path of the temporary file to write
+        """
+        directory, name = os.path.split(os.path.abspath(filename))
+        temporary_fd, temporary = tempfile.mkstemp(
+            prefix=name + '.', suffix='.tmp', dir=directory
+        )
+        os.close(temporary_fd)
+        try:
+            os.chmod(temporary, AtomicFile.file_mode)
+            write(temporary)
+            os.replace(temporary, filename)
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+
+    @staticmethod
+    def write(filename, data):
+        """
+        Replace filename with a file containing the given data
+
+        :param str filename: target file path
+        :param data: str or bytes to write
+        """
+        def _write(temporary):
+            mode = 'wb' if isinstance(data, bytes) else 'w'
+            with open(temporary, mode) as target:
+                target.write(data)
+        AtomicFile.replace(filename, _write)
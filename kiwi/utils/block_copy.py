@@ -0,0 +1,253 @@
+# Copyright (c) 2019 SUSE Linux GmbH.  All rights reserved.
+#
+# This file is part of kiwi.
+#
+# kiwi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# kiwi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with kiwi.  If not, see <http://www.gnu.org/licenses/>
+#
+import os
+import mmap
+import errno
+import stat
+import time
+import fcntl
+from collections import namedtuple
+
+# project
+from kiwi.logger import log
+
+from kiwi.exceptions import KiwiFileCopyError
+
+block_copy_result_type = namedtuple(
+    'block_copy_result', ['method', 'size', 'written', 'seconds']
+)
+
+
+class BlockCopy:
+    """
+    **Write an image file onto a block device or into a file**
+
+    A replacement for dd with large page aligned buffers. Data
+    is written with copy_file_range if source and target allow
+    it and with buffered or O_DIRECT writes otherwise. With
+    sparse copies only the data regions of the source, as
+    reported by SEEK_DATA/SEEK_HOLE, are written
+    """
+    # size of the write buffer and the copy_file_range chunks
+    buffer_size = 8 << 20
+
+    # data regions are aligned to this size, O_DIRECT requires
+    # offsets and sizes aligned to the logical block size
+    alignment = 4096
+
+    @staticmethod
+    def copy(source, target, sparse=False, direct=False):
+        """
+        Write the source file to the start of the target
+
+        The target is not truncated. For sparse copies the holes
+        of the source are skipped and the target is expected to
+        read as zero at those places, which is the case for new
+        files and for partitions of a newly created disk image
+
+        Example:
+
+        .. code:: python
+
+            BlockCopy.copy(
+                'root.squashfs', '/dev/mapper/loop0p3', sparse=True
+            )
+
+        :param str source: source file path
+        :param str target: target file or block device path
+        :param bool sparse: skip the holes of the source
+        :param bool direct: bypass the page cache with O_DIRECT
+
+        :return:
+            Contains the used method, the source size, the number
+            of written bytes and the time spent in seconds
+
+            .. code:: python
+
+                block_copy_result(
+                    method='copy_file_range', size=int, written=int,
+                    seconds=float
+                )
+
+        :rtype: namedtuple
+        """
+        start = time.monotonic()
+        target_flags = os.O_WRONLY | os.O_CREAT
+        if direct:
+            target_flags |= os.O_DIRECT
+        try:
+            source_fd = os.open(source, os.O_RDONLY)
+            try:
+                target_fd = os.open(target, target_flags, 0o644)
+                try:
+                    size, method, written = BlockCopy._copy_data(
+                        source_fd, target_fd, sparse, direct
+                    )
+                    os.fsync(target_fd)
+                finally:
+                    os.close(target_fd)
+            finally:
+                os.close(source_fd)
+        except OSError as issue:
+            raise KiwiFileCopyError(
+                'Write of {0} to {1} failed: {2}'.format(source, target, issue)
+            )
+        return block_copy_result_type(
+            method=method, size=size, written=written,
+            seconds=time.monotonic() - start
+        )
+
+    @staticmethod
+    def _copy_data(source_fd, target_fd, sparse, direct):
+        size = os.fstat(source_fd).st_size
+        target_stat = os.fstat(target_fd)
+        if stat.S_ISBLK(target_stat.st_mode):
+            target_size = os.lseek(target_fd, 0, os.SEEK_END)
+            if target_size < size:
+                raise OSError(
+                    'target device too small, {0} bytes required, {1} '
+                    'bytes available'.format(size, target_size)
+                )
+        regions = BlockCopy._get_data_regions(source_fd, size) \
+            if sparse else [(0, size)]
+        total = sum(length for offset, length in regions)
+        progress = _WriteProgress(total)
+        method = None
+        if not direct and hasattr(os, 'copy_file_range'):
+            method = 'copy_file_range'
+            try:
+                for offset, length in regions:
+                    BlockCopy._copy_region_in_kernel(
+                        source_fd, target_fd, offset, length, progress
+                    )
+            except OSError as issue:
+                # no data is lost, the plain copy starts over at
+                # the first region
+                log.debug('copy_file_range not possible: {0}'.format(issue))
+                method = None
+        if not method:
+            method = 'direct' if direct else 'copy'
+            progress = _WriteProgress(total)
+            # anonymous mappings are page aligned as required
+            # for O_DIRECT
+            buffer = memoryview(mmap.mmap(-1, BlockCopy.buffer_size))
+            for offset, length in regions:
+                BlockCopy._copy_region(
+                    source_fd, target_fd, offset, length, buffer, progress
+                )
+        if stat.S_ISREG(target_stat.st_mode) and target_stat.st_size < size:
+            # trailing holes are not written
+            os.ftruncate(target_fd, size)
+        progress.finish()
+        return (size, method, total)
+
+    @staticmethod
+    def _get_data_regions(source_fd, size):
+        """
+        Provides the data regions of the source as list of
+        (offset, length) tuples aligned to BlockCopy.alignment.
+        If the filesystem does not report holes the complete
+        file is one data region
+        """
+        regions = []
+        offset = 0
+        try:
+            while offset < size:
+                try:
+                    data = os.lseek(source_fd, offset, os.SEEK_DATA)
+                except OSError as issue:
+                    if issue.errno == errno.ENXIO:
+                        # no data after offset
+                        break
+                    raise
+                hole = os.lseek(source_fd, data, os.SEEK_HOLE)
+                data -= data % BlockCopy.alignment
+                hole = min(
+                    size, -(-hole // BlockCopy.alignment) * BlockCopy.alignment
+                )
+                if regions and regions[-1][0] + regions[-1][1] >= data:
+                    regions[-1] = (regions[-1][0], hole - regions[-1][0])
+                else:
+                    regions.append((data, hole - data))
+                offset = hole
+        except (OSError, AttributeError) as issue:
+            log.debug('Hole detection not possible: {0}'.format(issue))
+            return [(0, size)]
+        return regions
+
+    @staticmethod
+    def _copy_region_in_kernel(source_fd, target_fd, offset, length, progress):
+        end = offset + length
+        while offset < end:
+            copied = os.copy_file_range(
+                source_fd, target_fd,
+                min(BlockCopy.buffer_size, end - offset), offset, offset
+            )
+            if not copied:
+                raise OSError('unexpected end of file at {0}'.format(offset))
+            offset += copied
+            progress.update(copied)
+
+    @staticmethod
+    def _copy_region(source_fd, target_fd, offset, length, buffer, progress):
+        end = offset + length
+        os.lseek(source_fd, offset, os.SEEK_SET)
+        os.lseek(target_fd, offset, os.SEEK_SET)
+        while offset < end:
+            count = os.readv(
+                source_fd, [buffer[:min(BlockCopy.buffer_size, end - offset)]]
+            )
+            if not count:
+                raise OSError('unexpected end of file at {0}'.format(offset))
+            if count % BlockCopy.alignment:
+                # O_DIRECT can't write the unaligned end of file
+                BlockCopy._disable_direct(target_fd)
+            written = 0
+            while written < count:
+                written += os.write(target_fd, buffer[written:count])
+            offset += count
+            progress.update(count)
+
+    @staticmethod
+    def _disable_direct(target_fd):
+        flags = fcntl.fcntl(target_fd, fcntl.F_GETFL)
+        fcntl.fcntl(target_fd, fcntl.F_SETFL, flags & ~os.O_DIRECT)
+
+
+class _WriteProgress:
+    """
+    Log the write progress in percent, the progress line is only
+    updated if the percentage changed
+    """
+    prefix = '[ INFO    ]: Writing'
+
+    def __init__(self, total):
+        self.total = total
+        self.written = 0
+        self.percent = 0
+        log.progress(0, 100, self.prefix)
+
+    def update(self, count):
+        self.written += count
+        percent = int(self.written * 100 / self.total)
+        if percent != self.percent and percent < 100:
+            self.percent = percent
+            log.progress(percent, 100, self.prefix)
+
+    def finish(self):
+        log.progress(100, 100, self.prefix)
@@ -0,0 +1,89 @@
+# Copyright (c) 2019 SUSE Linux GmbH.  All rights reserved.
+#
+# This file is part of kiwi.
+#
+# kiwi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# kiwi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with kiwi.  If not, see <http://www.gnu.org/licenses/>
+#
+from collections import namedtuple
+from functools import lru_cache
+
+block_list_type = namedtuple(
+    'block_list', ['blocksize', 'blocks']
+)
+
+
+class BlockGeometry:
+    """
+    **Block geometry calculation for checksum metadata**
+
+    The checksum files written by kiwi contain the number of blocks
+    and the block size of the image. The block size is the product
+    of the smallest prime factors of the file size which does not
+    exceed the maximum block size. Thus the file size is always an
+    exact multiple of the block size.
+    """
+    max_blocksize = 8192
+
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def get_block_list(file_size):
+        """
+        Calculates the number of blocks and the block size for a given
+        file size in bytes
+
+        Only prime factors up to max_blocksize can contribute to the
+        block size, therefore a trial division by the primes in that
+        range is sufficient and no full factorization of the file size
+        is needed. Results are cached per file size
+
+        :param int file_size: file size in bytes
+
+        :return: blocksize, blocks
+
+        :rtype: namedtuple
+        """
+        max_blocksize = BlockGeometry.max_blocksize
+        blocksize = 1
+        remainder = file_size
+        for prime in BlockGeometry._get_primes():
+            if remainder < 2 or blocksize * prime > max_blocksize:
+                break
+            while remainder % prime == 0 and \
+                    blocksize * prime <= max_blocksize:
+                blocksize *= prime
+                remainder //= prime
+        return block_list_type(
+            blocksize=blocksize,
+            blocks=file_size // blocksize
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _get_primes():
+        """
+        Sieve of Eratosthenes for all primes up to max_blocksize
+
+        :return: ascending list of primes
+
+        :rtype: list
+        """
+        limit = BlockGeometry.max_blocksize
+        sieve = bytearray([1]) * (limit + 1)
+        sieve[0:2] = b'\x00\x00'
+        for number in range(2, int(limit ** 0.5) + 1):
+            if sieve[number]:
+                sieve[number * number::number] = bytes(
+                    len(range(number * number, limit + 1, number))
+                )
+        return [number for number in range(limit + 1) if sieve[number]]
@@ -0,0 +1,172 @@
+# Copyright (c) 2019 SUSE Linux GmbH.  All rights reserved.
+#
+# This file is part of kiwi.
+#
+# kiwi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# kiwi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with kiwi.  If not, see <http://www.gnu.org/licenses/>
+#
+import os
+import copy
+import json
+import hashlib
+import threading
+
+# project
+from kiwi.logger import log
+from kiwi.utils.atomic_file import AtomicFile
+
+
+class BundleCache:
+    """
+    **Manifest of bundled result files for incremental bundling**
+
+    The manifest is stored in the bundle directory and records for
+    each bundled source file its stat information, a fast content
+    hash sampled from the file, the settings used to bundle it and
+    the names and checksum of the created bundle files. A result
+    file which did not change since the last bundle run can reuse
+    those files instead of compressing and checksumming it again.
+
+    Lookups and updates are thread safe
+
+    :param str bundle_directory: bundle directory path
+    """
+    manifest_name = '.kiwi_bundle_cache.json'
+
+    # size and number of samples used for the fast content hash
+    sample_size = 1 << 20
+    sample_count = 3
+
+    def __init__(self, bundle_directory):
+        self.bundle_directory = bundle_directory
+        self.manifest_file = os.sep.join(
+            [bundle_directory, self.manifest_name]
+        )
+        self.lock = threading.Lock()
+        self.results = {}
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file) as manifest:
+                    self.results = json.load(manifest)['results']
+            except Exception as issue:
+                log.warning(
+                    'Ignoring invalid bundle cache {0}: {1}: {2}'.format(
+                        self.manifest_file, type(issue).__name__, issue
+                    )
+                )
+
+    def lookup(self, source_filename, settings):
+        """
+        Lookup bundle information for an unchanged source file
+
+        The source is considered unchanged if its size, mtime, inode
+        and fast content hash match the cached entry, the settings
+        are the same and the cached bundle files still exist
+
+        :param str source_filename: result file path
+        :param dict settings: bundle settings affecting the bundle files
+
+        :return:
+            Contains the cached bundle information or None
+
+            .. code:: python
+
+                {
+                    'bundle_file': 'basename',
+                    'sha256': 'hexdigest or None',
+                    'zsync_file': 'basename or None'
+                }
+
+        :rtype: dict
+        """
+        with self.lock:
+            cached = self.results.get(os.path.abspath(source_filename))
+        if not cached or cached['settings'] != settings:
+            return None
+        if cached['source'] != self._get_source_key(source_filename):
+            return None
+        for bundle_file in (cached['bundle_file'], cached['zsync_file']):
+            if bundle_file and not os.path.exists(
+                os.sep.join([self.bundle_directory, bundle_file])
+            ):
+                return None
+        return cached
+
+    def update(
+        self, source_filename, settings, bundle_file,
+        sha256=None, zsync_file=None
+    ):
+        """
+        Store bundle information for a source file
+
+        :param str source_filename: result file path
+        :param dict settings: bundle settings affecting the bundle files
+        :param str bundle_file: bundle file path
+        :param str sha256: sha256 hexdigest of the bundle file
+        :param str zsync_file: zsync control file path
+        """
+        entry = {
+            'source': self._get_source_key(source_filename),
+            'settings': copy.deepcopy(settings),
+            'bundle_file': os.path.basename(bundle_file),
+            'sha256': sha256,
+            'zsync_file': os.path.basename(zsync_file) if zsync_file else None
+        }
+        with self.lock:
+            self.results[os.path.abspath(source_filename)] = entry
+
+    def write(self):
+        """
+        Atomically write the manifest to the bundle directory
+        """
+        with self.lock:
+            manifest = json.dumps(
+                {'results': self.results}, indent=2, sort_keys=True
+            )
+        AtomicFile.write(self.manifest_file, manifest)
+
+    def _get_source_key(self, source_filename):
+        source_stat = os.stat(source_filename)
+        return {
+            'size': source_stat.st_size,
+            'mtime_ns': source_stat.st_mtime_ns,
+            'inode': source_stat.st_ino,
+            'fast_hash': self._get_fast_hash(
+                source_filename, source_stat.st_size
+            )
+        }
+
+    def _get_fast_hash(self, source_filename, size):
+        """
+        Hash of the file size and samples from the start, the
+        middle and the end of the file. Cheap to calculate also
+        for large image files
+
+        :param str source_filename: file path
+        :param int size: file size
+
+        :return: hexdigest
+
+        :rtype: str
+        """
+        digest = hashlib.blake2b(format(size).encode())
+        max_offset = max(size - self.sample_size, 0)
+        offsets = sorted(set(
+            max_offset * sample // (self.sample_count - 1)
+            for sample in range(self.sample_count)
+        ))
+        with open(source_filename, 'rb') as source:
+            for offset in offsets:
+                source.seek(offset)
+                digest.update(source.read(self.sample_size))
+        return digest.hexdigest()
@@ -16,15 +16,16 @@
 # along with kiwi.  If not, see <http://www.gnu.org/licenses/>
 #
 import os
-from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
 
 # project
-from kiwi.command import Command
+from kiwi.utils.block_geometry import BlockGeometry
 from kiwi.utils.compress import Compress
 
 from kiwi.exceptions import (
-    KiwiFileNotFound
+    KiwiFileNotFound,
+    KiwiChecksumError
 )
 
 
@@ -32,9 +33,23 @@ class Checksum:
     """
     **Manage checksum creation for files**
 
+    All digests requested for the same source file are calculated
+    in one streaming pass over the data. Reading the next chunk of
+    the file overlaps with hashing the current one, and each digest
+    is updated in its own worker thread. Results are cached per
+    instance such that e.g a call of md5() followed by sha256()
+    does not read the file again if both were requested upfront
+    via digests()
+
     :param str source_filename: source file name to build checksum for
     :param str checksum_filename: target file with checksum information
     """
+    supported_digests = ('md5', 'sha1', 'sha256', 'sha512', 'blake2b')
+
+    # read size used for streaming the source data, a multiple
+    # of the page size to allow aligned reads from the page cache
+    read_size = 4 * 1024 * 1024
+
     def __init__(self, source_filename):
         if not os.path.exists(source_filename):
             raise KiwiFileNotFound(
@@ -42,6 +57,7 @@ class Checksum:
             )
         self.source_filename = source_filename
         self.checksum_filename = None
+        self.hexdigests = {}
 
     def matches(self, checksum, filename):
         """
@@ -78,9 +94,7 @@ class Checksum:
 
         :rtype: str
         """
-        md5_checksum = self._calculate_hash_hexdigest(
-            hashlib.md5(), self.source_filename
-        )
+        md5_checksum = self.digests(['md5'])['md5']
         if filename:
             self._create_checksum_file(
                 md5_checksum, filename
@@ -93,15 +107,57 @@ class Checksum:
 
         :param str filename: filename for checksum
         """
-        sha256_checksum = self._calculate_hash_hexdigest(
-            hashlib.sha256(), self.source_filename
-        )
+        sha256_checksum = self.digests(['sha256'])['sha256']
         if filename:
             self._create_checksum_file(
                 sha256_checksum, filename
             )
         return sha256_checksum
 
+    def digests(self, digest_names):
+        """
+        Create checksums for all given digest names in one pass
+
+        Example:
+
+        .. code:: python
+
+            checksum = Checksum('image.raw')
+            result = checksum.digests(['md5', 'sha256'])
+
+        :param list digest_names: list of digest names, see supported_digests
+
+        :return:
+            Contains the hexdigest per digest name
+
+            .. code:: python
+
+                {'md5': 'hexdigest', 'sha256': 'hexdigest'}
+
+        :rtype: dict
+        """
+        for digest_name in digest_names:
+            if digest_name not in self.supported_digests:
+                raise KiwiChecksumError(
+                    'Unsupported digest: {0}, use one of {1}'.format(
+                        digest_name, ', '.join(self.supported_digests)
+                    )
+                )
+        missing_digest_names = [
+            digest_name for digest_name in digest_names
+            if digest_name not in self.hexdigests
+        ]
+        if missing_digest_names:
+            self.hexdigests.update(
+                self._calculate_hash_hexdigests(
+                    missing_digest_names, self.source_filename
+                )
+            )
+        return dict(
+            (digest_name, self.hexdigests[digest_name])
+            for digest_name in digest_names
+        )
+
     def _create_checksum_file(self, checksum, filename):
         """
         Creates the text file that contains the checksum
@@ -115,13 +171,15 @@ class Checksum:
             compressed_blocks = self._block_list(
                 os.path.getsize(self.source_filename)
             )
-            compress.uncompress(temporary=True)
-            blocks = self._block_list(
-                os.path.getsize(compress.uncompressed_filename)
-            )
-            checksum = self._calculate_hash_hexdigest(
-                hashlib.md5(), compress.uncompressed_filename
-            )
+            # the uncompressed data is streamed from the decoder into
+            # the digest, no uncompressed copy is written to disk
+            with compress.open_uncompressed() as uncompressed:
+                hexdigests, uncompressed_size = \
+                    self._calculate_stream_hash_hexdigests(
+                        ['md5'], uncompressed
+                    )
+            blocks = self._block_list(uncompressed_size)
+            checksum = hexdigests['md5']
         else:
             blocks = self._block_list(
                 os.path.getsize(self.source_filename)
@@ -141,55 +199,73 @@ class Checksum:
                     )
                 )
 
-    def _calculate_hash_hexdigest(self, digest, filename, digest_blocks=128):
+    def _calculate_hash_hexdigests(self, digest_names, filename):
         """
-        Calculates the hash hexadecimal digest for a given file.
+        Calculates the hash hexadecimal digests for a given file
+        in a single pass
 
-        :param func digest: Digest function for hash calculation
+        :param list digest_names: Names of the digests to calculate
         :param str filename: File to compute
-        :param int digest_blocks: Number of blocks processed at a time
+
+        :return: hexdigest per digest name
+
+        :rtype: dict
         """
-        chunk_size = digest_blocks * digest.block_size
         with open(filename, 'rb') as source:
-            for chunk in iter(lambda: source.read(chunk_size), b''):
-                digest.update(chunk)
-        return digest.hexdigest()
+            hexdigests, size = self._calculate_stream_hash_hexdigests(
+                digest_names, source
+            )
+        return hexdigests
 
-    def _block_list(self, file_size):
+    def _calculate_stream_hash_hexdigests(self, digest_names, source):
         """
-        Calculates the number of blocks and the block size for a given file
-        size in bytes.
+        Calculates the hash hexadecimal digests and the number of bytes
+        for the data read from the given file object in a single pass
 
-        :param int file_size: files size in bytes.
+        While the worker threads update the digests with the current
+        chunk, the next chunk is read from the source. hashlib releases
+        the GIL on large updates such that I/O, decompression of the
+        source if any and the calculation of the individual digests
+        effectively run in parallel
 
-        :return: int:blocksize, int:blocks
+        :param list digest_names: Names of the digests to calculate
+        :param object source: binary file object to read from
+
+        :return: hexdigest per digest name, number of bytes read
 
         :rtype: tuple
         """
-        blocksize = 1
-        for factor in self._prime_factors(file_size):
-            if blocksize * factor > 8192:
-                break
-            blocksize *= factor
-        blocks = int(file_size / blocksize)
-        block_list = namedtuple(
-            'block_list', ['blocksize', 'blocks']
-        )
-        return block_list(
-            blocksize=blocksize,
-            blocks=blocks
+        digests = [
+            getattr(hashlib, digest_name)() for digest_name in digest_names
+        ]
+        size = 0
+        with ThreadPoolExecutor(max_workers=len(digests)) as workers:
+            pending = []
+            for chunk in iter(lambda: source.read(self.read_size), b''):
+                size += len(chunk)
+                for job in pending:
+                    job.result()
+                pending = [
+                    workers.submit(digest.update, chunk)
+                    for digest in digests
+                ]
+            for job in pending:
+                job.result()
+        hexdigests = dict(
+            (digest_name, digest.hexdigest())
+            for digest_name, digest in zip(digest_names, digests)
         )
+        return hexdigests, size
 
-    def _prime_factors(self, number):
+    def _block_list(self, file_size):
         """
-        Get prime factors for the given number
+        Calculates the number of blocks and the block size for a given file
+        size in bytes.
 
-        :param int number: number to factorize
+        :param int file_size: files size in bytes.
 
-        :return: prime factors
+        :return: int:blocksize, int:blocks
 
-        :rtype: int generator
+        :rtype: tuple
         """
-        factor_call = Command.run(['factor', format(number)])
-        for factor in factor_call.output.split(':')[1].lstrip().split(' '):
-            yield int(factor)
+        return BlockGeometry.get_block_list(file_size)
@@ -15,13 +15,24 @@
 # You should have received a copy of the GNU General Public License
 # along with kiwi.  If not, see <http://www.gnu.org/licenses/>
 #
+import os
 import re
+import json
+import threading
+from collections import namedtuple
 
 # project
 from kiwi.command import Command
+from kiwi.defaults import Defaults
 from kiwi.logger import log
+from kiwi.path import Path
+from kiwi.utils.atomic_file import AtomicFile
 from kiwi.exceptions import KiwiCommandCapabilitiesError
 
+probe_type = namedtuple(
+    'probe_type', ['output', 'error']
+)
+
 
 class CommandCapabilities:
     """
@@ -30,7 +41,16 @@ class CommandCapabilities:
     Performs commands calls and parses the output
     so it can look specific flags on help message, check
     command version, etc.
+
+    The output of probes of host commands is cached in a file
+    shared between kiwi processes. The cache key consists of
+    the real path, size and modification time of the command
+    binary and the probe arguments, such that an updated tool
+    is probed again
     """
+    probe_cache = None
+    probe_cache_lock = threading.Lock()
+
     @staticmethod
     def has_option_in_help(
         call, flag, help_flags=None,
@@ -56,7 +76,7 @@ class CommandCapabilities:
         else:
             arguments = [call] + help_args
         try:
-            command = Command.run(arguments)
+            command = CommandCapabilities._run_probe(arguments, root)
             for line in command.output.splitlines():
                 if flag in line:
                     return True
@@ -99,7 +119,7 @@ class CommandCapabilities:
             arguments = [call] + version_args
         version_info = None
         try:
-            command = Command.run(arguments)
+            command = CommandCapabilities._run_probe(arguments, root)
             for line in command.output.splitlines():
                 match = re.search('[0-9]+(\.[0-9]+)*', line)
                 if match:
@@ -116,3 +136,63 @@ class CommandCapabilities:
             log.warning(message)
             return False
         return version_info >= version_waterline
+
+    @staticmethod
+    def _run_probe(arguments, root):
+        probe_key = None if root else \
+            CommandCapabilities._get_probe_key(arguments)
+        if not probe_key:
+            return Command.run(arguments)
+        with CommandCapabilities.probe_cache_lock:
+            probe_cache = CommandCapabilities._load_probe_cache()
+            if probe_key in probe_cache:
+                output, error = probe_cache[probe_key]
+                return probe_type(output=output, error=error)
+        command = Command.run(arguments)
+        with CommandCapabilities.probe_cache_lock:
+            probe_cache[probe_key] = [command.output, command.error]
+            CommandCapabilities._write_probe_cache(probe_cache)
+        return command
+
+    @staticmethod
+    def _get_probe_key(arguments):
+        binary = Path.which(arguments[0], access_mode=os.X_OK)
+        if not binary:
+            return None
+        binary = os.path.realpath(binary)
+        binary_stat = os.stat(binary)
+        return json.dumps(
+            [binary, binary_stat.st_size, binary_stat.st_mtime_ns] + list(
+                arguments[1:]
+            )
+        )
+
+    @staticmethod
+    def _load_probe_cache():
+        if CommandCapabilities.probe_cache is None:
+            CommandCapabilities.probe_cache = {}
+            cache_file = Defaults.get_command_capabilities_cache_file()
+            if os.path.exists(cache_file):
+                try:
+                    with open(cache_file) as cache:
+                        CommandCapabilities.probe_cache = json.load(cache)
+                except Exception as issue:
+                    log.debug(
+                        'Ignoring command capabilities cache: {0}'.format(
+                            issue
+                        )
+                    )
+        return CommandCapabilities.probe_cache
+
+    @staticmethod
+    def _write_probe_cache(probe_cache):
+        cache_file = Defaults.get_command_capabilities_cache_file()
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            AtomicFile.write(cache_file, json.dumps(probe_cache))
+        except Exception as issue:
+            log.debug(
+                'Failed to write command capabilities cache: {0}'.format(
+                    issue
+                )
+            )
@@ -0,0 +1,318 @@
+# Copyright (c) 2019 SUSE Linux GmbH.  All rights reserved.
+#
+# This file is part of kiwi.
+#
+# kiwi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# kiwi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with kiwi.  If not, see <http://www.gnu.org/licenses/>
+#
+import os
+import json
+import time
+import threading
+import subprocess
+from collections import (
+    namedtuple, OrderedDict, deque
+)
+
+# project
+from kiwi.logger import log
+
+command_record_type = namedtuple(
+    'command_record_type', [
+        'command', 'phase', 'start', 'seconds', 'user_seconds',
+        'system_seconds', 'max_rss_kbytes', 'returncode', 'thread'
+    ]
+)
+
+
+class CommandProfiler:
+    """
+    **Records resource usage of the commands called by kiwi**
+
+    For each command the wall time, the user and system CPU time,
+    the maximum resident set size, the exit code and the kiwi
+    phase the command was called in is recorded. The records can
+    be exported as Chrome trace timeline and summarized per program.
+
+    Commands are recorded by the active profiler, which is set
+    for the scope of a with block. Commands called while no
+    profiler is active, e.g by the solver service, are not
+    recorded. Scopes can be nested, the outer profiler is active
+    again once the inner scope ends. Each profiler keeps the
+    latest max_records commands
+
+    .. code:: python
+
+        with CommandProfiler() as profiler:
+            profiler.set_phase('prepare')
+            Command.run(['true'])
+        profiler.log_summary()
+    """
+    max_records = 10000
+
+    # profiler the commands are recorded in, None if no
+    # profiler is active
+    active = None
+
+    def __init__(self):
+        self.records = deque(maxlen=self.max_records)
+        self.phase = 'kiwi'
+        self.lock = threading.Lock()
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = CommandProfiler.active
+        CommandProfiler.active = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        CommandProfiler.active = self.previous
+        self.previous = None
+
+    def set_phase(self, phase):
+        """
+        Set the name of the kiwi phase recorded for subsequent commands
+
+        :param str phase: phase name
+        """
+        self.phase = phase
+
+    def add(self, record):
+        """
+        Add command record
+
+        :param namedtuple record: instance of command_record_type
+        """
+        with self.lock:
+            self.records.append(record)
+
+    @staticmethod
+    def get_program_name(command):
+        """
+        Program name of a command, commands called via chroot
+        are named by the program called in the chroot
+
+        :param list command: command and arguments
+
+        :return: program name
+
+        :rtype: str
+        """
+        if os.path.basename(command[0]) == 'chroot' and len(command) > 2:
+            command = command[2:]
+        return os.path.basename(command[0])
+
+    def get_summary(self):
+        """
+        Summarize command records per program, ordered by the
+        wall time spent in the program, longest first
+
+        :return:
+            Contains per program summary
+
+            .. code:: python
+
+                {
+                    'program': {
+                        'calls': int,
+                        'seconds': float,
+                        'user_seconds': float,
+                        'system_seconds': float,
+                        'max_rss_kbytes': int,
+                        'failed': int
+                    }
+                }
+
+        :rtype: OrderedDict
+        """
+        summary = {}
+        with self.lock:
+            records = list(self.records)
+        for record in records:
+            program = summary.setdefault(
+                CommandProfiler.get_program_name(record.command), {
+                    'calls': 0,
+                    'seconds': 0.0,
+                    'user_seconds': 0.0,
+                    'system_seconds': 0.0,
+                    'max_rss_kbytes': 0,
+                    'failed': 0
+                }
+            )
+            program['calls'] += 1
+            program['seconds'] += record.seconds
+            program['user_seconds'] += record.user_seconds
+            program['system_seconds'] += record.system_seconds
+            program['max_rss_kbytes'] = max(
+                program['max_rss_kbytes'], record.max_rss_kbytes
+            )
+            if record.returncode != 0:
+                program['failed'] += 1
+        return OrderedDict(
+            sorted(
+                summary.items(),
+                key=lambda item: item[1]['seconds'], reverse=True
+            )
+        )
+
+    def log_summary(self, count=10):
+        """
+        Log the programs which took the most wall time
+
+        :param int count: number of programs to log
+        """
+        summary = self.get_summary()
+        if not summary:
+            return
+        log.info('Command execution summary, top %d by wall time:', count)
+        for name, program in list(summary.items())[:count]:
+            log.info(
+                '--> %s: %d call(s), %.1fs wall, %.1fs user, %.1fs sys, '
+                '%d MB max rss%s', name, program['calls'],
+                program['seconds'], program['user_seconds'],
+                program['system_seconds'], program['max_rss_kbytes'] // 1024,
+                ', {0} failed'.format(program['failed'])
+                if program['failed'] else ''
+            )
+
+    def write_trace(self, filename):
+        """
+        Write command records as Chrome trace event file, which can
+        be loaded in chrome://tracing or the Perfetto UI
+
+        :param str filename: trace file path
+        """
+        with self.lock:
+            records = list(self.records)
+        threads = {}
+        trace_events = []
+        for record in records:
+            trace_events.append(
+                {
+                    'name': CommandProfiler.get_program_name(record.command),
+                    'cat': record.phase,
+                    'ph': 'X',
+                    'ts': int(record.start * 1000000),
+                    'dur': int(record.seconds * 1000000),
+                    'pid': os.getpid(),
+                    'tid': threads.setdefault(record.thread, len(threads)),
+                    'args': {
+                        'command': ' '.join(record.command),
+                        'returncode': record.returncode,
+                        'user_seconds': record.user_seconds,
+                        'system_seconds': record.system_seconds,
+                        'max_rss_kbytes': record.max_rss_kbytes
+                    }
+                }
+            )
+        with open(filename, 'w') as trace:
+            json.dump(
+                {'traceEvents': trace_events, 'displayTimeUnit': 'ms'},
+                trace, indent=1
+            )
+
+
+class ProfiledPopen(subprocess.Popen):
+    """
+    **subprocess.Popen recording the command in the CommandProfiler**
+
+    The command is recorded in the profiler which is active when
+    the process is started. The process is reaped with wait4 which
+    provides the resource usage of the process. The public wait
+    and poll methods reap the process by wait4 and set the
+    returncode, such that the subprocess.Popen implementation does
+    not wait for the process again
+    """
+    poll_interval = 0.05
+
+    def __init__(self, args, *popen_args, **popen_kwargs):
+        self.profiler = CommandProfiler.active
+        self.profile_phase = self.profiler.phase if self.profiler else None
+        self.profile_start = time.time()
+        self.profile_lock = threading.Lock()
+        super(ProfiledPopen, self).__init__(args, *popen_args, **popen_kwargs)
+
+    def poll(self):
+        """
+        Check if the process has terminated, reap and record it if so
+
+        :return: returncode or None
+
+        :rtype: int
+        """
+        if self.returncode is None and self.profile_lock.acquire(False):
+            try:
+                self._wait4(os.WNOHANG)
+            finally:
+                self.profile_lock.release()
+        return self.returncode
+
+    def wait(self, timeout=None):
+        """
+        Wait for the process to terminate, reap and record it
+
+        :param float timeout: seconds to wait
+
+        :raises subprocess.TimeoutExpired: if timeout is reached
+
+        :return: returncode
+
+        :rtype: int
+        """
+        if self.returncode is None:
+            with self.profile_lock:
+                if timeout is None:
+                    self._wait4(0)
+                else:
+                    endtime = time.time() + timeout
+                    delay = 0.0005
+                    while not self._wait4(os.WNOHANG):
+                        remaining = endtime - time.time()
+                        if remaining <= 0:
+                            raise subprocess.TimeoutExpired(self.args, timeout)
+                        delay = min(delay * 2, remaining, self.poll_interval)
+                        time.sleep(delay)
+        return super(ProfiledPopen, self).wait(timeout=timeout)
+
+    def _wait4(self, wait_flags):
+        if self.returncode is not None:
+            return True
+        try:
+            (pid, status, rusage) = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            # process already reaped elsewhere, the exit status is
+            # lost which is handled like in subprocess.Popen
+            self.returncode = 0
+            return True
+        if pid != self.pid:
+            return False
+        if os.WIFSIGNALED(status):
+            self.returncode = -os.WTERMSIG(status)
+        else:
+            self.returncode = os.WEXITSTATUS(status)
+        if not self.profiler:
+            return True
+        self.profiler.add(
+            command_record_type(
+                command=[format(arg) for arg in self.args],
+                phase=self.profile_phase,
+                start=self.profile_start,
+                seconds=time.time() - self.profile_start,
+                user_seconds=rusage.ru_utime,
+                system_seconds=rusage.ru_stime,
+                max_rss_kbytes=rusage.ru_maxrss,
+                returncode=self.returncode,
+                thread=threading.get_ident()
+            )
+        )
+        return True
@@ -16,18 +16,37 @@
 # along with kiwi.  If not, see <http://www.gnu.org/licenses/>
 #
 import os
-from tempfile import NamedTemporaryFile
+import bz2
+import gzip
+import lzma
+import time
+import hashlib
+from collections import namedtuple
+from functools import lru_cache
+from tempfile import (
+    NamedTemporaryFile, TemporaryFile
+)
 
 # project
 from kiwi.command import Command
 from kiwi.defaults import Defaults
 from kiwi.logger import log
+from kiwi.path import Path
+from kiwi.runtime_config import RuntimeConfig
+from kiwi.utils.codec import Codec
 
 from kiwi.exceptions import (
     KiwiFileNotFound,
+    KiwiCommandError,
     KiwiCompressionFormatUnknown
 )
 
+stream_result_type = namedtuple(
+    'stream_result', [
+        'hexdigests', 'input_bytes', 'output_bytes', 'stage_seconds'
+    ]
+)
+
 
 class Compress:
     """
@@ -36,11 +55,26 @@ class Compress:
     :param bool keep_source: Request to keep the uncompressed source
     :param str source_filename: Source file name to compress
     :param list supported_zipper: List of supported compression tools
+    :param dict stream_decoder: In-process decoder per compression tool,
+        formats not listed here are decoded through a pipe from the tool
     :param str compressed_filename: Compressed file name path with
         compression suffix
     :param str uncompressed_filename:
         Uncompressed file name path
     """
+    # magic bytes at the start of the file per compression format
+    format_magic = (
+        ('xz', b'\xfd7zXZ\x00'),
+        ('gzip', b'\x1f\x8b'),
+        ('zstd', b'\x28\xb5\x2f\xfd'),
+        ('bzip2', b'BZh'),
+        ('lz4', b'\x04\x22\x4d\x18'),
+        ('lz4', b'\x02\x21\x4c\x18')
+    )
+
+    # read size used for streaming compressed data
+    stream_chunk_size = 4 * 1024 * 1024
+
     def __init__(self, source_filename, keep_source_on_compress=False):
         if not os.path.exists(source_filename):
             raise KiwiFileNotFound(
@@ -49,8 +83,13 @@ class Compress:
         self.keep_source = keep_source_on_compress
         self.source_filename = source_filename
         self.supported_zipper = [
-            'xz', 'gzip'
+            'xz', 'gzip', 'zstd', 'bzip2', 'lz4'
         ]
+        self.stream_decoder = {
+            'xz': lzma.open,
+            'gzip': gzip.open,
+            'bzip2': bz2.open
+        }
         self.compressed_filename = None
         self.uncompressed_filename = None
 
@@ -58,12 +97,14 @@ class Compress:
         """
         Create XZ compressed file
 
+        Without custom options xz runs multithreaded, see
+        _get_xz_options for details
+
         :param list options: custom xz compression options
         """
-        if not options:
-            options = Defaults.get_xz_compression_options()
+        options = self._get_xz_options(options)
         if self.keep_source:
-            options.append('--keep')
+            options = options + ['--keep']
         Command.run(
             ['xz', '-f'] + options + [self.source_filename]
         )
@@ -73,18 +114,165 @@ class Compress:
     def gzip(self):
         """
         Create gzip(max compression) compressed file
+
+        The file is compressed in parallel by pigz unless gzip is
+        configured in the runtime config or pigz is not installed.
+        Both tools produce the same gzip format
         """
+        runtime_config = RuntimeConfig()
+        gzip_tool = runtime_config.get_gzip_tool()
+        if gzip_tool == 'pigz' and not Path.which(
+            'pigz', access_mode=os.X_OK
+        ):
+            log.debug('pigz not found, falling back to gzip')
+            gzip_tool = 'gzip'
         options = [
             '-9'
         ]
+        threads = runtime_config.get_compress_threads()
+        if gzip_tool == 'pigz' and threads:
+            options += ['--processes', format(threads)]
         if self.keep_source:
             options.append('--keep')
         Command.run(
-            ['gzip', '-f'] + options + [self.source_filename]
+            [gzip_tool, '-f'] + options + [self.source_filename]
         )
         self.compressed_filename = self.source_filename + '.gz'
         return self.compressed_filename
 
+    def zstd(self, options=None):
+        """
+        Create zstd compressed file
+
+        Without custom options zstd runs multithreaded and in long
+        range mode, see _get_zstd_options for details. If zstd is
+        not installed the file is XZ compressed instead and the
+        name of the XZ compressed file is returned
+
+        :param list options: custom zstd compression options
+        """
+        if not Path.which('zstd', access_mode=os.X_OK):
+            log.warning('zstd not found, falling back to xz compression')
+            return self.xz()
+        options = self._get_zstd_options(options)
+        if not self.keep_source:
+            options = options + ['--rm']
+        Command.run(
+            ['zstd', '-f', '-q'] + options + [self.source_filename]
+        )
+        self.compressed_filename = self.source_filename + '.zst'
+        return self.compressed_filename
+
+    def xz_stream(
+        self, target_filename, options=None, digest_names=None, threads=None
+    ):
+        """
+        Create XZ compressed copy of the source in one streaming pass
+
+        xz reads the source file once and the compressed data is
+        written to the target file while it is fed into the requested
+        digests. The source file is left untouched and the compressed
+        data is not read again to calculate its checksum
+
+        Example:
+
+        .. code:: python
+
+            result = Compress('image.raw').xz_stream(
+                'bundle/image.raw.xz', digest_names=['sha256']
+            )
+            result.hexdigests['sha256']
+
+        :param str target_filename: compressed target file name
+        :param list options: custom xz compression options
+        :param list digest_names: hashlib digest names, e.g sha256
+        :param int threads:
+            number of xz threads, replaces the compress threads
+            runtime config, not used with custom options
+
+        :return:
+            Contains the hexdigest per digest name of the compressed
+            data, the number of uncompressed and compressed bytes and
+            the time spent per stage in seconds
+
+            .. code:: python
+
+                stream_result(
+                    hexdigests={'sha256': 'hexdigest'},
+                    input_bytes=int, output_bytes=int,
+                    stage_seconds={
+                        'compress': float, 'write': float, 'checksum': float
+                    }
+                )
+
+        :rtype: namedtuple
+        """
+        options = self._get_xz_options(options, threads)
+        return self._stream(
+            ['xz', '-c'] + options + [self.source_filename],
+            target_filename, digest_names
+        )
+
+    def zstd_stream(
+        self, target_filename, options=None, digest_names=None, threads=None
+    ):
+        """
+        Create zstd compressed copy of the source in one streaming pass
+
+        Works like xz_stream with zstd as compression tool. The
+        caller is expected to check that zstd is installed
+
+        :param str target_filename: compressed target file name
+        :param list options: custom zstd compression options
+        :param list digest_names: hashlib digest names, e.g sha256
+        :param int threads:
+            number of zstd threads, replaces the compress threads
+            runtime config, not used with custom options
+
+        :return: see xz_stream
+
+        :rtype: namedtuple
+        """
+        options = self._get_zstd_options(options, threads)
+        return self._stream(
+            ['zstd', '-c', '-q'] + options + [self.source_filename],
+            target_filename, digest_names
+        )
+
+    def _stream(self, command, target_filename, digest_names):
+        digests = [
+            getattr(hashlib, digest_name)()
+            for digest_name in digest_names or []
+        ]
+        stage_seconds = {'compress': 0.0, 'write': 0.0, 'checksum': 0.0}
+        output_bytes = 0
+        with CommandPipe(command) as compressed, \
+                open(target_filename, 'wb') as target:
+            while True:
+                start = time.monotonic()
+                chunk = compressed.read(self.stream_chunk_size)
+                stage_seconds['compress'] += time.monotonic() - start
+                if not chunk:
+                    break
+                output_bytes += len(chunk)
+                start = time.monotonic()
+                target.write(chunk)
+                stage_seconds['write'] += time.monotonic() - start
+                start = time.monotonic()
+                for digest in digests:
+                    digest.update(chunk)
+                stage_seconds['checksum'] += time.monotonic() - start
+        self.compressed_filename = target_filename
+        return stream_result_type(
+            hexdigests=dict(
+                (digest_name, digest.hexdigest())
+                for digest_name, digest in zip(digest_names or [], digests)
+            ),
+            input_bytes=os.path.getsize(self.source_filename),
+            output_bytes=output_bytes,
+            stage_seconds=stage_seconds
+        )
+
     def uncompress(self, temporary=False):
         """
         Uncompress with format autodetection
@@ -114,25 +302,202 @@ class Compress:
             self.uncompressed_filename = self.temp_file.name
         return self.uncompressed_filename
 
+    def open_uncompressed(self):
+        """
+        Open the source for reading its uncompressed data as a stream
+
+        The data is decompressed in-process while reading from the
+        returned file object. Formats without a decoder in the python
+        standard library are read from a pipe of the compression tool
+        instead. Nothing is written to disk which makes
+        this the preferred method for consumers that only need to
+        read the uncompressed data once, e.g to calculate a checksum
+
+        Example:
+
+        .. code:: python
+
+            with Compress('image.xz').open_uncompressed() as data:
+                data.read()
+
+        :return: binary file object
+
+        :rtype: object
+        """
+        zipper = self.get_format()
+        if not zipper:
+            raise KiwiCompressionFormatUnknown(
+                'could not detect compression format for %s' %
+                self.source_filename
+            )
+        if zipper in self.stream_decoder:
+            return self.stream_decoder[zipper](self.source_filename, 'rb')
+        return CommandPipe(
+            [zipper, '-q', '-c', '-d', self.source_filename]
+        )
+
     def get_format(self):
         """
         Detect compression format
 
+        The format is detected from the magic bytes at the start of
+        the source file. Results are cached per path, modification
+        time and size of the source file
+
         :return: compression format name or None if it couldn't be inferred
 
         :rtype: Optional[str]
         """
-        for zipper in self.supported_zipper:
-            cmd = [zipper, '-l', self.source_filename]
-            try:
-                Command.run(cmd)
+        source_stat = os.stat(self.source_filename)
+        zipper = Compress._get_format_from_magic(
+            os.path.abspath(self.source_filename),
+            source_stat.st_mtime_ns, source_stat.st_size
+        )
+        if zipper in self.supported_zipper:
+            return zipper
+
+    def _get_xz_options(self, options, threads=None):
+        """
+        Provides the xz options to use for the given custom options
+
+        Custom options are used as given. Without custom options
+        the default xz options apply and the given number of threads
+        or the number of compression threads from the runtime config,
+        if set, replaces their thread option
+
+        :param list options: custom xz compression options
+        :param int threads: number of xz threads
+
+        :return: xz compression options
+
+        :rtype: list
+        """
+        if options:
+            return list(options)
+        options = Defaults.get_xz_compression_options()
+        if threads is None:
+            threads = RuntimeConfig().get_compress_threads()
+        if threads is None:
+            return options
+        return [
+            option for option in options
+            if not option.startswith(('-T', '--threads'))
+        ] + ['--threads={0}'.format(threads)]
+
+    def _get_zstd_options(self, options, threads=None):
+        """
+        Provides the zstd options to use for the given custom options
+
+        Custom options are used as given. Without custom options
+        the default zstd options apply with the given number of
+        threads or the number of compression threads from the
+        runtime config. If neither is set zstd uses one thread
+        per CPU
+
+        :param list options: custom zstd compression options
+        :param int threads: number of zstd threads
+
+        :return: zstd compression options
+
+        :rtype: list
+        """
+        if options:
+            return list(options)
+        if threads is None:
+            threads = RuntimeConfig().get_compress_threads()
+        return Defaults.get_zstd_compression_options() + [
+            '-T{0}'.format(threads or 0)
+        ]
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _get_format_from_magic(filename, mtime, size):
+        """
+        Read the file header and match it against the known
+        compression format magic bytes
+
+        :param str filename: file path
+        :param int mtime: file modification time in ns, cache key only
+        :param int size: file size in bytes, cache key only
+
+        :return: compression format name or None
+
+        :rtype: Optional[str]
+        """
+        header_size = max(len(magic) for _, magic in Compress.format_magic)
+        with open(filename, 'rb') as source:
+            header = source.read(header_size)
+        for zipper, magic in Compress.format_magic:
+            if header.startswith(magic):
+                if zipper == 'bzip2' and (
+                    len(header) < 4 or header[3:4] not in b'123456789'
+                ):
+                    # bzip2 magic is followed by the block size digit
+                    continue
                 return zipper
-            except Exception as exc:
-                log.debug(
-                    'Error running "{cmd:s}", got a {exc_t:s}: {exc:s}'
-                    .format(
-                        cmd=' '.join(cmd),
-                        exc_t=type(exc).__name__,
-                        exc=str(exc)
-                    )
+
+
+class CommandPipe:
+    """
+    **Read only file object for the stdout channel of a command**
+
+    Used to stream the output of a compression or decompression
+    tool. The exit code of the tool is checked when the object
+    is closed. The error messages of the tool are stored in a
+    temporary file, a pipe which is not read while the output
+    is consumed could fill up and block the tool
+
+    :param list command: command writing its data to stdout
+    """
+    def __init__(self, command):
+        self.error_file = TemporaryFile()
+        try:
+            self.command = Command.call(command, error_file=self.error_file)
+        except Exception:
+            self.error_file.close()
+            raise
+
+    def read(self, size=-1):
+        """
+        Read uncompressed data
+
+        :param int size: maximum number of bytes, all data if negative
+
+        :return: data
+
+        :rtype: bytes
+        """
+        return self.command.output.read(size)
+
+    def close(self):
+        """
+        Close the pipe and wait for the decompression tool to exit
+
+        :raises KiwiCommandError: if the tool exited with an error
+        """
+        self.command.output.close()
+        returncode = self.command.process.wait()
+        self.error_file.seek(0)
+        error = self.error_file.read()
+        self.error_file.close()
+        if returncode != 0:
+            raise KiwiCommandError(
+                '{0} failed: {1}'.format(
+                    self.command.process.args[0], Codec.decode(error)
                 )
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not exc_type:
+            self.close()
+            return
+        # the error raised in the block takes precedence, a failure
+        # of the tool is most likely a consequence of it, e.g a
+        # broken pipe, and is only logged
+        try:
+            self.close()
+        except KiwiCommandError as issue:
+            log.debug('Ignoring {0} after {1}'.format(issue, exc_type.__name__))
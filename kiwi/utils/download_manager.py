@@ -0,0 +1,350 @@
+# Copyright (c) 2019 SUSE Linux GmbH.  All rights reserved.
+#
+# This file is part of kiwi.
+#
+# kiwi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# kiwi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with kiwi.  If not, see <http://www.gnu.org/licenses/>
+#
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from base64 import b64encode
+from urllib.parse import urlparse
+from urllib.request import (
+    url2pathname, urlopen, Request
+)
+import os
+import json
+import shutil
+import hashlib
+import requests
+
+# project
+from kiwi.logger import log
+from kiwi.defaults import Defaults
+from kiwi.utils.atomic_file import AtomicFile
+
+from kiwi.exceptions import (
+    KiwiUriOpenError,
+    KiwiDownloadChecksumError
+)
+
+download_request_type = namedtuple(
+    'download_request_type', ['url', 'target', 'checksum']
+)
+
+download_type = namedtuple(
+    'download_type', ['url', 'target', 'size', 'cached']
+)
+
+
+class DownloadManager:
+    """
+    **Download files from http(s), ftp or file URLs**
+
+    Connections are kept alive and pooled per host and the data is
+    streamed to disk in chunks. A list of files is downloaded with
+    a bounded number of concurrent transfers. With a cache directory
+    http(s) downloads are stored in the cache together with their
+    ETag and Last-Modified information, subsequent downloads of the
+    same URL are conditional requests which reuse the cached file
+    if the server reports it as not modified. An expected checksum
+    is verified while the data is streamed. ftp downloads are
+    handled by urllib and are not cached
+
+    :param int max_transfers: maximum number of concurrent transfers
+    :param str cache_dir: metadata cache directory, None disables caching
+    :param int timeout: connect and read timeout in seconds
+    """
+    # size of the data chunks streamed to disk
+    chunk_size = 1 << 20
+
+    def __init__(
+        self, max_transfers=Defaults.get_download_jobs(), cache_dir=None,
+        timeout=60
+    ):
+        self.max_transfers = max_transfers
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=max_transfers, pool_maxsize=max_transfers
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def download(self, url, target, checksum=None, auth=None):
+        """
+        Download url to target file
+
+        Example:
+
+        .. code:: python
+
+            DownloadManager().download(
+                'http://example.org/repodata/repomd.xml', 'repomd.xml'
+            )
+
+        :param str url: http, https, ftp or file URL
+        :param str target: target file path
+        :param tuple checksum: (digest name, hex digest) to verify or None
+        :param tuple auth: (user, password) for basic authentication
+
+        :raises KiwiUriOpenError:
+            if the transfer failed or the URL scheme is not supported
+        :raises KiwiDownloadChecksumError: if the checksum does not match
+
+        :return:
+            Contains download information
+
+            .. code:: python
+
+                download_type(url=str, target=str, size=int, cached=bool)
+
+        :rtype: namedtuple
+        """
+        scheme = urlparse(url).scheme
+        if scheme in ('http', 'https'):
+            return self._download_http(url, target, checksum, auth)
+        if scheme == 'ftp':
+            return self._download_urllib(url, target, checksum, auth)
+        if scheme == 'file':
+            return self._download_file(url, target, checksum)
+        raise KiwiUriOpenError(
+            'Unsupported URL scheme {0!r} for {1}'.format(scheme, url)
+        )
+
+    def download_all(self, downloads, auth=None):
+        """
+        Download a list of files concurrently
+
+        All transfers are completed before the first failure, if any,
+        is raised
+
+        :param list downloads: list of download_request_type tuples
+        :param tuple auth: (user, password) for basic authentication
+
+        :return: list of download_type results in the order of downloads
+
+        :rtype: list
+        """
+        if not downloads:
+            return []
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_transfers, len(downloads))
+        ) as workers:
+            download_jobs = [
+                workers.submit(
+                    self.download, request.url, request.target,
+                    request.checksum, auth
+                ) for request in downloads
+            ]
+        return [download_job.result() for download_job in download_jobs]
+
+    def _download_http(self, url, target, checksum, auth, use_cache=True):
+        cache_info = self._load_cache_info(url) if use_cache else {}
+        headers = {}
+        if cache_info.get('etag'):
+            headers['If-None-Match'] = cache_info['etag']
+        if cache_info.get('last_modified'):
+            headers['If-Modified-Since'] = cache_info['last_modified']
+        log.debug('Downloading {0}'.format(url))
+        try:
+            response = self.session.get(
+                url, headers=headers, auth=auth, stream=True,
+                timeout=self.timeout
+            )
+        except Exception as issue:
+            raise KiwiUriOpenError(
+                '{0}: {1}'.format(type(issue).__name__, issue)
+            )
+        with response:
+            if response.status_code != 200:
+                # read the, usually empty, body of responses without
+                # data such that the connection goes back to the pool
+                response.content
+            if response.status_code == 304 and cache_info:
+                return self._download_cached(
+                    url, target, checksum, auth, cache_info
+                )
+            if response.status_code != 200:
+                raise KiwiUriOpenError(
+                    'HTTPError: {0} {1} for {2}'.format(
+                        response.status_code, response.reason, url
+                    )
+                )
+            try:
+                size = self._write(
+                    response.iter_content(self.chunk_size),
+                    target, checksum, url
+                )
+            except requests.RequestException as issue:
+                raise KiwiUriOpenError(
+                    '{0}: {1}'.format(type(issue).__name__, issue)
+                )
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if self.cache_dir and (etag or last_modified):
+                self._store_cache(url, target, etag, last_modified)
+        return download_type(
+            url=url, target=target, size=size, cached=False
+        )
+
+    def _download_cached(self, url, target, checksum, auth, cache_info):
+        cache_data = os.sep.join([self.cache_dir, cache_info['data']])
+        log.debug('--> Not modified, using {0}'.format(cache_data))
+        try:
+            with open(cache_data, 'rb') as cached:
+                size = self._write(
+                    iter(lambda: cached.read(self.chunk_size), b''),
+                    target, checksum, url
+                )
+        except FileNotFoundError:
+            # replaced by a concurrent download in the meantime
+            return self._download_http(
+                url, target, checksum, auth, use_cache=False
+            )
+        return download_type(
+            url=url, target=target, size=size, cached=True
+        )
+
+    def _download_urllib(self, url, target, checksum, auth):
+        log.debug('Downloading {0}'.format(url))
+        request = Request(url)
+        if auth:
+            credentials = b64encode(format(':'.join(auth)).encode())
+            request.add_header('Authorization', b'Basic ' + credentials)
+        try:
+            with urlopen(request, timeout=self.timeout) as data:
+                size = self._write(
+                    iter(lambda: data.read(self.chunk_size), b''),
+                    target, checksum, url
+                )
+        except OSError as issue:
+            raise KiwiUriOpenError(
+                '{0}: {1}'.format(type(issue).__name__, issue)
+            )
+        return download_type(
+            url=url, target=target, size=size, cached=False
+        )
+
+    def _download_file(self, url, target, checksum):
+        source = url2pathname(urlparse(url).path)
+        try:
+            with open(source, 'rb') as data:
+                size = self._write(
+                    iter(lambda: data.read(self.chunk_size), b''),
+                    target, checksum, url
+                )
+        except OSError as issue:
+            raise KiwiUriOpenError(
+                '{0}: {1}'.format(type(issue).__name__, issue)
+            )
+        return download_type(
+            url=url, target=target, size=size, cached=False
+        )
+
+    def _write(self, chunks, target, checksum, url):
+        """
+        Write data chunks to a temporary file next to the target,
+        verify the checksum and move the file into place
+
+        :return: number of bytes written
+
+        :rtype: int
+        """
+        digest = hashlib.new(checksum[0]) if checksum else None
+        written = []
+
+        def _write_chunks(target_tmp):
+            with open(target_tmp, 'wb') as target_file:
+                for chunk in chunks:
+                    target_file.write(chunk)
+                    written.append(len(chunk))
+                    if digest:
+                        digest.update(chunk)
+            if digest and digest.hexdigest() != checksum[1]:
+                raise KiwiDownloadChecksumError(
+                    '{0} checksum mismatch for {1}: {2} != {3}'.format(
+                        checksum[0], url, digest.hexdigest(), checksum[1]
+                    )
+                )
+        AtomicFile.replace(target, _write_chunks)
+        return sum(written)
+
+    def _get_cache_name(self, url):
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _load_cache_info(self, url):
+        """
+        Load the cache information of an URL
+
+        :return: dict with url, etag, last_modified and data file name
+
+        :rtype: dict
+        """
+        if self.cache_dir:
+            cache_info_file = os.sep.join(
+                [self.cache_dir, self._get_cache_name(url) + '.json']
+            )
+            try:
+                with open(cache_info_file) as cache_info:
+                    return json.load(cache_info)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as issue:
+                log.debug(
+                    'Ignoring metadata cache {0}: {1}'.format(
+                        cache_info_file, issue
+                    )
+                )
+        return {}
+
+    def _store_cache(self, url, source, etag, last_modified):
+        """
+        Store a copy of the downloaded file and its cache information
+
+        The data file name depends on the ETag and Last-Modified
+        values and is never changed once written. The cache
+        information referencing it is replaced atomically, which
+        makes sure the information always matches the data. The
+        cache is only an optimization, failing to write it is not
+        an error
+        """
+        cache_name = self._get_cache_name(url)
+        cache_info = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'data': '{0}.{1}'.format(
+                cache_name, hashlib.sha256(
+                    '{0}/{1}'.format(etag, last_modified).encode()
+                ).hexdigest()[:16]
+            )
+        }
+        previous_data = self._load_cache_info(url).get('data')
+        cache_info_file = os.sep.join([self.cache_dir, cache_name + '.json'])
+        cache_data = os.sep.join([self.cache_dir, cache_info['data']])
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            AtomicFile.replace(
+                cache_data, lambda target: shutil.copyfile(source, target)
+            )
+            AtomicFile.write(cache_info_file, json.dumps(cache_info))
+            if previous_data and previous_data != cache_info['data']:
+                os.unlink(os.sep.join([self.cache_dir, previous_data]))
+        except OSError as issue:
+            log.debug(
+                'Failed to write metadata cache {0}: {1}'.format(
+                    cache_info_file, issue
+                )
+            )
@@ -0,0 +1,187 @@
+# Copyright (c) 2019 SUSE Linux GmbH.  All rights reserved.
+#
+# This file is part of kiwi.
+#
+# kiwi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# kiwi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with kiwi.  If not, see <http://www.gnu.org/licenses/>
+#
+import os
+import fcntl
+import shutil
+import time
+from collections import namedtuple
+
+# project
+from kiwi.logger import log
+
+from kiwi.exceptions import KiwiFileCopyError
+
+copy_result_type = namedtuple(
+    'copy_result', ['method', 'size', 'seconds']
+)
+
+
+class FileCopy:
+    """
+    **Copy files with the cheapest method the filesystems allow**
+
+    Methods are tried in the following order:
+
+    1. reflink: the target shares the data extents of the source
+       via the FICLONE ioctl, supported e.g by btrfs and xfs
+    2. hardlink: if the caller does not modify the target in place
+    3. copy_file_range: in kernel copy, no data passes user space
+    4. sendfile: in kernel copy for older kernels
+    5. plain read/write copy
+    """
+    # FICLONE ioctl request number, _IOW(0x94, 9, int)
+    ficlone = 0x40049409
+
+    # maximum number of bytes per copy_file_range/sendfile call
+    chunk_size = 1 << 30
+
+    @staticmethod
+    def stage(source, target, allow_hardlink=False):
+        """
+        Provide the source file as target file with the cheapest
+        method possible
+
+        Example:
+
+        .. code:: python
+
+            result = FileCopy.stage('image.raw', 'bundle/image.raw')
+            result.method
+
+        :param str source: source file path
+        :param str target: target file path, replaced if it exists
+        :param bool allow_hardlink:
+            allow a hardlink, only safe if the target is not
+            modified in place afterwards
+
+        :return:
+            Contains the used method, the file size and the time
+            spent in seconds
+
+            .. code:: python
+
+                copy_result(method='reflink', size=int, seconds=float)
+
+        :rtype: namedtuple
+        """
+        start = time.monotonic()
+        size = os.path.getsize(source)
+        if os.path.lexists(target):
+            os.unlink(target)
+        method = None
+        if allow_hardlink:
+            # a reflink is tried first, unlike a hardlink it does not
+            # share the inode with the source
+            if FileCopy._reflink(source, target):
+                method = 'reflink'
+            else:
+                try:
+                    os.link(source, target)
+                    method = 'hardlink'
+                except OSError as issue:
+                    log.debug(
+                        'Hardlink {0} failed: {1}'.format(target, issue)
+                    )
+        if not method:
+            method = FileCopy.copy(
+                source, target, reflink=not allow_hardlink
+            )
+        return copy_result_type(
+            method=method, size=size, seconds=time.monotonic() - start
+        )
+
+    @staticmethod
+    def copy(source, target, reflink=True):
+        """
+        Copy source to target, preferring a reflink and in kernel
+        copy methods over a plain copy. The permission bits of the
+        source are applied to the target
+
+        :param str source: source file path
+        :param str target: target file path
+        :param bool reflink: try a reflink first
+
+        :return: name of the used method
+
+        :rtype: str
+        """
+        try:
+            with open(source, 'rb') as source_file:
+                with open(target, 'wb') as target_file:
+                    method = FileCopy._copy_data(
+                        source_file, target_file, reflink
+                    )
+            shutil.copymode(source, target)
+        except OSError as issue:
+            raise KiwiFileCopyError(
+                'Copy of {0} to {1} failed: {2}'.format(source, target, issue)
+            )
+        return method
+
+    @staticmethod
+    def _reflink(source, target):
+        """
+        Create target as reflink of source, on failure no target
+        is left behind
+        """
+        try:
+            with open(source, 'rb') as source_file:
+                with open(target, 'wb') as target_file:
+                    fcntl.ioctl(
+                        target_file.fileno(), FileCopy.ficlone,
+                        source_file.fileno()
+                    )
+            shutil.copymode(source, target)
+            return True
+        except OSError as issue:
+            log.debug('Reflink not possible: {0}'.format(issue))
+            if os.path.lexists(target):
+                os.unlink(target)
+            return False
+
+    @staticmethod
+    def _copy_data(source_file, target_file, reflink=True):
+        source_fd = source_file.fileno()
+        target_fd = target_file.fileno()
+        if reflink:
+            try:
+                fcntl.ioctl(target_fd, FileCopy.ficlone, source_fd)
+                return 'reflink'
+            except OSError as issue:
+                log.debug('Reflink not possible: {0}'.format(issue))
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while os.copy_file_range(
+                    source_fd, target_fd, FileCopy.chunk_size
+                ):
+                    pass
+                return 'copy_file_range'
+            except OSError as issue:
+                log.debug('copy_file_range not possible: {0}'.format(issue))
+        try:
+            while os.sendfile(
+                target_fd, source_fd, None, FileCopy.chunk_size
+            ):
+                pass
+            return 'sendfile'
+        except OSError as issue:
+            log.debug('sendfile not possible: {0}'.format(issue))
+        # copy_file_range and sendfile advance the file offsets,
+        # the plain copy continues from where they stopped
+        shutil.copyfileobj(source_file, target_file, 1 << 20)
+        return 'copy'
@@ -305,7 +305,7 @@ class VolumeManagerBase(DeviceProvider):
                 Defaults.get_min_volume_mbytes()
             mbsize += volume_size.customize(
                 volume_size.accumulate_mbyte_file_sizes(exclude_paths),
-                filesystem_name
+                filesystem_name, exclude_paths
             )
         return mbsize
 
@@ -0,0 +1,40 @@
+from mock import (
+    patch, Mock
+)
+from pytest import raises
+
+from kiwi.app import App
+from kiwi.exceptions import KiwiError
+
+
+class TestApp:
+    def setup(self):
+        self.task = Mock()
+        self.cli_task = Mock()
+        self.cli_task.cli.get_command.return_value = 'build'
+        self.cli_task.cli.get_servicename.return_value = 'system'
+        self.cli_task.task.__dict__ = {
+            'SystemBuildTask': Mock(return_value=self.task)
+        }
+
+    @patch('kiwi.app.Path.wait_for_background_wipes')
+    @patch('kiwi.app.CliTask')
+    def test_app(self, mock_CliTask, mock_wait_for_background_wipes):
+        mock_CliTask.return_value = self.cli_task
+        App()
+        mock_CliTask.assert_called_once_with(
+            should_perform_task_setup=False
+        )
+        self.task.process.assert_called_once_with()
+        mock_wait_for_background_wipes.assert_called_once_with()
+
+    @patch('kiwi.app.Path.wait_for_background_wipes')
+    @patch('kiwi.app.CliTask')
+    def test_app_task_failed(
+        self, mock_CliTask, mock_wait_for_background_wipes
+    ):
+        mock_CliTask.return_value = self.cli_task
+        self.task.process.side_effect = KiwiError('error')
+        with raises(KiwiError):
+            App()
+        mock_wait_for_background_wipes.assert_called_once_with()
@@ -12,11 +12,20 @@ from kiwi.exceptions import KiwiCommandCapabilitiesError
 class TestArchiveTar:
     @patch('kiwi.archive.tar.Command.run')
     def setup(self, mock_command):
+        # tar is probed on every instantiation, no cached probes
+        self.probe_key_patch = patch(
+            'kiwi.utils.command_capabilities.'
+            'CommandCapabilities._get_probe_key', return_value=None
+        )
+        self.probe_key_patch.start()
         command = mock.Mock()
         command.output = 'version 1.27.0'
         mock_command.return_value = command
         self.archive = ArchiveTar('foo.tar')
 
+    def teardown(self):
+        self.probe_key_patch.stop()
+
     @raises(KiwiCommandCapabilitiesError)
     @patch('kiwi.archive.tar.Command.run')
     def test_invalid_tar_command_version(self, mock_command):
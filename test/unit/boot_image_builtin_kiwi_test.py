@@ -163,7 +163,9 @@ class TestBootImageKiwi:
     def test_destructor(self, mock_path, mock_wipe):
         mock_path.return_value = True
         self.boot_image.__del__()
-        mock_wipe.assert_called_once_with('boot-root-directory')
+        mock_wipe.assert_called_once_with(
+            'boot-root-directory', background=True
+        )
 
     def test_boot_names(self):
         boot_names_type = namedtuple(
@@ -492,6 +492,7 @@ class TestDiskBuilder:
         self.boot_image_task.omit_module.assert_called_once_with('multipath')
         assert self.boot_image_task.write_system_config_file.call_args_list == []
 
+    @patch('kiwi.builder.disk.BlockCopy.copy')
     @patch('kiwi.builder.disk.FileSystem')
     @patch('kiwi.builder.disk.FileSystemSquashFs')
     @patch_open
@@ -503,7 +504,8 @@ class TestDiskBuilder:
     @patch('random.randrange')
     def test_create_disk_standard_root_is_overlay(
         self, mock_rand, mock_temp, mock_getsize, mock_exists,
-        mock_grub_dir, mock_command, mock_open, mock_squashfs, mock_fs
+        mock_grub_dir, mock_command, mock_open, mock_squashfs, mock_fs,
+        mock_block_copy
     ):
         mock_rand.return_value = 15
         mock_open.return_value = self.context_manager_mock
@@ -532,8 +534,8 @@ class TestDiskBuilder:
             ], filename='tempname')
         ]
         self.disk.create_root_readonly_partition.assert_called_once_with(11)
-        assert mock_command.call_args_list[2] == call(
-            ['dd', 'if=tempname', 'of=/dev/readonly-root-device']
+        mock_block_copy.assert_called_once_with(
+            'tempname', '/dev/readonly-root-device', sparse=True
         )
         assert self.file_mock.write.call_args_list == [
             call('kiwi_BootPart="1"\n'),
@@ -116,6 +116,63 @@ class TestFileSystemBuilder:
             'target_dir'
         )
 
+    @patch('kiwi.builder.filesystem.LoopDevice')
+    @patch('kiwi.builder.filesystem.FileSystem')
+    @patch('kiwi.builder.filesystem.DeviceProvider')
+    @patch('kiwi.builder.filesystem.FileSystemSetup')
+    @patch('platform.machine')
+    def test_create_populated(
+        self, mock_machine, mock_fs_setup, mock_provider, mock_fs, mock_loop
+    ):
+        mock_machine.return_value = 'x86_64'
+        mock_fs_setup.return_value = self.fs_setup
+        mock_fs.return_value = self.filesystem
+        self.filesystem.populate_on_file.return_value = True
+        self.xml_state.build_type.get_target_blocksize.return_value = None
+        fs = FileSystemBuilder(
+            self.xml_state, 'target_dir', 'root_dir'
+        )
+        fs.create()
+        mock_fs.assert_called_once_with(
+            'ext3', mock_provider.return_value, 'root_dir/', {
+                'mount_options': ['async'],
+                'create_options': ['-O', 'option']
+            }
+        )
+        self.filesystem.populate_on_file.assert_called_once_with(
+            'target_dir/myimage.x86_64-1.2.3.ext3', 42, None,
+            ['image', '.profile', '.kconfig', '.buildenv', 'var/cache/kiwi']
+        )
+        assert not mock_loop.called
+        assert not self.filesystem.sync_data.called
+
+    @patch('kiwi.builder.filesystem.LoopDevice')
+    @patch('kiwi.builder.filesystem.FileSystem')
+    @patch('kiwi.builder.filesystem.DeviceProvider')
+    @patch('kiwi.builder.filesystem.FileSystemSetup')
+    @patch('platform.machine')
+    def test_create_populate_not_available(
+        self, mock_machine, mock_fs_setup, mock_provider, mock_fs, mock_loop
+    ):
+        mock_machine.return_value = 'x86_64'
+        mock_fs_setup.return_value = self.fs_setup
+        mock_fs.return_value = self.filesystem
+        mock_loop.return_value = self.loop_provider
+        self.filesystem.populate_on_file.return_value = False
+        self.xml_state.build_type.get_target_blocksize.return_value = 512
+        fs = FileSystemBuilder(
+            self.xml_state, 'target_dir', 'root_dir'
+        )
+        fs.create()
+        assert mock_fs.call_count == 2
+        mock_loop.assert_called_once_with(
+            'target_dir/myimage.x86_64-1.2.3.ext3', 42, 512
+        )
+        self.filesystem.create_on_device.assert_called_once_with(None)
+        self.filesystem.sync_data.assert_called_once_with(
+            ['image', '.profile', '.kconfig', '.buildenv', 'var/cache/kiwi']
+        )
+
     @patch('kiwi.builder.filesystem.FileSystem')
     @patch('kiwi.builder.filesystem.DeviceProvider')
     @patch('platform.machine')
@@ -263,6 +263,14 @@ class TestInstallImageBuilder:
         self.kernel.get_xen_hypervisor.return_value = False
         self.install_image.create_install_iso()
 
+    @patch('kiwi.builder.install.Checksum')
+    def test_get_disk_checksum(self, mock_Checksum):
+        checksum = self.install_image._get_disk_checksum()
+        assert self.install_image._get_disk_checksum() == checksum
+        mock_Checksum.assert_called_once_with(
+            'target_dir/result-image.x86_64-1.2.3.raw'
+        )
+
     @patch('kiwi.builder.install.mkdtemp')
     @patch_open
     @patch('kiwi.builder.install.Command.run')
@@ -419,7 +427,9 @@ class TestInstallImageBuilder:
         self.install_image.squashed_contents = 'squashed-dir'
         self.install_image.__del__()
         assert mock_wipe.call_args_list == [
-            call('media-dir'), call('pxe-dir'), call('squashed-dir')
+            call('media-dir', background=True),
+            call('pxe-dir', background=True),
+            call('squashed-dir', background=True)
         ]
         self.install_image.pxe_dir = None
         self.install_image.media_dir = None
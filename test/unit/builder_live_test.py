@@ -136,7 +136,6 @@ class TestLiveImageBuilder:
 
     @patch('kiwi.builder.live.IsoToolsBase.setup_media_loader_directory')
     @patch('kiwi.builder.live.mkdtemp')
-    @patch('kiwi.builder.live.NamedTemporaryFile')
     @patch('kiwi.builder.live.shutil')
     @patch('kiwi.builder.live.Iso.set_media_tag')
     @patch('kiwi.builder.live.FileSystemIsoFs')
@@ -146,12 +145,9 @@ class TestLiveImageBuilder:
     @patch_open
     def test_create_overlay_structure(
         self, mock_open, mock_exists, mock_grub_dir, mock_size,
-        mock_isofs, mock_tag, mock_shutil, mock_tmpfile, mock_dtemp,
+        mock_isofs, mock_tag, mock_shutil, mock_dtemp,
         mock_setup_media_loader_directory
     ):
-        tempfile = mock.Mock()
-        tempfile.name = 'tmpfile'
-        mock_tmpfile.return_value = tempfile
         mock_exists.return_value = True
         mock_grub_dir.return_value = 'grub2'
         tmpdir_name = ['temp-squashfs', 'temp_media_dir']
@@ -201,12 +197,15 @@ class TestLiveImageBuilder:
         self.filesystem.sync_data.assert_called_once_with(
             ['image', '.profile', '.kconfig', '.buildenv', 'var/cache/kiwi']
         )
-        self.filesystem.create_on_file.assert_called_once_with('tmpfile')
-
-        assert mock_shutil.copy.call_args_list == [
-            call('tmpfile', 'temp-squashfs/LiveOS/rootfs.img'),
-            call('tmpfile', 'temp_media_dir/LiveOS/squashfs.img')
-        ]
+        kiwi.builder.live.LoopDevice.assert_called_once_with(
+            'temp-squashfs/LiveOS/rootfs.img',
+            self.filesystem_setup.get_size_mbytes.return_value,
+            self.xml_state.build_type.get_target_blocksize.return_value
+        )
+        self.filesystem.create_on_file.assert_called_once_with(
+            'temp_media_dir/LiveOS/squashfs.img'
+        )
+        assert not mock_shutil.copy.called
 
         self.setup.call_edit_boot_config_script.assert_called_once_with(
             boot_part_id=1, filesystem='iso:temp_media_dir',
@@ -314,6 +313,55 @@ class TestLiveImageBuilder:
             boot_dir='temp_media_dir'
         )
 
+    @patch('kiwi.builder.live.IsoToolsBase.setup_media_loader_directory')
+    @patch('kiwi.builder.live.mkdtemp')
+    @patch('kiwi.builder.live.shutil')
+    @patch('kiwi.builder.live.Iso.set_media_tag')
+    @patch('kiwi.builder.live.FileSystemIsoFs')
+    @patch('kiwi.builder.live.SystemSize')
+    @patch('kiwi.builder.live.Defaults.get_grub_boot_directory_name')
+    @patch('os.path.exists')
+    @patch_open
+    def test_create_overlay_structure_populated(
+        self, mock_open, mock_exists, mock_grub_dir, mock_size,
+        mock_isofs, mock_tag, mock_shutil, mock_dtemp,
+        mock_setup_media_loader_directory
+    ):
+        mock_exists.return_value = True
+        mock_grub_dir.return_value = 'grub2'
+        mock_dtemp.side_effect = ['temp_media_dir', 'temp-squashfs']
+        mock_open.return_value = self.context_manager_mock
+        mock_size.return_value.accumulate_mbyte_file_sizes.return_value = 42
+        self.filesystem_setup.get_size_mbytes.return_value = 1024
+        self.filesystem.populate_on_file.return_value = True
+        self.xml_state.build_type.get_target_blocksize.return_value = None
+        self.live_image.live_type = 'overlay'
+
+        self.live_image.create()
+
+        assert kiwi.builder.live.FileSystem.call_args_list == [
+            call(
+                device_provider=None, name='ext4',
+                root_dir='root_dir/',
+                custom_args={
+                    'mount_options': ['async'],
+                    'create_options': ['-O', 'option']
+                }
+            ),
+            call(
+                device_provider=None, name='squashfs',
+                root_dir='temp-squashfs'
+            )
+        ]
+        self.filesystem.populate_on_file.assert_called_once_with(
+            'temp-squashfs/LiveOS/rootfs.img', 1024, exclude=[
+                'image', '.profile', '.kconfig', '.buildenv', 'var/cache/kiwi'
+            ]
+        )
+        assert not kiwi.builder.live.LoopDevice.called
+        assert not self.filesystem.create_on_device.called
+        assert not self.filesystem.sync_data.called
+
     @patch('kiwi.builder.live.IsoToolsBase.setup_media_loader_directory')
     @patch('kiwi.builder.live.mkdtemp')
     @patch('kiwi.builder.live.shutil')
@@ -360,8 +408,8 @@ class TestLiveImageBuilder:
         self.live_image.live_container_dir = 'container-dir'
         self.live_image.__del__()
         assert mock_wipe.call_args_list == [
-            call('media-dir'),
-            call('container-dir')
+            call('media-dir', background=True),
+            call('container-dir', background=True)
         ]
         self.live_image.media_dir = None
         self.live_image.live_container_dir = None
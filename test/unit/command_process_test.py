@@ -1,3 +1,4 @@
+import os
 from mock import call
 from mock import patch
 import mock
@@ -8,48 +9,32 @@ from kiwi.exceptions import KiwiCommandError
 from kiwi.command_process import CommandProcess
 from kiwi.command_process import CommandIterator
 
-from builtins import bytes
-
 
 class TestCommandProcess:
     def fake_matcher(self, item, output):
         return True
 
-    def poll(self):
-        return self.data_flow.pop()
-
-    def outavailable(self):
-        return True
-
-    def erravailable(self):
-        return True
-
-    def outdata(self):
-        return self.data_out.pop()
+    def setup(self):
+        self.pipes = []
 
-    def errdata(self):
-        return self.data_err.pop()
+    def teardown(self):
+        for pipe in self.pipes:
+            pipe.close()
 
-    def create_flow_method(self, method):
-        def create_method(arg=None):
-            return method()
-        return create_method
+    def _pipe(self, data):
+        read_descriptor, write_descriptor = os.pipe()
+        os.write(write_descriptor, data)
+        os.close(write_descriptor)
+        pipe = open(read_descriptor, 'rb')
+        self.pipes.append(pipe)
+        return pipe
 
-    def setup(self):
-        self.data_flow = [True, None, None, None, None, None, None]
-        self.data_out = [
-            bytes(b''), bytes(b'\n'), bytes(b'a'),
-            bytes(b't'), bytes(b'a'), bytes(b'd')
-        ]
-        self.data_err = [
-            bytes(b''), bytes(b'r'), bytes(b'o'),
-            bytes(b'r'), bytes(b'r'), bytes(b'e')
-        ]
-        self.flow = self.create_flow_method(self.poll)
-        self.flow_out_available = self.create_flow_method(self.outavailable)
-        self.flow_err_available = self.create_flow_method(self.erravailable)
-        self.flow_out = self.create_flow_method(self.outdata)
-        self.flow_err = self.create_flow_method(self.errdata)
+    def _command(self, output, error, returncode):
+        command = mock.Mock()
+        command.output = self._pipe(output)
+        command.error = self._pipe(error)
+        command.process.returncode = returncode
+        return command
 
     @patch('kiwi.command.Command')
     def test_returncode(self, mock_command):
@@ -64,43 +49,51 @@ class TestCommandProcess:
         match_method = CommandProcess(mock_command).create_match_method(
             self.fake_matcher
         )
-        process = CommandProcess(mock_command)
-        process.command.command.process.poll = self.flow
-        process.command.command.output_available = self.flow_out_available
-        process.command.command.error_available = self.flow_err_available
-        process.command.command.output.read = self.flow_out
-        process.command.command.error.read = self.flow_err
-        process.command.command.process.returncode = 0
+        process = CommandProcess(
+            self._command(b'data\n', b'error', 0)
+        )
         process.poll_show_progress(['a', 'b'], match_method)
         assert mock_log_debug.call_args_list == [
             call('%s: %s', 'system', 'data')
         ]
 
+    @patch('kiwi.logger.log.progress')
+    def test_poll_show_progress_indexed(self, mock_log_progress):
+        process = CommandProcess(
+            self._command(
+                b'Installing: a-1.0\nInstalling: c-1.0\n'
+                b'Installing: a-1.0\nInstalling: b-1.0\n', b'', 0
+            )
+        )
+        match_method = mock.Mock()
+        process.poll_show_progress(
+            ['a', 'b'], match_method, lambda line: line.split()[1][:-4]
+        )
+        assert not match_method.called
+        assert mock_log_progress.call_args_list == [
+            call(0, 100, '[ INFO    ]: Processing'),
+            call(1, 2, '[ INFO    ]: Processing'),
+            call(2, 2, '[ INFO    ]: Processing'),
+            call(100, 100, '[ INFO    ]: Processing')
+        ]
+
     @raises(KiwiCommandError)
     @patch('kiwi.command.Command')
     def test_poll_show_progress_raises(self, mock_command):
         match_method = CommandProcess(mock_command).create_match_method(
             self.fake_matcher
         )
-        process = CommandProcess(mock_command)
-        process.command.command.process.poll = self.flow
-        process.command.command.output_available = self.flow_out_available
-        process.command.command.error_available = self.flow_err_available
-        process.command.command.output.read = self.flow_out
-        process.command.command.error.read = self.flow_err
-        process.command.command.process.returncode = 1
+        process = CommandProcess(
+            self._command(b'data\n', b'error', 1)
+        )
         process.poll_show_progress(['a', 'b'], match_method)
 
     @patch('kiwi.command.Command')
     @patch('kiwi.logger.log.debug')
     def test_poll(self, mock_log_debug, mock_command):
-        process = CommandProcess(mock_command)
-        process.command.command.process.poll = self.flow
-        process.command.command.output_available = self.flow_out_available
-        process.command.command.error_available = self.flow_err_available
-        process.command.command.output.read = self.flow_out
-        process.command.command.error.read = self.flow_err
-        process.command.command.process.returncode = 0
+        process = CommandProcess(
+            self._command(b'data\n', b'error', 0)
+        )
         process.poll()
         assert mock_log_debug.call_args_list == [
             call('%s: %s', 'system', 'data')
@@ -109,26 +102,17 @@ class TestCommandProcess:
     @raises(KiwiCommandError)
     @patch('kiwi.command.Command')
     def test_poll_raises(self, mock_command):
-        process = CommandProcess(mock_command)
-        process.command.command.process.poll = self.flow
-        process.command.command.output_available = self.flow_out_available
-        process.command.command.error_available = self.flow_err_available
-        process.command.command.output.read = self.flow_out
-        process.command.command.error.read = self.flow_err
-        process.command.command.output.read.return_value = 'data'
-        process.command.command.process.returncode = 1
+        process = CommandProcess(
+            self._command(b'data\n', b'error', 1)
+        )
         process.poll()
 
     @patch('kiwi.command.Command')
     @patch('kiwi.logger.log.debug')
     def test_poll_and_watch(self, mock_log_debug, mock_command):
-        process = CommandProcess(mock_command)
-        process.command.command.process.poll = self.flow
-        process.command.command.output_available = self.flow_out_available
-        process.command.command.error_available = self.flow_err_available
-        process.command.command.output.read = self.flow_out
-        process.command.command.error.read = self.flow_err
-        process.command.command.process.returncode = 1
+        process = CommandProcess(
+            self._command(b'data\n', b'error', 1)
+        )
         result = process.poll_and_watch()
         call = mock_log_debug.call_args_list[0]
         assert mock_log_debug.call_args_list[0] == \
@@ -160,3 +144,14 @@ class TestCommandProcess:
     def test_command_iterator(self):
         iterator = CommandIterator(mock.Mock())
         assert iterator.__iter__() == iterator
+
+    def test_command_iterator_large_output(self):
+        command = self._command(
+            b'\n'.join([b'x' * 100] * 500) + b'\nlast', b'', 0
+        )
+        iterator = CommandIterator(command)
+        iterator.read_size = 4096
+        lines = list(iterator)
+        assert lines == ['x' * 100] * 500 + ['last']
+        assert iterator.get_error_output() == ''
+        command.process.wait.assert_called_once_with()
@@ -4,6 +4,7 @@ from collections import namedtuple
 import mock
 
 import os
+import subprocess
 
 from .test_helper import raises
 
@@ -17,7 +18,7 @@ from kiwi.command import Command
 class TestCommand:
     @raises(KiwiCommandError)
     @patch('kiwi.path.Path.which')
-    @patch('subprocess.Popen')
+    @patch('kiwi.command.ProfiledPopen')
     def test_run_raises_error(self, mock_popen, mock_which):
         mock_which.return_value = 'command'
         mock_process = mock.Mock()
@@ -30,7 +31,7 @@ class TestCommand:
 
     @raises(KiwiCommandError)
     @patch('kiwi.path.Path.which')
-    @patch('subprocess.Popen')
+    @patch('kiwi.command.ProfiledPopen')
     def test_run_failure(self, mock_popen, mock_which):
         mock_which.return_value = 'command'
         mock_popen.side_effect = KiwiCommandError('Run failure')
@@ -41,7 +42,7 @@ class TestCommand:
         Command.run(['command', 'args'], {'HOME': '/root'})
 
     @patch('kiwi.path.Path.which')
-    @patch('subprocess.Popen')
+    @patch('kiwi.command.ProfiledPopen')
     def test_run_does_not_raise_error(self, mock_popen, mock_which):
         mock_which.return_value = 'command'
         mock_process = mock.Mock()
@@ -64,7 +65,7 @@ class TestCommand:
 
     @patch('os.access')
     @patch('os.path.exists')
-    @patch('subprocess.Popen')
+    @patch('kiwi.command.ProfiledPopen')
     def test_run(self, mock_popen, mock_exists, mock_access):
         mock_exists.return_value = True
         command_run = namedtuple(
@@ -93,7 +94,7 @@ class TestCommand:
         Command.call(['does-not-exist'], os.environ)
 
     @patch('kiwi.path.Path.which')
-    @patch('subprocess.Popen')
+    @patch('kiwi.command.ProfiledPopen')
     @patch('select.select')
     def test_call(self, mock_select, mock_popen, mock_which):
         mock_which.return_value = 'command'
@@ -107,9 +108,20 @@ class TestCommand:
         assert call.error == mock_process.stderr
         assert call.process == mock_process
 
+    @patch('kiwi.path.Path.which')
+    @patch('kiwi.command.ProfiledPopen')
+    def test_call_error_file(self, mock_popen, mock_which):
+        mock_which.return_value = 'command'
+        error_file = mock.Mock()
+        Command.call(['command', 'args'], error_file=error_file)
+        mock_popen.assert_called_once_with(
+            ['command', 'args'], stdout=subprocess.PIPE,
+            stderr=error_file, env=os.environ
+        )
+
     @raises(KiwiCommandError)
     @patch('kiwi.path.Path.which')
-    @patch('subprocess.Popen')
+    @patch('kiwi.command.ProfiledPopen')
     def test_call_failure(self, mock_popen, mock_which):
         mock_which.return_value = 'command'
         mock_popen.side_effect = KiwiCommandError('Call failure')
@@ -41,6 +41,17 @@ class TestDefaults:
     def test_get_publisher(self):
         assert Defaults.get_publisher() == 'SUSE LINUX GmbH'
 
+    @patch('os.cpu_count')
+    def test_get_bundle_jobs(self, mock_cpu_count):
+        mock_cpu_count.return_value = 32
+        assert Defaults.get_bundle_jobs() == 4
+        mock_cpu_count.return_value = None
+        assert Defaults.get_bundle_jobs() == 1
+
+    def test_get_command_capabilities_cache_file(self):
+        assert Defaults.get_command_capabilities_cache_file() == \
+            '/var/tmp/kiwi/command_capabilities.json'
+
     def test_get_default_shared_cache_location(self):
         assert Defaults.get_shared_cache_location() == 'var/cache/kiwi'
 
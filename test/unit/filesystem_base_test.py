@@ -1,11 +1,19 @@
 
-from mock import patch
+import os
+import shutil
+from tempfile import mkdtemp
+from mock import (
+    patch, call
+)
 
 import mock
 
 from .test_helper import raises
 
-from kiwi.exceptions import KiwiFileSystemSyncError
+from kiwi.exceptions import (
+    KiwiCommandError,
+    KiwiFileSystemSyncError
+)
 from kiwi.filesystem.base import FileSystemBase
 
 
@@ -65,3 +73,207 @@ class TestFileSystemBase:
         self.fsbase.filesystem_mount = mock.Mock()
         self.fsbase.__del__()
         self.fsbase.filesystem_mount.umount.assert_called_once_with()
+
+
+class TestFileSystemBasePopulate:
+    def setup(self):
+        self.tmpdir = mkdtemp(prefix='kiwi_populate_test.')
+        self.root_dir = os.sep.join([self.tmpdir, 'root'])
+        for path in ['image', 'usr/bin', 'var/cache/kiwi']:
+            os.makedirs(os.sep.join([self.root_dir, path]))
+        for path in ['.profile', 'usr/bin/ls', 'var/cache/kiwi/data']:
+            with open(os.sep.join([self.root_dir, path]), 'w'):
+                pass
+        os.symlink('usr/bin', os.sep.join([self.root_dir, 'bin']))
+        os.chmod(os.sep.join([self.root_dir, 'usr']), 0o750)
+        os.utime(os.sep.join([self.root_dir, 'usr']), (42, 42))
+        self.filename = os.sep.join([self.tmpdir, 'image.ext4'])
+        self.fsbase = FileSystemBase(
+            None, self.root_dir + os.sep, {'create_options': ['-O', 'opt']}
+        )
+        self.fsbase._get_populate_command = mock.Mock(
+            side_effect=lambda source_dir, filename, label=None: [
+                'mkfs.ext4', '-d', source_dir, filename
+            ]
+        )
+        self.exclude = ['image', '.profile', '.kconfig', 'var/cache/kiwi']
+        self.mountinfo = [
+            '22 1 8:2 / / rw,relatime shared:1 - ext4 /dev/sda2 rw\n'
+        ]
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _get_tree(self, root_dir):
+        tree = []
+        for source_dir, dirnames, filenames in os.walk(root_dir):
+            for name in dirnames + filenames:
+                tree.append(
+                    os.path.relpath(os.sep.join([source_dir, name]), root_dir)
+                )
+        return sorted(tree)
+
+    def _patch_mountinfo(self, mock_open):
+        mock_open.return_value.__enter__.return_value = iter(self.mountinfo)
+
+    def test_get_populate_command(self):
+        assert FileSystemBase(None, 'root_dir')._get_populate_command(
+            'root_dir', 'myimage'
+        ) is None
+        assert FileSystemBase(None, self.root_dir).populate_on_file(
+            self.filename, 42
+        ) is False
+
+    def test_get_create_options(self):
+        assert self.fsbase._get_create_options('label') == [
+            '-O', 'opt', '-L', 'label'
+        ]
+        assert self.fsbase._get_create_options() == ['-O', 'opt']
+        assert self.fsbase.custom_args['create_options'] == ['-O', 'opt']
+
+    @raises(KiwiFileSystemSyncError)
+    def test_populate_on_file_root_dir_does_not_exist(self):
+        FileSystemBase(None, 'root_dir_not_existing').populate_on_file(
+            'myimage', 42
+        )
+
+    @patch('kiwi.filesystem.base.Path.which')
+    def test_populate_on_file_tool_not_found(self, mock_which):
+        mock_which.return_value = None
+        assert self.fsbase.populate_on_file(self.filename, 42) is False
+        assert not os.path.exists(self.filename)
+
+    @patch('kiwi.filesystem.base.Command.run')
+    @patch('kiwi.filesystem.base.Path.which')
+    def test_populate_on_file_mounts_below_root(self, mock_which, mock_run):
+        self.mountinfo.append(
+            '40 22 0:5 / {0}/proc\\040dir rw - proc proc rw\n'.format(
+                self.root_dir
+            )
+        )
+        with patch('builtins.open', create=True) as mock_open:
+            self._patch_mountinfo(mock_open)
+            assert self.fsbase._get_mountpoints_below_root() == [
+                self.root_dir + '/proc dir'
+            ]
+        with patch('builtins.open', create=True) as mock_open:
+            self._patch_mountinfo(mock_open)
+            assert self.fsbase.populate_on_file(self.filename, 42) is False
+        assert not mock_run.called
+
+    @patch('kiwi.logger.log.debug')
+    @patch('kiwi.filesystem.base.Command.run')
+    @patch('kiwi.filesystem.base.Path.which')
+    def test_populate_on_file_mount_table_not_readable(
+        self, mock_which, mock_run, mock_log_debug
+    ):
+        with patch('builtins.open', create=True) as mock_open:
+            mock_open.side_effect = OSError('no proc')
+            assert self.fsbase.populate_on_file(self.filename, 42) is False
+        assert mock_log_debug.called
+        assert not mock_run.called
+
+    @patch('kiwi.filesystem.base.Command.run')
+    @patch('kiwi.filesystem.base.Path.which')
+    def test_populate_on_file(self, mock_which, mock_run):
+        root_tree = self._get_tree(self.root_dir)
+        populated = {}
+
+        def populate(command):
+            staging_dir = command[2]
+            populated['tree'] = self._get_tree(staging_dir)
+            populated['usr'] = os.stat(os.sep.join([staging_dir, 'usr']))
+            populated['ls'] = os.stat(
+                os.sep.join([staging_dir, 'usr/bin/ls'])
+            )
+
+        mock_run.side_effect = populate
+        with patch.object(
+            self.fsbase, '_get_mountpoints_below_root', return_value=[]
+        ):
+            assert self.fsbase.populate_on_file(
+                self.filename, 2, 'label', self.exclude
+            ) is True
+        staging_dir = mock_run.call_args[0][0][2]
+        assert self.fsbase._get_populate_command.call_args_list == [
+            call(self.root_dir + os.sep, self.filename, 'label'),
+            call(staging_dir, self.filename, 'label')
+        ]
+        assert os.path.dirname(staging_dir) == self.tmpdir
+        assert populated['tree'] == [
+            'bin', 'usr', 'usr/bin', 'usr/bin/ls', 'var', 'var/cache'
+        ]
+        assert populated['usr'].st_mode & 0o7777 == 0o750
+        assert populated['usr'].st_mtime == 42
+        assert populated['ls'].st_ino == os.stat(
+            os.sep.join([self.root_dir, 'usr/bin/ls'])
+        ).st_ino
+        assert os.path.getsize(self.filename) == 2097152
+        assert self._get_tree(self.root_dir) == root_tree
+        assert sorted(os.listdir(self.tmpdir)) == ['image.ext4', 'root']
+
+    @patch('kiwi.logger.log.info')
+    @patch('kiwi.filesystem.base.Command.run')
+    @patch('kiwi.filesystem.base.Path.which')
+    def test_populate_on_file_nothing_excluded(
+        self, mock_which, mock_run, mock_log_info
+    ):
+        with patch.object(
+            self.fsbase, '_get_mountpoints_below_root', return_value=[]
+        ):
+            assert self.fsbase.populate_on_file(
+                self.filename, 2, exclude=['.kconfig']
+            ) is True
+        mock_run.assert_called_once_with(
+            ['mkfs.ext4', '-d', self.root_dir + os.sep, self.filename]
+        )
+        mock_log_info.assert_called_once_with(
+            '--> Populated filesystem in %s', self.filename
+        )
+
+    @patch('kiwi.logger.log.warning')
+    @patch('kiwi.filesystem.base.Command.run')
+    @patch('kiwi.filesystem.base.Path.which')
+    def test_populate_on_file_failed(
+        self, mock_which, mock_run, mock_log_warning
+    ):
+        root_tree = self._get_tree(self.root_dir)
+        mock_run.side_effect = KiwiCommandError('mkfs.ext4: no space')
+        with patch.object(
+            self.fsbase, '_get_mountpoints_below_root', return_value=[]
+        ):
+            assert self.fsbase.populate_on_file(
+                self.filename, 2, exclude=self.exclude
+            ) is False
+        assert mock_log_warning.called
+        assert self._get_tree(self.root_dir) == root_tree
+        assert sorted(os.listdir(self.tmpdir)) == ['image.ext4', 'root']
+
+    @patch('kiwi.filesystem.base.Command.run')
+    @patch('kiwi.filesystem.base.Path.which')
+    def test_populate_on_file_staging_failed(self, mock_which, mock_run):
+        root_tree = self._get_tree(self.root_dir)
+        with patch.object(
+            self.fsbase, '_get_mountpoints_below_root', return_value=[]
+        ):
+            with patch('os.link', side_effect=OSError('cross device')):
+                assert self.fsbase.populate_on_file(
+                    self.filename, 2, exclude=self.exclude
+                ) is False
+        assert not mock_run.called
+        assert self._get_tree(self.root_dir) == root_tree
+        assert os.listdir(self.tmpdir) == ['root']
+
+    def test_create_staging_tree_walk_failed(self):
+        def walk(top, onerror):
+            onerror(OSError('permission denied'))
+
+        with patch('os.walk', side_effect=walk):
+            assert self.fsbase._create_staging_tree(set()) is None
+        assert os.listdir(self.tmpdir) == ['root']
+
+    def test_get_excluded_entries(self):
+        assert self.fsbase._get_excluded_entries(None) == set()
+        assert self.fsbase._get_excluded_entries(
+            ['.kconfig', 'var/cache/*']
+        ) == set([os.sep.join([self.root_dir, 'var/cache/kiwi'])])
@@ -24,3 +24,10 @@ class TestFileSystemBtrfs:
         call = mock_command.call_args_list[0]
         assert mock_command.call_args_list[0] == \
             call(['mkfs.btrfs', '-L', 'label', '/dev/foo'])
+
+    def test_get_populate_command(self):
+        assert self.btrfs._get_populate_command(
+            'root_dir', 'myimage', 'label'
+        ) == [
+            'mkfs.btrfs', '-L', 'label', '--rootdir', 'root_dir', 'myimage'
+        ]
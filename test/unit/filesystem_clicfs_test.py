@@ -30,6 +30,7 @@ class TestFileSystemClicFs:
         )
         mock_size.return_value = size
         filesystem = mock.Mock()
+        filesystem.populate_on_file.return_value = False
         mock_ext4.return_value = filesystem
         loop_provider = mock.Mock()
         mock_loop.return_value = loop_provider
@@ -43,8 +44,12 @@ class TestFileSystemClicFs:
             'tmpdir/fsdata.ext4', 42
         )
         loop_provider.create.assert_called_once_with()
-        mock_ext4.assert_called_once_with(
-            loop_provider, 'root_dir'
+        assert mock_ext4.call_args_list == [
+            call(None, 'root_dir'),
+            call(loop_provider, 'root_dir')
+        ]
+        filesystem.populate_on_file.assert_called_once_with(
+            'tmpdir/fsdata.ext4', 42
         )
         filesystem.create_on_device.assert_called_once_with()
         assert mock_command.call_args_list == [
@@ -56,6 +61,38 @@ class TestFileSystemClicFs:
             )
         ]
 
+    @patch('kiwi.filesystem.clicfs.Command.run')
+    @patch('kiwi.filesystem.clicfs.mkdtemp')
+    @patch('kiwi.filesystem.clicfs.LoopDevice')
+    @patch('kiwi.filesystem.clicfs.FileSystemExt4')
+    @patch('kiwi.filesystem.clicfs.SystemSize')
+    def test_create_on_file_populated(
+        self, mock_size, mock_ext4, mock_loop, mock_dtemp, mock_command
+    ):
+        mock_size.return_value.customize.return_value = 42
+        filesystem = mock.Mock()
+        filesystem.populate_on_file.return_value = True
+        mock_ext4.return_value = filesystem
+        mock_dtemp.return_value = 'tmpdir'
+
+        self.clicfs.create_on_file('myimage', 'label')
+
+        mock_ext4.assert_called_once_with(None, 'root_dir')
+        filesystem.populate_on_file.assert_called_once_with(
+            'tmpdir/fsdata.ext4', 42
+        )
+        assert not mock_loop.called
+        assert not filesystem.sync_data.called
+        assert mock_command.call_args_list == [
+            call(
+                ['resize2fs', '-f', 'tmpdir/fsdata.ext4', '-M']
+            ),
+            call(
+                ['mkclicfs', 'tmpdir/fsdata.ext4', 'myimage']
+            )
+        ]
+        self.clicfs.container_dir = None
+
     @patch('kiwi.filesystem.clicfs.Path.wipe')
     def test_destructor(self, mock_wipe):
         self.clicfs.container_dir = 'tmpdir'
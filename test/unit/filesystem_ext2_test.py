@@ -24,3 +24,10 @@ class TestFileSystemExt2:
         call = mock_command.call_args_list[0]
         assert mock_command.call_args_list[0] == \
             call(['mkfs.ext2', '-L', 'label', '/dev/foo'])
+
+    def test_get_populate_command(self):
+        assert self.ext2._get_populate_command(
+            'root_dir', 'myimage', 'label'
+        ) == [
+            'mkfs.ext2', '-L', 'label', '-d', 'root_dir', 'myimage'
+        ]
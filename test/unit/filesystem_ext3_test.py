@@ -24,3 +24,10 @@ class TestFileSystemExt3:
         call = mock_command.call_args_list[0]
         assert mock_command.call_args_list[0] == \
             call(['mkfs.ext3', '-L', 'label', '/dev/foo'])
+
+    def test_get_populate_command(self):
+        assert self.ext3._get_populate_command(
+            'root_dir', 'myimage', 'label'
+        ) == [
+            'mkfs.ext3', '-L', 'label', '-d', 'root_dir', 'myimage'
+        ]
@@ -1,8 +1,14 @@
+import os
+import shutil
+from tempfile import mkdtemp
+
 from mock import patch
 
 import mock
 
-from kiwi.filesystem.squashfs import FileSystemSquashFs
+from kiwi.filesystem.squashfs import (
+    FileSystemSquashFs, squashfs_profile_type
+)
 
 
 class TestFileSystemSquashfs:
@@ -10,39 +16,226 @@ class TestFileSystemSquashfs:
     def setup(self, mock_exists):
         mock_exists.return_value = True
         self.squashfs = FileSystemSquashFs(mock.Mock(), 'root_dir')
+        self.runtime_config = mock.Mock()
+        self.runtime_config.get_squashfs_compression.return_value = 'xz'
+        self.runtime_config.get_squashfs_compression_level.return_value = \
+            None
+        self.runtime_config.get_squashfs_processors.return_value = None
+        self.runtime_config.get_squashfs_memory.return_value = None
+        self.runtime_config.get_squashfs_access_list.return_value = None
+        self.tmpdir = mkdtemp(prefix='kiwi_squashfs.')
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
 
+    @patch('os.sched_getaffinity')
+    @patch('kiwi.filesystem.squashfs.RuntimeConfig')
     @patch('platform.machine')
     @patch('kiwi.filesystem.squashfs.Command.run')
-    def test_create_on_file(self, mock_command, mock_machine):
+    def test_create_on_file(
+        self, mock_command, mock_machine, mock_RuntimeConfig,
+        mock_sched_getaffinity
+    ):
+        mock_RuntimeConfig.return_value = self.runtime_config
+        mock_sched_getaffinity.return_value = {0, 1, 2, 3}
         mock_machine.return_value = 'x86_64'
         self.squashfs.create_on_file('myimage', 'label')
         mock_command.assert_called_once_with(
             [
                 'mksquashfs', 'root_dir', 'myimage', '-noappend',
-                '-b', '1M', '-comp', 'xz', '-Xbcj', 'x86'
+                '-b', '1M', '-comp', 'xz', '-Xbcj', 'x86',
+                '-processors', '4'
             ]
         )
 
+    @patch('os.sched_getaffinity')
+    @patch('kiwi.filesystem.squashfs.RuntimeConfig')
     @patch('platform.machine')
     @patch('kiwi.filesystem.squashfs.Command.run')
-    def test_create_on_file_exclude_data(self, mock_command, mock_machine):
+    def test_create_on_file_exclude_data(
+        self, mock_command, mock_machine, mock_RuntimeConfig,
+        mock_sched_getaffinity
+    ):
+        mock_RuntimeConfig.return_value = self.runtime_config
+        mock_sched_getaffinity.return_value = {0, 1, 2, 3}
         mock_machine.return_value = 'ppc64le'
         self.squashfs.create_on_file('myimage', 'label', ['foo'])
         mock_command.assert_called_once_with(
             [
                 'mksquashfs', 'root_dir', 'myimage', '-noappend',
-                '-b', '1M', '-comp', 'xz', '-Xbcj', 'powerpc', '-e', 'foo'
+                '-b', '1M', '-comp', 'xz', '-Xbcj', 'powerpc',
+                '-processors', '4', '-e', 'foo'
             ]
         )
 
+    @patch('os.sched_getaffinity')
+    @patch('kiwi.filesystem.squashfs.RuntimeConfig')
     @patch('platform.machine')
     @patch('kiwi.filesystem.squashfs.Command.run')
-    def test_create_on_file_unkown_arch(self, mock_command, mock_machine):
+    def test_create_on_file_unkown_arch(
+        self, mock_command, mock_machine, mock_RuntimeConfig,
+        mock_sched_getaffinity
+    ):
+        mock_RuntimeConfig.return_value = self.runtime_config
+        mock_sched_getaffinity.return_value = {0, 1, 2, 3}
         mock_machine.return_value = 'aarch64'
         self.squashfs.create_on_file('myimage', 'label')
         mock_command.assert_called_once_with(
             [
                 'mksquashfs', 'root_dir', 'myimage',
-                '-noappend', '-b', '1M', '-comp', 'xz'
+                '-noappend', '-b', '1M', '-comp', 'xz',
+                '-processors', '4'
             ]
         )
+
+    @patch('platform.machine')
+    @patch('kiwi.filesystem.squashfs.Command.run')
+    def test_create_on_file_with_profile(self, mock_command, mock_machine):
+        mock_machine.return_value = 'x86_64'
+        access_list = os.sep.join([self.tmpdir, 'access.list'])
+        with open(access_list, 'w') as access:
+            access.write('/usr/bin/bash\n')
+        os.makedirs(os.sep.join([self.tmpdir, 'usr', 'bin']))
+        with open(os.sep.join([self.tmpdir, 'usr', 'bin', 'bash']), 'w'):
+            pass
+        squashfs = FileSystemSquashFs(
+            device_provider=None, root_dir=self.tmpdir, custom_args={
+                'profile': squashfs_profile_type(
+                    compression='zstd', level=19, processors=2,
+                    memory=512 * 1048576, access_list=access_list
+                )
+            }
+        )
+        squashfs.create_on_file('myimage')
+        mock_command.assert_called_once_with(
+            [
+                'mksquashfs', self.tmpdir, 'myimage', '-noappend',
+                '-b', '1M', '-comp', 'zstd', '-Xcompression-level', '19',
+                '-processors', '2', '-mem', '512M',
+                '-sort', squashfs.sort_file.name
+            ]
+        )
+        with open(squashfs.sort_file.name) as sortfile:
+            assert sortfile.read() == 'usr/bin/bash 32767\n'
+
+    @patch('kiwi.filesystem.squashfs.Command.run')
+    def test_create_on_file_with_create_options(self, mock_command):
+        squashfs = FileSystemSquashFs(
+            device_provider=None, root_dir='root_dir', custom_args={
+                'create_options': [
+                    '-comp', 'lz4', '-processors', '1', '-mem', '1G',
+                    '-sort', 'sortfile'
+                ],
+                'profile': squashfs_profile_type(
+                    compression='zstd', level=19, processors=2,
+                    memory=512 * 1048576, access_list='access.list'
+                )
+            }
+        )
+        squashfs.create_on_file('myimage')
+        mock_command.assert_called_once_with(
+            [
+                'mksquashfs', 'root_dir', 'myimage', '-noappend',
+                '-b', '1M', '-comp', 'lz4', '-processors', '1',
+                '-mem', '1G', '-sort', 'sortfile'
+            ]
+        )
+
+    @patch('kiwi.filesystem.squashfs.Command.run')
+    def test_create_on_file_empty_sort_file(self, mock_command):
+        access_list = os.sep.join([self.tmpdir, 'access.list'])
+        with open(access_list, 'w') as access:
+            access.write('/usr/bin/bash\n')
+        squashfs = FileSystemSquashFs(
+            device_provider=None, root_dir=self.tmpdir, custom_args={
+                'profile': squashfs_profile_type(
+                    compression='lz4', level=9, processors=2,
+                    memory=None, access_list=access_list
+                )
+            }
+        )
+        squashfs.create_on_file('myimage')
+        mock_command.assert_called_once_with(
+            [
+                'mksquashfs', self.tmpdir, 'myimage', '-noappend',
+                '-b', '1M', '-comp', 'lz4', '-Xhc', '-processors', '2'
+            ]
+        )
+
+    @patch('os.sched_getaffinity')
+    @patch('kiwi.filesystem.squashfs.RuntimeConfig')
+    def test_get_profile(self, mock_RuntimeConfig, mock_sched_getaffinity):
+        mock_RuntimeConfig.return_value = self.runtime_config
+        mock_sched_getaffinity.return_value = {0, 1, 2, 3}
+        self.runtime_config.get_squashfs_compression.return_value = 'gzip'
+        self.runtime_config.get_squashfs_compression_level.return_value = 9
+        self.runtime_config.get_squashfs_processors.return_value = 2
+        self.runtime_config.get_squashfs_memory.return_value = 1048576
+        self.runtime_config.get_squashfs_access_list.return_value = \
+            'access.list'
+        assert FileSystemSquashFs.get_profile() == squashfs_profile_type(
+            compression='gzip', level=9, processors=2, memory=1048576,
+            access_list='access.list'
+        )
+        assert FileSystemSquashFs.get_profile(
+            compression='zstd', processors=0
+        ) == squashfs_profile_type(
+            compression='zstd', level=None, processors=4, memory=1048576,
+            access_list='access.list'
+        )
+
+    @patch('kiwi.logger.log.warning')
+    @patch('os.sysconf')
+    @patch('os.sched_getaffinity')
+    @patch('kiwi.filesystem.squashfs.RuntimeConfig')
+    def test_get_profile_host_limits(
+        self, mock_RuntimeConfig, mock_sched_getaffinity, mock_sysconf,
+        mock_log_warning
+    ):
+        mock_RuntimeConfig.return_value = self.runtime_config
+        mock_sched_getaffinity.return_value = {0, 1}
+        mock_sysconf.side_effect = lambda name: {
+            'SC_PAGE_SIZE': 4096, 'SC_PHYS_PAGES': 1024
+        }[name]
+        assert FileSystemSquashFs.get_profile(
+            compression='xz', level=9, processors=64, memory=4194304
+        ) == squashfs_profile_type(
+            compression='xz', level=None, processors=2, memory=2097152,
+            access_list=None
+        )
+        assert mock_log_warning.call_args_list == [
+            mock.call('Skipping unsupported xz compression level: 9'),
+            mock.call('Limiting squashfs memory to 2097152 bytes')
+        ]
+
+    @patch('kiwi.logger.log.debug')
+    def test_create_sort_file(self, mock_log_debug):
+        root_dir = os.sep.join([self.tmpdir, 'root'])
+        os.makedirs(os.sep.join([root_dir, 'usr', 'bin']))
+        for name in ['bash', 'ls', 'my file']:
+            with open(os.sep.join([root_dir, 'usr', 'bin', name]), 'w'):
+                pass
+        os.symlink('bash', os.sep.join([root_dir, 'usr', 'bin', 'sh']))
+        access_list = os.sep.join([self.tmpdir, 'access.list'])
+        with open(access_list, 'w') as access:
+            access.write(
+                '# recorded on first boot\n'
+                '/usr/bin/sh\n'
+                '/usr/bin/bash\n'
+                '\n'
+                '/usr\n'
+                '/usr/bin/missing\n'
+                '/usr/bin/my file\n'
+                '/usr/bin/bash\n'
+                'usr/bin/ls\n'
+            )
+        sort_file = os.sep.join([self.tmpdir, 'sortfile'])
+        with patch.object(FileSystemSquashFs, 'max_sort_priority', 2):
+            assert FileSystemSquashFs.create_sort_file(
+                root_dir, access_list, sort_file
+            ) == 2
+        with open(sort_file) as sortfile:
+            assert sortfile.read() == 'usr/bin/bash 2\nusr/bin/ls 1\n'
+        mock_log_debug.assert_called_once_with(
+            'Skipping access list entry with whitespace: usr/bin/my file'
+        )
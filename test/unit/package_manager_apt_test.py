@@ -87,8 +87,10 @@ class TestPackageManagerApt:
     @patch('kiwi.command.Command.run')
     @patch('os.path.exists')
     @patch('kiwi.package_manager.apt.DataSync')
+    @patch('kiwi.package_manager.apt.Path.wipe')
     def test_process_install_requests_bootstrap(
-        self, mock_sync, mock_exists, mock_run, mock_call, mock_warn
+        self, mock_wipe, mock_sync, mock_exists, mock_run, mock_call,
+        mock_warn
     ):
         self.manager.request_package('apt-get')
         self.manager.request_package('vim')
@@ -119,9 +121,6 @@ class TestPackageManagerApt:
                     'chroot', 'root-dir', 'apt-key', 'add', 'key-file.asc'
                 ], ['env']
             ),
-            call(
-                ['rm', '-r', '-f', 'root-dir.debootstrap']
-            ),
             call(
                 [
                     'chroot', 'root-dir', 'apt-get',
@@ -129,6 +128,7 @@ class TestPackageManagerApt:
                 ], ['env']
             )
         ]
+        mock_wipe.assert_called_once_with('root-dir.debootstrap')
         mock_call.assert_called_once_with([
             'chroot', 'root-dir', 'apt-get',
             'root-moved-arguments', 'install', 'vim'],
@@ -206,3 +206,16 @@ class TestPackageManagerApt:
 
     def test_match_package_deleted(self):
         assert self.manager.match_package_deleted('foo', 'Removing foo')
+
+    def test_get_installed_package_name(self):
+        assert self.manager.get_installed_package_name(
+            'Unpacking libc6:amd64 (2.36-9) ...'
+        ) == 'libc6'
+        assert self.manager.get_installed_package_name(
+            'Setting up libc6:amd64 (2.36-9) ...'
+        ) is None
+
+    def test_get_deleted_package_name(self):
+        assert self.manager.get_deleted_package_name(
+            'Removing vim (2:9.0-1) ...'
+        ) == 'vim'
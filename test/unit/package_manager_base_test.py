@@ -68,6 +68,14 @@ class TestPackageManagerBase:
     def test_match_package_deleted(self):
         self.manager.match_package_deleted('package_name', 'log')
 
+    @raises(NotImplementedError)
+    def test_get_installed_package_name(self):
+        self.manager.get_installed_package_name('log')
+
+    @raises(NotImplementedError)
+    def test_get_deleted_package_name(self):
+        self.manager.get_deleted_package_name('log')
+
     def test_database_consistent(self):
         self.manager.database_consistent()
 
@@ -151,6 +151,19 @@ class TestPackageManagerDnf:
     def test_match_package_deleted(self):
         assert self.manager.match_package_deleted('foo', 'Removing: foo')
 
+    def test_get_installed_package_name(self):
+        assert self.manager.get_installed_package_name(
+            '  Installing  : vim-minimal-2:9.0.1-1.fc38.x86_64    1/5'
+        ) == 'vim-minimal'
+        assert self.manager.get_installed_package_name(
+            '  Verifying   : vim-minimal-2:9.0.1-1.fc38.x86_64    1/5'
+        ) is None
+
+    def test_get_deleted_package_name(self):
+        assert self.manager.get_deleted_package_name(
+            'Removing: foo-1.2-3.x86_64'
+        ) == 'foo'
+
     @patch('kiwi.package_manager.dnf.RpmDataBase')
     def test_post_process_install_requests_bootstrap(self, mock_RpmDataBase):
         rpmdb = mock.Mock()
@@ -147,6 +147,19 @@ class TestPackageManagerZypper:
     def test_match_package_deleted(self):
         assert self.manager.match_package_deleted('foo', 'Removing: foo')
 
+    def test_get_installed_package_name(self):
+        assert self.manager.get_installed_package_name(
+            '(12/42) Installing: vim-data-9.0.1572-1.1.noarch ..[done]'
+        ) == 'vim-data'
+        assert self.manager.get_installed_package_name(
+            'Retrieving: vim-data-9.0.1572-1.1.noarch.rpm'
+        ) is None
+
+    def test_get_deleted_package_name(self):
+        assert self.manager.get_deleted_package_name(
+            'Removing: foo-1.2-3.x86_64'
+        ) == 'foo'
+
     @patch('kiwi.package_manager.zypper.RpmDataBase')
     def test_post_process_install_requests_bootstrap(self, mock_RpmDataBase):
         rpmdb = mock.Mock()
@@ -1,7 +1,9 @@
 from mock import patch, call
 from pytest import raises
+from tempfile import mkdtemp
 
 import os
+import shutil
 
 from kiwi.path import Path
 from kiwi.exceptions import KiwiFileAccessError
@@ -14,39 +16,169 @@ class TestPath:
         )
         assert ordered == ['usr', 'etc', 'usr/bin', 'usr/lib']
 
-    @patch('kiwi.command.Command.run')
-    def test_create(self, mock_command):
-        Path.create('foo')
-        mock_command.assert_called_once_with(
-            ['mkdir', '-p', 'foo']
-        )
+    def setup(self):
+        self.tmpdir = mkdtemp(prefix='kiwi_path_test.')
 
-    @patch('kiwi.command.Command.run')
-    def test_wipe(self, mock_command):
-        Path.wipe('foo')
-        mock_command.assert_called_once_with(
-            ['rm', '-r', '-f', 'foo']
-        )
+    def teardown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _create_tree(self, root):
+        for directory in ['a/b/c', 'a/d', 'e']:
+            os.makedirs(os.sep.join([root, directory]))
+        for filename in ['file', 'a/file', 'a/b/c/file', 'a/d/file']:
+            with open(os.sep.join([root, filename]), 'w') as data:
+                data.write('data')
+        os.symlink('/', os.sep.join([root, 'a/root_link']))
+        os.symlink('file', os.sep.join([root, 'a/b/link']))
+
+    def test_create(self):
+        path = os.sep.join([self.tmpdir, 'foo/bar'])
+        Path.create(path)
+        assert os.path.isdir(path)
+        Path.create(path)
+        assert os.path.isdir(path)
+
+    def test_create_raises(self):
+        path = os.sep.join([self.tmpdir, 'file'])
+        open(path, 'w').close()
+        with raises(KiwiFileAccessError):
+            Path.create(path + '/foo')
+
+    def test_wipe(self):
+        path = os.sep.join([self.tmpdir, 'tree'])
+        self._create_tree(path)
+        Path.wipe(path)
+        assert os.listdir(self.tmpdir) == []
+        Path.wipe(path)
+
+    def test_wipe_file(self):
+        path = os.sep.join([self.tmpdir, 'file'])
+        open(path, 'w').close()
+        os.symlink(self.tmpdir, path + '.link')
+        Path.wipe(path + '.link')
+        Path.wipe(path)
+        assert os.listdir(self.tmpdir) == []
+
+    @patch('os.unlink')
+    def test_wipe_file_raises(self, mock_unlink):
+        path = os.sep.join([self.tmpdir, 'file'])
+        open(path, 'w').close()
+        mock_unlink.side_effect = FileNotFoundError
+        Path.wipe(path)
+        mock_unlink.side_effect = PermissionError
+        with raises(KiwiFileAccessError):
+            Path.wipe(path)
 
-    @patch('kiwi.command.Command.run')
-    def test_remove(self, mock_command):
-        Path.remove('foo')
-        mock_command.assert_called_once_with(
-            ['rmdir', 'foo']
+    @patch('os.lstat')
+    def test_wipe_lstat_raises(self, mock_lstat):
+        mock_lstat.side_effect = PermissionError
+        with raises(KiwiFileAccessError):
+            Path.wipe('foo')
+
+    @patch('os.unlink')
+    @patch('os.rmdir')
+    def test_wipe_raises(self, mock_rmdir, mock_unlink):
+        path = os.sep.join([self.tmpdir, 'tree'])
+        self._create_tree(path)
+        mock_unlink.side_effect = PermissionError('unlink failed')
+        mock_rmdir.side_effect = FileNotFoundError
+        with raises(KiwiFileAccessError) as issue:
+            Path.wipe(path)
+        assert '6 error(s), first: unlink failed' in format(issue.value)
+
+    @patch('os.scandir')
+    def test_wipe_scan_raises(self, mock_scandir):
+        path = os.sep.join([self.tmpdir, 'tree'])
+        os.makedirs(path)
+        mock_scandir.side_effect = FileNotFoundError
+        Path.wipe(path)
+        assert os.listdir(self.tmpdir) == []
+        os.makedirs(path)
+        mock_scandir.side_effect = PermissionError
+        with raises(KiwiFileAccessError):
+            Path.wipe(path)
+
+    @patch('os.unlink')
+    def test_wipe_concurrently_removed(self, mock_unlink):
+        path = os.sep.join([self.tmpdir, 'tree'])
+        os.makedirs(path)
+        open(path + '/file', 'w').close()
+        mock_unlink.side_effect = FileNotFoundError
+        with raises(KiwiFileAccessError):
+            # rmdir of the not really removed file content fails
+            Path.wipe(path)
+
+    def test_wipe_background(self):
+        path = os.sep.join([self.tmpdir, 'tree'])
+        self._create_tree(path)
+        Path.wipe(path, background=True)
+        assert not os.path.exists(path)
+        Path.wait_for_background_wipes()
+        assert os.listdir(self.tmpdir) == []
+        assert Path.background_wipes == []
+
+    @patch('kiwi.path.Path._wipe_tree')
+    @patch('kiwi.logger.log.warning')
+    def test_wipe_background_raises(self, mock_log_warn, mock_wipe_tree):
+        path = os.sep.join([self.tmpdir, 'tree'])
+        os.makedirs(path)
+        mock_wipe_tree.side_effect = KiwiFileAccessError('wipe failed')
+        Path.wipe(path, background=True)
+        Path.wait_for_background_wipes()
+        mock_log_warn.assert_called_once_with(
+            'Background wipe failed: wipe failed'
         )
 
-    @patch('kiwi.command.Command.run')
+    @patch('os.rename')
+    def test_wipe_background_rename_fails(self, mock_rename):
+        path = os.sep.join([self.tmpdir, 'tree'])
+        self._create_tree(path)
+        mock_rename.side_effect = OSError('Device or resource busy')
+        Path.wipe(path, background=True)
+        assert os.listdir(self.tmpdir) == []
+
+    @patch('kiwi.path.Path.background_workers')
+    def test_wipe_background_at_shutdown(self, mock_workers):
+        path = os.sep.join([self.tmpdir, 'tree'])
+        self._create_tree(path)
+        mock_workers.submit.side_effect = RuntimeError
+        Path.wipe(path, background=True)
+        assert os.listdir(self.tmpdir) == []
+
+    def test_remove(self):
+        path = os.sep.join([self.tmpdir, 'foo'])
+        os.mkdir(path)
+        Path.remove(path)
+        assert not os.path.exists(path)
+        with raises(KiwiFileAccessError):
+            Path.remove(path)
+
+    @patch('os.rmdir')
     @patch('kiwi.logger.log.warning')
-    def test_remove_hierarchy(self, mock_log_warn, mock_command):
+    def test_remove_hierarchy(self, mock_log_warn, mock_rmdir):
         Path.remove_hierarchy('/my_root/tmp/foo/bar')
-        assert mock_command.call_args_list == [
-            call(['rmdir', '--ignore-fail-on-non-empty', '/my_root/tmp/foo/bar']),
-            call(['rmdir', '--ignore-fail-on-non-empty', '/my_root/tmp/foo'])
+        assert mock_rmdir.call_args_list == [
+            call('/my_root/tmp/foo/bar'),
+            call('/my_root/tmp/foo')
         ]
         mock_log_warn.assert_called_once_with(
             'remove_hierarchy: path /my_root/tmp is protected'
         )
 
+    @patch('kiwi.logger.log.warning')
+    def test_remove_hierarchy_not_empty(self, mock_log_warn):
+        path = os.sep.join([self.tmpdir, 'tmp/foo/bar/baz'])
+        os.makedirs(path)
+        open(os.sep.join([self.tmpdir, 'tmp/foo/file']), 'w').close()
+        Path.remove_hierarchy(path)
+        assert os.listdir(os.sep.join([self.tmpdir, 'tmp/foo'])) == ['file']
+
+    def test_remove_hierarchy_raises(self):
+        with raises(KiwiFileAccessError):
+            Path.remove_hierarchy(
+                os.sep.join([self.tmpdir, 'does-not-exist'])
+            )
+
     @patch('os.access')
     @patch('os.environ.get')
     @patch('os.path.exists')
@@ -69,6 +201,26 @@ class TestPath:
         assert Path.which('some-file', custom_env={'PATH': 'custom_path'}) == \
             'custom_path/some-file'
 
+    @patch('os.access')
+    @patch('os.environ.get')
+    @patch('os.path.exists')
+    def test_which_cached(self, mock_exists, mock_env, mock_access):
+        mock_env.return_value = '/usr/local/bin:/usr/bin:/bin'
+        mock_exists.side_effect = lambda path: path == '/bin/cached-file'
+        assert Path.which('cached-file') == '/bin/cached-file'
+        assert mock_exists.call_count == 3
+        assert Path.which('cached-file') == '/bin/cached-file'
+        assert mock_exists.call_count == 4
+        mock_access.return_value = False
+        assert Path.which('cached-file', access_mode=os.X_OK) is None
+        mock_access.return_value = True
+        assert Path.which('cached-file', access_mode=os.X_OK) == \
+            '/bin/cached-file'
+        mock_access.return_value = False
+        assert Path.which('cached-file', access_mode=os.X_OK) is None
+        mock_exists.side_effect = lambda path: False
+        assert Path.which('cached-file') is None
+
     @patch('os.access')
     @patch('os.environ.get')
     @patch('os.path.exists')
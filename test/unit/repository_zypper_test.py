@@ -12,9 +12,10 @@ from kiwi.exceptions import KiwiCommandError
 
 class TestRepositoryZypper:
     @patch('kiwi.command.Command.run')
+    @patch('kiwi.repository.zypper.Path.create')
     @patch('kiwi.repository.zypper.NamedTemporaryFile')
     @patch_open
-    def setup(self, mock_open, mock_temp, mock_command):
+    def setup(self, mock_open, mock_temp, mock_create, mock_command):
         self.context_manager_mock = mock.Mock()
         self.file_mock = mock.Mock()
         self.enter_mock = mock.Mock()
@@ -37,20 +38,22 @@ class TestRepositoryZypper:
         )
 
     @patch('kiwi.command.Command.run')
+    @patch('kiwi.repository.zypper.Path.create')
     @patch('kiwi.repository.zypper.NamedTemporaryFile')
     @patch_open
     def test_custom_args_init_excludedocs(
-        self, mock_open, mock_temp, mock_command
+        self, mock_open, mock_temp, mock_create, mock_command
     ):
         self.repo = RepositoryZypper(self.root_bind)
         assert self.repo.custom_args == []
 
     @patch('kiwi.command.Command.run')
+    @patch('kiwi.repository.zypper.Path.create')
     @patch('kiwi.repository.zypper.NamedTemporaryFile')
     @patch('kiwi.repository.zypper.ConfigParser')
     @patch_open
     def test_custom_args_init_check_signatures(
-        self, mock_open, mock_config, mock_temp, mock_command
+        self, mock_open, mock_config, mock_temp, mock_create, mock_command
     ):
         runtime_zypp_config = mock.Mock()
         mock_config.return_value = runtime_zypp_config
@@ -353,19 +356,16 @@ class TestRepositoryZypper:
             call('../data/shared-dir/zypper/repos/spam')
         ]
 
-    @patch('kiwi.command.Command.run')
-    def test_delete_all_repos(self, mock_command):
+    @patch('kiwi.repository.zypper.Path.wipe')
+    @patch('kiwi.repository.zypper.Path.create')
+    def test_delete_all_repos(self, mock_create, mock_wipe):
         self.repo.delete_all_repos()
-        call = mock_command.call_args_list[0]
-        assert mock_command.call_args_list[0] == \
-            call([
-                'rm', '-r', '-f', '../data/shared-dir/zypper/repos'
-            ])
-        call = mock_command.call_args_list[1]
-        assert mock_command.call_args_list[1] == \
-            call([
-                'mkdir', '-p', '../data/shared-dir/zypper/repos'
-            ])
+        mock_wipe.assert_called_once_with(
+            '../data/shared-dir/zypper/repos'
+        )
+        mock_create.assert_called_once_with(
+            '../data/shared-dir/zypper/repos'
+        )
 
     @patch('kiwi.path.Path.wipe')
     def test_delete_repo_cache(self, mock_wipe):
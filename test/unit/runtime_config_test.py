@@ -41,6 +41,70 @@ class TestRuntimeConfig:
     def test_get_xz_options(self):
         assert self.runtime_config.get_xz_options() == ['-a', '-b', 'xxx']
 
+    def test_get_bundle_compression_tool(self):
+        assert self.runtime_config.get_bundle_compression_tool() == 'zstd'
+        assert self.default_runtime_config.get_bundle_compression_tool() == \
+            Defaults.get_bundle_compression_tool()
+
+    @patch.object(RuntimeConfig, '_get_attribute')
+    @patch('kiwi.logger.log.warning')
+    def test_get_bundle_compression_tool_invalid(
+        self, mock_warning, mock_get_attribute
+    ):
+        mock_get_attribute.return_value = 'lzip'
+        assert self.runtime_config.get_bundle_compression_tool() == \
+            Defaults.get_bundle_compression_tool()
+        mock_warning.assert_called_once_with(
+            'Skipping invalid bundle compression tool: lzip'
+        )
+
+    def test_get_bundle_jobs(self):
+        assert self.runtime_config.get_bundle_jobs() == 2
+        assert self.default_runtime_config.get_bundle_jobs() == \
+            Defaults.get_bundle_jobs()
+
+    @patch.object(RuntimeConfig, '_get_attribute')
+    @patch('kiwi.logger.log.warning')
+    def test_get_bundle_jobs_invalid(self, mock_warning, mock_get_attribute):
+        mock_get_attribute.return_value = 'many'
+        assert self.runtime_config.get_bundle_jobs() == \
+            Defaults.get_bundle_jobs()
+        mock_warning.assert_called_once_with(
+            'Skipping invalid bundle jobs: many'
+        )
+        mock_get_attribute.return_value = '0'
+        assert self.runtime_config.get_bundle_jobs() == \
+            Defaults.get_bundle_jobs()
+
+    def test_get_compress_threads(self):
+        assert self.runtime_config.get_compress_threads() == 4
+        assert self.default_runtime_config.get_compress_threads() is None
+
+    @patch.object(RuntimeConfig, '_get_attribute')
+    @patch('kiwi.logger.log.warning')
+    def test_get_compress_threads_invalid(
+        self, mock_warning, mock_get_attribute
+    ):
+        mock_get_attribute.return_value = 'all'
+        assert self.runtime_config.get_compress_threads() is None
+        mock_warning.assert_called_once_with(
+            'Skipping invalid compress threads: all'
+        )
+
+    def test_get_gzip_tool(self):
+        assert self.runtime_config.get_gzip_tool() == 'gzip'
+        assert self.default_runtime_config.get_gzip_tool() == \
+            Defaults.get_gzip_tool()
+
+    @patch.object(RuntimeConfig, '_get_attribute')
+    @patch('kiwi.logger.log.warning')
+    def test_get_gzip_tool_invalid(self, mock_warning, mock_get_attribute):
+        mock_get_attribute.return_value = 'bzip2'
+        assert self.runtime_config.get_gzip_tool() == 'pigz'
+        mock_warning.assert_called_once_with(
+            'Skipping invalid gzip tool: bzip2'
+        )
+
     def test_is_obs_public(self):
         assert self.runtime_config.is_obs_public() is True
 
@@ -84,6 +148,74 @@ class TestRuntimeConfig:
         mock_get_attribute.return_value = 'xz'
         assert self.runtime_config.get_container_compression() == 'xz'
 
+    def test_get_squashfs_compression(self):
+        assert self.runtime_config.get_squashfs_compression() == 'zstd'
+
+    def test_get_squashfs_compression_default(self):
+        assert self.default_runtime_config.get_squashfs_compression() == 'xz'
+
+    @patch.object(RuntimeConfig, '_get_attribute')
+    @patch('kiwi.logger.log.warning')
+    def test_get_squashfs_compression_invalid(
+        self, mock_warning, mock_get_attribute
+    ):
+        mock_get_attribute.return_value = 'foo'
+        assert self.runtime_config.get_squashfs_compression() == 'xz'
+        mock_warning.assert_called_once_with(
+            'Skipping invalid squashfs compression: foo'
+        )
+
+    def test_get_squashfs_compression_level(self):
+        assert self.runtime_config.get_squashfs_compression_level() == 19
+        assert self.default_runtime_config.get_squashfs_compression_level() \
+            is None
+
+    def test_get_squashfs_processors(self):
+        assert self.runtime_config.get_squashfs_processors() == 2
+        assert self.default_runtime_config.get_squashfs_processors() is None
+
+    def test_get_squashfs_memory(self):
+        assert self.runtime_config.get_squashfs_memory() == 536870912
+        assert self.default_runtime_config.get_squashfs_memory() is None
+
+    @patch.object(RuntimeConfig, '_get_attribute')
+    @patch('kiwi.logger.log.warning')
+    def test_get_squashfs_compression_level_invalid(
+        self, mock_warning, mock_get_attribute
+    ):
+        mock_get_attribute.return_value = 'max'
+        assert self.runtime_config.get_squashfs_compression_level() is None
+        mock_warning.assert_called_once_with(
+            'Skipping invalid squashfs compression level: max'
+        )
+
+    @patch.object(RuntimeConfig, '_get_attribute')
+    @patch('kiwi.logger.log.warning')
+    def test_get_squashfs_processors_invalid(
+        self, mock_warning, mock_get_attribute
+    ):
+        mock_get_attribute.return_value = -1
+        assert self.runtime_config.get_squashfs_processors() is None
+        mock_warning.assert_called_once_with(
+            'Skipping invalid squashfs processors: -1'
+        )
+
+    @patch.object(RuntimeConfig, '_get_attribute')
+    @patch('kiwi.logger.log.warning')
+    def test_get_squashfs_memory_invalid(
+        self, mock_warning, mock_get_attribute
+    ):
+        mock_get_attribute.return_value = '2 GB'
+        assert self.runtime_config.get_squashfs_memory() is None
+        mock_warning.assert_called_once_with(
+            'Skipping invalid squashfs memory: 2 GB'
+        )
+
+    def test_get_squashfs_access_list(self):
+        assert self.runtime_config.get_squashfs_access_list() == \
+            '/var/lib/kiwi/boot-access.list'
+        assert self.default_runtime_config.get_squashfs_access_list() is None
+
     def test_get_iso_tool_category(self):
         assert self.runtime_config.get_iso_tool_category() == 'cdrtools'
 
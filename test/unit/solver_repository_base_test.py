@@ -1,13 +1,23 @@
 from mock import patch, call
+from tempfile import mkdtemp
+import gzip
+import io
 import os
+import shutil
 import mock
+import pytest
 
 from lxml import etree
 
-from .test_helper import raises, patch_open
+from .test_helper import raises
 
 from kiwi.solver.repository.base import SolverRepositoryBase
-from kiwi.exceptions import KiwiUriOpenError
+from kiwi.utils.download_manager import download_request_type
+from kiwi.exceptions import (
+    KiwiUriOpenError,
+    KiwiCommandError,
+    KiwiCommandNotFound
+)
 
 
 class TestSolverRepositoryBase:
@@ -56,153 +66,180 @@ class TestSolverRepositoryBase:
         assert self.solver.repository_metadata_dirs == ['tmpdir']
         mock_mkdtemp.assert_called_once_with(prefix='metadata_dir.')
 
-    @patch_open
-    @patch('os.path.exists')
-    def test_is_uptodate_static_time(self, mock_exists, mock_open):
-        mock_exists.return_value = True
-        mock_open.return_value = self.context_manager_mock
-        self.file_mock.read.return_value = 'static'
-        self.uri.alias.return_value = 'repo-alias'
+    def test_is_uptodate_without_fingerprint(self):
         assert self.solver.is_uptodate() is False
-        mock_open.assert_called_once_with(
-            '/var/tmp/kiwi/satsolver/repo-alias.timestamp'
+
+    @patch('kiwi.solver.repository.base.SolvableCache')
+    @patch.object(SolverRepositoryBase, 'fingerprint')
+    def test_is_uptodate(self, mock_fingerprint, mock_SolvableCache):
+        solvable_cache = mock.Mock()
+        solvable_cache.get_key.return_value = 'key'
+        solvable_cache.lookup.return_value = 'target_dir/key'
+        mock_SolvableCache.return_value = solvable_cache
+        mock_fingerprint.return_value = 'fingerprint'
+        assert self.solver.is_uptodate('target_dir') is True
+        mock_SolvableCache.assert_called_once_with('target_dir')
+        solvable_cache.get_key.assert_called_once_with(
+            'SolverRepositoryBase', 'fingerprint'
         )
+        solvable_cache.lookup.assert_called_once_with('key')
+        solvable_cache.lookup.return_value = None
+        assert self.solver.is_uptodate('target_dir') is False
+
+    def test_fingerprint(self):
+        assert self.solver.fingerprint() is None
 
-    @patch_open
-    @patch('os.path.exists')
-    @patch('kiwi.solver.repository.base.SolverRepositoryBase.timestamp')
-    def test_is_uptodate_some_time(
-        self, mock_timestamp, mock_exists, mock_open
+    @patch('kiwi.solver.repository.base.NamedTemporaryFile')
+    @patch('kiwi.solver.repository.base.Checksum')
+    @patch.object(SolverRepositoryBase, 'download_from_repository')
+    def test__get_repomd_fingerprint(
+        self, mock_download, mock_Checksum, mock_tmpfile
     ):
-        mock_exists.return_value = True
-        mock_open.return_value = self.context_manager_mock
-        self.file_mock.read.return_value = 'some-time'
-        mock_timestamp.return_value = 'some-time'
-        self.uri.alias.return_value = 'repo-alias'
-        assert self.solver.is_uptodate() is True
-        mock_open.assert_called_once_with(
-            '/var/tmp/kiwi/satsolver/repo-alias.timestamp'
+        tmpfile = mock.Mock()
+        tmpfile.name = 'tmpfile'
+        mock_tmpfile.return_value = tmpfile
+        mock_Checksum.return_value.sha256.return_value = 'sum'
+        assert self.solver._get_repomd_fingerprint('suse/repodata') == 'sum'
+        mock_download.assert_called_once_with(
+            'suse/repodata/repomd.xml', 'tmpfile'
         )
+        mock_Checksum.assert_called_once_with('tmpfile')
 
     def test_timestamp(self):
         assert self.solver.timestamp() == 'static'
 
-    @patch('kiwi.solver.repository.base.urlopen')
-    @patch('kiwi.solver.repository.base.Request')
-    @patch_open
+    @patch.object(SolverRepositoryBase, '_get_download_manager')
     def test_download_from_repository_with_credentials(
-        self, mock_open, mock_request, mock_urlopen
+        self, mock_get_download_manager
     ):
-        request = mock.Mock()
-        mock_request.return_value = request
-        location = mock.Mock()
-        location.read.return_value = 'data-from-network'
-        mock_urlopen.return_value = location
-        mock_open.return_value = self.context_manager_mock
         self.uri.is_remote.return_value = True
         self.uri.translate.return_value = 'http://myrepo/file'
         self.solver.user = 'user'
         self.solver.secret = 'secret'
         self.solver.download_from_repository(
-            'repodata/file', 'target-file'
-        )
-        mock_urlopen.assert_called_once_with(request)
-        mock_request.assert_called_once_with(
-            'http://myrepo/file/repodata/file'
-        )
-        request.add_header.assert_called_once_with(
-            'Authorization', b'Basic dXNlcjpzZWNyZXQ='
-        )
-        mock_open.assert_called_once_with(
-            'target-file', 'wb'
-        )
-        self.file_mock.write.assert_called_once_with(
-            'data-from-network'
+            'repodata/file', 'target-file', ('sha256', 'digest')
         )
+        mock_get_download_manager.return_value.download_all.\
+            assert_called_once_with(
+                [
+                    download_request_type(
+                        url='http://myrepo/file/repodata/file',
+                        target='target-file', checksum=('sha256', 'digest')
+                    )
+                ], auth=('user', 'secret')
+            )
 
-    @patch('kiwi.solver.repository.base.urlopen')
-    @patch('kiwi.solver.repository.base.Request')
-    @patch_open
-    def test_download_from_repository_remote(
-        self, mock_open, mock_request, mock_urlopen
+    @patch.object(SolverRepositoryBase, '_get_download_manager')
+    def test_download_files_from_repository_remote(
+        self, mock_get_download_manager
     ):
-        request = mock.Mock()
-        mock_request.return_value = request
-        location = mock.Mock()
-        location.read.return_value = 'data-from-network'
-        mock_urlopen.return_value = location
-        mock_open.return_value = self.context_manager_mock
         self.uri.is_remote.return_value = True
         self.uri.translate.return_value = 'http://myrepo/file'
-        self.solver.download_from_repository('repodata/file', 'target-file')
-        mock_urlopen.assert_called_once_with(request)
-        mock_request.assert_called_once_with(
-            'http://myrepo/file/repodata/file'
-        )
-        mock_open.assert_called_once_with(
-            'target-file', 'wb'
-        )
-        self.file_mock.write.assert_called_once_with(
-            'data-from-network'
+        self.solver.download_files_from_repository(
+            [
+                ('repodata/primary.xml.gz', 'primary.xml.gz', None),
+                ('repodata/other.xml.gz', 'other.xml.gz', None)
+            ]
         )
+        mock_get_download_manager.return_value.download_all.\
+            assert_called_once_with(
+                [
+                    download_request_type(
+                        url='http://myrepo/file/repodata/primary.xml.gz',
+                        target='primary.xml.gz', checksum=None
+                    ),
+                    download_request_type(
+                        url='http://myrepo/file/repodata/other.xml.gz',
+                        target='other.xml.gz', checksum=None
+                    )
+                ], auth=None
+            )
 
-    @patch('kiwi.solver.repository.base.urlopen')
-    @patch('kiwi.solver.repository.base.Request')
-    @patch_open
-    def test_download_from_repository_local(
-        self, mock_open, mock_request, mock_urlopen
-    ):
-        request = mock.Mock()
-        mock_request.return_value = request
-        location = mock.Mock()
-        location.read.return_value = 'data'
-        mock_urlopen.return_value = location
-        mock_open.return_value = self.context_manager_mock
+    @patch.object(SolverRepositoryBase, '_get_download_manager')
+    def test_download_from_repository_local(self, mock_get_download_manager):
         self.uri.is_remote.return_value = False
         self.uri.translate.return_value = '/my_local_repo/file'
         self.solver.download_from_repository('repodata/file', 'target-file')
-        mock_urlopen.assert_called_once_with(request)
-        mock_request.assert_called_once_with(
-            'file:///my_local_repo/file/repodata/file'
-        )
-        mock_open.assert_called_once_with(
-            'target-file', 'wb'
-        )
-        self.file_mock.write.assert_called_once_with(
-            'data'
-        )
+        mock_get_download_manager.return_value.download_all.\
+            assert_called_once_with(
+                [
+                    download_request_type(
+                        url='file:///my_local_repo/file/repodata/file',
+                        target='target-file', checksum=None
+                    )
+                ], auth=None
+            )
 
-    @patch('kiwi.solver.repository.base.urlopen')
     @raises(KiwiUriOpenError)
-    def test_download_from_repository_raises(self, mock_urlopen):
+    @patch.object(SolverRepositoryBase, '_get_download_manager')
+    def test_download_from_repository_raises(self, mock_get_download_manager):
         self.uri.is_remote.return_value = False
         self.uri.translate.return_value = '/my_local_repo/file'
-        mock_urlopen.side_effect = Exception
+        mock_get_download_manager.return_value.download_all.side_effect = \
+            KiwiUriOpenError('download failed')
         self.solver.download_from_repository('repodata/file', 'target-file')
 
+    @patch('kiwi.solver.repository.base.DownloadManager')
+    def test_get_download_manager(self, mock_DownloadManager):
+        with patch.object(SolverRepositoryBase, 'download_manager', None):
+            assert SolverRepositoryBase._get_download_manager() == \
+                mock_DownloadManager.return_value
+            assert SolverRepositoryBase._get_download_manager() == \
+                mock_DownloadManager.return_value
+        mock_DownloadManager.assert_called_once_with(
+            cache_dir='/var/tmp/kiwi/metadata'
+        )
+
+    def test__get_repomd_files(self):
+        xml_data = etree.ElementTree(
+            etree.fromstring(
+                '<repomd xmlns="http://linux.duke.edu/metadata/repo">'
+                '  <data type="primary">'
+                '    <location href="repodata/primary.xml.gz"/>'
+                '    <checksum type="sha">0815</checksum>'
+                '  </data>'
+                '  <data type="primary">'
+                '    <location href="repodata/other-primary.xml.gz"/>'
+                '    <checksum type="unknown-digest">0815</checksum>'
+                '  </data>'
+                '  <data type="patterns">'
+                '    <location href="repodata/patterns.xml.gz"/>'
+                '  </data>'
+                '</repomd>'
+            )
+        )
+        assert self.solver._get_repomd_files(xml_data, 'primary') == [
+            ('repodata/primary.xml.gz', ('sha1', '0815')),
+            ('repodata/other-primary.xml.gz', None)
+        ]
+        assert self.solver._get_repomd_files(xml_data, 'patterns') == [
+            ('repodata/patterns.xml.gz', None)
+        ]
+
     @patch('kiwi.solver.repository.base.mkdtemp')
     @patch('kiwi.solver.repository.base.random.randrange')
-    @patch('kiwi.solver.repository.base.Command.run')
+    @patch.object(SolverRepositoryBase, '_run_solv_tool')
+    @patch('kiwi.solver.repository.base.glob.iglob')
     def test__create_solvables_rpms2_solv(
-        self, mock_command, mock_rand, mock_mkdtemp
+        self, mock_glob, mock_run_solv_tool, mock_rand, mock_mkdtemp
     ):
+        mock_glob.return_value = ['meta_dir.XX/b.rpm', 'meta_dir.XX/a.rpm']
         mock_rand.return_value = 0xfe
         self.solver.repository_metadata_dirs = ['metadata_dir.XXXX']
         mock_mkdtemp.return_value = 'solv_dir.XX'
         self.solver._create_solvables('meta_dir.XX', 'rpms2solv')
-        mock_command.assert_called_once_with(
-            [
-                'bash', '-c',
-                'rpms2solv meta_dir.XX/*.rpm > solv_dir.XX/solvable-fefefefe'
-            ]
+        mock_glob.assert_called_once_with('meta_dir.XX/*.rpm')
+        mock_run_solv_tool.assert_called_once_with(
+            ['rpms2solv', 'meta_dir.XX/a.rpm', 'meta_dir.XX/b.rpm'],
+            'solv_dir.XX/solvable-fefefefe'
         )
 
     @patch('kiwi.solver.repository.base.mkdtemp')
     @patch('kiwi.solver.repository.base.random.randrange')
-    @patch('kiwi.solver.repository.base.Command.run')
+    @patch.object(SolverRepositoryBase, '_run_solv_tool')
     @patch('kiwi.solver.repository.base.glob.iglob')
     def test__create_solvables_rpmmd2_solv(
-        self, mock_glob, mock_command, mock_rand, mock_mkdtemp
+        self, mock_glob, mock_run_solv_tool, mock_rand, mock_mkdtemp
     ):
         mock_glob.return_value = ['some-solv-data-file']
         mock_rand.return_value = 0xfe
@@ -210,50 +247,178 @@ class TestSolverRepositoryBase:
         mock_mkdtemp.return_value = 'solv_dir.XX'
         self.solver._create_solvables('meta_dir.XX', 'rpmmd2solv')
         mock_glob.assert_called_once_with('meta_dir.XX/*')
-        mock_command.assert_called_once_with(
-            [
-                'bash', '-c',
-                ' '.join([
-                    'gzip -cd --force some-solv-data-file',
-                    '|',
-                    'rpmmd2solv > solv_dir.XX/solvable-fefefefe'
-                ])
-            ]
+        mock_run_solv_tool.assert_called_once_with(
+            ['rpmmd2solv'], 'solv_dir.XX/solvable-fefefefe',
+            'some-solv-data-file'
         )
 
-    @patch('kiwi.solver.repository.base.Command.run')
+    @raises(KiwiCommandError)
+    @patch('kiwi.solver.repository.base.mkdtemp')
+    @patch.object(SolverRepositoryBase, '_run_solv_tool')
+    @patch('kiwi.solver.repository.base.glob.iglob')
+    def test__create_solvables_raises(
+        self, mock_glob, mock_run_solv_tool, mock_mkdtemp
+    ):
+        mock_glob.return_value = ['primary.xml.gz', 'patterns.xml.gz']
+        mock_mkdtemp.return_value = 'solv_dir.XX'
+        mock_run_solv_tool.side_effect = KiwiCommandError('rpmmd2solv')
+        self.solver._create_solvables('meta_dir.XX', 'rpmmd2solv')
+
+    def test__run_solv_tool(self):
+        tmpdir = mkdtemp(prefix='kiwi_solver_test.')
+        try:
+            metadata = os.sep.join([tmpdir, 'primary.xml'])
+            with open(metadata, 'wb') as data:
+                data.write(b'metadata')
+            with gzip.open(metadata + '.gz', 'wb') as data:
+                data.write(b'compressed metadata')
+            solvable = os.sep.join([tmpdir, 'solvable'])
+            self.solver._run_solv_tool(['cat'], solvable, metadata)
+            with open(solvable, 'rb') as data:
+                assert data.read() == b'metadata'
+            self.solver._run_solv_tool(['cat'], solvable, metadata + '.gz')
+            with open(solvable, 'rb') as data:
+                assert data.read() == b'compressed metadata'
+            self.solver._run_solv_tool(['cat', metadata], solvable)
+            with open(solvable, 'rb') as data:
+                assert data.read() == b'metadata'
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @patch('kiwi.solver.repository.base.Path.which')
+    def test__run_solv_tool_not_found(self, mock_which):
+        mock_which.return_value = None
+        with pytest.raises(KiwiCommandNotFound):
+            self.solver._run_solv_tool(['rpmmd2solv'], 'solvable')
+
+    def test__run_solv_tool_failed(self):
+        tmpdir = mkdtemp(prefix='kiwi_solver_test.')
+        try:
+            solvable = os.sep.join([tmpdir, 'solvable'])
+            with pytest.raises(KiwiCommandError) as issue:
+                self.solver._run_solv_tool(
+                    ['bash', '-c', 'echo failed >&2; exit 1'], solvable
+                )
+            assert 'bash: stderr: failed' in issue.value.message
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @patch('kiwi.solver.repository.base.ProfiledPopen')
+    @patch('kiwi.solver.repository.base.Path.which')
+    @patch.object(SolverRepositoryBase, '_open_metadata')
+    def test__run_solv_tool_broken_pipe(
+        self, mock_open_metadata, mock_which, mock_Popen
+    ):
+        tmpdir = mkdtemp(prefix='kiwi_solver_test.')
+        try:
+            process = mock.Mock()
+            process.stdin.write.side_effect = BrokenPipeError
+            process.stdin.close.side_effect = BrokenPipeError
+            process.wait.return_value = 1
+            mock_Popen.return_value = process
+            mock_open_metadata.return_value = io.BytesIO(b'metadata')
+            with pytest.raises(KiwiCommandError):
+                self.solver._run_solv_tool(
+                    ['rpmmd2solv'], os.sep.join([tmpdir, 'solvable']),
+                    'primary.xml'
+                )
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @patch('kiwi.solver.repository.base.Path.wipe')
+    @patch.object(SolverRepositoryBase, 'fingerprint')
+    @patch.object(SolverRepositoryBase, '_setup_repository_metadata')
+    def test_create_repository_solvable_cached(
+        self, mock_setup_repository_metadata, mock_fingerprint,
+        mock_path_wipe
+    ):
+        mock_fingerprint.return_value = 'fingerprint'
+        tmpdir = mkdtemp(prefix='kiwi_solvable_cache.')
+        try:
+            solvable_dir = os.sep.join([tmpdir, 'solvable_dir'])
+            os.mkdir(solvable_dir)
+            with open(os.sep.join([solvable_dir, 'primary']), 'wb') as solv:
+                solv.write(b'solvable')
+
+            def setup_repository_metadata():
+                self.solver.repository_solvable_dir = solvable_dir
+
+            mock_setup_repository_metadata.side_effect = \
+                setup_repository_metadata
+            self.uri.uri = 'repo-uri'
+            target_dir = os.sep.join([tmpdir, 'satsolver'])
+            solvable = self.solver.create_repository_solvable(target_dir)
+            with open(solvable, 'rb') as solvable_file:
+                assert solvable_file.read() == b'solvable'
+            with open(solvable + '.info') as solvable_info:
+                assert solvable_info.read() == 'repo-uri' + os.linesep
+            mock_path_wipe.assert_called_once_with(solvable_dir)
+
+            # the same repository metadata reached through
+            # another uri is taken from the cache
+            mock_setup_repository_metadata.reset_mock()
+            self.uri.uri = 'other-repo-uri'
+            assert self.solver.create_repository_solvable(target_dir) == \
+                solvable
+            assert not mock_setup_repository_metadata.called
+        finally:
+            shutil.rmtree(tmpdir)
+
     @patch('kiwi.solver.repository.base.Path.wipe')
-    @patch('kiwi.solver.repository.base.Path.create')
-    @patch('kiwi.solver.repository.base.SolverRepositoryBase.is_uptodate')
+    @patch('kiwi.solver.repository.base.SolvableCache')
     @patch.object(SolverRepositoryBase, '_setup_repository_metadata')
-    @patch_open
     def test_create_repository_solvable(
-        self, mock_open, mock_setup_repository_metadata, mock_is_uptodate,
-        mock_path_create, mock_path_wipe, mock_command
+        self, mock_setup_repository_metadata, mock_SolvableCache,
+        mock_path_wipe
     ):
-        mock_is_uptodate.return_value = False
-        mock_open.return_value = self.context_manager_mock
+        solvable_cache = mock.Mock()
+        solvable_cache.get_key.return_value = 'key'
+        solvable_cache.store.return_value = 'target_dir/key'
+        mock_SolvableCache.return_value = solvable_cache
         self.solver.repository_solvable_dir = 'solvable_dir.XX'
-        self.uri.alias.return_value = 'repo-alias'
         self.uri.uri = 'repo-uri'
         assert self.solver.create_repository_solvable('target_dir') == \
-            'target_dir/repo-alias'
-        mock_is_uptodate.assert_called_once_with('target_dir')
+            'target_dir/key'
+        mock_SolvableCache.assert_called_once_with('target_dir')
+        solvable_cache.get_key.assert_called_once_with(
+            'SolverRepositoryBase', 'uri:repo-uri'
+        )
+        assert not solvable_cache.lookup.called
         mock_setup_repository_metadata.assert_called_once_with()
-        mock_command.assert_called_once_with(
-            [
-                'bash', '-c',
-                'mergesolv solvable_dir.XX/* > target_dir/repo-alias'
-            ]
+        solvable_cache.store.assert_called_once_with(
+            'key', self.solver._merge_solvables, 'repo-uri' + os.linesep
         )
-        assert mock_open.call_args_list == [
-            call('target_dir/repo-alias.info', 'w'),
-            call('target_dir/repo-alias.timestamp', 'w')
-        ]
-        assert self.file_mock.write.call_args_list == [
-            call(''.join(['repo-uri', os.linesep])),
-            call('static')
+        mock_path_wipe.assert_called_once_with('solvable_dir.XX')
+
+    @patch('kiwi.solver.repository.base.glob.iglob')
+    @patch.object(SolverRepositoryBase, '_run_solv_tool')
+    def test__merge_solvables(self, mock_run_solv_tool, mock_glob):
+        mock_glob.return_value = [
+            'solvable_dir.XX/solvable-b', 'solvable_dir.XX/solvable-a'
         ]
+        self.solver.repository_solvable_dir = 'solvable_dir.XX'
+        self.solver._merge_solvables('target_dir/key.tmp')
+        mock_glob.assert_called_once_with('solvable_dir.XX/*')
+        mock_run_solv_tool.assert_called_once_with(
+            [
+                'mergesolv',
+                'solvable_dir.XX/solvable-a', 'solvable_dir.XX/solvable-b'
+            ], 'target_dir/key.tmp'
+        )
+
+    @patch('kiwi.solver.repository.base.shutil.move')
+    @patch('kiwi.solver.repository.base.glob.iglob')
+    @patch.object(SolverRepositoryBase, '_run_solv_tool')
+    def test__merge_solvables_single_solvable(
+        self, mock_run_solv_tool, mock_glob, mock_move
+    ):
+        mock_glob.return_value = ['solvable_dir.XX/solvable-a']
+        self.solver.repository_solvable_dir = 'solvable_dir.XX'
+        self.solver._merge_solvables('target_dir/key.tmp')
+        mock_move.assert_called_once_with(
+            'solvable_dir.XX/solvable-a', 'target_dir/key.tmp'
+        )
+        assert not mock_run_solv_tool.called
 
     @patch('kiwi.solver.repository.base.Path.wipe')
     def test_destructor(self, mock_wipe):
@@ -1,6 +1,8 @@
 from mock import patch
-
+from tempfile import mkdtemp
+import shutil
 import mock
+import os
 
 from .test_helper import raises
 
@@ -18,7 +20,7 @@ class TestSolverRepositoryRpmDir:
     def test__setup_repository_metadata_raises(self):
         self.solver._setup_repository_metadata()
 
-    @patch.object(SolverRepositoryBase, 'download_from_repository')
+    @patch.object(SolverRepositoryBase, 'download_files_from_repository')
     @patch.object(SolverRepositoryBase, '_create_solvables')
     @patch.object(SolverRepositoryBase, '_create_temporary_metadata_dir')
     @patch('kiwi.solver.repository.rpm_dir.glob.iglob')
@@ -32,8 +34,37 @@ class TestSolverRepositoryRpmDir:
         mock_mkdtemp.return_value = 'metadata_dir.XX'
         self.solver._setup_repository_metadata()
         mock_download_from_repository.assert_called_once_with(
-            'some-package.rpm', 'metadata_dir.XX/some-package.rpm'
+            [('some-package.rpm', 'metadata_dir.XX/some-package.rpm', None)]
         )
         mock_create_solvables.assert_called_once_with(
             'metadata_dir.XX', 'rpms2solv'
         )
+
+    def test_fingerprint_remote(self):
+        self.uri.is_remote.return_value = True
+        assert self.solver.fingerprint() is None
+
+    def test_fingerprint_unreadable(self):
+        self.uri.is_remote.return_value = False
+        self.uri.translate.return_value = '/some/missing/rpm-dir'
+        assert self.solver.fingerprint() is None
+
+    def test_fingerprint(self):
+        tmpdir = mkdtemp(prefix='kiwi_rpm_dir.')
+        try:
+            self.uri.is_remote.return_value = False
+            self.uri.translate.return_value = tmpdir
+            for name in ('b.rpm', 'a.rpm', 'repo.info'):
+                with open(os.sep.join([tmpdir, name]), 'w') as package:
+                    package.write(name)
+            os.mkdir(os.sep.join([tmpdir, 'directory.rpm']))
+            fingerprint = self.solver.fingerprint()
+            assert len(fingerprint) == 64
+            with open(os.sep.join([tmpdir, 'repo.info']), 'a') as info:
+                info.write('changed')
+            assert self.solver.fingerprint() == fingerprint
+            with open(os.sep.join([tmpdir, 'a.rpm']), 'a') as package:
+                package.write('changed')
+            assert self.solver.fingerprint() != fingerprint
+        finally:
+            shutil.rmtree(tmpdir)
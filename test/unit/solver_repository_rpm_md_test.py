@@ -14,7 +14,7 @@ class TestSolverRepositoryRpmMd:
         self.uri = mock.Mock()
         self.solver = SolverRepositoryRpmMd(self.uri)
 
-    @patch.object(SolverRepositoryBase, 'download_from_repository')
+    @patch.object(SolverRepositoryBase, 'download_files_from_repository')
     @patch.object(SolverRepositoryBase, '_create_solvables')
     @patch.object(SolverRepositoryBase, '_create_temporary_metadata_dir')
     @patch.object(SolverRepositoryBase, '_get_repomd_xml')
@@ -28,12 +28,25 @@ class TestSolverRepositoryRpmMd:
 
         assert mock_download_from_repository.call_args_list == [
             call(
-                'repodata/55f95a93-primary.xml.gz',
-                'metadata_dir.XX/55f95a93-primary.xml.gz'
+                [
+                    (
+                        'repodata/55f95a93-primary.xml.gz',
+                        'metadata_dir.XX/55f95a93-primary.xml.gz',
+                        ('sha256', '55f95a93')
+                    )
+                ]
             ),
             call(
-                'repodata/0815-other.xml.gz',
-                'metadata_dir.XX/0815-other.xml.gz'
+                [
+                    (
+                        'repodata/0815-other.xml.gz',
+                        'metadata_dir.XX/0815-other.xml.gz',
+                        (
+                            'sha256', 'd62ed932df26f29968f17d3ed780a617'
+                            'ce116e651d4b0042495bbec4182671ac'
+                        )
+                    )
+                ]
             )
         ]
         assert mock_create_solvables.call_args_list == [
@@ -45,3 +58,9 @@ class TestSolverRepositoryRpmMd:
     def test_timestamp(self, mock_xml):
         mock_xml.return_value = self.xml_data
         assert self.solver.timestamp() == '1478352191'
+
+    @patch.object(SolverRepositoryBase, '_get_repomd_fingerprint')
+    def test_fingerprint(self, mock_get_repomd_fingerprint):
+        mock_get_repomd_fingerprint.return_value = 'sum'
+        assert self.solver.fingerprint() == 'sum'
+        mock_get_repomd_fingerprint.assert_called_once_with()
@@ -6,6 +6,7 @@ from lxml import etree
 
 from kiwi.solver.repository.suse import SolverRepositorySUSE
 from kiwi.solver.repository.base import SolverRepositoryBase
+from kiwi.exceptions import KiwiUriOpenError
 
 
 class TestSolverRepositorySUSE:
@@ -14,7 +15,7 @@ class TestSolverRepositorySUSE:
         self.uri = mock.Mock()
         self.solver = SolverRepositorySUSE(self.uri)
 
-    @patch.object(SolverRepositoryBase, 'download_from_repository')
+    @patch.object(SolverRepositoryBase, 'download_files_from_repository')
     @patch.object(SolverRepositoryBase, '_create_solvables')
     @patch.object(SolverRepositoryBase, '_create_temporary_metadata_dir')
     @patch.object(SolverRepositoryBase, '_get_repomd_xml')
@@ -26,14 +27,19 @@ class TestSolverRepositorySUSE:
         mock_xml.return_value = self.xml_data
         self.solver._setup_repository_metadata()
         mock_download_from_repository.assert_called_once_with(
-            'suse/repodata/55f95a93-primary.xml.gz',
-            'metadata_dir.XX/55f95a93-primary.xml.gz'
+            [
+                (
+                    'suse/repodata/55f95a93-primary.xml.gz',
+                    'metadata_dir.XX/55f95a93-primary.xml.gz',
+                    ('sha256', '55f95a93')
+                )
+            ]
         )
         mock_create_solvables.assert_called_once_with(
             'metadata_dir.XX', 'rpmmd2solv'
         )
 
-    @patch.object(SolverRepositoryBase, 'download_from_repository')
+    @patch.object(SolverRepositoryBase, 'download_files_from_repository')
     @patch.object(SolverRepositoryBase, '_create_solvables')
     @patch.object(SolverRepositoryBase, '_get_repomd_xml')
     @patch.object(SolverRepositoryBase, '_create_temporary_metadata_dir')
@@ -45,8 +51,21 @@ class TestSolverRepositorySUSE:
         mock_mkdtemp.return_value = 'metadata_dir.XX'
         self.solver._setup_repository_metadata()
         mock_download_from_repository.assert_called_once_with(
-            'suse/setup/descr/packages.gz', 'metadata_dir.XX/packages.gz'
+            [
+                (
+                    'suse/setup/descr/packages.gz',
+                    'metadata_dir.XX/packages.gz', None
+                )
+            ]
         )
         mock_create_solvables.assert_called_once_with(
             'metadata_dir.XX', 'susetags2solv'
         )
+
+    @patch.object(SolverRepositoryBase, '_get_repomd_fingerprint')
+    def test_fingerprint(self, mock_get_repomd_fingerprint):
+        mock_get_repomd_fingerprint.return_value = 'sum'
+        assert self.solver.fingerprint() == 'sum'
+        mock_get_repomd_fingerprint.assert_called_once_with('suse/repodata')
+        mock_get_repomd_fingerprint.side_effect = KiwiUriOpenError('error')
+        assert self.solver.fingerprint() is None
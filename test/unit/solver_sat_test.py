@@ -1,4 +1,4 @@
-from mock import patch
+from mock import patch, call
 import mock
 
 from .test_helper import raises
@@ -7,7 +7,8 @@ from kiwi.solver.sat import Sat
 from kiwi.exceptions import (
     KiwiSatSolverPluginError,
     KiwiSatSolverJobProblems,
-    KiwiSatSolverJobError
+    KiwiSatSolverJobError,
+    KiwiUriOpenError
 )
 
 
@@ -54,6 +55,40 @@ class TestSat:
         self.sat.pool.addfileprovides.assert_called_once_with()
         self.sat.pool.createwhatprovides.assert_called_once_with()
 
+    def test_add_repositories(self):
+        solver_repositories = []
+        for uri in ['some-uri', 'other-uri']:
+            solver_repository = mock.Mock()
+            solver_repository.uri.uri = uri
+            solver_repository.create_repository_solvable.return_value = \
+                uri + '-solvable'
+            solver_repositories.append(solver_repository)
+        pool_repository = mock.Mock()
+        self.sat.pool.add_repo.return_value = pool_repository
+
+        self.sat.add_repositories(solver_repositories)
+
+        assert self.sat.pool.add_repo.call_args_list == [
+            call('some-uri'), call('other-uri')
+        ]
+        assert pool_repository.add_solv.call_args_list == [
+            call('some-uri-solvable'), call('other-uri-solvable')
+        ]
+        self.sat.pool.addfileprovides.assert_called_once_with()
+        self.sat.pool.createwhatprovides.assert_called_once_with()
+
+    def test_add_repositories_empty(self):
+        self.sat.add_repositories([])
+        assert not self.sat.pool.createwhatprovides.called
+
+    @raises(KiwiUriOpenError)
+    def test_add_repositories_solvable_creation_failed(self):
+        solver_repository = mock.Mock()
+        solver_repository.create_repository_solvable.side_effect = \
+            KiwiUriOpenError('download failed')
+
+        self.sat.add_repositories([solver_repository, mock.Mock()])
+
     @raises(KiwiSatSolverJobProblems)
     @patch.object(Sat, '_setup_jobs')
     def test_solve_has_problems(self, mock_setup_jobs):
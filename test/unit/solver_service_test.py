@@ -0,0 +1,257 @@
+import os
+import socket
+import shutil
+import threading
+from tempfile import mkdtemp
+
+from mock import (
+    patch, Mock
+)
+from pytest import raises
+
+from kiwi.solver.sat import solved_package_type
+from kiwi.solver.service import (
+    SolverService,
+    SolverServiceClient,
+    solver_repository_type,
+    solver_job_type
+)
+from kiwi.exceptions import (
+    KiwiSatSolverJobProblems,
+    KiwiSolverServiceError
+)
+
+
+class TestSolverService:
+    def setup(self):
+        self.tmpdir = mkdtemp(prefix='kiwi_solver_service.')
+        self.socket_path = os.sep.join([self.tmpdir, 'resolver.sock'])
+        self.repositories = [
+            solver_repository_type(
+                source='http://example.com/repo', type='rpm-md',
+                user=None, secret=None
+            ),
+            solver_repository_type(
+                source='/some/rpm/dir', type='rpm-dir',
+                user='user', secret='secret'
+            )
+        ]
+        self.jobs = [
+            solver_job_type(
+                job_names=['bash'], skip_missing=False,
+                ignore_recommended=True
+            ),
+            solver_job_type(
+                job_names=['vim'], skip_missing=True,
+                ignore_recommended=False
+            )
+        ]
+        self.solver_repository = Mock()
+        self.solver_repository.fingerprint.return_value = 'fingerprint'
+        self.solver = Mock()
+        self.solver.solve.side_effect = lambda job_names, *args: {
+            job_names[0]: solved_package_type(
+                uri='http://example.com/repo', installsize_bytes=42,
+                arch='x86_64', version='1.0', checksum=Mock()
+            )
+        }
+        self.patches = [
+            patch(
+                'kiwi.solver.service.SolverRepository',
+                return_value=self.solver_repository
+            ),
+            patch('kiwi.solver.service.Uri'),
+            patch('kiwi.solver.service.Sat', return_value=self.solver)
+        ]
+        self.mock_SolverRepository, self.mock_Uri, self.mock_Sat = [
+            service_patch.start() for service_patch in self.patches
+        ]
+        self.mock_Uri.return_value.translate.return_value = \
+            'http://example.com/repo'
+        self.mock_Uri.return_value.is_remote.return_value = True
+        self.service = SolverService(self.socket_path)
+        self.client = SolverServiceClient(self.socket_path)
+
+    def teardown(self):
+        for service_patch in self.patches:
+            service_patch.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _start(self):
+        self.service_thread = threading.Thread(
+            target=self.service.serve_forever
+        )
+        self.service_thread.start()
+        while not self.service.server:
+            self.service_thread.join(0.01)
+
+    def _stop(self):
+        self.service.shutdown()
+        self.service_thread.join()
+
+    def test_solve(self):
+        self._start()
+        try:
+            assert oct(os.stat(self.socket_path).st_mode & 0o777) == '0o700'
+            results = self.client.solve(self.repositories, self.jobs)
+            assert results[0]['bash'].installsize_bytes == 42
+            assert results[1]['vim'].arch == 'x86_64'
+            assert self.client.solve(self.repositories, self.jobs) == results
+        finally:
+            self._stop()
+        assert not os.path.exists(self.socket_path)
+        # the pool is loaded once and the results are memoized
+        self.mock_Sat.assert_called_once_with()
+        self.solver.add_repositories.assert_called_once_with(
+            [self.solver_repository, self.solver_repository]
+        )
+        assert self.solver.solve.call_count == 2
+        self.mock_Uri.assert_any_call('dir:///some/rpm/dir', 'rpm-dir')
+        self.mock_SolverRepository.assert_any_call(
+            self.mock_Uri.return_value, 'user', 'secret'
+        )
+
+    def test_handle_changed_fingerprint(self):
+        request = {
+            'repositories': [
+                repository._asdict() for repository in self.repositories
+            ],
+            'jobs': [self.jobs[0]._asdict()]
+        }
+        self.service.handle(request)
+        self.solver_repository.fingerprint.return_value = 'changed'
+        self.service.handle(request)
+        assert self.mock_Sat.call_count == 2
+        assert self.solver.solve.call_count == 2
+
+    def test_handle_without_fingerprint(self):
+        self.solver_repository.fingerprint.return_value = None
+        request = {
+            'repositories': [self.repositories[0]._asdict()],
+            'jobs': [self.jobs[0]._asdict()]
+        }
+        self.service.handle(request)
+        self.service.handle(request)
+        assert self.mock_Sat.call_count == 2
+        assert not self.service.pools
+
+    def test_handle_evicts(self):
+        self.service.max_pools = 1
+        self.service.max_results = 1
+        request = {
+            'repositories': [self.repositories[0]._asdict()],
+            'jobs': [job._asdict() for job in self.jobs]
+        }
+        self.service.handle(request)
+        solver, results = self.service.pools[
+            (('http://example.com/repo', 'rpm-md', None), 'fingerprint')
+        ]
+        assert list(results) == [(('vim',), True, False)]
+        request['repositories'] = [self.repositories[1]._asdict()]
+        self.service.handle(request)
+        assert list(self.service.pools) == [
+            (('dir:///some/rpm/dir', 'rpm-dir', 'user'), 'fingerprint')
+        ]
+
+    def test_handle_resolves_relative_source(self):
+        request = {
+            'repositories': [
+                solver_repository_type(
+                    source='dir://./repo', type='rpm-md',
+                    user=None, secret=None
+                )._asdict()
+            ],
+            'jobs': [self.jobs[0]._asdict()]
+        }
+        with patch('os.getcwd', return_value='/service'):
+            self.service.handle(request)
+        assert list(self.service.pools) == [
+            (('dir:///service/repo', 'rpm-md', None), 'fingerprint')
+        ]
+
+    @patch('os.getcwd', return_value='/client')
+    def test_resolve_repository(self, mock_getcwd):
+        def resolve(source, repo_type='rpm-md'):
+            return SolverService.resolve_repository(
+                solver_repository_type(
+                    source=source, type=repo_type, user='user', secret='pwd'
+                )
+            )
+
+        for source, resolved in (
+            ('dir://./repo', 'dir:///client/repo'),
+            ('dir://repo', 'dir:///client/repo'),
+            ('dir:///some/repo/', 'dir:///some/repo'),
+            ('/some/repo', 'dir:///some/repo'),
+            ('file:///some/repo', 'file:///some/repo'),
+            ('iso://./dvd.iso', 'iso:///client/dvd.iso')
+        ):
+            repository = resolve(source)
+            assert repository == solver_repository_type(
+                source=resolved, type='rpm-md', user='user', secret='pwd'
+            )
+            assert SolverService.resolve_repository(repository) == repository
+        assert resolve('obs://Devel:Tools/SLE_15').source == \
+            'http://example.com/repo'
+        self.mock_Uri.assert_called_once_with(
+            'obs://Devel:Tools/SLE_15', 'rpm-md'
+        )
+        self.mock_Uri.return_value.is_remote.return_value = False
+        self.mock_Uri.return_value.translate.return_value = \
+            '/usr/src/packages/SOURCES/repos/Devel:Tools/SLE_15'
+        assert resolve('obs://Devel:Tools/SLE_15').source == \
+            'dir:///usr/src/packages/SOURCES/repos/Devel:Tools/SLE_15'
+
+    def test_solve_raises_solver_error(self):
+        self.solver.solve.side_effect = KiwiSatSolverJobProblems('problems')
+        self._start()
+        try:
+            with raises(KiwiSatSolverJobProblems) as issue:
+                self.client.solve(self.repositories, self.jobs)
+            assert issue.value.message == 'problems'
+        finally:
+            self._stop()
+
+    def test_solve_raises_unknown_error(self):
+        self.mock_Sat.side_effect = ImportError('No module named solv')
+        self._start()
+        try:
+            with raises(KiwiSolverServiceError) as issue:
+                self.client.solve(self.repositories, self.jobs)
+            assert 'ImportError: No module named solv' in issue.value.message
+        finally:
+            self._stop()
+
+    def test_invalid_request(self):
+        self._start()
+        try:
+            with socket.socket(
+                socket.AF_UNIX, socket.SOCK_STREAM
+            ) as connection:
+                connection.connect(self.socket_path)
+                connection.sendall(b'{\n')
+                with connection.makefile('rb') as responses:
+                    assert b'JSONDecodeError' in responses.readline()
+        finally:
+            self._stop()
+
+    def test_solve_not_running(self):
+        with raises(KiwiSolverServiceError):
+            self.client.solve(self.repositories, self.jobs)
+
+    def test_serve_forever_removes_stale_socket(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+            stale.bind(self.socket_path)
+        self._start()
+        try:
+            assert self.client.solve(self.repositories, self.jobs)
+        finally:
+            self._stop()
+
+    def test_serve_forever_already_running(self):
+        self._start()
+        try:
+            with raises(KiwiSolverServiceError):
+                SolverService(self.socket_path).serve_forever()
+        finally:
+            self._stop()
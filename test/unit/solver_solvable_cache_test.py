@@ -0,0 +1,130 @@
+import os
+import time
+import shutil
+from tempfile import mkdtemp
+
+from mock import (
+    patch, Mock
+)
+
+from kiwi.solver.solvable_cache import SolvableCache
+
+
+class TestSolvableCache:
+    def setup(self):
+        self.cache_dir = mkdtemp(prefix='kiwi_solvable_cache.')
+        self.solvable_cache = SolvableCache(self.cache_dir, max_size=100)
+
+    def teardown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _create(self, data):
+        def create(filename):
+            with open(filename, 'wb') as solvable:
+                solvable.write(data)
+        return create
+
+    def _store(self, fingerprint, size, age=0):
+        key = self.solvable_cache.get_key('SolverRepositoryRpmMd', fingerprint)
+        solvable = self.solvable_cache.store(key, self._create(b'x' * size))
+        mtime = time.time() - age
+        os.utime(solvable, (mtime, mtime))
+        return key
+
+    def test_get_key(self):
+        key = self.solvable_cache.get_key('SolverRepositoryRpmMd', 'abc')
+        assert len(key) == 64
+        assert key == self.solvable_cache.get_key(
+            'SolverRepositoryRpmMd', 'abc'
+        )
+        assert key != self.solvable_cache.get_key(
+            'SolverRepositorySUSE', 'abc'
+        )
+        assert key != self.solvable_cache.get_key(
+            'SolverRepositoryRpmMd', 'abd'
+        )
+
+    def test_store_and_lookup(self):
+        key = self.solvable_cache.get_key('SolverRepositoryRpmMd', 'abc')
+        assert self.solvable_cache.lookup(key) is None
+        solvable = self.solvable_cache.store(
+            key, self._create(b'solvable'), 'http://example.com/repo\n'
+        )
+        assert solvable == os.sep.join([self.cache_dir, key])
+        os.utime(solvable, (0, 0))
+        assert self.solvable_cache.lookup(key) == solvable
+        assert os.stat(solvable).st_mtime > 0
+        with open(solvable, 'rb') as solvable_file:
+            assert solvable_file.read() == b'solvable'
+        with open(solvable + '.info') as info:
+            assert info.read() == 'http://example.com/repo\n'
+        assert sorted(os.listdir(self.cache_dir)) == [key, key + '.info']
+
+    def test_store_creates_cache_dir(self):
+        solvable_cache = SolvableCache(os.sep.join([self.cache_dir, 'sub']))
+        key = solvable_cache.get_key('SolverRepositoryRpmMd', 'abc')
+        assert solvable_cache.store(key, self._create(b'solvable')) == \
+            os.sep.join([self.cache_dir, 'sub', key])
+
+    def test_store_failed(self):
+        def create(filename):
+            with open(filename, 'wb'):
+                pass
+            raise OSError('mergesolv failed')
+
+        key = self.solvable_cache.get_key('SolverRepositoryRpmMd', 'abc')
+        try:
+            self.solvable_cache.store(key, create)
+        except OSError:
+            pass
+        assert os.listdir(self.cache_dir) == []
+
+    @patch('kiwi.logger.log.debug')
+    def test_evict(self, mock_log_debug):
+        oldest = self._store('a', 40, age=7200)
+        protected = self._store('b', 40, age=60)
+        latest = self._store('c', 40)
+        # the oldest entries are evicted until the limit is met
+        assert sorted(os.listdir(self.cache_dir)) == sorted(
+            [protected, latest]
+        )
+        assert oldest not in os.listdir(self.cache_dir)
+        assert mock_log_debug.called
+        # recently used entries are kept even above the limit
+        newest = self._store('d', 40)
+        assert sorted(os.listdir(self.cache_dir)) == sorted(
+            [protected, latest, newest]
+        )
+
+    def test_evict_keeps_entry(self):
+        key = self._store('a', 200, age=7200)
+        self.solvable_cache.evict(keep=key)
+        assert os.listdir(self.cache_dir) == [key]
+
+    def test_evict_stale_files(self):
+        stale = os.sep.join([self.cache_dir, 'solvable.1.2.tmp'])
+        running = os.sep.join([self.cache_dir, 'solvable.3.4.tmp'])
+        legacy = os.sep.join([self.cache_dir, 'repo-alias'])
+        for filename in (stale, running, legacy):
+            with open(filename, 'wb') as data:
+                data.write(b'x' * 200)
+            os.utime(filename, (0, 0))
+        os.utime(running)
+        self.solvable_cache.evict()
+        assert sorted(os.listdir(self.cache_dir)) == [
+            'repo-alias', 'solvable.3.4.tmp'
+        ]
+
+    @patch('os.scandir')
+    def test_evict_concurrently_removed(self, mock_scandir):
+        removed = Mock()
+        removed.stat.side_effect = FileNotFoundError
+        evicted = Mock()
+        evicted.name = 'a' * 64
+        evicted.stat.return_value = Mock(st_mtime=0, st_size=200)
+        mock_scandir.return_value.__enter__ = Mock(
+            return_value=[removed, evicted]
+        )
+        mock_scandir.return_value.__exit__ = Mock(return_value=False)
+        self.solvable_cache.evict()
+        assert os.listdir(self.cache_dir) == []
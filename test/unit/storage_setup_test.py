@@ -133,6 +133,13 @@ class TestDiskSetup:
             Defaults.get_default_prep_mbytes() + \
             self.size.accumulate_mbyte_file_sizes.return_value
 
+    def test_get_disksize_mbytes_boot_files_in_root(self):
+        self.setup_ppc.bootpart_requested = False
+        assert self.setup_ppc.get_disksize_mbytes() == \
+            Defaults.get_boot_files_mbytes() + \
+            Defaults.get_default_prep_mbytes() + \
+            self.size.accumulate_mbyte_file_sizes.return_value
+
     def test_get_disksize_mbytes_with_spare_partition(self):
         configured_spare_part_size = 42
         assert self.setup_arm.get_disksize_mbytes() == \
@@ -28,8 +28,9 @@ class TestRootInit:
     @patch('kiwi.system.root_init.DataSync')
     @patch('kiwi.system.root_init.mkdtemp')
     @patch('kiwi.system.root_init.Command.run')
+    @patch('kiwi.system.root_init.Path')
     def test_create_raises_error(
-        self, mock_command, mock_temp, mock_data_sync, mock_rmtree,
+        self, mock_Path, mock_command, mock_temp, mock_data_sync, mock_rmtree,
         mock_symlink, mock_chwon, mock_makedirs, mock_path
     ):
         mock_path.return_value = False
@@ -48,10 +49,11 @@ class TestRootInit:
     @patch('kiwi.system.root_init.DataSync')
     @patch('kiwi.system.root_init.mkdtemp')
     @patch('kiwi.system.root_init.Command.run')
+    @patch('kiwi.system.root_init.Path.create')
     def test_create(
-        self, mock_command, mock_temp, mock_data_sync, mock_rmtree, mock_copy,
-        mock_makedev, mock_symlink, mock_chwon, mock_makedirs,
-        mock_path
+        self, mock_create, mock_command, mock_temp, mock_data_sync,
+        mock_rmtree, mock_copy, mock_makedev, mock_symlink, mock_chwon,
+        mock_makedirs, mock_path
     ):
         data_sync = mock.Mock()
         mock_data_sync.return_value = data_sync
@@ -94,8 +96,8 @@ class TestRootInit:
             call('fd/1', 'tmpdir/dev/stdout'),
             call('/run', 'tmpdir/var/run')
         ]
+        mock_create.assert_called_once_with('root_dir')
         assert mock_command.call_args_list == [
-            call(['mkdir', '-p', 'root_dir']),
             call([
                 'cp',
                 '/var/adm/fillup-templates/group.aaa_base',
@@ -126,12 +128,10 @@ class TestRootInit:
             '/.buildenv', 'root_dir'
         )
 
-    @patch('kiwi.command.Command.run')
+    @patch('kiwi.system.root_init.Path.wipe')
     @patch('os.path.exists')
-    def test_delete(self, mock_path, mock_command):
+    def test_delete(self, mock_path, mock_wipe):
         mock_path.return_value = False
         root = RootInit('root_dir')
         root.delete()
-        mock_command.assert_called_once_with(
-            ['rm', '-r', '-f', 'root_dir']
-        )
+        mock_wipe.assert_called_once_with('root_dir')
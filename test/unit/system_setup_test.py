@@ -69,12 +69,13 @@ class TestSystemSetup:
         )
         assert setup.arch == 'ix86'
 
+    @patch('kiwi.system.setup.Path.create')
     @patch('kiwi.command.Command.run')
     @patch_open
     @patch('os.path.exists')
     @patch('kiwi.system.setup.glob.iglob')
     def test_import_description(
-        self, mock_iglob, mock_path, mock_open, mock_command
+        self, mock_iglob, mock_path, mock_open, mock_command, mock_create
     ):
         mock_iglob.return_value = ['config-cdroot.tar.xz']
         mock_path.return_value = True
@@ -83,8 +84,8 @@ class TestSystemSetup:
         mock_iglob.assert_called_once_with(
             '../data/config-cdroot.tar*'
         )
+        mock_create.assert_called_once_with('root_dir/image')
         assert mock_command.call_args_list == [
-            call(['mkdir', '-p', 'root_dir/image']),
             call(['cp', '../data/config.sh', 'root_dir/image/config.sh']),
             call([
                 'cp', '../data/my_edit_boot_script',
@@ -104,11 +105,12 @@ class TestSystemSetup:
             call(['cp', 'config-cdroot.tar.xz', 'root_dir/image/'])
         ]
 
+    @patch('kiwi.system.setup.Path.create')
     @patch('kiwi.command.Command.run')
     @patch_open
     @patch('os.path.exists')
     def test_import_description_archive_from_derived(
-        self, mock_path, mock_open, mock_command
+        self, mock_path, mock_open, mock_command, mock_create
     ):
         path_return_values = [
             True, False, True, True, True, True, True
@@ -120,8 +122,8 @@ class TestSystemSetup:
         mock_path.side_effect = side_effect
         self.setup_with_real_xml.import_description()
 
+        mock_create.assert_called_once_with('root_dir/image')
         assert mock_command.call_args_list == [
-            call(['mkdir', '-p', 'root_dir/image']),
             call(['cp', '../data/config.sh', 'root_dir/image/config.sh']),
             call([
                 'cp', '../data/my_edit_boot_script',
@@ -142,12 +144,13 @@ class TestSystemSetup:
             ])
         ]
 
+    @patch('kiwi.system.setup.Path.create')
     @patch('kiwi.command.Command.run')
     @patch_open
     @patch('os.path.exists')
     @raises(KiwiImportDescriptionError)
     def test_import_description_configured_editboot_scripts_not_found(
-        self, mock_path, mock_open, mock_command
+        self, mock_path, mock_open, mock_command, mock_create
     ):
         path_return_values = [False, True, True]
 
@@ -157,12 +160,13 @@ class TestSystemSetup:
         mock_path.side_effect = side_effect
         self.setup_with_real_xml.import_description()
 
+    @patch('kiwi.system.setup.Path.create')
     @patch('kiwi.command.Command.run')
     @patch_open
     @patch('os.path.exists')
     @raises(KiwiImportDescriptionError)
     def test_import_description_configured_archives_not_found(
-        self, mock_path, mock_open, mock_command
+        self, mock_path, mock_open, mock_command, mock_create
     ):
         path_return_values = [False, False, True, True, True, True]
 
@@ -283,19 +287,20 @@ class TestSystemSetup:
             ]
         )
 
+    @patch('kiwi.system.setup.Path.wipe')
     @patch('kiwi.system.setup.CommandCapabilities.has_option_in_help')
     @patch('kiwi.system.setup.Shell.run_common_function')
     @patch('kiwi.system.setup.Command.run')
     @patch('os.path.exists')
     def test_setup_keyboard_map_with_systemd(
-        self, mock_path, mock_run, mock_shell, mock_caps
+        self, mock_path, mock_run, mock_shell, mock_caps, mock_wipe
     ):
         mock_caps.return_value = True
         mock_path.return_value = True
         self.setup.preferences['keytable'] = 'keytable'
         self.setup.setup_keyboard_map()
+        mock_wipe.assert_called_once_with('root_dir/etc/vconsole.conf')
         mock_run.assert_has_calls([
-            call(['rm', '-r', '-f', 'root_dir/etc/vconsole.conf']),
             call([
                 'chroot', 'root_dir', 'systemd-firstboot',
                 '--keymap=keytable'
@@ -310,19 +315,20 @@ class TestSystemSetup:
         self.setup.setup_keyboard_map()
         assert mock_log_warn.called
 
+    @patch('kiwi.system.setup.Path.wipe')
     @patch('kiwi.system.setup.CommandCapabilities.has_option_in_help')
     @patch('kiwi.system.setup.Shell.run_common_function')
     @patch('kiwi.system.setup.Command.run')
     @patch('os.path.exists')
     def test_setup_locale(
-        self, mock_path, mock_run, mock_shell, mock_caps
+        self, mock_path, mock_run, mock_shell, mock_caps, mock_wipe
     ):
         mock_caps.return_valure = True
         mock_path.return_value = True
         self.setup.preferences['locale'] = 'locale1,locale2'
         self.setup.setup_locale()
+        mock_wipe.assert_called_once_with('root_dir/etc/locale.conf')
         mock_run.assert_has_calls([
-            call(['rm', '-r', '-f', 'root_dir/etc/locale.conf']),
             call([
                 'chroot', 'root_dir', 'systemd-firstboot',
                 '--locale=locale1.UTF-8'
@@ -358,14 +364,17 @@ class TestSystemSetup:
             ])
         ])
 
+    @patch('kiwi.system.setup.Path.wipe')
     @patch('kiwi.system.setup.CommandCapabilities.has_option_in_help')
     @patch('kiwi.system.setup.Command.run')
-    def test_setup_timezone_with_systemd(self, mock_command, mock_caps):
+    def test_setup_timezone_with_systemd(
+        self, mock_command, mock_caps, mock_wipe
+    ):
         mock_caps.return_value = True
         self.setup.preferences['timezone'] = 'timezone'
         self.setup.setup_timezone()
+        mock_wipe.assert_called_once_with('root_dir/etc/localtime')
         mock_command.assert_has_calls([
-            call(['rm', '-r', '-f', 'root_dir/etc/localtime']),
             call([
                 'chroot', 'root_dir', 'systemd-firstboot',
                 '--timezone=timezone'
@@ -1,39 +1,333 @@
-from mock import patch
+import os
+import errno
+import shutil
+import subprocess
+from tempfile import mkdtemp
 
 import mock
+import pytest
 
-from kiwi.system.size import SystemSize
+from kiwi.path import Path
+from kiwi.system.size import (
+    SystemSize, _TreeCount, filesystem_usage_type
+)
 
 
 class TestSystemSize:
     def setup(self):
         self.size = SystemSize('directory')
-
-    def test_customize_ext(self):
-        self.size.accumulate_files = mock.Mock(
-            return_value=10000
+        self.source_dir = mkdtemp(prefix='kiwi_system_size.')
+        os.makedirs(self.source_dir + '/usr/lib')
+        os.makedirs(self.source_dir + '/var/cache')
+        with open(self.source_dir + '/usr/lib/data', 'wb') as data:
+            data.write(b'x' * 100)
+        os.link(
+            self.source_dir + '/usr/lib/data',
+            self.source_dir + '/usr/lib/data.link'
+        )
+        with open(self.source_dir + '/var/cache/data', 'wb') as data:
+            data.write(b'x' * 1000)
+        with open(self.source_dir + '/file', 'wb') as data:
+            data.write(b'x' * 10)
+        os.symlink('usr/lib/data', self.source_dir + '/symlink')
+        self.dir_bytes = sum(
+            os.lstat(self.source_dir + path).st_size for path in [
+                '', '/usr', '/usr/lib', '/var', '/var/cache'
+            ]
         )
-        assert self.size.customize(42, 'ext3') == 67
 
-    def test_customize_btrfs(self):
-        assert self.size.customize(42, 'btrfs') == 63
+    def teardown(self):
+        shutil.rmtree(self.source_dir)
+
+    def test_customize(self):
+        size = SystemSize(self.source_dir)
+        size.get_filesystem_bytes = mock.Mock(
+            return_value=(42 << 20) + 1
+        )
+        assert size.customize(40, 'ext4') == 82
+        size.get_filesystem_bytes.assert_called_once_with('ext4', None)
+        size.get_filesystem_bytes.return_value = 0
+        assert size.customize(40, 'btrfs', ['var']) == 40
+        size.get_filesystem_bytes.assert_called_with('btrfs', ['var'])
 
     def test_customize_xfs(self):
-        assert self.size.customize(42, 'xfs') == 63
-
-    @patch('kiwi.system.size.Command.run')
-    def test_accumulate_mbyte_file_sizes(self, mock_command):
-        self.size.accumulate_mbyte_file_sizes(['/foo'])
-        mock_command.assert_called_once_with(
-            [
-                'du', '-s', '--apparent-size', '--block-size', '1',
-                '--exclude', '/foo', 'directory'
+        size = SystemSize(self.source_dir)
+        size.get_filesystem_bytes = mock.Mock()
+        assert size.customize(40, 'xfs', ['var']) == 60
+        assert not size.get_filesystem_bytes.called
+
+    def test_customize_unknown_filesystem(self):
+        assert self.size.customize(42.5, 'squashfs') == 42
+        assert self.size.customize(42.5, None) == 42
+
+    def test_get_filesystem_bytes(self):
+        usage = filesystem_usage_type(
+            file_blocks=100000, directory_blocks=1000, long_symlinks=100,
+            xattr_blocks=10, xattr_bytes=50000, inline_files=20000,
+            inline_bytes=20000000, name_bytes=400000, inodes=30000
+        )
+        size = SystemSize(self.source_dir)
+        size.get_filesystem_usage = mock.Mock(return_value=usage)
+        assert size.get_filesystem_bytes('ext2') == 461693304
+        assert size.get_filesystem_bytes('ext3') == 480324606
+        assert size.get_filesystem_bytes('ext4') == 478546081
+        assert size.get_filesystem_bytes('xfs', ['var']) == 527038148
+        assert size.get_filesystem_bytes('btrfs') == 547097064
+        size.get_filesystem_usage.assert_any_call(['var'])
+
+    def test_get_filesystem_bytes_minimum(self):
+        usage = filesystem_usage_type(
+            file_blocks=1, directory_blocks=1, long_symlinks=0,
+            xattr_blocks=0, xattr_bytes=0, inline_files=1, inline_bytes=10,
+            name_bytes=4, inodes=2
+        )
+        size = SystemSize(self.source_dir)
+        size.get_filesystem_usage = mock.Mock(return_value=usage)
+        assert size.get_filesystem_bytes('ext2') == 75940
+        assert size.get_filesystem_bytes('xfs') == 324009984
+        assert size.get_filesystem_bytes('btrfs') == 276488520
+
+    def test_get_ext_journal_bytes(self):
+        assert SystemSize._get_ext_journal_bytes(4 << 20) == 0
+        assert SystemSize._get_ext_journal_bytes(100 << 20) == 4 << 20
+        assert SystemSize._get_ext_journal_bytes(10 << 30) == 64 << 20
+        assert SystemSize._get_ext_journal_bytes(1 << 40) == 1 << 30
+
+    def test_get_filesystem_usage(self):
+        size = SystemSize(self.source_dir)
+        assert size.get_filesystem_usage() == filesystem_usage_type(
+            file_blocks=3, directory_blocks=5, long_symlinks=0,
+            xattr_blocks=0, xattr_bytes=0, inline_files=3,
+            inline_bytes=1110, name_bytes=42, inodes=9
+        )
+        assert size.get_filesystem_usage(['var']).file_blocks == 2
+
+    def test_get_filesystem_usage_large_entries(self):
+        with open(self.source_dir + '/usr/lib/large', 'wb') as data:
+            data.truncate(3 * 4096 + 1)
+        os.symlink('x' * 100, self.source_dir + '/usr/long_symlink')
+        for count in range(200):
+            os.symlink(
+                'usr/lib/data', self.source_dir + '/var/cache/{0:040}'.format(
+                    count
+                )
+            )
+        usage = SystemSize(self.source_dir).get_filesystem_usage()
+        assert usage.file_blocks == 7
+        assert usage.long_symlinks == 1
+        assert usage.inline_files == 3
+        # var/cache holds 201 entries with long names
+        assert usage.directory_blocks == 7
+
+    def test_get_filesystem_usage_xattrs(self):
+        filename = self.source_dir + '/file'
+        try:
+            os.setxattr(filename, 'user.large', b'x' * 100)
+        except OSError:
+            pytest.skip('requires user extended attributes')
+        os.setxattr(self.source_dir + '/usr', 'user.small', b'x' * 10)
+        usage = SystemSize(self.source_dir).get_filesystem_usage()
+        assert usage.xattr_blocks == 1
+        assert usage.xattr_bytes == 130
+
+    @mock.patch('os.listxattr')
+    def test_get_filesystem_usage_xattrs_not_supported(self, mock_listxattr):
+        mock_listxattr.side_effect = OSError(errno.ENOTSUP, 'not supported')
+        usage = SystemSize(self.source_dir).get_filesystem_usage()
+        assert usage.xattr_bytes == 0
+        # one call per tree walker
+        assert mock_listxattr.call_count == 3
+        mock_listxattr.side_effect = OSError(errno.ENOENT, 'vanished')
+        count = _TreeCount()
+        count.add_xattrs('vanished')
+        assert count.xattr_supported is True
+
+    def test_get_tree_size(self):
+        size = SystemSize(self.source_dir)
+        symlink_bytes = len('usr/lib/data')
+        assert size.get_tree_size() == (
+            self.dir_bytes + 1210 + symlink_bytes,
+            self.dir_bytes + 1110 + symlink_bytes,
+            10, 9
+        )
+
+    def test_get_tree_size_exclude(self):
+        size = SystemSize(self.source_dir)
+        tree_size = size.get_tree_size(
+            [self.source_dir + '/var', 'data.link', 'symlink']
+        )
+        dir_bytes = self.dir_bytes - sum(
+            os.lstat(self.source_dir + path).st_size for path in [
+                '/var', '/var/cache'
             ]
         )
+        assert tree_size == (dir_bytes + 110, dir_bytes + 110, 5, 5)
 
-    @patch('kiwi.system.size.Command.run')
-    def test_accumulate_files(self, mock_command):
-        self.size.accumulate_files()
-        mock_command.assert_called_once_with(
-            ['bash', '-c', 'find directory | wc -l']
+    def test_get_tree_size_cached(self):
+        size = SystemSize(self.source_dir)
+        tree_size = size.get_tree_size()
+        with open(self.source_dir + '/new', 'wb') as data:
+            data.write(b'x' * 10)
+        with mock.patch('os.scandir') as mock_scandir:
+            assert size.get_tree_size() == tree_size
+            assert not mock_scandir.called
+        # the cache is bound to the instance
+        assert SystemSize(self.source_dir).get_tree_size().files == \
+            tree_size.files + 1
+        size.clear_cache()
+        assert size.get_tree_size().files == tree_size.files + 1
+
+    @mock.patch('os.scandir')
+    def test_walk_entry_vanished(self, mock_scandir):
+        entry = mock.Mock()
+        entry.name = 'vanished'
+        entry.path = 'directory/vanished'
+        entry.stat.side_effect = FileNotFoundError
+        mock_scandir.return_value.__enter__.return_value = [entry]
+        assert _TreeCount().walk('directory', ()).files == 0
+
+    def test_accumulate_mbyte_file_sizes(self):
+        size = SystemSize(self.source_dir)
+        assert size.accumulate_mbyte_file_sizes() == \
+            size.get_tree_size().deduplicated_bytes / 1048576
+
+    def test_accumulate_files(self):
+        assert SystemSize(self.source_dir).accumulate_files() == 10
+
+
+class TestSystemSizeEstimate:
+    """
+    Build filesystems of the estimated size from source trees of
+    different shapes and compare the estimate with the actual usage
+    """
+    def setup(self):
+        self.tmpdir = mkdtemp(prefix='kiwi_system_size_estimate.')
+        self.source_dir = self.tmpdir + '/root'
+        self.image = self.tmpdir + '/image'
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _create_small_files(self):
+        for directory in range(20):
+            path = '{0}/usr/share/{1}'.format(self.source_dir, directory)
+            os.makedirs(path)
+            for count in range(100):
+                with open('{0}/file{1}'.format(path, count), 'wb') as data:
+                    data.write(b'x' * (count * 97 % 5000))
+
+    def _create_large_files(self):
+        os.makedirs(self.source_dir + '/usr/lib')
+        for count in range(6):
+            filename = '{0}/usr/lib/lib{1}.so'.format(self.source_dir, count)
+            with open(filename, 'wb') as data:
+                data.write(os.urandom(4 << 20))
+
+    def _create_links_and_xattrs(self):
+        os.makedirs(self.source_dir + '/etc')
+        for count in range(500):
+            filename = '{0}/etc/config{1}'.format(self.source_dir, count)
+            with open(filename, 'wb') as data:
+                data.write(b'y' * 3000)
+            try:
+                os.setxattr(filename, 'user.comment', b'z' * (count % 300))
+            except OSError:
+                pass
+            os.link(filename, filename + '.link')
+            os.symlink('../' * 30 + filename, filename + '.symlink')
+
+    def _create_filesystem(self, filesystem, filesystem_bytes):
+        with open(self.image, 'wb') as image:
+            image.truncate(filesystem_bytes)
+        if filesystem == 'btrfs':
+            command = ['mkfs.btrfs', '--rootdir', self.source_dir]
+        else:
+            command = ['mkfs.' + filesystem, '-q', '-F', '-d', self.source_dir]
+        subprocess.check_call(
+            command + [self.image],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    def _get_ext_free_bytes(self):
+        header = {}
+        for line in subprocess.check_output(
+            ['dumpe2fs', '-h', self.image], stderr=subprocess.DEVNULL
+        ).decode().splitlines():
+            key, separator, value = line.partition(':')
+            header[key] = value.strip()
+        return int(header['Free blocks']) * int(header['Block size'])
+
+    @pytest.mark.skipif(
+        Path.which('mkfs.ext4') is None or Path.which('dumpe2fs') is None,
+        reason='requires e2fsprogs'
+    )
+    @pytest.mark.parametrize('filesystem', ['ext2', 'ext3', 'ext4'])
+    @pytest.mark.parametrize(
+        'create_tree', [
+            '_create_small_files', '_create_large_files',
+            '_create_links_and_xattrs'
+        ]
+    )
+    def test_ext_estimate(self, filesystem, create_tree):
+        getattr(self, create_tree)()
+        filesystem_bytes = SystemSize(self.source_dir).get_filesystem_bytes(
+            filesystem
+        )
+        self._create_filesystem(filesystem, filesystem_bytes)
+        # the estimate fits the tree, the remaining free space is
+        # mostly due to the fixed costs of small filesystems
+        assert self._get_ext_free_bytes() <= \
+            filesystem_bytes * 0.2 + (8 << 20)
+
+    @pytest.mark.skipif(
+        Path.which('mkfs.btrfs') is None, reason='requires btrfs-progs'
+    )
+    @pytest.mark.parametrize(
+        'create_tree', [
+            '_create_small_files', '_create_large_files',
+            '_create_links_and_xattrs'
+        ]
+    )
+    def test_btrfs_estimate(self, create_tree):
+        getattr(self, create_tree)()
+        self._create_filesystem(
+            'btrfs', SystemSize(self.source_dir).get_filesystem_bytes('btrfs')
+        )
+
+    @pytest.mark.skipif(
+        Path.which('mkfs.xfs') is None or os.geteuid() != 0,
+        reason='requires xfsprogs and root privileges for a loop mount'
+    )
+    @pytest.mark.parametrize(
+        'create_tree', [
+            '_create_small_files', '_create_large_files',
+            '_create_links_and_xattrs'
+        ]
+    )
+    def test_xfs_estimate(self, create_tree):
+        getattr(self, create_tree)()
+        filesystem_bytes = SystemSize(self.source_dir).get_filesystem_bytes(
+            'xfs'
+        )
+        # mkfs.xfs can't populate a filesystem from a directory,
+        # the tree is copied into the loop mounted filesystem
+        with open(self.image, 'wb') as image:
+            image.truncate(filesystem_bytes)
+        subprocess.check_call(
+            ['mkfs.xfs', '-q', '-f', self.image],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
         )
+        mountpoint = self.tmpdir + '/mnt'
+        os.mkdir(mountpoint)
+        subprocess.check_call(['mount', '-o', 'loop', self.image, mountpoint])
+        try:
+            subprocess.check_call(
+                ['cp', '-a', self.source_dir + '/.', mountpoint],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            os.sync()
+            filesystem_stat = os.statvfs(mountpoint)
+        finally:
+            subprocess.check_call(['umount', mountpoint])
+        assert filesystem_stat.f_bfree * filesystem_stat.f_frsize <= \
+            filesystem_bytes * 0.2 + (8 << 20)
@@ -8,6 +8,8 @@ import kiwi
 from .test_helper import argv_kiwi_tests
 
 from kiwi.tasks.image_info import ImageInfoTask
+from kiwi.solver.service import solver_repository_type
+from kiwi.exceptions import KiwiSolverServiceError
 
 from collections import namedtuple
 
@@ -85,6 +87,8 @@ class TestImageInfoTask:
         self.task.command_args['--add-repo'] = []
         self.task.command_args['--ignore-repos'] = False
         self.task.command_args['--resolve-package-list'] = False
+        self.task.command_args['--resolver-socket'] = None
+        self.task.command_args['--serve-resolver'] = None
 
     @patch('kiwi.tasks.image_info.DataOutput')
     def test_process_image_info(self, mock_out):
@@ -116,13 +120,75 @@ class TestImageInfoTask:
         self.task.command_args['info'] = True
         self.task.command_args['--resolve-package-list'] = True
         self.task.process()
-        assert self.solver.add_repository.called
+        self.solver.add_repositories.assert_called_once_with(
+            [mock_solver_repo.return_value, mock_solver_repo.return_value]
+        )
         assert mock_uri.call_args_list == [
             call('iso:///image/CDs/dvd.iso', None),
             call('obs://Devel:PubCloud:AmazonEC2/SLE_12_GA', 'rpm-md')
         ]
         mock_out.assert_called_once_with(self.result_info)
 
+    @patch('kiwi.tasks.image_info.DataOutput')
+    @patch('kiwi.tasks.image_info.SolverServiceClient')
+    def test_process_image_info_resolve_package_list_service(
+        self, mock_SolverServiceClient, mock_out
+    ):
+        client = mock.Mock()
+        client.solve.return_value = [
+            self.solver.solve.return_value, self.solver.solve.return_value
+        ]
+        mock_SolverServiceClient.return_value = client
+        self._init_command_args()
+        self.task.command_args['info'] = True
+        self.task.command_args['--resolve-package-list'] = True
+        self.task.command_args['--resolver-socket'] = 'resolver.sock'
+        self.task.process()
+        mock_SolverServiceClient.assert_called_once_with('resolver.sock')
+        repositories, jobs = client.solve.call_args[0]
+        assert repositories == [
+            solver_repository_type(
+                source='iso:///image/CDs/dvd.iso', type=None,
+                user=None, secret=None
+            ),
+            solver_repository_type(
+                source='obs://Devel:PubCloud:AmazonEC2/SLE_12_GA',
+                type='rpm-md', user=None, secret=None
+            )
+        ]
+        assert [job.ignore_recommended for job in jobs] == [True, False]
+        assert 'filesystem' in jobs[0].job_names
+        assert not self.solver.solve.called
+        mock_out.assert_called_once_with(self.result_info)
+
+    @patch('kiwi.tasks.image_info.DataOutput')
+    @patch('kiwi.tasks.image_info.SolverServiceClient')
+    @patch('kiwi.tasks.image_info.SolverRepository')
+    @patch('kiwi.tasks.image_info.Uri')
+    @patch('kiwi.logger.log.warning')
+    def test_process_image_info_resolve_package_list_service_failed(
+        self, mock_log_warning, mock_uri, mock_solver_repo,
+        mock_SolverServiceClient, mock_out
+    ):
+        mock_SolverServiceClient.return_value.solve.side_effect = \
+            KiwiSolverServiceError('Solver service on resolver.sock failed')
+        self._init_command_args()
+        self.task.command_args['info'] = True
+        self.task.command_args['--resolve-package-list'] = True
+        self.task.command_args['--resolver-socket'] = 'resolver.sock'
+        self.task.process()
+        assert mock_log_warning.called
+        assert self.solver.solve.call_count == 2
+        mock_out.assert_called_once_with(self.result_info)
+
+    @patch('kiwi.tasks.image_info.SolverService')
+    def test_process_image_info_serve_resolver(self, mock_SolverService):
+        self._init_command_args()
+        self.task.command_args['--serve-resolver'] = 'resolver.sock'
+        self.task.process()
+        mock_SolverService.assert_called_once_with('resolver.sock')
+        mock_SolverService.return_value.serve_forever.assert_called_once_with()
+
     @patch('kiwi.xml_state.XMLState.add_repository')
     @patch('kiwi.tasks.image_info.DataOutput')
     def test_process_image_info_add_repo(self, mock_out, mock_state):
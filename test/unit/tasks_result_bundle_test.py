@@ -53,6 +53,15 @@ class TestResultBundleTask:
         runtime_config.is_bundle_compression_requested = mock.Mock(
             return_value=True
         )
+        runtime_config.get_bundle_jobs = mock.Mock(
+            return_value=1
+        )
+        runtime_config.get_compress_threads = mock.Mock(
+            return_value=8
+        )
+        runtime_config.get_bundle_compression_tool = mock.Mock(
+            return_value='xz'
+        )
         self.task.runtime_config = runtime_config
 
     def teardown(self):
@@ -75,8 +84,10 @@ class TestResultBundleTask:
         self.task.command_args['bundle'] = True
         self.task.process()
 
+    @patch('kiwi.tasks.result_bundle.BundleCache')
     @patch('kiwi.tasks.result_bundle.Result.load')
     @patch('kiwi.tasks.result_bundle.Command.run')
+    @patch('kiwi.tasks.result_bundle.FileCopy.stage')
     @patch('kiwi.tasks.result_bundle.Path.create')
     @patch('kiwi.tasks.result_bundle.Path.which')
     @patch('kiwi.tasks.result_bundle.Compress')
@@ -85,8 +96,10 @@ class TestResultBundleTask:
     @patch_open
     def test_process_result_bundle(
         self, mock_open, mock_exists, mock_checksum, mock_compress,
-        mock_path_which, mock_path_create, mock_command, mock_load
+        mock_path_which, mock_path_create, mock_stage, mock_command,
+        mock_load, mock_bundle_cache
     ):
+        mock_bundle_cache.return_value.lookup.return_value = None
         # This file won't be copied with build id
         self.result.add(
             key='noversion', filename='test-image-noversion',
@@ -97,6 +110,11 @@ class TestResultBundleTask:
         compress = mock.Mock()
         mock_path_which.return_value = 'zsyncmake'
         compress.compressed_filename = 'compressed_filename'
+        compress.xz_stream.return_value = mock.Mock(
+            hexdigests={'sha256': 'sha256sum'},
+            input_bytes=4194304, output_bytes=1048576,
+            stage_seconds={'compress': 2.0, 'write': 0.5, 'checksum': 0}
+        )
         mock_compress.return_value = compress
         mock_checksum.return_value = checksum
         mock_exists.return_value = False
@@ -112,42 +130,137 @@ class TestResultBundleTask:
             os.sep.join([self.abs_target_dir, 'kiwi.result'])
         )
         mock_path_create.assert_called_once_with(self.abs_bundle_dir)
+        mock_stage.assert_called_once_with(
+            'test-image-noversion',
+            os.sep.join([self.abs_bundle_dir, 'test-image-noversion']),
+            allow_hardlink=True
+        )
         assert mock_command.call_args_list == [
-            call([
-                'cp', 'test-image-1.2.3',
-                os.sep.join([self.abs_bundle_dir, 'test-image-1.2.3-Build_42'])
-            ]),
             call([
                 'zsyncmake', '-e',
                 '-u', 'http://example.com/zsync/compressed_filename',
                 '-o', 'compressed_filename.zsync',
                 'compressed_filename'
-            ]),
-            call([
-                'cp', 'test-image-noversion',
-                os.sep.join([self.abs_bundle_dir, 'test-image-noversion'])
             ])
         ]
-        mock_compress.assert_called_once_with(
-            os.sep.join([self.abs_bundle_dir, 'test-image-1.2.3-Build_42'])
+        mock_compress.assert_called_once_with('test-image-1.2.3')
+        compress.xz_stream.assert_called_once_with(
+            os.sep.join(
+                [self.abs_bundle_dir, 'test-image-1.2.3-Build_42.xz']
+            ), self.task.runtime_config.get_xz_options.return_value,
+            ['sha256'], 8
         )
-        mock_checksum.assert_called_once_with(
-            compress.compressed_filename
+        assert not mock_checksum.called
+        mock_open.assert_called_once_with(
+            'compressed_filename.sha256', 'w'
         )
-        checksum.sha256.assert_called_once_with()
         self.file_mock.write.assert_called_once_with(
-            '{0}  test-image-1.2.3-Build_42'.format(
-                checksum.sha256.return_value
-            )
+            'sha256sum  test-image-1.2.3-Build_42'
+        )
+        mock_bundle_cache.assert_called_once_with(self.abs_bundle_dir)
+        bundle_cache = mock_bundle_cache.return_value
+        bundle_cache.lookup.assert_any_call(
+            'test-image-1.2.3', {
+                'compress': True, 'shasum': True,
+                'compression_tool': 'xz', 'xz_options':
+                    self.task.runtime_config.get_xz_options.return_value
+            }
         )
+        assert call(
+            'test-image-1.2.3', {
+                'compress': True, 'shasum': True,
+                'compression_tool': 'xz', 'xz_options':
+                    self.task.runtime_config.get_xz_options.return_value
+            }, 'compressed_filename', 'sha256sum',
+            'compressed_filename.zsync'
+        ) in bundle_cache.update.call_args_list
+        bundle_cache.write.assert_called_once_with()
 
+    @patch('kiwi.tasks.result_bundle.BundleCache')
     @patch('kiwi.tasks.result_bundle.Result.load')
     @patch('kiwi.tasks.result_bundle.Command.run')
+    @patch('kiwi.tasks.result_bundle.FileCopy.stage')
+    @patch('kiwi.tasks.result_bundle.Path.create')
+    @patch('kiwi.tasks.result_bundle.Path.which')
+    @patch('kiwi.tasks.result_bundle.Compress')
+    @patch('kiwi.tasks.result_bundle.Checksum')
+    @patch('os.path.exists')
+    @patch('kiwi.tasks.result_bundle.AtomicFile')
+    @patch_open
+    def test_process_result_bundle_unchanged(
+        self, mock_open, mock_AtomicFile, mock_exists, mock_checksum,
+        mock_compress, mock_path_which, mock_path_create, mock_stage,
+        mock_command, mock_load, mock_bundle_cache
+    ):
+        bundle_file = os.sep.join(
+            [self.abs_bundle_dir, 'test-image-1.2.3-Build_42.xz']
+        )
+        mock_bundle_cache.return_value.lookup.return_value = {
+            'bundle_file': 'test-image-1.2.3-Build_41.xz',
+            'sha256': 'sha256sum',
+            'zsync_file': 'test-image-1.2.3-Build_41.xz.zsync'
+        }
+        mock_path_which.return_value = 'zsyncmake'
+        mock_exists.return_value = True
+        mock_open.return_value = self.context_manager_mock
+        self.file_mock.read.return_value = \
+            b'zsync: 0.6.2\n' \
+            b'Filename: test-image-1.2.3-Build_41.xz\n' \
+            b'URL: http://example.com/zsync/test-image-1.2.3-Build_41.xz\n' \
+            b'\n\x00\x01'
+        mock_load.return_value = self.result
+        self._init_command_args()
+        self.task.command_args['--zsync-source'] = 'http://example.com/zsync'
+
+        self.task.process()
+
+        assert not mock_compress.called
+        assert not mock_checksum.called
+        assert not mock_command.called
+        mock_stage.assert_called_once_with(
+            os.sep.join(
+                [self.abs_bundle_dir, 'test-image-1.2.3-Build_41.xz']
+            ), bundle_file, allow_hardlink=True
+        )
+        assert mock_open.call_args_list == [
+            call(
+                os.sep.join([
+                    self.abs_bundle_dir,
+                    'test-image-1.2.3-Build_41.xz.zsync'
+                ]), 'rb'
+            ),
+            call(bundle_file + '.sha256', 'w')
+        ]
+        mock_AtomicFile.write.assert_called_once_with(
+            bundle_file + '.zsync',
+            b'zsync: 0.6.2\n'
+            b'Filename: test-image-1.2.3-Build_42.xz\n'
+            b'URL: http://example.com/zsync/'
+            b'test-image-1.2.3-Build_42.xz\n'
+            b'\n\x00\x01'
+        )
+        assert self.file_mock.write.call_args_list == [
+            call('sha256sum  test-image-1.2.3-Build_42')
+        ]
+        mock_bundle_cache.return_value.update.assert_called_once_with(
+            'test-image-1.2.3', {
+                'compress': True, 'shasum': True,
+                'compression_tool': 'xz', 'xz_options':
+                    self.task.runtime_config.get_xz_options.return_value
+            }, bundle_file, 'sha256sum', bundle_file + '.zsync'
+        )
+
+    @patch('kiwi.tasks.result_bundle.BundleCache')
+    @patch('kiwi.logger.log.info')
+    @patch('kiwi.tasks.result_bundle.Result.load')
+    @patch('kiwi.tasks.result_bundle.FileCopy.stage')
     @patch('kiwi.tasks.result_bundle.Path.create')
     @patch('os.path.exists')
     def test_process_result_bundle_name_includes_version(
-        self, mock_exists, mock_path_create, mock_command, mock_load
+        self, mock_exists, mock_path_create, mock_stage, mock_load, mock_log,
+        mock_bundle_cache
     ):
+        mock_bundle_cache.return_value.lookup.return_value = None
         result = Result(self.xml_state)
         result.add(
             key='nameincludesversion', filename='test-1.2.3-image-1.2.3',
@@ -160,6 +273,9 @@ class TestResultBundleTask:
 
         mock_exists.return_value = False
         mock_load.return_value = result
+        mock_stage.return_value = mock.Mock(
+            method='copy', size=42, seconds=0.5
+        )
         self._init_command_args()
 
         self.task.process()
@@ -168,19 +284,22 @@ class TestResultBundleTask:
             os.sep.join([self.abs_target_dir, 'kiwi.result'])
         )
         mock_path_create.assert_called_once_with(self.abs_bundle_dir)
-        assert mock_command.call_args_list == [
-            call([
-                'cp', 'test-1.2.3-image-1.2.3',
-                os.sep.join([
-                    self.abs_bundle_dir,
-                    'test-1.2.3-image-1.2.3-Build_42'
-                ])
-            ])
-        ]
+        mock_stage.assert_called_once_with(
+            'test-1.2.3-image-1.2.3',
+            os.sep.join([
+                self.abs_bundle_dir,
+                'test-1.2.3-image-1.2.3-Build_42'
+            ]),
+            allow_hardlink=True
+        )
+        assert call(
+            '--> Plain copy of %d bytes took %.2fs', 42, 0.5
+        ) in mock_log.call_args_list
 
+    @patch('kiwi.tasks.result_bundle.BundleCache')
     @patch('kiwi.logger.log.warning')
     @patch('kiwi.tasks.result_bundle.Result.load')
-    @patch('kiwi.tasks.result_bundle.Command.run')
+    @patch('kiwi.tasks.result_bundle.FileCopy.stage')
     @patch('kiwi.tasks.result_bundle.Path.create')
     @patch('kiwi.tasks.result_bundle.Path.which')
     @patch('kiwi.tasks.result_bundle.Compress')
@@ -189,12 +308,19 @@ class TestResultBundleTask:
     @patch_open
     def test_process_result_bundle_zsyncmake_missing(
         self, mock_open, mock_exists, mock_checksum, mock_compress,
-        mock_path_which, mock_path_create, mock_command, mock_load, mock_log
+        mock_path_which, mock_path_create, mock_stage, mock_load, mock_log,
+        mock_bundle_cache
     ):
+        mock_bundle_cache.return_value.lookup.return_value = None
         checksum = mock.Mock()
         compress = mock.Mock()
         mock_path_which.return_value = None
         compress.compressed_filename = 'compressed_filename'
+        compress.xz_stream.return_value = mock.Mock(
+            hexdigests={'sha256': 'sha256sum'},
+            input_bytes=0, output_bytes=0,
+            stage_seconds={'compress': 0, 'write': 0, 'checksum': 0}
+        )
         mock_compress.return_value = compress
         mock_checksum.return_value = checksum
         mock_exists.return_value = False
@@ -209,6 +335,207 @@ class TestResultBundleTask:
             '--> zsyncmake missing, zsync setup skipped'
         )
 
+    @patch('kiwi.tasks.result_bundle.BundleCache')
+    @patch('kiwi.tasks.result_bundle.Result.load')
+    @patch('kiwi.tasks.result_bundle.Path.create')
+    @patch('kiwi.tasks.result_bundle.Compress')
+    @patch('os.cpu_count')
+    @patch('os.path.exists')
+    @patch_open
+    def test_process_result_bundle_split_xz_threads(
+        self, mock_open, mock_exists, mock_cpu_count, mock_compress,
+        mock_path_create, mock_load, mock_bundle_cache
+    ):
+        mock_bundle_cache.return_value.lookup.return_value = None
+        result = Result(self.xml_state)
+        for name in ['a', 'b', 'c']:
+            result.add(
+                key=name, filename='test-image-' + name,
+                use_for_bundle=True, compress=True, shasum=False
+            )
+        mock_compress.return_value.xz_stream.return_value = mock.Mock(
+            hexdigests={}, input_bytes=0, output_bytes=0,
+            stage_seconds={'compress': 0, 'write': 0, 'checksum': 0}
+        )
+        mock_cpu_count.return_value = 8
+        mock_exists.return_value = True
+        mock_load.return_value = result
+        self.task.runtime_config.get_bundle_jobs.return_value = 4
+        self.task.runtime_config.get_compress_threads.return_value = None
+        self._init_command_args()
+
+        self.task.process()
+
+        # 8 CPUs for 3 xz processes in parallel
+        assert [
+            xz_stream[0][3] for xz_stream in
+            mock_compress.return_value.xz_stream.call_args_list
+        ] == [2, 2, 2]
+
+    @patch('kiwi.tasks.result_bundle.BundleCache')
+    @patch('kiwi.tasks.result_bundle.Result.load')
+    @patch('kiwi.tasks.result_bundle.Path.create')
+    @patch('kiwi.tasks.result_bundle.Path.which')
+    @patch('kiwi.tasks.result_bundle.Compress')
+    @patch('os.path.exists')
+    def test_process_result_bundle_zstd(
+        self, mock_exists, mock_compress, mock_path_which,
+        mock_path_create, mock_load, mock_bundle_cache
+    ):
+        mock_bundle_cache.return_value.lookup.return_value = None
+        result = Result(self.xml_state)
+        result.add(
+            key='keyname', filename='test-image-1.2.3',
+            use_for_bundle=True, compress=True, shasum=False
+        )
+        compress = mock_compress.return_value
+        compress.compressed_filename = 'compressed_filename'
+        compress.zstd_stream.return_value = mock.Mock(
+            hexdigests={}, input_bytes=0, output_bytes=0,
+            stage_seconds={'compress': 0, 'write': 0, 'checksum': 0}
+        )
+        mock_path_which.return_value = '/usr/bin/zstd'
+        mock_exists.return_value = True
+        mock_load.return_value = result
+        self.task.runtime_config.get_bundle_compression_tool.return_value = \
+            'zstd'
+        self._init_command_args()
+
+        self.task.process()
+
+        mock_path_which.assert_called_once_with('zstd', access_mode=os.X_OK)
+        compress.zstd_stream.assert_called_once_with(
+            os.sep.join(
+                [self.abs_bundle_dir, 'test-image-1.2.3-Build_42.zst']
+            ), None, None, 8
+        )
+        assert not compress.xz_stream.called
+        mock_bundle_cache.return_value.update.assert_called_once_with(
+            'test-image-1.2.3', {
+                'compress': True, 'shasum': False,
+                'compression_tool': 'zstd', 'xz_options': None
+            }, 'compressed_filename', None, None
+        )
+
+    @patch('kiwi.tasks.result_bundle.BundleCache')
+    @patch('kiwi.logger.log.warning')
+    @patch('kiwi.tasks.result_bundle.Result.load')
+    @patch('kiwi.tasks.result_bundle.Path.create')
+    @patch('kiwi.tasks.result_bundle.Path.which')
+    @patch('kiwi.tasks.result_bundle.Compress')
+    @patch('os.path.exists')
+    def test_process_result_bundle_zstd_missing(
+        self, mock_exists, mock_compress, mock_path_which,
+        mock_path_create, mock_load, mock_warning, mock_bundle_cache
+    ):
+        mock_bundle_cache.return_value.lookup.return_value = None
+        result = Result(self.xml_state)
+        result.add(
+            key='keyname', filename='test-image-1.2.3',
+            use_for_bundle=True, compress=True, shasum=False
+        )
+        compress = mock_compress.return_value
+        compress.xz_stream.return_value = mock.Mock(
+            hexdigests={}, input_bytes=0, output_bytes=0,
+            stage_seconds={'compress': 0, 'write': 0, 'checksum': 0}
+        )
+        mock_path_which.return_value = None
+        mock_exists.return_value = True
+        mock_load.return_value = result
+        self.task.runtime_config.get_bundle_compression_tool.return_value = \
+            'zstd'
+        self._init_command_args()
+
+        self.task.process()
+
+        mock_warning.assert_called_once_with(
+            'zstd not found, falling back to xz compression'
+        )
+        compress.xz_stream.assert_called_once_with(
+            os.sep.join(
+                [self.abs_bundle_dir, 'test-image-1.2.3-Build_42.xz']
+            ), self.task.runtime_config.get_xz_options.return_value, None, 8
+        )
+        assert not compress.zstd_stream.called
+
+    @patch('kiwi.tasks.result_bundle.BundleCache')
+    @patch('kiwi.logger.log.info')
+    @patch('kiwi.tasks.result_bundle.Result.load')
+    @patch('kiwi.tasks.result_bundle.FileCopy.stage')
+    @patch('kiwi.tasks.result_bundle.Path.create')
+    @patch('os.path.exists')
+    def test_process_result_bundle_parallel_errors(
+        self, mock_exists, mock_path_create, mock_stage, mock_load,
+        mock_log, mock_bundle_cache
+    ):
+        mock_bundle_cache.return_value.lookup.return_value = None
+        result = Result(self.xml_state)
+        for name in ['a', 'b', 'c']:
+            result.add(
+                key=name, filename='test-image-' + name,
+                use_for_bundle=True, compress=False, shasum=False
+            )
+
+        def stage(source, target, allow_hardlink):
+            if source != 'test-image-b':
+                raise KiwiBundleError('copy failed')
+            return mock.Mock(method='reflink')
+
+        mock_stage.side_effect = stage
+        mock_exists.return_value = True
+        mock_load.return_value = result
+        self.task.runtime_config.get_bundle_jobs.return_value = 3
+        self._init_command_args()
+
+        bundle_error = None
+        try:
+            self.task.process()
+        except KiwiBundleError as issue:
+            bundle_error = format(issue)
+        assert bundle_error == \
+            'Failed to bundle 2 result file(s):\n' \
+            'test-image-a: KiwiBundleError: copy failed\n' \
+            'test-image-c: KiwiBundleError: copy failed'
+        assert mock_log.call_args_list[-3:] == [
+            call('Creating %s', 'test-image-a'),
+            call('Creating %s', 'test-image-b'),
+            call('Creating %s', 'test-image-c')
+        ]
+
+    @patch('kiwi.tasks.result_bundle.BundleCache')
+    @patch('kiwi.tasks.result_bundle.Result.load')
+    @patch('kiwi.tasks.result_bundle.FileCopy.stage')
+    @patch('kiwi.tasks.result_bundle.Path.create')
+    @patch('kiwi.tasks.result_bundle.Checksum')
+    @patch('os.path.exists')
+    @patch_open
+    def test_process_result_bundle_uncompressed_shasum(
+        self, mock_open, mock_exists, mock_checksum, mock_path_create,
+        mock_stage, mock_load, mock_bundle_cache
+    ):
+        mock_bundle_cache.return_value.lookup.return_value = None
+        result = Result(self.xml_state)
+        result.add(
+            key='keyname', filename='test-image-1.2.3',
+            use_for_bundle=True, compress=False, shasum=True
+        )
+        mock_checksum.return_value.sha256.return_value = 'sha256sum'
+        mock_exists.return_value = True
+        mock_open.return_value = self.context_manager_mock
+        mock_load.return_value = result
+        self._init_command_args()
+
+        self.task.process()
+
+        bundle_file = os.sep.join(
+            [self.abs_bundle_dir, 'test-image-1.2.3-Build_42']
+        )
+        mock_checksum.assert_called_once_with(bundle_file)
+        mock_open.assert_called_once_with(bundle_file + '.sha256', 'w')
+        self.file_mock.write.assert_called_once_with(
+            'sha256sum  test-image-1.2.3-Build_42'
+        )
+
     def test_process_result_bundle_help(self):
         self._init_command_args()
         self.task.command_args['help'] = True
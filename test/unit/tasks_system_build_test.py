@@ -21,6 +21,7 @@ class TestSystemBuildTask:
         self.abs_target_dir = os.path.abspath('some-target')
 
         kiwi.tasks.system_build.Privileges = mock.Mock()
+        kiwi.tasks.system_build.CommandProfiler = mock.MagicMock()
         kiwi.tasks.system_build.Path = mock.Mock()
 
         kiwi.tasks.system_build.Help = mock.Mock(
@@ -181,6 +182,16 @@ class TestSystemBuildTask:
         self.result.dump.assert_called_once_with(
             os.sep.join([self.abs_target_dir, 'kiwi.result'])
         )
+        command_profiler = kiwi.tasks.system_build.CommandProfiler
+        profiler = command_profiler.return_value.__enter__.return_value
+        assert command_profiler.return_value.__exit__.called
+        assert profiler.set_phase.call_args_list == [
+            call('prepare'), call('setup'), call('create')
+        ]
+        profiler.log_summary.assert_called_once_with()
+        profiler.write_trace.assert_called_once_with(
+            os.sep.join([self.abs_target_dir, 'kiwi.command_trace.json'])
+        )
 
     @patch('kiwi.logger.Logger.set_logfile')
     def test_process_system_build_add_package(self, mock_log):
@@ -0,0 +1,61 @@
+import os
+import stat
+import shutil
+from tempfile import mkdtemp
+
+from pytest import raises
+
+from kiwi.utils.atomic_file import AtomicFile
+
+
+class TestAtomicFile:
+    def setup(self):
+        self.tmpdir = mkdtemp(prefix='kiwi_atomic_file.')
+        self.filename = os.sep.join([self.tmpdir, 'manifest.json'])
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _read(self, mode='r'):
+        with open(self.filename, mode) as data:
+            return data.read()
+
+    def test_write(self):
+        AtomicFile.write(self.filename, 'text')
+        assert self._read() == 'text'
+        AtomicFile.write(self.filename, b'\x00bytes')
+        assert self._read('rb') == b'\x00bytes'
+        assert stat.S_IMODE(os.stat(self.filename).st_mode) == \
+            AtomicFile.file_mode
+        assert os.listdir(self.tmpdir) == ['manifest.json']
+
+    def test_replace(self):
+        temporary_files = []
+
+        def write(temporary):
+            temporary_files.append(temporary)
+            with open(temporary, 'w') as data:
+                data.write('new')
+
+        AtomicFile.replace(self.filename, write)
+        AtomicFile.replace(self.filename, write)
+        assert self._read() == 'new'
+        assert temporary_files[0] != temporary_files[1]
+        assert os.path.dirname(temporary_files[0]) == self.tmpdir
+        assert os.path.basename(temporary_files[0]).startswith(
+            'manifest.json.'
+        )
+        assert temporary_files[0].endswith('.tmp')
+
+    def test_replace_failed(self):
+        AtomicFile.write(self.filename, 'old')
+
+        def write(temporary):
+            with open(temporary, 'w') as data:
+                data.write('partial')
+            raise ValueError('write failed')
+
+        with raises(ValueError):
+            AtomicFile.replace(self.filename, write)
+        assert self._read() == 'old'
+        assert os.listdir(self.tmpdir) == ['manifest.json']
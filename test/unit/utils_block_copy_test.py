@@ -0,0 +1,145 @@
+import os
+import errno
+import shutil
+from tempfile import mkdtemp
+
+from mock import (
+    patch, call
+)
+from pytest import raises
+
+from kiwi.utils.block_copy import BlockCopy
+from kiwi.exceptions import KiwiFileCopyError
+
+
+class TestBlockCopy:
+    def setup(self):
+        self.tmpdir = mkdtemp(prefix='kiwi_block_copy.')
+        self.source = os.sep.join([self.tmpdir, 'source'])
+        self.target = os.sep.join([self.tmpdir, 'target'])
+        # 3 data regions, a hole in between and a trailing hole
+        self.data = [
+            (0, b'a' * 5000),
+            (1 << 20, b'b' * 4096),
+            (3 << 20, b'c' * 100)
+        ]
+        with open(self.source, 'wb') as source:
+            for offset, data in self.data:
+                source.seek(offset)
+                source.write(data)
+            source.truncate(4 << 20)
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _read(self, filename):
+        with open(filename, 'rb') as data:
+            return data.read()
+
+    @patch('kiwi.logger.log.progress')
+    @patch('kiwi.utils.block_copy.BlockCopy.buffer_size', 1 << 20)
+    def test_copy(self, mock_progress):
+        result = BlockCopy.copy(self.source, self.target)
+        assert result.method in ('copy_file_range', 'copy')
+        assert result.size == 4 << 20
+        assert result.written == 4 << 20
+        assert self._read(self.target) == self._read(self.source)
+        assert mock_progress.call_args_list[0] == call(
+            0, 100, '[ INFO    ]: Writing'
+        )
+        assert mock_progress.call_args_list[-1] == call(
+            100, 100, '[ INFO    ]: Writing'
+        )
+        assert [
+            progress[0][0] for progress in mock_progress.call_args_list
+        ] == [0, 25, 50, 75, 100]
+
+    @patch('kiwi.logger.log.progress')
+    def test_copy_sparse(self, mock_progress):
+        source_fd = os.open(self.source, os.O_RDONLY)
+        regions = BlockCopy._get_data_regions(source_fd, 4 << 20)
+        os.close(source_fd)
+        if regions == [(0, 4 << 20)]:
+            # filesystem of the temporary directory reports no holes
+            return
+        result = BlockCopy.copy(self.source, self.target, sparse=True)
+        assert result.size == 4 << 20
+        assert result.written < 4 << 20
+        assert self._read(self.target) == self._read(self.source)
+
+    def test_get_data_regions(self):
+        def lseek(fd, offset, whence):
+            if whence == os.SEEK_DATA:
+                for data in [0, 8192, 20000]:
+                    if offset <= data:
+                        return data
+                raise OSError(errno.ENXIO, 'no data')
+            return {0: 6000, 8192: 9000, 20000: 20100}[offset]
+
+        with patch('os.lseek', side_effect=lseek):
+            assert BlockCopy._get_data_regions(3, 30000) == [
+                (0, 12288), (16384, 4096)
+            ]
+            assert BlockCopy._get_data_regions(3, 20050) == [
+                (0, 12288), (16384, 3666)
+            ]
+
+    @patch('kiwi.logger.log.debug')
+    def test_get_data_regions_not_supported(self, mock_log_debug):
+        with patch('os.lseek', side_effect=OSError(errno.EINVAL, 'invalid')):
+            assert BlockCopy._get_data_regions(3, 4096) == [(0, 4096)]
+        assert mock_log_debug.called
+
+    @patch('kiwi.logger.log.progress')
+    @patch('kiwi.logger.log.debug')
+    @patch('os.copy_file_range', create=True)
+    def test_copy_file_range_not_possible(
+        self, mock_copy_file_range, mock_log_debug, mock_progress
+    ):
+        mock_copy_file_range.side_effect = OSError(errno.EXDEV, 'cross dev')
+        result = BlockCopy.copy(self.source, self.target, sparse=True)
+        assert result.method == 'copy'
+        assert self._read(self.target) == self._read(self.source)
+        assert mock_log_debug.called
+
+    @patch('kiwi.logger.log.progress')
+    @patch('kiwi.logger.log.debug')
+    @patch('os.copy_file_range', create=True)
+    def test_copy_file_range_end_of_file(
+        self, mock_copy_file_range, mock_log_debug, mock_progress
+    ):
+        mock_copy_file_range.return_value = 0
+        assert BlockCopy.copy(self.source, self.target).method == 'copy'
+        assert self._read(self.target) == self._read(self.source)
+
+    @patch('kiwi.logger.log.progress')
+    @patch('kiwi.utils.block_copy.os.O_DIRECT', 0)
+    def test_copy_direct(self, mock_progress):
+        os.truncate(self.source, (4 << 20) + 100)
+        with open(self.target, 'wb') as target:
+            target.write(b'x' * (5 << 20))
+        with patch('kiwi.utils.block_copy.BlockCopy.buffer_size', 1 << 20):
+            result = BlockCopy.copy(self.source, self.target, direct=True)
+        assert result.method == 'direct'
+        # the target is not truncated
+        assert self._read(self.target) == \
+            self._read(self.source) + b'x' * ((1 << 20) - 100)
+
+    @patch('kiwi.logger.log.progress')
+    @patch('kiwi.utils.block_copy.os.O_DIRECT', 0)
+    @patch('os.readv')
+    def test_copy_source_truncated(self, mock_readv, mock_progress):
+        mock_readv.return_value = 0
+        with raises(KiwiFileCopyError):
+            BlockCopy.copy(self.source, self.target, direct=True)
+
+    @patch('stat.S_ISBLK')
+    def test_copy_device_too_small(self, mock_isblk):
+        mock_isblk.return_value = True
+        with raises(KiwiFileCopyError) as issue:
+            BlockCopy.copy(self.source, self.target)
+        assert 'too small' in issue.value.message
+
+    def test_copy_source_missing(self):
+        with raises(KiwiFileCopyError):
+            BlockCopy.copy(self.source + '.missing', self.target)
@@ -0,0 +1,23 @@
+from kiwi.utils.block_geometry import BlockGeometry
+
+
+class TestBlockGeometry:
+    def test_get_block_list(self):
+        assert BlockGeometry.get_block_list(1343225856) == (8192, 163968)
+        assert BlockGeometry.get_block_list(1343225856).blocksize == 8192
+        assert BlockGeometry.get_block_list(1343225856).blocks == 163968
+
+    def test_get_block_list_large_prime_factor(self):
+        # 2 * 3 * 1000003
+        assert BlockGeometry.get_block_list(6000018) == (6, 1000003)
+
+    def test_get_block_list_prime(self):
+        assert BlockGeometry.get_block_list(7919) == (7919, 1)
+        assert BlockGeometry.get_block_list(1000003) == (1, 1000003)
+
+    def test_get_block_list_factor_exceeds_max_blocksize(self):
+        # 2^12 * 3: the factor 3 would exceed the 8192 limit
+        assert BlockGeometry.get_block_list(12288) == (4096, 3)
+
+    def test_get_block_list_empty(self):
+        assert BlockGeometry.get_block_list(0) == (1, 0)
@@ -0,0 +1,90 @@
+import os
+import shutil
+from tempfile import mkdtemp
+
+from mock import patch
+
+from kiwi.utils.bundle_cache import BundleCache
+
+
+class TestBundleCache:
+    def setup(self):
+        self.bundle_dir = mkdtemp(prefix='kiwi_bundle_cache.')
+        self.source = os.sep.join([self.bundle_dir, 'source'])
+        self.bundle_file = os.sep.join([self.bundle_dir, 'bundle.xz'])
+        self.zsync_file = self.bundle_file + '.zsync'
+        for filename in (self.source, self.bundle_file, self.zsync_file):
+            with open(filename, 'wb') as data:
+                data.write(b'data')
+        self.settings = {'compress': True, 'shasum': True, 'xz_options': []}
+        self.cache = BundleCache(self.bundle_dir)
+        self.cache.update(
+            self.source, self.settings, self.bundle_file,
+            'sha256sum', self.zsync_file
+        )
+
+    def teardown(self):
+        shutil.rmtree(self.bundle_dir)
+
+    def test_lookup_from_written_manifest(self):
+        self.cache.write()
+        cached = BundleCache(self.bundle_dir).lookup(
+            self.source, self.settings
+        )
+        assert cached['bundle_file'] == 'bundle.xz'
+        assert cached['sha256'] == 'sha256sum'
+        assert cached['zsync_file'] == 'bundle.xz.zsync'
+        assert not os.path.exists(self.cache.manifest_file + '.tmp')
+
+    def test_lookup_unknown_source(self):
+        assert self.cache.lookup(self.bundle_file, self.settings) is None
+
+    def test_lookup_changed_settings(self):
+        self.settings['xz_options'] = ['-9']
+        assert self.cache.lookup(self.source, self.settings) is None
+
+    def test_lookup_changed_source(self):
+        with open(self.source, 'wb') as data:
+            data.write(b'changed')
+        assert self.cache.lookup(self.source, self.settings) is None
+
+    def test_lookup_changed_content_same_stat(self):
+        source_stat = os.stat(self.source)
+        with open(self.source, 'r+b') as data:
+            data.write(b'DATA')
+        os.utime(
+            self.source, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns)
+        )
+        assert self.cache.lookup(self.source, self.settings) is None
+
+    def test_lookup_bundle_file_removed(self):
+        os.unlink(self.zsync_file)
+        assert self.cache.lookup(self.source, self.settings) is None
+
+    def test_get_fast_hash_samples(self):
+        self.cache.sample_size = 2
+        with open(self.source, 'wb') as data:
+            data.write(b'abcdefghij')
+        self.cache.update(self.source, self.settings, self.bundle_file)
+        assert self.cache.lookup(self.source, self.settings)
+        # bytes between the samples are not part of the fast hash
+        with open(self.source, 'r+b') as data:
+            data.seek(3)
+            data.write(b'X')
+        assert self.cache.lookup(self.source, self.settings) is None
+        source_stat = os.stat(self.source)
+        self.cache.update(self.source, self.settings, self.bundle_file)
+        with open(self.source, 'r+b') as data:
+            data.seek(2)
+            data.write(b'X')
+        os.utime(
+            self.source, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns)
+        )
+        assert self.cache.lookup(self.source, self.settings)
+
+    @patch('kiwi.logger.log.warning')
+    def test_invalid_manifest(self, mock_warning):
+        with open(self.cache.manifest_file, 'w') as manifest:
+            manifest.write('{')
+        assert BundleCache(self.bundle_dir).results == {}
+        assert mock_warning.called
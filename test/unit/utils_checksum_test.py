@@ -4,7 +4,10 @@ import mock
 
 from .test_helper import raises, patch_open
 
-from kiwi.exceptions import KiwiFileNotFound
+from kiwi.exceptions import (
+    KiwiFileNotFound,
+    KiwiChecksumError
+)
 from kiwi.utils.checksum import Checksum
 
 from builtins import bytes
@@ -51,29 +54,26 @@ class TestChecksum:
         mock_open.assert_called_once_with('some-file')
         assert self.checksum.matches('foo', 'some-file') is False
 
-    @patch('kiwi.path.Path.which')
     @patch('kiwi.utils.checksum.Compress')
     @patch('hashlib.md5')
     @patch('os.path.getsize')
     @patch_open
     def test_md5_xz(
-        self, mock_open, mock_size, mock_md5, mock_compress, mock_which
+        self, mock_open, mock_size, mock_md5, mock_compress
     ):
-        checksum = mock.Mock
-        checksum.uncompressed_filename = 'some-file-uncompressed'
-        mock_which.return_value = 'factor'
         compress = mock.Mock()
         digest = mock.Mock()
-        digest.block_size = 1024
-        digest._calculate_hash_hexdigest = mock.Mock(
-            return_value=checksum
-        )
         digest.hexdigest = mock.Mock(
             return_value='sum'
         )
         compress.get_format = mock.Mock(
             return_value='xz'
         )
+        uncompressed = mock.MagicMock()
+        uncompressed.__enter__.return_value.read.side_effect = [
+            bytes(12288), b''
+        ]
+        compress.open_uncompressed.return_value = uncompressed
         mock_open.return_value = self.context_manager_mock
         mock_size.return_value = 1343225856
         mock_md5.return_value = digest
@@ -83,22 +83,20 @@ class TestChecksum:
 
         assert mock_open.call_args_list == [
             call('some-file', 'rb'),
-            call('some-file-uncompressed', 'rb'),
             call('outfile', 'w')
         ]
+        digest.update.assert_called_with(bytes(12288))
         self.file_mock.write.assert_called_once_with(
-            'sum 163968 8192 163968 8192\n'
+            'sum 3 4096 163968 8192\n'
         )
 
-    @patch('kiwi.path.Path.which')
     @patch('kiwi.utils.checksum.Compress')
     @patch('hashlib.md5')
     @patch('os.path.getsize')
     @patch_open
     def test_md5(
-        self, mock_open, mock_size, mock_md5, mock_compress, mock_which
+        self, mock_open, mock_size, mock_md5, mock_compress
     ):
-        mock_which.return_value = 'factor'
         compress = mock.Mock()
         digest = mock.Mock()
         digest.block_size = 1024
@@ -123,15 +121,13 @@ class TestChecksum:
             'sum 163968 8192\n'
         )
 
-    @patch('kiwi.path.Path.which')
     @patch('kiwi.utils.checksum.Compress')
     @patch('hashlib.sha256')
     @patch('os.path.getsize')
     @patch_open
     def test_sha256(
-        self, mock_open, mock_size, mock_sha256, mock_compress, mock_which
+        self, mock_open, mock_size, mock_sha256, mock_compress
     ):
-        mock_which.return_value = 'factor'
         compress = mock.Mock()
         digest = mock.Mock()
         digest.block_size = 1024
@@ -179,3 +175,33 @@ class TestChecksum:
         mock_md5.return_value = digest
         mock_open.return_value = self.context_manager_mock
         assert self.checksum.md5() == digest.hexdigest.return_value
+
+    @patch('hashlib.sha256')
+    @patch('hashlib.md5')
+    @patch_open
+    def test_digests(self, mock_open, mock_md5, mock_sha256):
+        md5_digest = mock.Mock()
+        md5_digest.hexdigest.return_value = 'md5sum'
+        sha256_digest = mock.Mock()
+        sha256_digest.hexdigest.return_value = 'sha256sum'
+        mock_md5.return_value = md5_digest
+        mock_sha256.return_value = sha256_digest
+        mock_open.return_value = self.context_manager_mock
+        self.file_mock.read.side_effect = [b'da', b'ta', b'']
+        assert self.checksum.digests(['md5', 'sha256']) == {
+            'md5': 'md5sum', 'sha256': 'sha256sum'
+        }
+        mock_open.assert_called_once_with('some-file', 'rb')
+        self.file_mock.read.assert_called_with(Checksum.read_size)
+        assert md5_digest.update.call_args_list == [call(b'da'), call(b'ta')]
+        assert sha256_digest.update.call_args_list == [
+            call(b'da'), call(b'ta')
+        ]
+        # results are cached, no further read of the source file
+        assert self.checksum.sha256() == 'sha256sum'
+        assert self.checksum.md5() == 'md5sum'
+        assert mock_open.call_count == 1
+
+    @raises(KiwiChecksumError)
+    def test_digests_unsupported(self):
+        self.checksum.digests(['crc32'])
@@ -1,3 +1,7 @@
+import os
+import shutil
+from tempfile import mkdtemp
+
 from mock import patch
 from mock import call
 from collections import namedtuple
@@ -115,3 +119,82 @@ class TestCommandCapabilities:
         CommandCapabilities.check_version(
             'command_that_fails', '--non-existing-flag'
         )
+
+
+class TestCommandCapabilitiesProbeCache:
+    def setup(self):
+        self.cache_dir = mkdtemp(prefix='kiwi_capabilities.')
+        self.cache_file = os.sep.join([self.cache_dir, 'cache', 'probes.json'])
+        CommandCapabilities.probe_cache = None
+        command_type = namedtuple('command', ['output', 'error'])
+        self.command = command_type(output='tool v1.2.3', error='')
+
+    def teardown(self):
+        CommandCapabilities.probe_cache = None
+        shutil.rmtree(self.cache_dir)
+
+    @patch('kiwi.utils.command_capabilities.Defaults')
+    @patch('kiwi.command.Command.run')
+    def test_probe_cached(self, mock_run, mock_defaults):
+        mock_defaults.get_command_capabilities_cache_file.return_value = \
+            self.cache_file
+        mock_run.return_value = self.command
+        assert CommandCapabilities.check_version('true', (1, 2))
+        assert CommandCapabilities.check_version('true', (1, 2))
+        assert CommandCapabilities.has_option_in_help('true', 'v1.2')
+        assert mock_run.call_args_list == [
+            call(['true', '--version']), call(['true', '--help'])
+        ]
+        # a new process loads the probes from the cache file
+        CommandCapabilities.probe_cache = None
+        assert CommandCapabilities.check_version('true', (1, 2))
+        assert mock_run.call_count == 2
+        # probes in a chroot are not cached
+        assert CommandCapabilities.check_version(
+            'true', (1, 2), root='root_dir'
+        )
+        assert mock_run.call_count == 3
+
+    @patch('kiwi.utils.command_capabilities.Defaults')
+    @patch('kiwi.command.Command.run')
+    @patch('os.stat')
+    def test_probe_binary_changed(self, mock_stat, mock_run, mock_defaults):
+        mock_defaults.get_command_capabilities_cache_file.return_value = \
+            self.cache_file
+        mock_run.return_value = self.command
+        mock_stat.return_value.st_size = 42
+        mock_stat.return_value.st_mtime_ns = 1
+        CommandCapabilities.check_version('true', (1, 2))
+        mock_stat.return_value.st_mtime_ns = 2
+        CommandCapabilities.check_version('true', (1, 2))
+        assert mock_run.call_count == 2
+
+    @patch('kiwi.utils.command_capabilities.Defaults')
+    @patch('kiwi.command.Command.run')
+    @patch('kiwi.logger.log.debug')
+    def test_probe_cache_write_failed(
+        self, mock_debug, mock_run, mock_defaults
+    ):
+        mock_defaults.get_command_capabilities_cache_file.return_value = \
+            self.cache_file
+        mock_run.return_value = self.command._replace(error=object())
+        assert CommandCapabilities.check_version('true', (1, 2))
+        assert os.listdir(os.path.dirname(self.cache_file)) == []
+        assert mock_debug.call_args_list[0][0][0].startswith(
+            'Failed to write command capabilities cache:'
+        )
+
+    @patch('kiwi.utils.command_capabilities.Defaults')
+    @patch('kiwi.command.Command.run')
+    @patch('kiwi.logger.log.debug')
+    def test_probe_cache_invalid(self, mock_debug, mock_run, mock_defaults):
+        mock_defaults.get_command_capabilities_cache_file.return_value = \
+            self.cache_dir
+        mock_run.return_value = self.command
+        assert CommandCapabilities.check_version('true', (1, 2))
+        assert mock_debug.call_args_list[0][0][0].startswith(
+            'Ignoring command capabilities cache:'
+        )
+        assert mock_debug.call_args_list[1][0][0].startswith(
+            'Failed to write command capabilities cache:'
+        )
@@ -0,0 +1,222 @@
+import json
+import os
+import time
+import subprocess
+from collections import namedtuple
+
+from mock import (
+    patch, call, mock_open
+)
+from pytest import raises
+
+from kiwi.utils.command_profiler import (
+    CommandProfiler, ProfiledPopen, command_record_type
+)
+
+
+class TestCommandProfiler:
+    def setup(self):
+        self.profiler = CommandProfiler()
+        self.profiler.set_phase('prepare')
+        self.profiler.add(
+            command_record_type(
+                command=['chroot', 'root', 'zypper', 'install'],
+                phase='prepare', start=10.0, seconds=5.0,
+                user_seconds=2.0, system_seconds=1.0,
+                max_rss_kbytes=2048, returncode=0, thread=42
+            )
+        )
+        self.profiler.add(
+            command_record_type(
+                command=['/usr/bin/xz', '-c'],
+                phase='create', start=20.0, seconds=3.0,
+                user_seconds=2.5, system_seconds=0.5,
+                max_rss_kbytes=4096, returncode=0, thread=43
+            )
+        )
+        self.profiler.add(
+            command_record_type(
+                command=['xz', '-c'],
+                phase='create', start=30.0, seconds=3.0,
+                user_seconds=2.5, system_seconds=0.5,
+                max_rss_kbytes=1024, returncode=1, thread=42
+            )
+        )
+
+    def test_scope(self):
+        assert CommandProfiler.active is None
+        with self.profiler as profiler:
+            assert profiler is self.profiler
+            assert CommandProfiler.active is self.profiler
+            with CommandProfiler() as inner_profiler:
+                assert CommandProfiler.active is inner_profiler
+            assert CommandProfiler.active is self.profiler
+        assert CommandProfiler.active is None
+        assert self.profiler.phase == 'prepare'
+        assert CommandProfiler().records is not self.profiler.records
+
+    def test_get_summary(self):
+        summary = self.profiler.get_summary()
+        assert list(summary.keys()) == ['xz', 'zypper']
+        assert summary['xz'] == {
+            'calls': 2,
+            'seconds': 6.0,
+            'user_seconds': 5.0,
+            'system_seconds': 1.0,
+            'max_rss_kbytes': 4096,
+            'failed': 1
+        }
+
+    @patch('kiwi.logger.log.info')
+    def test_log_summary(self, mock_log_info):
+        self.profiler.log_summary(count=1)
+        assert mock_log_info.call_args_list == [
+            call('Command execution summary, top %d by wall time:', 1),
+            call(
+                '--> %s: %d call(s), %.1fs wall, %.1fs user, %.1fs sys, '
+                '%d MB max rss%s', 'xz', 2, 6.0, 5.0, 1.0, 4, ', 1 failed'
+            )
+        ]
+
+    def test_records_bounded(self):
+        record = self.profiler.records[0]
+        for count in range(CommandProfiler.max_records):
+            self.profiler.add(record)
+        assert len(self.profiler.records) == CommandProfiler.max_records
+        assert self.profiler.records[-1] is record
+
+    @patch('kiwi.logger.log.info')
+    def test_log_summary_no_records(self, mock_log_info):
+        CommandProfiler().log_summary()
+        assert not mock_log_info.called
+
+    def test_write_trace(self):
+        with patch('builtins.open', mock_open()) as mock_file:
+            self.profiler.write_trace('trace.json')
+        mock_file.assert_called_once_with('trace.json', 'w')
+        trace = json.loads(
+            ''.join(
+                write_call[0][0]
+                for write_call in mock_file.return_value.write.call_args_list
+            )
+        )
+        assert [event['tid'] for event in trace['traceEvents']] == [0, 1, 0]
+        assert trace['traceEvents'][0] == {
+            'name': 'zypper',
+            'cat': 'prepare',
+            'ph': 'X',
+            'ts': 10000000,
+            'dur': 5000000,
+            'pid': os.getpid(),
+            'tid': 0,
+            'args': {
+                'command': 'chroot root zypper install',
+                'returncode': 0,
+                'user_seconds': 2.0,
+                'system_seconds': 1.0,
+                'max_rss_kbytes': 2048
+            }
+        }
+
+
+class TestProfiledPopen:
+    def setup(self):
+        self.profiler = CommandProfiler().__enter__()
+        self.profiler.set_phase('create')
+        rusage_type = namedtuple(
+            'rusage', ['ru_utime', 'ru_stime', 'ru_maxrss']
+        )
+        self.rusage = rusage_type(ru_utime=1.5, ru_stime=0.5, ru_maxrss=42)
+
+    def teardown(self):
+        self.profiler.__exit__(None, None, None)
+
+    @patch('os.wait4')
+    def test_wait_records_command(self, mock_wait4):
+        process = ProfiledPopen(['true'])
+        mock_wait4.return_value = (process.pid, 3 << 8, self.rusage)
+        assert process.wait() == 3
+        mock_wait4.assert_called_once_with(process.pid, 0)
+        record = self.profiler.records[0]
+        assert record.command == ['true']
+        assert record.phase == 'create'
+        assert record.user_seconds == 1.5
+        assert record.system_seconds == 0.5
+        assert record.max_rss_kbytes == 42
+        assert record.returncode == 3
+        # reap the real process
+        os.waitpid(process.pid, 0)
+
+    @patch('os.wait4')
+    def test_wait_records_signaled_command(self, mock_wait4):
+        process = ProfiledPopen(['true'])
+        mock_wait4.return_value = (process.pid, 9, self.rusage)
+        assert process.wait() == -9
+        assert self.profiler.records[0].returncode == -9
+        os.waitpid(process.pid, 0)
+
+    @patch('os.wait4')
+    def test_wait_already_reaped(self, mock_wait4):
+        process = ProfiledPopen(['true'])
+        mock_wait4.side_effect = ChildProcessError
+        assert process.wait() == 0
+        assert list(self.profiler.records) == []
+        os.waitpid(process.pid, 0)
+
+    @patch('os.wait4')
+    def test_wait_timeout(self, mock_wait4):
+        process = ProfiledPopen(['true'])
+        mock_wait4.return_value = (0, 0, None)
+        with raises(subprocess.TimeoutExpired):
+            process.wait(timeout=0.01)
+        assert process.returncode is None
+        mock_wait4.return_value = (process.pid, 0, self.rusage)
+        assert process.wait(timeout=1) == 0
+        mock_wait4.assert_called_with(process.pid, os.WNOHANG)
+        assert len(self.profiler.records) == 1
+        os.waitpid(process.pid, 0)
+
+    @patch('os.wait4')
+    def test_poll_records_command(self, mock_wait4):
+        process = ProfiledPopen(['true'])
+        mock_wait4.return_value = (0, 0, None)
+        assert process.poll() is None
+        mock_wait4.return_value = (process.pid, 1 << 8, self.rusage)
+        assert process.poll() == 1
+        assert process.poll() == 1
+        assert process.wait() == 1
+        assert mock_wait4.call_count == 2
+        assert self.profiler.records[0].returncode == 1
+        assert len(self.profiler.records) == 1
+        os.waitpid(process.pid, 0)
+
+    @patch('os.wait4')
+    def test_wait4_reaped_by_other_thread(self, mock_wait4):
+        process = ProfiledPopen(['true'])
+        process.returncode = 0
+        assert process._wait4(0) is True
+        assert not mock_wait4.called
+        os.waitpid(process.pid, 0)
+
+    def test_poll_real_process(self):
+        process = ProfiledPopen(['true'])
+        while process.poll() is None:
+            time.sleep(0.01)
+        assert process.returncode == 0
+        assert self.profiler.records[0].command == ['true']
+
+    def test_communicate(self):
+        process = ProfiledPopen(['true'])
+        process.communicate()
+        assert process.returncode == 0
+        assert self.profiler.records[0].command == ['true']
+
+    @patch('os.wait4')
+    def test_wait_no_active_profiler(self, mock_wait4):
+        self.profiler.__exit__(None, None, None)
+        process = ProfiledPopen(['true'])
+        mock_wait4.return_value = (process.pid, 0, self.rusage)
+        assert process.wait() == 0
+        assert process.profiler is None
+        assert list(self.profiler.records) == []
+        os.waitpid(process.pid, 0)
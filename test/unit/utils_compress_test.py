@@ -1,12 +1,20 @@
-from mock import patch
-
+from mock import (
+    patch, call
+)
+import hashlib
 import mock
+import pytest
 
-from .test_helper import raises
+from .test_helper import (
+    raises, mock_open
+)
 
-from kiwi.utils.compress import Compress
+from kiwi.utils.compress import (
+    Compress, CommandPipe
+)
 from kiwi.exceptions import (
     KiwiFileNotFound,
+    KiwiCommandError,
     KiwiCompressionFormatUnknown
 )
 
@@ -22,7 +30,10 @@ class TestCompress:
         Compress('some-file')
 
     @patch('kiwi.command.Command.run')
-    def test_xz(self, mock_command):
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    def test_xz(self, mock_RuntimeConfig, mock_command):
+        mock_RuntimeConfig.return_value.get_compress_threads.return_value = \
+            None
         assert self.compress.xz() == 'some-file.xz'
         mock_command.assert_called_once_with(
             [
@@ -33,24 +44,222 @@ class TestCompress:
         assert self.compress.compressed_filename == 'some-file.xz'
 
     @patch('kiwi.command.Command.run')
-    def test_xz_with_custom_options(self, mock_command):
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    def test_xz_with_custom_options(self, mock_RuntimeConfig, mock_command):
+        mock_RuntimeConfig.return_value.get_compress_threads.return_value = \
+            None
         assert self.compress.xz(options=['foo', 'bar']) == 'some-file.xz'
         mock_command.assert_called_once_with(
-            [
-                'xz', '-f', 'foo', 'bar', '--keep',
-                'some-file'
-            ]
+            ['xz', '-f', 'foo', 'bar', '--keep', 'some-file']
         )
         assert self.compress.compressed_filename == 'some-file.xz'
 
     @patch('kiwi.command.Command.run')
-    def test_gzip(self, mock_command):
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    def test_xz_with_custom_thread_options(
+        self, mock_RuntimeConfig, mock_command
+    ):
+        mock_RuntimeConfig.return_value.get_compress_threads.return_value = \
+            None
+        self.compress.xz(options=['-9', '-T4'])
+        mock_command.assert_called_once_with(
+            ['xz', '-f', '-9', '-T4', '--keep', 'some-file']
+        )
+
+    @patch('kiwi.command.Command.run')
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    def test_xz_with_configured_threads(
+        self, mock_RuntimeConfig, mock_command
+    ):
+        mock_RuntimeConfig.return_value.get_compress_threads.return_value = 8
+        self.compress.xz()
+        mock_command.assert_called_once_with(
+            ['xz', '-f', '--threads=8', '--keep', 'some-file']
+        )
+        mock_command.reset_mock()
+        self.compress.xz(options=['-9', '-T4'])
+        mock_command.assert_called_once_with(
+            ['xz', '-f', '-9', '-T4', '--keep', 'some-file']
+        )
+
+    @patch('kiwi.command.Command.run')
+    @patch('kiwi.utils.compress.Path.which')
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    def test_gzip(self, mock_RuntimeConfig, mock_which, mock_command):
+        runtime_config = mock_RuntimeConfig.return_value
+        runtime_config.get_gzip_tool.return_value = 'gzip'
+        runtime_config.get_compress_threads.return_value = 8
         assert self.compress.gzip() == 'some-file.gz'
         mock_command.assert_called_once_with(
             ['gzip', '-f', '-9', '--keep', 'some-file']
         )
         assert self.compress.compressed_filename == 'some-file.gz'
 
+    @patch('kiwi.command.Command.run')
+    @patch('kiwi.utils.compress.Path.which')
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    def test_gzip_pigz(self, mock_RuntimeConfig, mock_which, mock_command):
+        runtime_config = mock_RuntimeConfig.return_value
+        runtime_config.get_gzip_tool.return_value = 'pigz'
+        runtime_config.get_compress_threads.return_value = 8
+        mock_which.return_value = '/usr/bin/pigz'
+        assert self.compress.gzip() == 'some-file.gz'
+        mock_command.assert_called_once_with(
+            ['pigz', '-f', '-9', '--processes', '8', '--keep', 'some-file']
+        )
+
+    @patch('kiwi.command.Command.run')
+    @patch('kiwi.utils.compress.Path.which')
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    def test_gzip_pigz_not_installed(
+        self, mock_RuntimeConfig, mock_which, mock_command
+    ):
+        runtime_config = mock_RuntimeConfig.return_value
+        runtime_config.get_gzip_tool.return_value = 'pigz'
+        runtime_config.get_compress_threads.return_value = None
+        mock_which.return_value = None
+        self.compress.gzip()
+        mock_command.assert_called_once_with(
+            ['gzip', '-f', '-9', '--keep', 'some-file']
+        )
+
+    @patch('kiwi.command.Command.run')
+    @patch('kiwi.utils.compress.Path.which')
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    def test_zstd(self, mock_RuntimeConfig, mock_which, mock_command):
+        mock_RuntimeConfig.return_value.get_compress_threads.return_value = \
+            None
+        mock_which.return_value = '/usr/bin/zstd'
+        assert self.compress.zstd() == 'some-file.zst'
+        mock_command.assert_called_once_with(
+            ['zstd', '-f', '-q', '-19', '--long', '-T0', 'some-file']
+        )
+        assert self.compress.compressed_filename == 'some-file.zst'
+        mock_command.reset_mock()
+        self.compress.keep_source = False
+        self.compress.zstd(options=['-3'])
+        mock_command.assert_called_once_with(
+            ['zstd', '-f', '-q', '-3', '--rm', 'some-file']
+        )
+
+    @patch('kiwi.command.Command.run')
+    @patch('kiwi.utils.compress.Path.which')
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    def test_zstd_with_configured_threads(
+        self, mock_RuntimeConfig, mock_which, mock_command
+    ):
+        mock_RuntimeConfig.return_value.get_compress_threads.return_value = 8
+        mock_which.return_value = '/usr/bin/zstd'
+        self.compress.zstd()
+        mock_command.assert_called_once_with(
+            ['zstd', '-f', '-q', '-19', '--long', '-T8', 'some-file']
+        )
+
+    @patch('kiwi.command.Command.run')
+    @patch('kiwi.utils.compress.Path.which')
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    @patch('kiwi.logger.log.warning')
+    def test_zstd_not_installed(
+        self, mock_warning, mock_RuntimeConfig, mock_which, mock_command
+    ):
+        mock_RuntimeConfig.return_value.get_compress_threads.return_value = \
+            None
+        mock_which.return_value = None
+        assert self.compress.zstd() == 'some-file.xz'
+        mock_command.assert_called_once_with(
+            ['xz', '-f', '--threads=0', '--keep', 'some-file']
+        )
+        mock_warning.assert_called_once_with(
+            'zstd not found, falling back to xz compression'
+        )
+
+    @patch('kiwi.utils.compress.Command.call')
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    @patch('os.path.getsize')
+    def test_zstd_stream(self, mock_getsize, mock_RuntimeConfig, mock_call):
+        mock_getsize.return_value = 4
+        command = mock.Mock()
+        command.output.read.side_effect = [b'data', b'']
+        command.process.wait.return_value = 0
+        mock_call.return_value = command
+        with patch('builtins.open', create=True):
+            result = self.compress.zstd_stream(
+                'target.zst', digest_names=['sha256'], threads=2
+            )
+        mock_call.assert_called_once_with(
+            ['zstd', '-c', '-q', '-19', '--long', '-T2', 'some-file'],
+            error_file=mock.ANY
+        )
+        assert not mock_RuntimeConfig.called
+        assert result.hexdigests == {
+            'sha256': hashlib.sha256(b'data').hexdigest()
+        }
+        assert result.output_bytes == 4
+        assert self.compress.compressed_filename == 'target.zst'
+
+    @patch('kiwi.utils.compress.Command.call')
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    @patch('os.path.getsize')
+    def test_xz_stream(self, mock_getsize, mock_RuntimeConfig, mock_call):
+        mock_RuntimeConfig.return_value.get_compress_threads.return_value = \
+            None
+        mock_getsize.return_value = 8
+        command = mock.Mock()
+        command.output.read.side_effect = [b'comp', b'ress', b'']
+        command.process.wait.return_value = 0
+        mock_call.return_value = command
+        with patch('builtins.open', create=True) as mock_open:
+            mock_open.return_value = mock.MagicMock()
+            target = mock_open.return_value.__enter__.return_value
+            result = self.compress.xz_stream(
+                'target.xz', digest_names=['sha256', 'md5']
+            )
+        mock_call.assert_called_once_with(
+            ['xz', '-c', '--threads=0', 'some-file'],
+            error_file=mock.ANY
+        )
+        mock_open.assert_called_once_with('target.xz', 'wb')
+        assert target.write.call_args_list == [
+            call(b'comp'), call(b'ress')
+        ]
+        assert result.hexdigests == {
+            'sha256': hashlib.sha256(b'compress').hexdigest(),
+            'md5': hashlib.md5(b'compress').hexdigest()
+        }
+        assert result.input_bytes == 8
+        assert result.output_bytes == 8
+        assert sorted(result.stage_seconds) == [
+            'checksum', 'compress', 'write'
+        ]
+        assert self.compress.compressed_filename == 'target.xz'
+
+    @patch('kiwi.utils.compress.Command.call')
+    @patch('kiwi.utils.compress.RuntimeConfig')
+    @patch('os.path.getsize')
+    def test_xz_stream_no_digests(
+        self, mock_getsize, mock_RuntimeConfig, mock_call
+    ):
+        mock_RuntimeConfig.return_value.get_compress_threads.return_value = 2
+        command = mock.Mock()
+        command.output.read.side_effect = [b'data', b'']
+        command.process.wait.return_value = 0
+        mock_call.return_value = command
+        with patch('builtins.open', create=True):
+            result = self.compress.xz_stream('target.xz')
+        mock_call.assert_called_once_with(
+            ['xz', '-c', '--threads=2', 'some-file'],
+            error_file=mock.ANY
+        )
+        command.output.read.side_effect = [b'data', b'']
+        mock_call.reset_mock()
+        with patch('builtins.open', create=True):
+            self.compress.xz_stream('target.xz', threads=1)
+        mock_call.assert_called_once_with(
+            ['xz', '-c', '--threads=1', 'some-file'],
+            error_file=mock.ANY
+        )
+        assert result.hexdigests == {}
+
     @patch('kiwi.command.Command.run')
     @patch('kiwi.utils.compress.NamedTemporaryFile')
     @patch('kiwi.utils.compress.Compress.get_format')
@@ -82,27 +291,129 @@ class TestCompress:
         mock_format.return_value = None
         self.compress.uncompress()
 
-    @patch('kiwi.path.Path.which')
-    def test_get_format(self, mock_which):
-        mock_which.return_value = 'ziptool'
+    def test_open_uncompressed(self):
+        with Compress('../data/xz_data.xz').open_uncompressed() as data:
+            assert data.read() == b''
+        with Compress('../data/gz_data.gz').open_uncompressed() as data:
+            assert data.read() == b''
+
+    @raises(KiwiCompressionFormatUnknown)
+    @patch('kiwi.utils.compress.Compress.get_format')
+    def test_open_uncompressed_unknown_format(self, mock_format):
+        mock_format.return_value = None
+        self.compress.open_uncompressed()
+
+    def test_get_format(self):
         xz = Compress('../data/xz_data.xz')
         assert xz.get_format() == 'xz'
         gzip = Compress('../data/gz_data.gz')
         assert gzip.get_format() == 'gzip'
 
-    @patch('kiwi.logger.log.debug')
-    @patch('kiwi.command.Command.run')
-    def test_get_format_invalid_format(self, mock_run, mock_log):
-        mock_run.side_effect = ValueError("nothing")
-        invalid = Compress("../data/gz_data.gz")
-        invalid.supported_zipper = ["mock_zip"]
+    @patch('os.stat')
+    def test_get_format_from_magic(self, mock_stat):
+        mock_stat.return_value = mock.Mock(st_mtime_ns=1, st_size=42)
+        headers = [
+            (b'\x28\xb5\x2f\xfd\x04\x58', 'zstd'),
+            (b'BZh91AY', 'bzip2'),
+            (b'\x04\x22\x4d\x18\x64\x40', 'lz4'),
+            (b'\x02\x21\x4c\x18\x00\x00', 'lz4'),
+            (b'BZhx', None),
+            (b'BZh', None),
+            (b'\x00\x01\x02\x03\x04\x05', None)
+        ]
+        for header, zipper in headers:
+            with patch('builtins.open', mock_open(header)):
+                assert self.compress.get_format() == zipper
+            Compress._get_format_from_magic.cache_clear()
+
+    @patch('os.stat')
+    def test_get_format_cached(self, mock_stat):
+        mock_stat.return_value = mock.Mock(st_mtime_ns=2, st_size=42)
+        with patch('builtins.open', mock_open(b'\xfd7zXZ\x00')) as mock_io:
+            assert self.compress.get_format() == 'xz'
+            assert self.compress.get_format() == 'xz'
+            assert mock_io.call_count == 1
+        Compress._get_format_from_magic.cache_clear()
 
-        assert invalid.get_format() is None
+    @patch('os.stat')
+    def test_get_format_unsupported_zipper(self, mock_stat):
+        mock_stat.return_value = mock.Mock(st_mtime_ns=3, st_size=42)
+        self.compress.supported_zipper = ['xz']
+        with patch('builtins.open', mock_open(b'\x1f\x8b\x08')):
+            assert self.compress.get_format() is None
+        Compress._get_format_from_magic.cache_clear()
 
-        mock_run.assert_called_once_with(
-            ['mock_zip', '-l', '../data/gz_data.gz']
+    @patch('kiwi.utils.compress.Command.call')
+    @patch('kiwi.utils.compress.Compress.get_format')
+    def test_open_uncompressed_from_pipe(self, mock_format, mock_call):
+        mock_format.return_value = 'zstd'
+        command = mock.Mock()
+        command.output.read.return_value = b'data'
+        command.process.wait.return_value = 0
+        mock_call.return_value = command
+        with self.compress.open_uncompressed() as data:
+            assert data.read(4) == b'data'
+        mock_call.assert_called_once_with(
+            ['zstd', '-q', '-c', '-d', 'some-file'],
+            error_file=mock.ANY
         )
-        mock_log.assert_called_once_with(
-            'Error running "mock_zip -l ../data/gz_data.gz", got a'
-            ' ValueError: nothing'
+        command.output.read.assert_called_once_with(4)
+        command.output.close.assert_called_once_with()
+        command.process.wait.assert_called_once_with()
+
+    @raises(KiwiCommandError)
+    @patch('kiwi.utils.compress.TemporaryFile')
+    @patch('kiwi.utils.compress.Command.call')
+    @patch('kiwi.utils.compress.Compress.get_format')
+    def test_open_uncompressed_from_pipe_failed(
+        self, mock_format, mock_call, mock_TemporaryFile
+    ):
+        mock_format.return_value = 'lz4'
+        mock_TemporaryFile.return_value.read.return_value = b'corrupted'
+        command = mock.Mock()
+        command.process.wait.return_value = 1
+        command.process.args = ['lz4', '-q', '-c', '-d', 'some-file']
+        mock_call.return_value = command
+        with self.compress.open_uncompressed():
+            pass
+
+    @patch('kiwi.logger.log.debug')
+    @patch('kiwi.utils.compress.TemporaryFile')
+    @patch('kiwi.utils.compress.Command.call')
+    @patch('kiwi.utils.compress.Compress.get_format')
+    def test_open_uncompressed_from_pipe_failed_in_block(
+        self, mock_format, mock_call, mock_TemporaryFile, mock_log_debug
+    ):
+        mock_format.return_value = 'lz4'
+        mock_TemporaryFile.return_value.read.return_value = b'broken pipe'
+        command = mock.Mock()
+        command.process.wait.return_value = 1
+        command.process.args = ['lz4', '-q', '-c', '-d', 'some-file']
+        mock_call.return_value = command
+        with pytest.raises(ValueError):
+            with self.compress.open_uncompressed():
+                raise ValueError('digest failed')
+        command.process.wait.assert_called_once_with()
+        mock_log_debug.assert_called_once_with(
+            'Ignoring lz4 failed: broken pipe after ValueError'
         )
+
+    def test_command_pipe_error_output(self):
+        # more error output than a pipe buffer holds must not block
+        # the tool while its output is read
+        with CommandPipe(
+            ['bash', '-c', 'head -c 1048576 /dev/zero >&2; echo data']
+        ) as pipe:
+            assert pipe.read() == b'data\n'
+        with pytest.raises(KiwiCommandError) as issue:
+            with CommandPipe(['bash', '-c', 'echo corrupted >&2; exit 1']):
+                pass
+        assert 'bash failed: corrupted' in format(issue.value)
+
+    @patch('kiwi.utils.compress.TemporaryFile')
+    @patch('kiwi.utils.compress.Command.call')
+    def test_command_pipe_call_failed(self, mock_call, mock_TemporaryFile):
+        mock_call.side_effect = KiwiCommandError('not found')
+        with pytest.raises(KiwiCommandError):
+            CommandPipe(['lz4', '-d'])
+        mock_TemporaryFile.return_value.close.assert_called_once_with()
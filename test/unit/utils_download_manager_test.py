@@ -0,0 +1,339 @@
+import io
+import os
+import json
+import shutil
+import hashlib
+import threading
+from tempfile import mkdtemp
+from http.server import (
+    HTTPServer, SimpleHTTPRequestHandler
+)
+from socketserver import ThreadingMixIn
+
+import requests
+from mock import patch
+from pytest import raises
+
+from kiwi.utils.download_manager import (
+    DownloadManager,
+    download_request_type
+)
+from kiwi.exceptions import (
+    KiwiUriOpenError,
+    KiwiDownloadChecksumError
+)
+
+
+class MetadataServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetadataRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serves files from the repository directory of the server with
+    keep-alive connections and ETag based conditional requests,
+    every request is recorded in the server request list
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def translate_path(self, path):
+        return os.sep.join(
+            [self.server.repository_dir, path.split('?')[0].lstrip('/')]
+        )
+
+    def send_head(self):
+        self.server.requests.append(
+            (self.client_address[1], self.path, dict(self.headers))
+        )
+        self.etag = None
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            path_stat = os.stat(path)
+            self.etag = '"{0}-{1}"'.format(
+                path_stat.st_mtime_ns, path_stat.st_size
+            )
+            if self.headers.get('If-None-Match') == self.etag:
+                self.send_response(304)
+                self.end_headers()
+                return None
+        return super(MetadataRequestHandler, self).send_head()
+
+    def end_headers(self):
+        if self.etag:
+            self.send_header('ETag', self.etag)
+        super(MetadataRequestHandler, self).end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDownloadManager:
+    def setup(self):
+        self.tmpdir = mkdtemp(prefix='kiwi_download_manager.')
+        self.repository_dir = os.sep.join([self.tmpdir, 'repo'])
+        self.cache_dir = os.sep.join([self.tmpdir, 'cache'])
+        self.target_dir = os.sep.join([self.tmpdir, 'target'])
+        os.makedirs(os.sep.join([self.repository_dir, 'repodata']))
+        os.makedirs(self.target_dir)
+        self.repomd = os.sep.join(
+            [self.repository_dir, 'repodata', 'repomd.xml']
+        )
+        self._write_repomd(b'<repomd/>')
+        self.server = MetadataServer(('127.0.0.1', 0), MetadataRequestHandler)
+        self.server.repository_dir = self.repository_dir
+        self.server.requests = []
+        self.server_thread = threading.Thread(
+            target=self.server.serve_forever
+        )
+        self.server_thread.start()
+        self.url = 'http://127.0.0.1:{0}'.format(self.server.server_port)
+        self.manager = DownloadManager(
+            max_transfers=2, cache_dir=self.cache_dir
+        )
+
+    def teardown(self):
+        self.manager.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+        shutil.rmtree(self.tmpdir)
+
+    def _write_repomd(self, data, mtime=1000000000):
+        with open(self.repomd, 'wb') as repomd:
+            repomd.write(data)
+        os.utime(self.repomd, (mtime, mtime))
+
+    def _read(self, filename):
+        with open(filename, 'rb') as data:
+            return data.read()
+
+    def test_download(self):
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        result = self.manager.download(
+            self.url + '/repodata/repomd.xml', target,
+            ('sha256', hashlib.sha256(b'<repomd/>').hexdigest())
+        )
+        assert result.size == 9
+        assert result.cached is False
+        assert self._read(target) == b'<repomd/>'
+        assert not os.path.exists(target + '.download')
+        assert 'If-None-Match' not in self.server.requests[0][2]
+
+    def test_download_conditional(self):
+        url = self.url + '/repodata/repomd.xml'
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        self.manager.download(url, target)
+        os.unlink(target)
+
+        result = self.manager.download(url, target)
+        assert result.cached is True
+        assert result.size == 9
+        assert self._read(target) == b'<repomd/>'
+        assert self.server.requests[1][2]['If-None-Match']
+        assert self.server.requests[1][2]['If-Modified-Since']
+
+        cache_files = sorted(os.listdir(self.cache_dir))
+        self._write_repomd(b'<repomd>changed</repomd>', mtime=1100000000)
+        result = self.manager.download(url, target)
+        assert result.cached is False
+        assert self._read(target) == b'<repomd>changed</repomd>'
+        updated_cache_files = sorted(os.listdir(self.cache_dir))
+        assert len(updated_cache_files) == 2
+        assert updated_cache_files != cache_files
+        with open(os.sep.join([self.cache_dir, [
+            name for name in updated_cache_files if name.endswith('.json')
+        ][0]])) as cache_info:
+            assert json.load(cache_info)['url'] == url
+
+        # connections are kept alive
+        assert len(set(request[0] for request in self.server.requests)) == 1
+
+    def test_download_conditional_cache_data_removed(self):
+        url = self.url + '/repodata/repomd.xml'
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        self.manager.download(url, target)
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                os.unlink(os.sep.join([self.cache_dir, name]))
+        result = self.manager.download(url, target)
+        assert result.cached is False
+        assert self._read(target) == b'<repomd/>'
+        assert 'If-None-Match' not in self.server.requests[2][2]
+
+    @patch('kiwi.logger.log.debug')
+    def test_download_invalid_cache_info(self, mock_log_debug):
+        url = self.url + '/repodata/repomd.xml'
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        self.manager.download(url, target)
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                with open(os.sep.join([self.cache_dir, name]), 'w') as info:
+                    info.write('{')
+        assert self.manager.download(url, target).cached is False
+        assert mock_log_debug.called
+
+    @patch('kiwi.logger.log.debug')
+    def test_download_cache_not_writable(self, mock_log_debug):
+        with open(self.cache_dir, 'w'):
+            pass
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        self.manager.download(self.url + '/repodata/repomd.xml', target)
+        assert self._read(target) == b'<repomd/>'
+        assert mock_log_debug.called
+
+    @patch('kiwi.logger.log.debug')
+    @patch('json.dump')
+    def test_download_cache_info_write_failed(
+        self, mock_json_dump, mock_log_debug
+    ):
+        mock_json_dump.side_effect = OSError('no space left')
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        self.manager.download(self.url + '/repodata/repomd.xml', target)
+        assert self._read(target) == b'<repomd/>'
+        assert not [
+            name for name in os.listdir(self.cache_dir)
+            if name.endswith('.tmp')
+        ]
+        assert mock_log_debug.called
+
+    def test_download_without_cache(self):
+        manager = DownloadManager()
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        manager.download(self.url + '/repodata/repomd.xml', target)
+        assert manager.download(
+            self.url + '/repodata/repomd.xml', target
+        ).cached is False
+        assert not os.path.exists(self.cache_dir)
+        manager.session.close()
+
+    def test_download_checksum_mismatch(self):
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        with raises(KiwiDownloadChecksumError):
+            self.manager.download(
+                self.url + '/repodata/repomd.xml', target, ('sha256', 'bogus')
+            )
+        assert os.listdir(self.target_dir) == []
+
+    def test_download_not_found(self):
+        with raises(KiwiUriOpenError) as issue:
+            self.manager.download(
+                self.url + '/repodata/primary.xml.gz',
+                os.sep.join([self.target_dir, 'primary.xml.gz'])
+            )
+        assert '404' in issue.value.message
+
+    def test_download_connection_failed(self):
+        self.server.shutdown()
+        self.server.server_close()
+        with raises(KiwiUriOpenError):
+            DownloadManager().download(
+                self.url + '/repodata/repomd.xml',
+                os.sep.join([self.target_dir, 'repomd.xml'])
+            )
+
+    @patch('requests.models.Response.iter_content')
+    def test_download_transfer_failed(self, mock_iter_content):
+        mock_iter_content.side_effect = requests.ConnectionError('reset')
+        with raises(KiwiUriOpenError):
+            self.manager.download(
+                self.url + '/repodata/repomd.xml',
+                os.sep.join([self.target_dir, 'repomd.xml'])
+            )
+
+    def test_download_with_credentials(self):
+        self.manager.download(
+            self.url + '/repodata/repomd.xml',
+            os.sep.join([self.target_dir, 'repomd.xml']),
+            auth=('user', 'secret')
+        )
+        assert self.server.requests[0][2]['Authorization'] == \
+            'Basic dXNlcjpzZWNyZXQ='
+
+    def test_download_file(self):
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        result = self.manager.download(
+            'file://' + self.repomd, target,
+            ('sha256', hashlib.sha256(b'<repomd/>').hexdigest())
+        )
+        assert result.size == 9
+        assert self._read(target) == b'<repomd/>'
+        with raises(KiwiUriOpenError):
+            self.manager.download(
+                'file://' + self.repomd + '.missing', target
+            )
+
+    @patch('kiwi.utils.download_manager.urlopen')
+    def test_download_ftp(self, mock_urlopen):
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        mock_urlopen.return_value = io.BytesIO(b'<repomd/>')
+        result = self.manager.download(
+            'ftp://example.org/repodata/repomd.xml', target,
+            auth=('user', 'secret')
+        )
+        assert result.size == 9
+        assert not result.cached
+        assert self._read(target) == b'<repomd/>'
+        request = mock_urlopen.call_args[0][0]
+        assert request.full_url == 'ftp://example.org/repodata/repomd.xml'
+        assert request.get_header('Authorization') == \
+            b'Basic dXNlcjpzZWNyZXQ='
+        assert mock_urlopen.call_args[1] == {'timeout': 60}
+        mock_urlopen.side_effect = OSError('connection refused')
+        with raises(KiwiUriOpenError):
+            self.manager.download(
+                'ftp://example.org/repodata/repomd.xml', target
+            )
+
+    def test_download_unsupported_scheme(self):
+        target = os.sep.join([self.target_dir, 'repomd.xml'])
+        for url in ('obs://project/repo/repomd.xml', self.repomd):
+            with raises(KiwiUriOpenError):
+                self.manager.download(url, target)
+        assert not os.path.exists(target)
+
+    def test_download_all(self):
+        downloads = []
+        for count in range(6):
+            data = format(count).encode() * 1000
+            filename = 'repodata/{0}-primary.xml.gz'.format(count)
+            with open(os.sep.join([self.repository_dir, filename]), 'wb') \
+                    as primary:
+                primary.write(data)
+            downloads.append(
+                download_request_type(
+                    url='/'.join([self.url, filename]),
+                    target=os.sep.join(
+                        [self.target_dir, os.path.basename(filename)]
+                    ),
+                    checksum=('sha256', hashlib.sha256(data).hexdigest())
+                )
+            )
+        results = self.manager.download_all(downloads)
+        assert [result.target for result in results] == [
+            download.target for download in downloads
+        ]
+        assert [result.size for result in results] == [1000] * 6
+        assert len(os.listdir(self.target_dir)) == 6
+        # transfers are bound to max_transfers pooled connections
+        assert len(set(request[0] for request in self.server.requests)) <= 2
+
+    def test_download_all_raises(self):
+        with raises(KiwiUriOpenError):
+            self.manager.download_all(
+                [
+                    download_request_type(
+                        url=self.url + '/repodata/missing.xml.gz',
+                        target=os.sep.join([self.target_dir, 'missing']),
+                        checksum=None
+                    ),
+                    download_request_type(
+                        url=self.url + '/repodata/repomd.xml',
+                        target=os.sep.join([self.target_dir, 'repomd.xml']),
+                        checksum=None
+                    )
+                ]
+            )
+        assert os.listdir(self.target_dir) == ['repomd.xml']
+
+    def test_download_all_empty(self):
+        assert self.manager.download_all([]) == []
@@ -0,0 +1,179 @@
+from mock import (
+    patch, call, MagicMock
+)
+
+from .test_helper import raises
+
+from kiwi.utils.file_copy import FileCopy
+from kiwi.exceptions import KiwiFileCopyError
+
+
+class TestFileCopy:
+    def setup(self):
+        self.source_file = MagicMock()
+        self.source_file.fileno.return_value = 3
+        self.target_file = MagicMock()
+        self.target_file.fileno.return_value = 4
+        self.open_results = {
+            ('source', 'rb'): self.source_file,
+            ('target', 'wb'): self.target_file
+        }
+
+    def _open(self, filename, mode):
+        file_handle = MagicMock()
+        file_handle.__enter__.return_value = self.open_results[
+            (filename, mode)
+        ]
+        return file_handle
+
+    @patch('kiwi.utils.file_copy.FileCopy._reflink')
+    @patch('os.link')
+    @patch('os.path.lexists')
+    @patch('os.path.getsize')
+    def test_stage_reflink_before_hardlink(
+        self, mock_getsize, mock_lexists, mock_link, mock_reflink
+    ):
+        mock_lexists.return_value = False
+        mock_reflink.return_value = True
+        result = FileCopy.stage('source', 'target', allow_hardlink=True)
+        mock_reflink.assert_called_once_with('source', 'target')
+        assert not mock_link.called
+        assert result.method == 'reflink'
+
+    @patch('kiwi.utils.file_copy.FileCopy._reflink')
+    @patch('os.link')
+    @patch('os.unlink')
+    @patch('os.path.lexists')
+    @patch('os.path.getsize')
+    def test_stage_hardlink(
+        self, mock_getsize, mock_lexists, mock_unlink, mock_link,
+        mock_reflink
+    ):
+        mock_getsize.return_value = 42
+        mock_lexists.return_value = True
+        mock_reflink.return_value = False
+        result = FileCopy.stage('source', 'target', allow_hardlink=True)
+        mock_unlink.assert_called_once_with('target')
+        mock_link.assert_called_once_with('source', 'target')
+        assert result.method == 'hardlink'
+        assert result.size == 42
+
+    @patch('kiwi.utils.file_copy.FileCopy._reflink')
+    @patch('kiwi.utils.file_copy.FileCopy.copy')
+    @patch('os.link')
+    @patch('os.path.lexists')
+    @patch('os.path.getsize')
+    def test_stage_hardlink_failed(
+        self, mock_getsize, mock_lexists, mock_link, mock_copy, mock_reflink
+    ):
+        mock_lexists.return_value = False
+        mock_reflink.return_value = False
+        mock_link.side_effect = OSError('cross device link')
+        mock_copy.return_value = 'copy_file_range'
+        result = FileCopy.stage('source', 'target', allow_hardlink=True)
+        mock_copy.assert_called_once_with('source', 'target', reflink=False)
+        assert result.method == 'copy_file_range'
+
+    @patch('kiwi.utils.file_copy.FileCopy.copy')
+    @patch('os.link')
+    @patch('os.path.lexists')
+    @patch('os.path.getsize')
+    def test_stage_no_hardlink(
+        self, mock_getsize, mock_lexists, mock_link, mock_copy
+    ):
+        mock_lexists.return_value = False
+        mock_copy.return_value = 'copy'
+        assert FileCopy.stage('source', 'target').method == 'copy'
+        assert not mock_link.called
+        mock_copy.assert_called_once_with('source', 'target', reflink=True)
+
+    @patch('shutil.copymode')
+    @patch('fcntl.ioctl')
+    def test_reflink(self, mock_ioctl, mock_copymode):
+        with patch('builtins.open', side_effect=self._open):
+            assert FileCopy._reflink('source', 'target') is True
+        mock_ioctl.assert_called_once_with(4, FileCopy.ficlone, 3)
+        mock_copymode.assert_called_once_with('source', 'target')
+
+    @patch('os.unlink')
+    @patch('os.path.lexists')
+    @patch('fcntl.ioctl')
+    def test_reflink_not_possible(self, mock_ioctl, mock_lexists, mock_unlink):
+        mock_ioctl.side_effect = OSError('not supported')
+        mock_lexists.return_value = True
+        with patch('builtins.open', side_effect=self._open):
+            assert FileCopy._reflink('source', 'target') is False
+        mock_unlink.assert_called_once_with('target')
+
+    @patch('shutil.copyfileobj')
+    @patch('shutil.copymode')
+    @patch('fcntl.ioctl')
+    @patch('kiwi.utils.file_copy.os')
+    def test_copy_without_reflink(
+        self, mock_os, mock_ioctl, mock_copymode, mock_copyfileobj
+    ):
+        mock_os.mock_add_spec(['sendfile'])
+        mock_os.sendfile.side_effect = OSError('not supported')
+        with patch('builtins.open', side_effect=self._open):
+            assert FileCopy.copy('source', 'target', reflink=False) == 'copy'
+        assert not mock_ioctl.called
+
+    @patch('shutil.copymode')
+    @patch('fcntl.ioctl')
+    def test_copy_reflink(self, mock_ioctl, mock_copymode):
+        with patch('builtins.open', side_effect=self._open):
+            assert FileCopy.copy('source', 'target') == 'reflink'
+        mock_ioctl.assert_called_once_with(4, FileCopy.ficlone, 3)
+        mock_copymode.assert_called_once_with('source', 'target')
+
+    @patch('shutil.copymode')
+    @patch('fcntl.ioctl')
+    @patch('os.copy_file_range', create=True)
+    def test_copy_file_range(
+        self, mock_copy_file_range, mock_ioctl, mock_copymode
+    ):
+        mock_ioctl.side_effect = OSError('not supported')
+        mock_copy_file_range.side_effect = [FileCopy.chunk_size, 42, 0]
+        with patch('builtins.open', side_effect=self._open):
+            assert FileCopy.copy('source', 'target') == 'copy_file_range'
+        assert mock_copy_file_range.call_args_list == [
+            call(3, 4, FileCopy.chunk_size)
+        ] * 3
+
+    @patch('shutil.copymode')
+    @patch('fcntl.ioctl')
+    @patch('os.sendfile')
+    @patch('os.copy_file_range', create=True)
+    def test_copy_sendfile(
+        self, mock_copy_file_range, mock_sendfile, mock_ioctl, mock_copymode
+    ):
+        mock_ioctl.side_effect = OSError('not supported')
+        mock_copy_file_range.side_effect = OSError('cross device')
+        mock_sendfile.side_effect = [42, 0]
+        with patch('builtins.open', side_effect=self._open):
+            assert FileCopy.copy('source', 'target') == 'sendfile'
+        assert mock_sendfile.call_args_list == [
+            call(4, 3, None, FileCopy.chunk_size)
+        ] * 2
+
+    @patch('shutil.copyfileobj')
+    @patch('shutil.copymode')
+    @patch('fcntl.ioctl')
+    @patch('kiwi.utils.file_copy.os')
+    def test_copy_plain(
+        self, mock_os, mock_ioctl, mock_copymode, mock_copyfileobj
+    ):
+        # no copy_file_range on this python version
+        mock_os.mock_add_spec(['sendfile'])
+        mock_os.sendfile.side_effect = OSError('not supported')
+        mock_ioctl.side_effect = OSError('not supported')
+        with patch('builtins.open', side_effect=self._open):
+            assert FileCopy.copy('source', 'target') == 'copy'
+        mock_copyfileobj.assert_called_once_with(
+            self.source_file, self.target_file, 1 << 20
+        )
+
+    @raises(KiwiFileCopyError)
+    def test_copy_failed(self):
+        with patch('builtins.open', side_effect=OSError('no space')):
+            FileCopy.copy('source', 'target')
@@ -176,6 +176,10 @@ class TestVolumeManagerBase:
         size.accumulate_mbyte_file_sizes.assert_called_once_with(
             ['root_dir/usr', 'root_dir/usr/lib']
         )
+        size.customize.assert_called_once_with(
+            size.accumulate_mbyte_file_sizes.return_value, 'ext3',
+            ['root_dir/usr', 'root_dir/usr/lib']
+        )
 
     @raises(NotImplementedError)
     def test_mount_volumes(self):
@@ -106,6 +106,7 @@ class TestVolumeManagerBtrfs:
         ]
 
     @patch('os.path.exists')
+    @patch('kiwi.volume_manager.btrfs.Path.create')
     @patch('kiwi.volume_manager.btrfs.Command.run')
     @patch('kiwi.volume_manager.btrfs.FileSystem')
     @patch('kiwi.volume_manager.btrfs.MappedDevice')
@@ -113,7 +114,7 @@ class TestVolumeManagerBtrfs:
     @patch('kiwi.volume_manager.base.mkdtemp')
     def test_setup_with_snapshot(
         self, mock_mkdtemp, mock_mount, mock_mapped_device, mock_fs,
-        mock_command, mock_os_exists
+        mock_command, mock_Path_create, mock_os_exists
     ):
         mock_mkdtemp.return_value = 'tmpdir'
         toplevel_mount = mock.Mock()
@@ -137,7 +138,6 @@ class TestVolumeManagerBtrfs:
             call(['btrfs', 'quota', 'enable', 'tmpdir']),
             call(['btrfs', 'subvolume', 'create', 'tmpdir/@']),
             call(['btrfs', 'subvolume', 'create', 'tmpdir/@/.snapshots']),
-            call(['mkdir', '-p', 'tmpdir/@/.snapshots/1']),
             call([
                 'btrfs', 'subvolume', 'snapshot', 'tmpdir/@',
                 'tmpdir/@/.snapshots/1/snapshot'
@@ -145,6 +145,7 @@ class TestVolumeManagerBtrfs:
             call(['btrfs', 'subvolume', 'list', 'tmpdir']),
             call(['btrfs', 'subvolume', 'set-default', '258', 'tmpdir'])
         ]
+        mock_Path_create.assert_called_once_with('tmpdir/@/.snapshots/1')
 
     @raises(KiwiVolumeRootIDError)
     @patch('os.path.exists')
@@ -278,6 +279,7 @@ class TestVolumeManagerBtrfs:
         )
 
     @patch('os.path.exists')
+    @patch('kiwi.volume_manager.btrfs.Path.create')
     @patch('kiwi.volume_manager.btrfs.Command.run')
     @patch('kiwi.volume_manager.btrfs.FileSystem')
     @patch('kiwi.volume_manager.btrfs.MappedDevice')
@@ -285,7 +287,7 @@ class TestVolumeManagerBtrfs:
     @patch('kiwi.volume_manager.base.mkdtemp')
     def test_remount_volumes(
         self, mock_mkdtemp, mock_mount, mock_mapped_device, mock_fs,
-        mock_command, mock_os_exists
+        mock_command, mock_Path_create, mock_os_exists
     ):
         mock_mkdtemp.return_value = '/tmp/kiwi_volumes.xx'
         toplevel_mount = mock.Mock()
@@ -126,6 +126,7 @@ class TestVolumeManagerLVM:
         self.volume_manager.setup('volume_group')
 
     @patch('os.path.exists')
+    @patch('kiwi.volume_manager.base.Path.create')
     @patch('kiwi.volume_manager.base.SystemSize')
     @patch('kiwi.volume_manager.lvm.Command.run')
     @patch('kiwi.volume_manager.lvm.FileSystem')
@@ -134,7 +135,7 @@ class TestVolumeManagerLVM:
     @patch('kiwi.volume_manager.base.VolumeManagerBase.apply_attributes_on_volume')
     def test_create_volumes(
         self, mock_attrs, mock_mount, mock_mapped_device, mock_fs,
-        mock_command, mock_size, mock_os_exists
+        mock_command, mock_size, mock_Path_create, mock_os_exists
     ):
         filesystem = mock.Mock()
         mock_fs.return_value = filesystem
@@ -181,10 +182,12 @@ class TestVolumeManagerLVM:
             call(device='/dev/volume_group/LVetc', mountpoint='tmpdir//etc'),
             call(device='/dev/volume_group/LVhome', mountpoint='tmpdir//home')
         ]
+        assert mock_Path_create.call_args_list == [
+            call('root_dir/etc'),
+            call('root_dir/data'),
+            call('root_dir/home')
+        ]
         assert mock_command.call_args_list == [
-            call(['mkdir', '-p', 'root_dir/etc']),
-            call(['mkdir', '-p', 'root_dir/data']),
-            call(['mkdir', '-p', 'root_dir/home']),
             call([
                 'lvcreate', '-Zn', '-L', format(root_size), '-n', 'LVRoot',
                 'volume_group'